@@ -2,7 +2,7 @@
 # Archivo: backend/api/admin.py
 
 from django.contrib import admin
-from .models import Predio, Medicion, Recomendacion, Profile
+from .models import Predio, Medicion, Recomendacion, Profile, Reporte, Tarea, Perfil, Dispositivo, EstadisticaSensor, ResumenDiario
 
 
 @admin.register(Profile)
@@ -22,7 +22,7 @@ class PredioAdmin(admin.ModelAdmin):
 
 @admin.register(Medicion)
 class MedicionAdmin(admin.ModelAdmin):
-    list_display = ['predio', 'fecha', 'ph', 'temperatura', 'humedad', 'origen']
+    list_display = ['predio', 'fecha', 'ph', 'temperatura', 'humedad', 'origen', 'anomalias']
     list_filter = ['origen', 'fecha', 'predio']
     date_hierarchy = 'fecha'
 
@@ -32,4 +32,47 @@ class RecomendacionAdmin(admin.ModelAdmin):
     list_display = ['predio', 'semana_inicio', 'urea_kg_ha', 'superfosfato_kg_ha', 'fecha_calculo']
     date_hierarchy = 'fecha_calculo'
     list_filter = ['predio__zona']
-    search_fields = ['predio__nombre']
\ No newline at end of file
+    search_fields = ['predio__nombre']
+
+@admin.register(Reporte)
+class ReporteAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'tipo', 'formato', 'estado', 'tamano', 'duracion_ms', 'descargas', 'fecha_solicitud']
+    list_filter = ['estado', 'tipo', 'formato']
+    search_fields = ['usuario__email']
+    exclude = ['archivo']
+    readonly_fields = ['huella', 'marca_datos', 'clave']
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'clave', 'estado', 'intentos', 'disponible_en', 'fecha_encolado', 'fecha_fin']
+    list_filter = ['estado', 'tipo']
+    search_fields = ['clave']
+
+
+@admin.register(Perfil)
+class PerfilAdmin(admin.ModelAdmin):
+    list_display = ['id', 'metodo', 'ruta', 'codigo', 'duracion_ms', 'cantidad_consultas', 'usuario', 'fecha']
+    search_fields = ['ruta', 'usuario__email']
+    exclude = ['estadisticas', 'consultas']
+
+
+@admin.register(Dispositivo)
+class DispositivoAdmin(admin.ModelAdmin):
+    list_display = ['identificador', 'predio', 'total_lecturas', 'secuencia_max', 'duplicadas', 'ultima_vez', 'primera_vez']
+    search_fields = ['identificador', 'predio__nombre']
+    raw_id_fields = ['ultima_medicion']
+
+
+@admin.register(EstadisticaSensor)
+class EstadisticaSensorAdmin(admin.ModelAdmin):
+    list_display = ['predio', 'parametro', 'n', 'media', 'varianza', 'consecutivas', 'actualizada']
+    list_filter = ['parametro']
+    search_fields = ['predio__nombre']
+
+
+@admin.register(ResumenDiario)
+class ResumenDiarioAdmin(admin.ModelAdmin):
+    list_display = ['predio', 'dia', 'cantidad', 'n_humedad', 'min_humedad', 'max_humedad', 'actualizado']
+    date_hierarchy = 'dia'
+    search_fields = ['predio__nombre']
@@ -0,0 +1,147 @@
+# backend/api/anomalias.py
+"""
+Detección de lecturas anómalas en la ingesta IoT, sin recorrer el historial.
+
+Cada (predio, parámetro) tiene una fila en `estadisticas_sensores` con la media
+y la varianza móviles de sus lecturas aceptadas: cada lectura nueva se compara
+con ellas y las actualiza en O(1) (un SELECT ... FOR UPDATE y un UPDATE por
+lectura, para todos sus parámetros).
+
+- Calentamiento: las primeras ANOMALIAS_MINIMO lecturas se acumulan con
+  Welford (media y varianza exactas) y no se marcan por desvío.
+- Después, media y varianza exponenciales (peso ANOMALIAS_ALFA): siguen la
+  deriva lenta del suelo (riego, estación) y olvidan lo antiguo.
+- Se marca una lectura si se aleja más de ANOMALIAS_Z desvíos de la media
+  ('desvio') o si está en el tope del rango del sensor ('limite': humedad 0 o
+  100, pH 0 o 14, lo que manda una sonda desconectada o saturada).
+- Los valores marcados no actualizan la estadística. Tras ANOMALIAS_CONSECUTIVAS
+  marcas seguidas por desvío se asume un cambio de nivel real (sonda movida,
+  recalibración) y la estadística se reinicia desde la lectura actual.
+
+El resultado es una máscara de bits por parámetro (BITS) que se guarda en
+Medicion.anomalias; los promedios semanales excluyen los valores marcados con
+sin_anomalia() (ANOMALIAS_EXCLUIR_PROMEDIOS).
+"""
+import math
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from .lecturas import CAMPOS
+from .metricas import REGISTRO
+from .models import EstadisticaSensor
+
+BITS = {campo: 1 << i for i, campo in enumerate(CAMPOS)}
+
+# Rango físico del sensor: los valores en el tope son sondas desconectadas o saturadas
+LIMITES_SENSOR = {
+    'humedad': (0, 100),
+    'ph': (0, 14),
+}
+# Desvío mínimo: con lecturas constantes la varianza es 0 y cualquier cambio sería anómalo
+DESVIO_MINIMO = {
+    'ph': 0.1,
+    'temperatura': 0.5,
+    'humedad': 1.0,
+    'nitrogeno': 1.0,
+    'fosforo': 1.0,
+    'potasio': 1.0,
+}
+
+ANOMALIAS = REGISTRO.contador(
+    'nutrisoil_ingest_anomalies_total', 'Valores marcados como anómalos en la ingesta, por parámetro y motivo',
+    ('parametro', 'motivo'))
+
+
+def sin_anomalia(campo):
+    """Condición para agregados (filter=) que deja fuera los valores de `campo` marcados."""
+    return Exact(F('anomalias').bitand(BITS[campo]), 0)
+
+
+def _numero(valor):
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None  # La creación de la Medicion rechaza el valor
+    return numero if math.isfinite(numero) else None
+
+
+def _reiniciar(estado, valor):
+    estado.n, estado.media, estado.varianza, estado.consecutivas = 1, valor, 0.0, 0
+
+
+def _acumular(estado, valor):
+    delta = valor - estado.media
+    if estado.n < settings.ANOMALIAS_MINIMO:
+        # Welford sobre la varianza poblacional: M2 = varianza * n
+        estado.n += 1
+        estado.media += delta / estado.n
+        estado.varianza += (delta * (valor - estado.media) - estado.varianza) / estado.n
+    else:
+        alfa = settings.ANOMALIAS_ALFA
+        estado.n += 1
+        estado.media += alfa * delta
+        estado.varianza = (1 - alfa) * (estado.varianza + alfa * delta * delta)
+    estado.consecutivas = 0
+
+
+def evaluar(estado, valor):
+    """
+    Compara `valor` con la estadística y la actualiza. Retorna el motivo si es
+    anómalo ('limite' o 'desvio') o None.
+    """
+    limites = LIMITES_SENSOR.get(estado.parametro)
+    if limites and not limites[0] < valor < limites[1]:
+        return 'limite'
+    if estado.n >= settings.ANOMALIAS_MINIMO:
+        desvio = max(math.sqrt(estado.varianza), DESVIO_MINIMO.get(estado.parametro, 0))
+        if abs(valor - estado.media) > settings.ANOMALIAS_Z * desvio:
+            estado.consecutivas += 1
+            if estado.consecutivas >= settings.ANOMALIAS_CONSECUTIVAS:
+                _reiniciar(estado, valor)  # Cambio de nivel: esta lectura aún se marca
+            return 'desvio'
+    if estado.n == 0:
+        _reiniciar(estado, valor)
+    else:
+        _acumular(estado, valor)
+    return None
+
+
+def evaluar_lectura(predio_id, valores):
+    """
+    Máscara de anomalías de una lectura ({'humedad': ..., 'ph': ...}) y
+    actualización de las estadísticas del predio. Llamar dentro de la
+    transacción que guarda la Medicion: las filas quedan bloqueadas hasta el
+    commit, así dos lecturas del mismo predio no pisan la estadística.
+    """
+    valores = {campo: _numero(valor) for campo, valor in valores.items() if campo in BITS}
+    valores = {campo: valor for campo, valor in valores.items() if valor is not None}
+    if not valores:
+        return 0
+
+    def bloquear():
+        filas = (EstadisticaSensor.objects.select_for_update()
+                 .filter(predio_id=predio_id, parametro__in=list(valores)).order_by('parametro'))
+        return {estado.parametro: estado for estado in filas}
+
+    estados = bloquear()
+    if len(estados) < len(valores):
+        # Primera lectura del parámetro en el predio; si otra petición la crea a la vez, se ignora la repetida
+        EstadisticaSensor.objects.bulk_create(
+            [EstadisticaSensor(predio_id=predio_id, parametro=campo) for campo in valores if campo not in estados],
+            ignore_conflicts=True)
+        estados = bloquear()
+
+    mascara, ahora = 0, timezone.now()
+    for campo, valor in valores.items():
+        estado = estados[campo]
+        motivo = evaluar(estado, valor)
+        if motivo:
+            mascara |= BITS[campo]
+            ANOMALIAS.incrementar(campo, motivo)
+        estado.actualizada = ahora  # bulk_update no aplica auto_now
+    EstadisticaSensor.objects.bulk_update(list(estados.values()),
+                                          ['n', 'media', 'varianza', 'consecutivas', 'actualizada'])
+    return mascara
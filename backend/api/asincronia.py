@@ -0,0 +1,177 @@
+# backend/api/asincronia.py
+"""
+Soporte para las vistas async (ASGI) de views_async.py.
+
+El ORM de Django es síncrono: sus variantes async (aget, acount...) pasan
+todas por un mismo hilo, una consulta detrás de otra. Aquí cada función
+síncrona corre en un pool de ASYNC_HILOS_BD hilos, cada uno con su propia
+conexión, y en_paralelo lanza juntas las consultas independientes:
+
+    total, tendencia = await en_paralelo(mediciones.count, partial(tendencia_npk, mediciones))
+
+Cada hilo reutiliza su conexión como un hilo de gunicorn: close_old_connections
+antes y después de cada tarea (respeta DB_CONN_MAX_AGE y los health checks),
+así que ASYNC_HILOS_BD acota las conexiones de cada worker ASGI. Estos hilos no
+pasan por request_started/request_finished: cerrar_conexiones() cierra las que
+quedan abiertas al salir del proceso (y al final de las pruebas que usan el
+pool). Las tareas corren en una copia del contexto de la petición: heredan la
+réplica elegida por @lectura_replica y la medición de SQL de /metrics y del
+perfilado.
+
+DRF 3.14 no ejecuta vistas async; @vista_async pasa por el mismo APIView que
+@api_view (initial, handle_exception y finalize_response): autenticación,
+permisos, throttling y negociación de contenido con la configuración de
+REST_FRAMEWORK, y solo la vista en sí es async.
+"""
+import asyncio
+import atexit
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.views import APIView
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .metricas import envolturas_heredadas
+
+_ejecutor = None
+_lock = threading.Lock()
+
+
+# ═══════════════════════════════════════════════════════
+# CONSULTAS EN HILOS
+# ═══════════════════════════════════════════════════════
+
+def ejecutor():
+    global _ejecutor
+    with _lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=settings.ASYNC_HILOS_BD, thread_name_prefix='bd-async')
+        return _ejecutor
+
+
+def _tarea(funcion, args):
+    close_old_connections()
+    try:
+        with envolturas_heredadas():
+            return funcion(*args)
+    finally:
+        close_old_connections()
+
+
+def _cerrar_hilo(barrera):
+    try:
+        barrera.wait()
+    except threading.BrokenBarrierError:
+        pass
+    connections.close_all()
+
+
+def cerrar_conexiones():
+    """Cierra las conexiones de todos los hilos del pool y lo descarta; el próximo en_hilo crea otro."""
+    global _ejecutor
+    with _lock:
+        pool, _ejecutor = _ejecutor, None
+    if pool is None:
+        return
+    # Una tarea por hilo: la barrera impide que un hilo tome dos y otro ninguna
+    hilos = pool._max_workers
+    barrera = threading.Barrier(hilos, timeout=30)
+    try:
+        for _ in range(hilos):
+            pool.submit(_cerrar_hilo, barrera)
+    except RuntimeError:
+        return  # Al salir del intérprete concurrent.futures ya terminó los hilos (y sus conexiones)
+    pool.shutdown(wait=True)
+
+
+atexit.register(cerrar_conexiones)
+
+
+async def en_hilo(funcion, *args):
+    """Ejecuta una función síncrona (ORM) en el pool, con el contexto de la petición."""
+    contexto = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(ejecutor(), contexto.run, _tarea, funcion, args)
+
+
+async def en_paralelo(*funciones):
+    """Resultados de las funciones (sin argumentos: usar partial) en el mismo orden."""
+    return await asyncio.gather(*(en_hilo(funcion) for funcion in funciones))
+
+
+async def en_flujo(generador):
+    """
+    Itera un generador síncrono de bytes desde un StreamingHttpResponse bajo
+    ASGI, bloque a bloque: con el generador tal cual, Django lo junta entero en
+    memoria antes de enviarlo. Cada paso corre en el hilo de la petición
+    (thread_sensitive) y no en el pool: el cursor del servidor que abre
+    .iterator() pertenece a la conexión de ese hilo.
+    """
+    siguiente = sync_to_async(next, thread_sensitive=True)
+    fin = object()
+    while (bloque := await siguiente(generador, fin)) is not fin:
+        yield bloque
+
+
+# ═══════════════════════════════════════════════════════
+# VISTAS
+# ═══════════════════════════════════════════════════════
+
+def vista_async(metodos, permisos=None):
+    """
+    @api_view para vistas async. La vista recibe el Request de DRF (con .data,
+    .user y .profile) y devuelve un Response de DRF, que aquí se renderiza.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            drf = APIView(**({'permission_classes': permisos} if permisos else {}))
+            drf.args, drf.kwargs = args, kwargs
+            peticion = drf.request = drf.initialize_request(request, *args, **kwargs)
+            drf.headers = drf.default_response_headers
+            try:
+                if 'Authorization' in request.headers:  # Sin token no hay consultas: no hace falta el hilo
+                    await en_hilo(drf.initial, peticion, *args, **kwargs)
+                else:
+                    drf.initial(peticion, *args, **kwargs)
+                if request.method not in metodos:
+                    raise MethodNotAllowed(request.method)
+                respuesta = await vista(peticion, *args, **kwargs)
+            except Exception as exc:
+                respuesta = drf.handle_exception(exc)
+            respuesta = drf.finalize_response(peticion, respuesta, *args, **kwargs)
+            return respuesta.render()
+        return csrf_exempt(envoltura)
+    return decorador
+
+
+# ═══════════════════════════════════════════════════════
+# MIDDLEWARE
+# ═══════════════════════════════════════════════════════
+
+class WhiteNoiseAsyncMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise es solo síncrono: con él en la cadena ASGI atendería las peticiones de a una."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        static_file = self.find_file(request.path_info) if self.autorefresh else self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
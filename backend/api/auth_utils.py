@@ -1,7 +1,12 @@
 """
 Utilidades para autenticación con Supabase
-( ! ) Por ahora se utiliza authentication.py, pero por si acaso no borrar este archivo
+( ! ) Por ahora se utiliza authentication.py, pero por si acaso no borrar este archivo.
+      authentication.py sí usa `jwks_cache` para verificar tokens RS256/ES256.
 """
+import logging
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
 from rest_framework.response import Response
 from rest_framework import status
@@ -10,42 +15,185 @@ import jwt
 import requests
 from typing import Optional, Dict, Any
 
-# Cache para el JWKS (JSON Web Key Set) de Supabase
-_jwks_cache = None
+logger = logging.getLogger(__name__)
+
+
+class JWKSCache:
+    """
+    Cache de las claves públicas (JWKS) de Supabase para verificar tokens RS256/ES256.
+
+    - Las claves se guardan ya parseadas (PyJWK) e indexadas por `kid`.
+    - Pasado el TTL se siguen sirviendo las claves actuales y se refrescan en segundo plano.
+    - Un `kid` desconocido fuerza una única descarga síncrona (rotación de claves),
+      limitada por `min_refetch_interval` para no martillar el endpoint con tokens basura.
+    - Si una descarga falla se conservan las claves anteriores; nunca se cachea `{}`.
+    """
+
+    def __init__(self, url=None, ttl=None, min_refetch_interval=None, timeout=5, session=None):
+        self._url = url
+        self.ttl = ttl if ttl is not None else getattr(settings, 'SUPABASE_JWKS_TTL', 600)
+        self.min_refetch_interval = (
+            min_refetch_interval if min_refetch_interval is not None
+            else getattr(settings, 'SUPABASE_JWKS_MIN_REFETCH', 30)
+        )
+        self.timeout = timeout
+        self._session = session or requests.Session()
+        self._keys = {}
+        self._jwks = {'keys': []}
+        self._fetched_at = None      # Última descarga exitosa
+        self._attempted_at = None    # Último intento (exitoso o no)
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def url(self):
+        if self._url:
+            return self._url
+        return getattr(settings, 'SUPABASE_JWKS_URL', None) or \
+            f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+
+    def _fetch(self):
+        response = self._session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        jwks = response.json()
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            kid = jwk.get('kid')
+            if not kid:
+                continue
+            try:
+                keys[kid] = jwt.PyJWK(jwk)
+            except jwt.PyJWKError as e:
+                logger.warning("Clave JWKS %s ignorada: %s", kid, e)
+        return jwks, keys
+
+    def refresh(self, force=False):
+        """
+        Descarga el JWKS y reemplaza las claves. Devuelve True si se actualizaron.
+        Sin `force`, respeta `min_refetch_interval` desde el último intento.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._attempted_at is not None and \
+                    now - self._attempted_at < self.min_refetch_interval:
+                return False
+            self._attempted_at = now
+            try:
+                jwks, keys = self._fetch()
+            except Exception as e:
+                logger.warning("Error al obtener JWKS de Supabase: %s", e)
+                return False
+            # Reemplazo atómico: los lectores nunca ven un dict a medio construir
+            self._keys = keys
+            self._jwks = jwks
+            self._fetched_at = time.monotonic()
+            return True
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _run():
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=_run, name='jwks-refresh', daemon=True).start()
+
+    def is_stale(self):
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl
+
+    def get_key(self, kid):
+        """Retorna la PyJWK para `kid`, o None si no existe tras un refetch."""
+        if not self._keys:
+            self.refresh()
+        elif self.is_stale():
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and self.refresh():
+            key = self._keys.get(kid)
+        return key
+
+    def as_dict(self):
+        """Representación JWKS de las claves cacheadas."""
+        if not self._keys:
+            self.refresh()
+        return self._jwks
+
+    def clear(self):
+        with self._lock:
+            self._keys = {}
+            self._jwks = {'keys': []}
+            self._fetched_at = None
+            self._attempted_at = None
+
+
+class TokenCache:
+    """
+    LRU de payloads ya verificados, indexado por el token completo (firma incluida).
+    Un mismo token llega en varias requests seguidas (dashboard, listados); así la
+    verificación criptográfica se paga una vez por token y no una vez por request.
+    Cada entrada vence con el `exp` del propio token.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize if maxsize is not None else getattr(settings, 'SUPABASE_TOKEN_CACHE_SIZE', 1024)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entrada = self._data.get(token)
+            if entrada is None:
+                return None
+            payload, exp = entrada
+            if exp <= time.time():
+                del self._data[token]
+                return None
+            self._data.move_to_end(token)
+            return payload
+
+    def set(self, token, payload):
+        exp = payload.get('exp')
+        if not self.maxsize or not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._data[token] = (payload, exp)
+            self._data.move_to_end(token)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Instancias compartidas por todo el proceso
+jwks_cache = JWKSCache()
+token_cache = TokenCache()
 
 
 def get_supabase_jwks():
     """
     Obtiene las claves públicas de Supabase para verificar tokens JWT
     """
-    global _jwks_cache
-    if _jwks_cache is None:
-        jwks_url = f"{settings.SUPABASE_URL}/.well-known/jwks.json"
-        try:
-            response = requests.get(jwks_url, timeout=5)
-            response.raise_for_status()
-            _jwks_cache = response.json()
-        except Exception as e:
-            print(f"Error al obtener JWKS de Supabase: {e}")
-            _jwks_cache = {}
-    return _jwks_cache
+    return jwks_cache.as_dict()
 
 
 def get_signing_key(token: str):
     """
-    Obtiene la clave de firma correspondiente al token JWT
+    Obtiene la clave de firma (PyJWK) correspondiente al token JWT
     """
-    jwks = get_supabase_jwks()
     unverified_header = jwt.get_unverified_header(token)
     
     if 'kid' not in unverified_header:
         return None
     
-    for key in jwks.get('keys', []):
-        if key.get('kid') == unverified_header['kid']:
-            return jwt.algorithms.RSAAlgorithm.from_jwk(key)
-    
-    return None
+    return jwks_cache.get_key(unverified_header['kid'])
 
 
 def get_user_from_token(token: str) -> Optional[Dict[str, Any]]:
@@ -62,8 +210,8 @@ def get_user_from_token(token: str) -> Optional[Dict[str, Any]]:
         # Decodificar y verificar el token
         payload = jwt.decode(
             token,
-            signing_key,
-            algorithms=["RS256"],
+            signing_key.key,
+            algorithms=[signing_key.algorithm_name],
             audience="authenticated",
             options={"verify_exp": True}
         )
@@ -4,8 +4,13 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from .auth_utils import jwks_cache, token_cache
 from .models import Profile
 
+# Algoritmos asimétricos aceptados (claves publicadas en el JWKS de Supabase)
+ALGORITMOS_JWKS = ("RS256", "ES256")
+
+
 class SupabaseAuthentication(BaseAuthentication):
     def authenticate(self, request):
         auth_header = request.headers.get('Authorization')
@@ -13,20 +18,7 @@ class SupabaseAuthentication(BaseAuthentication):
             return None
 
         token = auth_header.split(' ')[1]
-        jwt_secret = settings.SUPABASE_JWT_SECRET
-        if not jwt_secret:
-            raise AuthenticationFailed("La clave secreta de JWT no está configurada.")
-
-        try:
-            # Agregamos leeway=60 para tolerar pequeñas diferencias de hora entre servidores
-            payload = jwt.decode(
-                token, jwt_secret, algorithms=["HS256"],
-                audience="authenticated", 
-                options={"verify_exp": True},
-                leeway=60 
-            )
-        except Exception as e:
-            raise AuthenticationFailed(f"Token inválido: {e}")
+        payload = self.decodificar_token(token)
 
         supabase_user_id = payload.get("sub")
         user_email = payload.get("email")
@@ -60,4 +52,45 @@ class SupabaseAuthentication(BaseAuthentication):
         except Profile.DoesNotExist:
             raise AuthenticationFailed("El perfil del usuario no existe en la base de datos.")
         except Exception as e:
-            raise AuthenticationFailed(f"Error al procesar el perfil de usuario: {e}")
\ No newline at end of file
+            raise AuthenticationFailed(f"Error al procesar el perfil de usuario: {e}")
+
+    def decodificar_token(self, token):
+        """
+        Verifica la firma del token. Los tokens HS256 usan el secreto compartido;
+        los RS256/ES256 usan la clave pública del JWKS, buscada por `kid` en la cache.
+        """
+        payload = token_cache.get(token)
+        if payload is not None:
+            return payload
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise AuthenticationFailed(f"Token inválido: {e}")
+
+        alg = header.get("alg")
+        if alg in ALGORITMOS_JWKS:
+            kid = header.get("kid")
+            signing_key = jwks_cache.get_key(kid) if kid else None
+            if signing_key is None:
+                raise AuthenticationFailed("Token inválido: clave de firma desconocida.")
+            key, algorithms = signing_key.key, [signing_key.algorithm_name]
+        else:
+            key = settings.SUPABASE_JWT_SECRET
+            if not key:
+                raise AuthenticationFailed("La clave secreta de JWT no está configurada.")
+            algorithms = ["HS256"]
+
+        try:
+            # Agregamos leeway=60 para tolerar pequeñas diferencias de hora entre servidores
+            payload = jwt.decode(
+                token, key, algorithms=algorithms,
+                audience="authenticated", 
+                options={"verify_exp": True},
+                leeway=60 
+            )
+        except Exception as e:
+            raise AuthenticationFailed(f"Token inválido: {e}")
+
+        token_cache.set(token, payload)
+        return payload
\ No newline at end of file
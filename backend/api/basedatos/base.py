@@ -0,0 +1,63 @@
+# backend/api/basedatos/base.py
+"""
+Backend PostgreSQL de Django con métricas de conexión (ENGINE 'api.basedatos').
+
+Mide en /metrics cuánto tarda cada petición en obtener su conexión: sin pool
+es el handshake completo (TCP + TLS + auth contra Supabase), con el pool de
+psycopg3 es la espera hasta que haya una conexión libre. Con pool además
+expone su tamaño, las conexiones en uso y las peticiones en espera.
+
+El modo se elige con DB_MODO_CONEXION en settings.py.
+"""
+import time
+
+from django.db.backends.postgresql import base
+
+from ..metricas import REGISTRO
+
+OBTENER_CONEXION = REGISTRO.histograma(
+    'nutrisoil_db_connection_acquire_seconds',
+    'Tiempo para obtener una conexión (handshake sin pool, espera del pool con pool)', ('alias', 'modo'))
+
+
+def _estadisticas_pools():
+    # El pool es uno por alias y por proceso, compartido entre hilos
+    return {alias: pool.get_stats() for alias, pool in DatabaseWrapper._connection_pools.items()}
+
+
+def _pools(*claves, escala=1):
+    def leer():
+        return {(alias,): sum(stats.get(c, 0) for c in claves) * escala
+                for alias, stats in _estadisticas_pools().items()}
+    return leer
+
+
+def _en_uso():
+    return {(alias,): stats.get('pool_size', 0) - stats.get('pool_available', 0)
+            for alias, stats in _estadisticas_pools().items()}
+
+
+def _utilizacion():
+    return {(alias,): (stats.get('pool_size', 0) - stats.get('pool_available', 0)) / stats['pool_max']
+            for alias, stats in _estadisticas_pools().items() if stats.get('pool_max')}
+
+
+REGISTRO.recolector('nutrisoil_db_pool_size', 'Conexiones abiertas en el pool', _pools('pool_size'), ('alias',))
+REGISTRO.recolector('nutrisoil_db_pool_max', 'Tamaño máximo del pool', _pools('pool_max'), ('alias',))
+REGISTRO.recolector('nutrisoil_db_pool_in_use', 'Conexiones del pool prestadas a una petición', _en_uso, ('alias',))
+REGISTRO.recolector('nutrisoil_db_pool_utilization', 'Conexiones en uso / tamaño máximo', _utilizacion, ('alias',))
+REGISTRO.recolector('nutrisoil_db_pool_waiting', 'Peticiones esperando una conexión', _pools('requests_waiting'),
+                    ('alias',))
+REGISTRO.recolector('nutrisoil_db_pool_wait_seconds_total', 'Tiempo total de espera por una conexión',
+                    _pools('requests_wait_ms', escala=0.001), ('alias',), tipo='counter')
+REGISTRO.recolector('nutrisoil_db_pool_timeouts_total', 'Peticiones que no obtuvieron conexión a tiempo',
+                    _pools('requests_errors'), ('alias',), tipo='counter')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        inicio = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            OBTENER_CONEXION.observar(time.perf_counter() - inicio, self.alias, 'pool' if self.pool else 'directa')
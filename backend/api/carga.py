@@ -0,0 +1,331 @@
+# backend/api/carga.py
+"""
+Arnés de carga: datos sintéticos y generador de tráfico contra un servidor real.
+
+- sembrar(): perfiles, predios y mediciones sintéticas (COPY en PostgreSQL),
+  deterministas para una misma semilla. Los perfiles usan el dominio DOMINIO
+  para poder borrarlos con limpiar() sin tocar datos reales.
+- GeneradorCarga: N Wemos (POST /api/iot/ingest/) y M usuarios del dashboard
+  (GET /api/dashboard/stats/ y /api/mediciones/) concurrentes, con tokens HS256
+  firmados con SUPABASE_JWT_SECRET como los emite Supabase. Reporta throughput y
+  latencias p50/p95/p99 por endpoint.
+
+Comandos: `sembrar_datos` y `carga`.
+"""
+import csv
+import io
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+import jwt
+import requests
+from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from calculadora.motor_calculo import MotorFertilizacion
+
+from .importacion import copiar
+from .models import Dispositivo, Medicion, Predio, Profile, Recomendacion
+
+DOMINIO = 'carga.nutrisoil.local'
+LOTE = 50000
+
+COLUMNAS_MEDICION = ('predio_id', 'fecha', 'ph', 'temperatura', 'humedad', 'nitrogeno', 'fosforo', 'potasio', 'origen')
+
+
+# ═══════════════════════════════════════════════════════
+# DATOS SINTÉTICOS
+# ═══════════════════════════════════════════════════════
+
+def perfiles_de_carga():
+    return Profile.objects.filter(email__endswith=f'@{DOMINIO}')
+
+
+def limpiar():
+    """Borra los datos sintéticos. Las mediciones se borran con un DELETE directo (pueden ser millones)."""
+    perfiles = perfiles_de_carga()
+    predios = Predio.objects.filter(usuario__in=perfiles)
+    with transaction.atomic():
+        Recomendacion.objects.filter(predio__in=predios).delete()
+        Dispositivo.objects.filter(predio__in=predios).delete()
+        with connection.cursor() as cursor:
+            q = connection.ops.quote_name
+            cursor.execute(
+                f"DELETE FROM {q(Medicion._meta.db_table)} WHERE predio_id IN "
+                f"(SELECT p.id FROM {q(Predio._meta.db_table)} p JOIN {q(Profile._meta.db_table)} u "
+                f"ON p.usuario_id = u.id WHERE u.email LIKE %s)", [f'%@{DOMINIO}']
+            )
+            mediciones = cursor.rowcount
+        User.objects.filter(profile__in=perfiles).delete()
+        perfiles.delete()
+    return mediciones
+
+
+def _filas_mediciones(rng, predio_ids, por_predio, dias, fraccion_npk, fin):
+    """Lecturas espaciadas de forma pareja en `dias` días, ordenadas por predio y fecha."""
+    paso = timedelta(days=dias) / max(por_predio, 1)
+    for predio_id in predio_ids:
+        inicio = fin - timedelta(days=dias)
+        for i in range(por_predio):
+            fecha = inicio + paso * i + timedelta(seconds=rng.randint(0, 59))
+            laboratorio = rng.random() < fraccion_npk
+            yield (
+                predio_id, fecha,
+                Decimal(f'{min(max(rng.gauss(6.0, 0.5), 4.0), 8.5):.2f}'),
+                Decimal(f'{rng.uniform(4, 24):.2f}'),
+                Decimal(f'{rng.uniform(15, 85):.2f}'),
+                Decimal(f'{rng.uniform(5, 40):.2f}') if laboratorio else None,
+                Decimal(f'{rng.uniform(3, 30):.2f}') if laboratorio else None,
+                Decimal(f'{rng.uniform(0.1, 1.2):.4f}') if laboratorio else None,
+                'manual' if laboratorio else 'wemos',
+            )
+
+
+def _insertar_postgres(filas):
+    tabla = connection.ops.quote_name(Medicion._meta.db_table)
+    total = 0
+    with connection.cursor() as cursor:
+        while True:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            n = 0
+            for fila in filas:
+                writer.writerow(['' if v is None else v for v in fila])
+                n += 1
+                if n >= LOTE:
+                    break
+            if not n:
+                break
+            buffer.seek(0)
+            copiar(cursor, f"COPY {tabla} ({', '.join(COLUMNAS_MEDICION)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            total += n
+        cursor.execute(f"ANALYZE {tabla}")
+    return total
+
+
+def _insertar_generico(filas):
+    """Otros motores: executemany por lotes (el INSERT directo respeta la fecha, bulk_create no)."""
+    tabla = connection.ops.quote_name(Medicion._meta.db_table)
+    sql = f"INSERT INTO {tabla} ({', '.join(COLUMNAS_MEDICION)}) VALUES ({', '.join(['%s'] * len(COLUMNAS_MEDICION))})"
+    total = 0
+    with connection.cursor() as cursor:
+        while True:
+            lote = [fila for fila, _ in zip(filas, range(LOTE))]
+            if not lote:
+                break
+            cursor.executemany(sql, lote)
+            total += len(lote)
+    return total
+
+
+def sembrar(perfiles=10, predios_por_perfil=5, mediciones_por_predio=1000, dias=365, semilla=42, fraccion_npk=0.1):
+    """
+    Reemplaza el conjunto sintético por uno nuevo. Con la misma semilla y
+    parámetros se generan los mismos perfiles, predios y valores (las fechas se
+    anclan a la hora actual, así el dashboard de 30 días siempre tiene datos).
+    """
+    inicio = time.perf_counter()
+    rng = random.Random(semilla)
+    borradas = limpiar()
+
+    with transaction.atomic():
+        ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(perfiles)]
+        usuarios = User.objects.bulk_create([
+            User(username=str(pid), email=f'carga{i:04d}@{DOMINIO}', password=make_password(None))
+            for i, pid in enumerate(ids)
+        ])
+        Profile.objects.bulk_create([
+            Profile(id=pid, user=usuario, email=usuario.email, nombre=f'Carga {i}')
+            for i, (pid, usuario) in enumerate(zip(ids, usuarios))
+        ])
+        zonas = list(MotorFertilizacion.FACTORES_ZONA)
+        suelos = list(MotorFertilizacion.FACTORES_SUELO)
+        cultivos = list(MotorFertilizacion.REQUERIMIENTOS_CULTIVOS)
+        predios = Predio.objects.bulk_create([
+            Predio(usuario_id=pid, nombre=f'Predio {i}-{j}', superficie=Decimal(f'{rng.uniform(1, 50):.2f}'),
+                   zona=rng.choice(zonas), tipo_suelo=rng.choice(suelos), cultivo_actual=rng.choice(cultivos))
+            for i, pid in enumerate(ids) for j in range(predios_por_perfil)
+        ])
+
+        filas = _filas_mediciones(rng, [p.id for p in predios], mediciones_por_predio, dias, fraccion_npk,
+                                  timezone.now().replace(microsecond=0))
+        insertar = _insertar_postgres if connection.vendor == 'postgresql' else _insertar_generico
+        mediciones = insertar(filas)
+
+    duracion = time.perf_counter() - inicio
+    return {
+        'perfiles': perfiles, 'predios': len(predios), 'mediciones': mediciones,
+        'mediciones_borradas': borradas, 'duracion_s': round(duracion, 2),
+        'filas_por_s': round(mediciones / duracion) if duracion else 0,
+    }
+
+
+# ═══════════════════════════════════════════════════════
+# GENERADOR DE CARGA
+# ═══════════════════════════════════════════════════════
+
+def token_hs256(profile_id, email, secreto, duracion=12 * 3600):
+    """Token con los claims que verifica SupabaseAuthentication (sub, email, aud)."""
+    ahora = int(time.time())
+    payload = {'sub': str(profile_id), 'email': email, 'aud': 'authenticated', 'role': 'authenticated',
+               'iat': ahora, 'exp': ahora + duracion}
+    return jwt.encode(payload, secreto, algorithm='HS256')
+
+
+def percentiles(latencias):
+    if not latencias:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    ordenadas = sorted(latencias)
+    if len(ordenadas) == 1:
+        cortes = ordenadas * 99
+    else:
+        cortes = statistics.quantiles(ordenadas, n=100, method='inclusive')
+    return {
+        'p50_ms': round(cortes[49] * 1000, 2), 'p95_ms': round(cortes[94] * 1000, 2),
+        'p99_ms': round(cortes[98] * 1000, 2), 'max_ms': round(ordenadas[-1] * 1000, 2),
+    }
+
+
+class _Muestras:
+    """Resultados de un hilo; se combinan al final (sin locks durante la carga)."""
+
+    def __init__(self):
+        self.latencias = {}
+        self.codigos = {}
+
+    def registrar(self, endpoint, duracion, codigo):
+        self.latencias.setdefault(endpoint, []).append(duracion)
+        self.codigos.setdefault(endpoint, Counter())[codigo] += 1
+
+
+class GeneradorCarga:
+    """
+    Tráfico de lazo cerrado: cada hilo hace su siguiente petición al recibir la
+    respuesta anterior (más `pausa`). Termina a los `duracion` segundos o tras
+    `peticiones` por hilo. Los hilos usan una semilla derivada de `semilla`,
+    así dos corridas con los mismos parámetros envían la misma secuencia.
+    Con `rutas_async` la ingesta y el dashboard van a las vistas de views_async.
+    """
+
+    def __init__(self, url, api_key, secreto, dispositivos=10, usuarios=5, duracion=30.0, peticiones=None,
+                 pausa=0.0, semilla=42, timeout=10.0, rutas_async=False):
+        self.url = url.rstrip('/')
+        self.api_key, self.secreto = api_key, secreto
+        self.dispositivos, self.usuarios = dispositivos, usuarios
+        self.duracion, self.peticiones, self.pausa = duracion, peticiones, pausa
+        self.semilla, self.timeout = semilla, timeout
+        self.prefijo = '/api/async' if rutas_async else '/api'
+        self._fin = float('inf')
+
+    def configuracion(self):
+        return {
+            'url': self.url, 'dispositivos': self.dispositivos, 'usuarios': self.usuarios,
+            'duracion_s': None if self.peticiones else self.duracion, 'peticiones_por_hilo': self.peticiones,
+            'pausa_s': self.pausa, 'semilla': self.semilla, 'rutas_async': self.prefijo != '/api',
+        }
+
+    def _continuar(self, hechas):
+        if self.peticiones is not None:
+            return hechas < self.peticiones
+        return time.monotonic() < self._fin
+
+    def _pedir(self, muestras, endpoint, metodo, url, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            codigo = metodo(url, timeout=self.timeout, **kwargs).status_code
+        except requests.RequestException as e:
+            codigo = type(e).__name__
+        muestras.registrar(endpoint, time.perf_counter() - inicio, codigo)
+
+    def _wemos(self, indice, predio_id, muestras, inicio):
+        rng = random.Random(f'{self.semilla}-wemos-{indice}')
+        sesion = requests.Session()
+        sesion.headers['X-API-KEY'] = self.api_key
+        inicio.wait()
+        hechas = 0
+        while self._continuar(hechas):
+            datos = {'predio_id': predio_id, 'dispositivo_id': f'carga-{indice:04d}',
+                     'humedad': round(rng.uniform(15, 85), 2), 'temperatura': round(rng.uniform(4, 24), 2),
+                     'ph': round(rng.gauss(6.0, 0.4), 2)}
+            self._pedir(muestras, 'ingesta', sesion.post, f'{self.url}{self.prefijo}/iot/ingest/', json=datos)
+            hechas += 1
+            if self.pausa:
+                time.sleep(self.pausa)
+
+    def _usuario(self, indice, perfil, predio_id, muestras, inicio):
+        sesion = requests.Session()
+        sesion.headers['Authorization'] = f'Bearer {token_hs256(perfil[0], perfil[1], self.secreto)}'
+        lecturas = [
+            ('dashboard', f'{self.url}{self.prefijo}/dashboard/stats/'),
+            ('mediciones', f'{self.url}/api/mediciones/?predio={predio_id}'),
+        ]
+        inicio.wait()
+        hechas = 0
+        while self._continuar(hechas):
+            endpoint, url = lecturas[(indice + hechas) % len(lecturas)]
+            self._pedir(muestras, endpoint, sesion.get, url)
+            hechas += 1
+            if self.pausa:
+                time.sleep(self.pausa)
+
+    def ejecutar(self):
+        perfiles = list(perfiles_de_carga().order_by('email').values_list('id', 'email'))
+        predios = dict(Predio.objects.filter(usuario__email__endswith=f'@{DOMINIO}')
+                       .order_by('id').values_list('usuario_id', 'id'))
+        todos_predios = list(Predio.objects.filter(usuario__email__endswith=f'@{DOMINIO}')
+                             .order_by('id').values_list('id', flat=True))
+        if not perfiles or not todos_predios:
+            raise ValueError("No hay datos de carga: ejecute primero `manage.py sembrar_datos`")
+
+        inicio = threading.Event()
+        hilos, muestras = [], []
+        for i in range(self.dispositivos):
+            m = _Muestras()
+            muestras.append(m)
+            hilos.append(threading.Thread(
+                target=self._wemos, args=(i, todos_predios[i % len(todos_predios)], m, inicio)))
+        for i in range(self.usuarios):
+            perfil = perfiles[i % len(perfiles)]
+            m = _Muestras()
+            muestras.append(m)
+            hilos.append(threading.Thread(
+                target=self._usuario, args=(i, perfil, predios[perfil[0]], m, inicio)))
+
+        for hilo in hilos:
+            hilo.start()
+        comienzo = time.monotonic()  # Todos los hilos parten juntos al activar el evento
+        self._fin = comienzo + self.duracion
+        inicio.set()
+        for hilo in hilos:
+            hilo.join()
+        transcurrido = time.monotonic() - comienzo
+        return self._resumen(muestras, transcurrido)
+
+    def _resumen(self, muestras, transcurrido):
+        latencias, codigos = {}, {}
+        for m in muestras:
+            for endpoint, valores in m.latencias.items():
+                latencias.setdefault(endpoint, []).extend(valores)
+            for endpoint, contador in m.codigos.items():
+                codigos.setdefault(endpoint, Counter()).update(contador)
+        resultados = {}
+        for endpoint in sorted(latencias):
+            n = len(latencias[endpoint])
+            errores = sum(c for codigo, c in codigos[endpoint].items()
+                          if not isinstance(codigo, int) or codigo >= 400)
+            resultados[endpoint] = {
+                'peticiones': n, 'errores': errores,
+                'throughput_rps': round(n / transcurrido, 2) if transcurrido else None,
+                **percentiles(latencias[endpoint]),
+                'codigos': {str(k): v for k, v in sorted(codigos[endpoint].items(), key=lambda kv: str(kv[0]))},
+            }
+        return {'configuracion': self.configuracion(), 'transcurrido_s': round(transcurrido, 2),
+                'resultados': resultados}
@@ -0,0 +1,165 @@
+# backend/api/dispositivos.py
+"""
+Telemetría de la ingesta IoT (POST /api/iot/ingest/).
+
+- Contadores y latencias por dispositivo y predio en el registro de
+  api/metricas.py (se exponen en /metrics junto al resto).
+- Índice de "última vez visto" en la tabla `dispositivos`: cada lectura hace un
+  UPDATE de una fila por clave única, así el estado de los sensores se consulta
+  sin recorrer `mediciones`.
+- Protocolo con números de secuencia: el firmware numera sus lecturas (`seq`,
+  creciente, y `sesion`, que cambia al reiniciar). Por dispositivo se guarda la
+  secuencia más alta y los rangos faltantes por debajo de ella; una lectura ya
+  recibida se descarta sin escribir otra medición y cada respuesta trae los
+  rangos que faltan, para que el equipo reenvíe solo esos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .metricas import REGISTRO
+from .models import Dispositivo
+
+LECTURAS = REGISTRO.contador(
+    'nutrisoil_ingest_readings_total', 'Lecturas recibidas por dispositivo, predio y resultado',
+    ('dispositivo', 'predio', 'resultado'))
+LATENCIA_INGESTA = REGISTRO.histograma(
+    'nutrisoil_ingest_duration_seconds', 'Latencia de la ingesta por dispositivo y predio',
+    ('dispositivo', 'predio'))
+
+DESCONOCIDO = 'desconocido'  # Peticiones sin API key válida: no se confía en sus datos
+
+
+def identificador(datos, predio_id):
+    """dispositivo_id del payload; el firmware que no lo envía se identifica por su predio."""
+    valor = datos.get('dispositivo_id')
+    return (str(valor) if valor else f'predio-{predio_id}')[:64]
+
+
+def observar_ingesta(dispositivo, predio_id, resultado, duracion):
+    LECTURAS.incrementar(dispositivo, str(predio_id or ''), resultado)
+    LATENCIA_INGESTA.observar(duracion, dispositivo, str(predio_id or ''))
+
+
+def registrar_lectura(identificador, medicion):
+    """Actualiza el índice de última vez visto (una fila por dispositivo)."""
+    valores = {'predio_id': medicion.predio_id, 'ultima_medicion': medicion, 'ultima_vez': medicion.fecha}
+    if Dispositivo.objects.filter(identificador=identificador).update(total_lecturas=F('total_lecturas') + 1, **valores):
+        return
+    try:
+        with transaction.atomic():
+            Dispositivo.objects.create(identificador=identificador, total_lecturas=1, **valores)
+    except IntegrityError:  # Otra petición del mismo dispositivo lo creó primero
+        Dispositivo.objects.filter(identificador=identificador).update(total_lecturas=F('total_lecturas') + 1, **valores)
+
+
+def _acotar(faltantes, limite):
+    """
+    Junta los rangos más cercanos hasta dejar `limite`: un rango unido vuelve a
+    pedir las pocas lecturas que había entre ambos, pero nunca se olvida una
+    faltante (al reenviarla se respondería 'duplicado' sin haberla guardado).
+    """
+    while len(faltantes) > max(limite, 1):
+        i = min(range(len(faltantes) - 1), key=lambda j: faltantes[j + 1][0] - faltantes[j][1])
+        faltantes[i:i + 2] = [[faltantes[i][0], faltantes[i + 1][1]]]
+    return faltantes
+
+
+def aplicar_secuencia(dispositivo, secuencia, sesion=''):
+    """
+    Actualiza secuencia_max / faltantes / sesion de `dispositivo` con una
+    lectura. Retorna False si la secuencia ya se había recibido.
+    """
+    ventana = settings.IOT_VENTANA_SECUENCIA
+    maximo = dispositivo.secuencia_max
+    if maximo is None or sesion != dispositivo.sesion or (not sesion and secuencia < maximo - ventana):
+        # Primera lectura numerada o equipo reiniciado: la numeración empieza de nuevo.
+        # Sin `sesion` el reinicio solo se nota porque la secuencia cae bajo la ventana
+        dispositivo.secuencia_max, dispositivo.faltantes, dispositivo.sesion = secuencia, [], sesion
+        return True
+    if secuencia < maximo - ventana:
+        return False  # Misma sesión: reintento atrasado de algo que ya no se pide
+
+    faltantes = dispositivo.faltantes
+    if secuencia > maximo:
+        if secuencia > maximo + 1:
+            faltantes.append([maximo + 1, secuencia - 1])
+        dispositivo.secuencia_max = maximo = secuencia
+    else:
+        rango = next((r for r in faltantes if r[0] <= secuencia <= r[1]), None)
+        if rango is None:
+            return False
+        i = faltantes.index(rango)
+        faltantes[i:i + 1] = [r for r in ([rango[0], secuencia - 1], [secuencia + 1, rango[1]]) if r[0] <= r[1]]
+
+    # Lo que el equipo ya no guarda no se pide; la lista queda acotada
+    inicio = maximo - ventana
+    faltantes = [[max(desde, inicio), hasta] for desde, hasta in faltantes if hasta >= inicio]
+    dispositivo.faltantes = _acotar(faltantes, settings.IOT_MAX_RANGOS_FALTANTES)
+    return True
+
+
+def reservar_secuencia(identificador, predio_id, secuencia, sesion=''):
+    """
+    Registra la secuencia de una lectura. Retorna (nueva, dispositivo); si no es
+    nueva la lectura es un reenvío ya guardado. Llamar dentro de la transacción
+    de la ingesta: la fila del dispositivo queda bloqueada hasta el commit.
+    """
+    filas = Dispositivo.objects.select_for_update().filter(identificador=identificador)
+    dispositivo = filas.first()
+    if dispositivo is None:
+        try:
+            with transaction.atomic():
+                dispositivo = Dispositivo.objects.create(identificador=identificador, predio_id=predio_id,
+                                                         ultima_vez=timezone.now())
+        except IntegrityError:  # Otra petición del mismo dispositivo lo creó primero
+            dispositivo = filas.get()
+
+    nueva = aplicar_secuencia(dispositivo, secuencia, sesion)
+    if nueva:
+        filas.update(secuencia_max=dispositivo.secuencia_max, faltantes=dispositivo.faltantes, sesion=sesion)
+    else:
+        filas.update(duplicadas=F('duplicadas') + 1)
+    return nueva, dispositivo
+
+
+def estado_dispositivos(dispositivos, umbral_min=None, solo_inactivos=False):
+    """
+    Estado de salud de los dispositivos: inactivo si no reporta hace más de
+    `umbral_min` minutos. El filtro usa el índice sobre `ultima_vez`.
+    """
+    umbral_min = settings.IOT_DISPOSITIVO_INACTIVO_MIN if umbral_min is None else umbral_min
+    ahora = timezone.now()
+    limite = ahora - timedelta(minutes=umbral_min)
+    if solo_inactivos:
+        dispositivos = dispositivos.filter(ultima_vez__lt=limite)
+    filas = dispositivos.order_by('ultima_vez').values(
+        'identificador', 'predio_id', 'predio__nombre', 'ultima_medicion_id',
+        'total_lecturas', 'primera_vez', 'ultima_vez', 'secuencia_max', 'faltantes', 'duplicadas'
+    )
+    resultado = []
+    for fila in filas:
+        segundos = (ahora - fila['ultima_vez']).total_seconds()
+        resultado.append({
+            'identificador': fila['identificador'],
+            'predio': fila['predio_id'],
+            'predio_nombre': fila['predio__nombre'],
+            'ultima_medicion': fila['ultima_medicion_id'],
+            'total_lecturas': fila['total_lecturas'],
+            'primera_vez': fila['primera_vez'],
+            'ultima_vez': fila['ultima_vez'],
+            'segundos_sin_reportar': round(max(segundos, 0)),
+            'secuencia_max': fila['secuencia_max'],
+            'lecturas_faltantes': sum(hasta - desde + 1 for desde, hasta in fila['faltantes']),
+            'duplicadas': fila['duplicadas'],
+            'estado': 'inactivo' if fila['ultima_vez'] < limite else 'activo',
+        })
+    return {
+        'umbral_min': umbral_min,
+        'total': len(resultado),
+        'inactivos': sum(1 for d in resultado if d['estado'] == 'inactivo'),
+        'dispositivos': resultado,
+    }
@@ -0,0 +1,221 @@
+# backend/api/exportacion.py
+"""
+Exportación masiva en streaming de mediciones y recomendaciones.
+
+Las filas se leen con values_list().iterator(), que en PostgreSQL usa un cursor
+del lado del servidor: la memoria queda acotada por `chunk_size` y no por el
+tamaño del historial. Cada formato es un generador de bytes que se entrega a
+StreamingHttpResponse (o se escribe a un archivo desde el comando `exportar`).
+"""
+import csv
+import io
+import logging
+import time
+from datetime import datetime, time as dtime, timedelta
+from itertools import islice
+
+from django.db import models
+from django.utils import timezone
+
+from .models import Medicion, Recomendacion
+from .renderers import orjson
+from .serializacion_rapida import (
+    CAMPOS_MEDICION, CAMPOS_RECOMENDACION, SerializadorFilas, resolver_campo
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Está en requirements.txt; sin él, parquet y arrow responden 400
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+}
+FORMATOS_COLUMNARES = ('parquet', 'arrow')
+
+# tipo -> (modelo, campos, campo de fecha para el rango, ruta al dueño)
+TIPOS = {
+    'mediciones': (Medicion, CAMPOS_MEDICION, 'fecha', 'predio__usuario'),
+    'recomendaciones': (Recomendacion, CAMPOS_RECOMENDACION, 'fecha_calculo', 'predio__usuario'),
+}
+
+
+class ExportacionError(ValueError):
+    pass
+
+
+def rango_fechas(desde=None, hasta=None):
+    """
+    Fechas locales inclusivas -> filtro semiabierto [desde 00:00, hasta+1 00:00).
+    Comparar la columna contra límites (en vez de fecha__date) permite usar índices.
+    """
+    zona = timezone.get_current_timezone()
+    filtro = {}
+    if desde:
+        filtro['gte'] = timezone.make_aware(datetime.combine(desde, dtime.min), zona)
+    if hasta:
+        filtro['lt'] = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), dtime.min), zona)
+    return filtro
+
+
+class Exportacion:
+    """
+    Exportación de un tipo de fila para un perfil y un rango de fechas.
+
+        exp = Exportacion('mediciones', profile, formato='csv', desde=date(2025, 1, 1))
+        for bloque in exp.bytes():
+            ...
+    """
+
+    def __init__(self, tipo, profile, formato='csv', desde=None, hasta=None, predio=None,
+                 chunk_size=CHUNK_SIZE):
+        if tipo not in TIPOS:
+            raise ExportacionError(f"Tipo de exportación no válido: {tipo}")
+        if formato not in FORMATOS:
+            raise ExportacionError(f"Formato no válido: {formato}. Opciones: {', '.join(FORMATOS)}")
+        if formato in FORMATOS_COLUMNARES and pa is None:
+            raise ExportacionError(f"El formato {formato} requiere pyarrow instalado en el servidor")
+
+        self.tipo, self.formato, self.chunk_size = tipo, formato, chunk_size
+        model, campos, campo_fecha, ruta_usuario = TIPOS[tipo]
+        self.rapido = SerializadorFilas(model, campos)
+
+        queryset = model.objects.filter(**{ruta_usuario: profile})
+        for lookup, valor in rango_fechas(desde, hasta).items():
+            queryset = queryset.filter(**{f'{campo_fecha}__{lookup}': valor})
+        if predio:
+            queryset = queryset.filter(predio_id=predio)
+        # Orden cronológico estable (fecha, pk)
+        self.queryset = queryset.order_by(campo_fecha, 'pk')
+        self.filas_exportadas = 0
+
+    @property
+    def content_type(self):
+        return FORMATOS[self.formato][0]
+
+    @property
+    def nombre_archivo(self):
+        return f"{self.tipo}_{timezone.localdate():%Y%m%d}.{FORMATOS[self.formato][1]}"
+
+    def _bloques(self):
+        """Tuplas en bloques de chunk_size leídas con cursor del lado del servidor."""
+        tuplas = self.rapido.valores(self.queryset).iterator(chunk_size=self.chunk_size)
+        while True:
+            bloque = list(islice(tuplas, self.chunk_size))
+            if not bloque:
+                return
+            self.filas_exportadas += len(bloque)
+            yield bloque
+
+    def bytes(self):
+        inicio = time.perf_counter()
+        generador = getattr(self, f'_{self.formato}')
+        yield from generador()
+        duracion = time.perf_counter() - inicio
+        logger.info(
+            "Exportación %s/%s: %d filas en %.2fs (%.0f filas/s)",
+            self.tipo, self.formato, self.filas_exportadas, duracion,
+            self.filas_exportadas / duracion if duracion else 0
+        )
+
+    # --- Formatos de texto -------------------------------------------------
+
+    def _csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.rapido.nombres)
+        for bloque in self._bloques():
+            for fila in self.rapido.filas(bloque, fechas_como_texto=True):
+                writer.writerow(fila.values())
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    def _ndjson(self):
+        if orjson is not None:
+            dumps = lambda fila: orjson.dumps(fila, option=orjson.OPT_UTC_Z)
+        else:
+            import json
+            dumps = lambda fila: json.dumps(fila, ensure_ascii=False).encode('utf-8')
+        for bloque in self._bloques():
+            yield b''.join(dumps(fila) + b'\n' for fila in self.rapido.filas(bloque))
+
+    # --- Formatos columnares (pyarrow) -------------------------------------
+
+    def esquema_arrow(self):
+        columnas = []
+        for nombre, ruta in zip(self.rapido.nombres, self.rapido.rutas):
+            field = resolver_campo(self.rapido.model, ruta)
+            if isinstance(field, models.DecimalField):
+                tipo = pa.decimal128(field.max_digits, field.decimal_places)
+            elif isinstance(field, models.DateTimeField):
+                tipo = pa.timestamp('us', tz='UTC')
+            elif isinstance(field, models.DateField):
+                tipo = pa.date32()
+            elif isinstance(field, (models.AutoField, models.BigAutoField, models.IntegerField,
+                                    models.ForeignKey, models.OneToOneField)):
+                tipo = pa.int64()
+            else:
+                tipo = pa.string()
+            columnas.append(pa.field(nombre, tipo))
+        return pa.schema(columnas)
+
+    def _lotes_arrow(self, esquema):
+        for bloque in self._bloques():
+            columnas = list(zip(*bloque))
+            yield pa.record_batch(
+                [pa.array(col, type=campo.type) for col, campo in zip(columnas, esquema)],
+                schema=esquema
+            )
+
+    def _columnar(self, abrir_writer):
+        esquema = self.esquema_arrow()
+        sink = _BufferSalida()
+        writer = abrir_writer(sink, esquema)
+        for lote in self._lotes_arrow(esquema):
+            writer.write_batch(lote)
+            yield sink.vaciar()
+        writer.close()
+        yield sink.vaciar()
+
+    def _parquet(self):
+        # Un row group por bloque: el footer se escribe al cerrar
+        yield from self._columnar(lambda sink, esquema: pq.ParquetWriter(sink, esquema))
+
+    def _arrow(self):
+        yield from self._columnar(lambda sink, esquema: pa.ipc.new_stream(sink, esquema))
+
+
+class _BufferSalida(io.RawIOBase):
+    """Archivo de solo escritura que acumula bytes hasta que el generador los entrega."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self._posicion
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
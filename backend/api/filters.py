@@ -1,11 +1,19 @@
 import django_filters
+from .exportacion import rango_fechas
 from .models import Medicion
 
 class MedicionFilter(django_filters.FilterSet):
-    # Usamos '__date' para comparar solo la parte de la fecha del DateTimeField
-    fecha__gte = django_filters.DateFilter(field_name='fecha', lookup_expr='date__gte')
-    fecha__lte = django_filters.DateFilter(field_name='fecha', lookup_expr='date__lte')
+    # Fechas locales inclusivas. Se comparan como rango sobre la columna
+    # (fecha__date envuelve la columna en un cast y no usa los índices)
+    fecha__gte = django_filters.DateFilter(field_name='fecha', method='filtrar_desde')
+    fecha__lte = django_filters.DateFilter(field_name='fecha', method='filtrar_hasta')
 
     class Meta:
         model = Medicion
         fields = ['predio', 'fecha__gte', 'fecha__lte']
+
+    def filtrar_desde(self, queryset, name, value):
+        return queryset.filter(fecha__gte=rango_fechas(desde=value)['gte'])
+
+    def filtrar_hasta(self, queryset, name, value):
+        return queryset.filter(fecha__lt=rango_fechas(hasta=value)['lt'])
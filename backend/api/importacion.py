@@ -0,0 +1,328 @@
+# backend/api/importacion.py
+"""
+Importación masiva de mediciones de laboratorio (CSV o XLSX).
+
+El archivo se valida fila a fila en streaming y cada fila válida se escribe en
+un CSV temporal (en memoria hasta unos MB, luego en disco). En PostgreSQL ese
+CSV se carga con COPY a una tabla temporal y pasa a `mediciones` con un solo
+INSERT ... SELECT; luego se rehacen los resúmenes diarios de los días
+importados y las recomendaciones de las filas importadas se calculan en lote. Los errores se reportan por número de fila sin hacer
+consultas por fila.
+"""
+import csv
+import io
+import logging
+import tempfile
+import time
+import unicodedata
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Medicion, Predio
+from .recomendaciones import TAMANO_LOTE, crear_recomendaciones_lote
+from .resumenes import dia_utc, recalcular
+
+try:
+    import openpyxl
+except ImportError:  # Lectura de XLSX opcional
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_NUMERICAS = ('ph', 'temperatura', 'humedad', 'nitrogeno', 'fosforo', 'potasio')
+COLUMNAS_STAGING = ('fila', 'predio_id', 'fecha') + COLUMNAS_NUMERICAS
+
+# Encabezados alternativos habituales en las planillas de laboratorio
+ALIAS = {
+    'predio_id': 'predio',
+    'temp': 'temperatura',
+    'n': 'nitrogeno',
+    'p': 'fosforo',
+    'k': 'potasio',
+}
+
+FORMATOS_FECHA = ('%d-%m-%Y', '%d/%m/%Y', '%d-%m-%Y %H:%M', '%d/%m/%Y %H:%M')
+
+
+class ImportacionError(ValueError):
+    pass
+
+
+def normalizar_encabezado(nombre):
+    """'Nitrógeno (ppm)' -> 'nitrogeno'"""
+    texto = str(nombre or '').split('(')[0].strip().lower()
+    texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    texto = texto.replace(' ', '_')
+    return ALIAS.get(texto, texto)
+
+
+# ═══════════════════════════════════════════════════════
+# LECTURA EN STREAMING
+# ═══════════════════════════════════════════════════════
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    muestra = texto.read(4096)
+    texto.seek(0)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.reader(texto, dialecto)
+    columnas = [normalizar_encabezado(c) for c in next(lector, [])]
+    # Fila 1 = encabezado, igual que en la planilla original
+    for numero, valores in enumerate(lector, start=2):
+        if any(v.strip() for v in valores):
+            yield numero, dict(zip(columnas, valores))
+    texto.detach()
+
+
+def _filas_xlsx(archivo):
+    if openpyxl is None:
+        raise ImportacionError("Leer archivos XLSX requiere openpyxl instalado en el servidor")
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        columnas = [normalizar_encabezado(c) for c in next(filas, ())]
+        for numero, valores in enumerate(filas, start=2):
+            if any(v is not None and str(v).strip() for v in valores):
+                yield numero, dict(zip(columnas, valores))
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    if nombre.lower().endswith('.xlsx'):
+        return _filas_xlsx(archivo)
+    if nombre.lower().endswith(('.csv', '.txt')):
+        return _filas_csv(archivo)
+    raise ImportacionError("Formato no soportado: use un archivo .csv o .xlsx")
+
+
+# ═══════════════════════════════════════════════════════
+# VALIDACIÓN
+# ═══════════════════════════════════════════════════════
+
+class ValidadorFilas:
+    """
+    Valida una fila contra los predios del usuario (cargados una sola vez) y
+    los límites de los campos de Medicion. Retorna (valores, errores).
+    """
+
+    def __init__(self, profile):
+        self.predios = {}
+        for predio_id, nombre in Predio.objects.filter(usuario=profile).values_list('id', 'nombre'):
+            self.predios[str(predio_id)] = predio_id
+            self.predios[nombre.strip().lower()] = predio_id
+        self.campos = {nombre: Medicion._meta.get_field(nombre) for nombre in COLUMNAS_NUMERICAS}
+        self.limite_fecha = timezone.now() + timedelta(days=1)
+
+    def _predio(self, valor):
+        clave = str(valor if valor is not None else '').strip()
+        if clave.endswith('.0'):  # IDs numéricos leídos desde Excel
+            clave = clave[:-2]
+        if not clave:
+            raise ValueError("Campo requerido")
+        predio_id = self.predios.get(clave) or self.predios.get(clave.lower())
+        if predio_id is None:
+            raise ValueError(f"Predio '{clave}' no existe o no pertenece al usuario")
+        return predio_id
+
+    def _decimal(self, nombre, valor):
+        if valor is None or not str(valor).strip():
+            return None
+        texto = str(valor).strip()
+        if ',' in texto and '.' not in texto:  # Coma decimal
+            texto = texto.replace(',', '.')
+        try:
+            numero = Decimal(texto)
+        except InvalidOperation:
+            raise ValueError(f"'{valor}' no es un número")
+        if not numero.is_finite():
+            raise ValueError(f"'{valor}' no es un número")
+        campo = self.campos[nombre]
+        if numero and numero.adjusted() >= campo.max_digits - campo.decimal_places:
+            raise ValueError(f"{valor} está fuera de rango")  # Antes de quantize: 1e30 no cabe en el contexto
+        numero = numero.quantize(Decimal(1).scaleb(-campo.decimal_places), rounding=ROUND_HALF_UP)
+        if abs(numero) >= 10 ** (campo.max_digits - campo.decimal_places):
+            raise ValueError(f"{numero} está fuera de rango")
+        if nombre == 'ph' and not 0 <= numero <= 14:
+            raise ValueError("El pH debe estar entre 0 y 14")
+        if nombre != 'temperatura' and numero < 0:
+            raise ValueError("No puede ser negativo")
+        return numero
+
+    def _fecha(self, valor):
+        if valor is None or not str(valor).strip():
+            return None
+        if isinstance(valor, datetime):
+            fecha = valor
+        elif isinstance(valor, date):
+            fecha = datetime.combine(valor, datetime.min.time())
+        else:
+            texto = str(valor).strip()
+            try:
+                fecha = datetime.fromisoformat(texto)
+            except ValueError:
+                for formato in FORMATOS_FECHA:
+                    try:
+                        fecha = datetime.strptime(texto, formato)
+                        break
+                    except ValueError:
+                        continue
+                else:
+                    raise ValueError(f"Fecha '{texto}' no reconocida (use AAAA-MM-DD o DD-MM-AAAA)")
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        if fecha > self.limite_fecha:
+            raise ValueError("La fecha no puede ser futura")
+        return fecha
+
+    def validar(self, fila):
+        valores, errores = {}, {}
+        for nombre, conversor in [('predio', self._predio), ('fecha', self._fecha)]:
+            try:
+                valores[nombre] = conversor(fila.get(nombre))
+            except ValueError as e:
+                errores[nombre] = str(e)
+        for nombre in COLUMNAS_NUMERICAS:
+            try:
+                valores[nombre] = self._decimal(nombre, fila.get(nombre))
+            except ValueError as e:
+                errores[nombre] = str(e)
+        if not errores and all(valores[n] is None for n in COLUMNAS_NUMERICAS):
+            errores['fila'] = "La fila no tiene valores de medición"
+        return valores, errores
+
+
+# ═══════════════════════════════════════════════════════
+# CARGA
+# ═══════════════════════════════════════════════════════
+
+def copiar(cursor, sql, archivo):
+    """COPY ... FROM STDIN desde un archivo de texto, con psycopg2 o psycopg 3."""
+    crudo = cursor.cursor
+    if hasattr(crudo, 'copy_expert'):  # psycopg2
+        crudo.copy_expert(sql, archivo)
+        return
+    with crudo.copy(sql) as copy:  # psycopg 3
+        while bloque := archivo.read(1 << 16):
+            copy.write(bloque)
+
+
+def _cargar_postgres(staging, ahora):
+    """COPY a una tabla temporal y un único INSERT ... SELECT hacia mediciones."""
+    tabla = connection.ops.quote_name(Medicion._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            CREATE TEMP TABLE importacion_mediciones (
+                fila integer, predio_id bigint, fecha timestamptz,
+                ph numeric(4, 2), temperatura numeric(5, 2), humedad numeric(5, 2),
+                nitrogeno numeric(10, 2), fosforo numeric(10, 2), potasio numeric(10, 4)
+            ) ON COMMIT DROP
+        """)
+        copiar(cursor, "COPY importacion_mediciones FROM STDIN WITH (FORMAT csv)", staging)
+        cursor.execute(f"""
+            INSERT INTO {tabla} (predio_id, fecha, ph, temperatura, humedad, nitrogeno, fosforo, potasio, origen)
+            SELECT predio_id, COALESCE(fecha, %s), ph, temperatura, humedad, nitrogeno, fosforo, potasio, 'manual'
+            FROM importacion_mediciones ORDER BY fila
+            RETURNING id
+        """, [ahora])
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def _cargar_orm(staging, ahora):
+    """Alternativa para otros motores (SQLite en desarrollo): bulk_create por lotes."""
+    ids = []
+    lector = csv.reader(staging)
+    while lote := list(islice(lector, TAMANO_LOTE)):
+        mediciones, fechas = [], []
+        for fila in lote:
+            datos = dict(zip(COLUMNAS_STAGING, fila))
+            mediciones.append(Medicion(
+                predio_id=int(datos['predio_id']), origen='manual',
+                **{n: Decimal(datos[n]) if datos[n] else None for n in COLUMNAS_NUMERICAS}
+            ))
+            fechas.append(datetime.fromisoformat(datos['fecha']) if datos['fecha'] else ahora)
+        Medicion.objects.bulk_create(mediciones)
+        # auto_now_add pisa la fecha en el INSERT; se restaura la del laboratorio
+        for medicion, fecha in zip(mediciones, fechas):
+            medicion.fecha = fecha
+        Medicion.objects.bulk_update(mediciones, ['fecha'])
+        ids.extend(m.id for m in mediciones)
+    return ids
+
+
+def importar_mediciones(profile, archivo, nombre, solo_validar=False):
+    """
+    Importa las filas válidas del archivo y reporta las inválidas.
+    Retorna un dict con el resumen (ver MedicionViewSet.importar).
+    """
+    inicio = time.perf_counter()
+    max_filas = settings.IMPORTACION_MAX_FILAS
+    max_errores = settings.IMPORTACION_MAX_ERRORES
+    validador = ValidadorFilas(profile)
+    errores, leidas, validas = [], 0, 0
+    predios, dias = set(), set()  # Resúmenes diarios a rehacer
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode='w+', newline='') as staging:
+        escritor = csv.writer(staging)
+        for numero, fila in leer_filas(archivo, nombre):
+            leidas += 1
+            if leidas > max_filas:
+                raise ImportacionError(f"El archivo supera el máximo de {max_filas} filas por importación")
+            valores, errores_fila = validador.validar(fila)
+            if errores_fila:
+                if len(errores) < max_errores:
+                    errores.append({'fila': numero, 'errores': errores_fila})
+                continue
+            validas += 1
+            predios.add(valores['predio'])
+            dias.add(dia_utc(valores['fecha']) if valores['fecha'] else None)
+            escritor.writerow([numero, valores['predio'], valores['fecha'].isoformat() if valores['fecha'] else ''] +
+                              ['' if valores[n] is None else str(valores[n]) for n in COLUMNAS_NUMERICAS])
+
+        resultado = {
+            'filas_leidas': leidas,
+            'importadas': 0,
+            'rechazadas': leidas - validas,
+            'errores': errores,
+            'errores_truncados': leidas - validas > len(errores),
+            'recomendaciones_creadas': 0,
+            'recomendaciones_omitidas': [],
+        }
+        if solo_validar or not validas:
+            resultado['duracion_ms'] = int((time.perf_counter() - inicio) * 1000)
+            return resultado
+
+        staging.seek(0)
+        ahora = timezone.now()
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                ids = _cargar_postgres(staging, ahora)
+            else:
+                ids = _cargar_orm(staging, ahora)
+            dias = {dia or dia_utc(ahora) for dia in dias}  # Las filas sin fecha quedan con la de hoy
+            recalcular(predios, min(dias), max(dias))
+
+            creadas, omitidas = 0, []
+            for desde in range(0, len(ids), TAMANO_LOTE):
+                lote = Medicion.objects.filter(id__in=ids[desde:desde + TAMANO_LOTE]).select_related('predio')
+                creadas_lote, omitidas_lote = crear_recomendaciones_lote(lote)
+                creadas += creadas_lote
+                omitidas.extend(omitidas_lote)
+
+    resultado.update({
+        'importadas': len(ids),
+        'recomendaciones_creadas': creadas,
+        'recomendaciones_omitidas': omitidas[:max_errores],
+        'duracion_ms': int((time.perf_counter() - inicio) * 1000),
+    })
+    logger.info("Importación de %s: %d filas, %d importadas, %d rechazadas en %d ms",
+                profile.email, leidas, len(ids), resultado['rechazadas'], resultado['duracion_ms'])
+    return resultado
@@ -0,0 +1,123 @@
+# backend/api/lecturas.py
+"""
+Lecturas de sensores en memoria compacta para los caminos de lectura masiva.
+
+Medicion guarda NUMERIC y el ORM entrega cada valor como Decimal, que el motor,
+las alertas y los promedios convierten a float de inmediato. Aquí la base
+entrega float8 (CAST en la consulta, sin Decimal en el camino) y las lecturas
+se guardan por columnas en array('d'): 8 bytes por valor en vez de un objeto
+Python por valor y un Medicion por fila.
+
+    lote = cargar_lecturas(Medicion.objects.filter(predio=predio).order_by('fecha'))
+    for lectura in lote:          # Lectura con __slots__, atributos float o None
+        lectura.ph, lectura.fecha
+
+float(Decimal) y el CAST de NUMERIC a float8 dan el mismo double, así que
+los cálculos y sus redondeos a dos decimales no cambian. El almacenamiento
+sigue en NUMERIC: la API, los serializers y las sumas en SQL dependen de
+valores decimales exactos.
+"""
+import math
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+CAMPOS = ('ph', 'temperatura', 'humedad', 'nitrogeno', 'fosforo', 'potasio')
+TAMANO_CHUNK = 20000
+
+_FALTANTE = math.nan  # Las columnas NUMERIC nunca contienen NaN: marca los NULL
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICRO = timedelta(microseconds=1)
+_MICROS_DIA = 86_400_000_000
+
+
+class Lectura:
+    __slots__ = ('id', 'predio_id', 'fecha') + CAMPOS
+
+    def __init__(self, id, predio_id, fecha, *valores):
+        self.id, self.predio_id, self.fecha = id, predio_id, fecha
+        for campo, valor in zip(CAMPOS, valores):
+            setattr(self, campo, valor)
+
+    def __repr__(self):
+        return f'Lectura(id={self.id}, predio_id={self.predio_id}, fecha={self.fecha.isoformat()})'
+
+
+class LoteLecturas:
+    """Lecturas por columnas: ids, predios y fechas (µs desde epoch, exactas) en array('q'), valores en array('d')."""
+
+    def __init__(self):
+        self.ids = array('q')
+        self.predios = array('q')
+        self.fechas = array('q')
+        self.columnas = {campo: array('d') for campo in CAMPOS}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def agregar(self, id, predio_id, fecha, *valores):
+        self.ids.append(id)
+        self.predios.append(predio_id)
+        self.fechas.append((fecha - _EPOCH) // _MICRO)
+        for columna, valor in zip(self.columnas.values(), valores):
+            columna.append(_FALTANTE if valor is None else valor)
+
+    def valor(self, campo, indice):
+        valor = self.columnas[campo][indice]
+        return None if valor != valor else valor  # NaN != NaN
+
+    def fecha(self, indice):
+        return _EPOCH + timedelta(microseconds=self.fechas[indice])
+
+    def __getitem__(self, indice):
+        return Lectura(self.ids[indice], self.predios[indice], self.fecha(indice),
+                       *(self.valor(campo, indice) for campo in CAMPOS))
+
+    def __iter__(self):
+        for indice in range(len(self)):
+            yield self[indice]
+
+    def agrupar_por_semana(self):
+        """{domingo de la semana: [índices]}, sobre la fecha UTC como Medicion.get_semana_inicio."""
+        grupos = defaultdict(list)
+        for indice, micros in enumerate(self.fechas):
+            dia = micros // _MICROS_DIA  # 1970-01-01 fue jueves: (dia + 4) % 7 días desde el domingo
+            grupos[dia - (dia + 4) % 7].append(indice)
+        return {_EPOCH.date() + timedelta(days=dia): indices for dia, indices in grupos.items()}
+
+    def promedio(self, campo, indices):
+        """Promedio de los valores no nulos, sumados en el orden de `indices`."""
+        columna = self.columnas[campo]
+        valores = [v for v in (columna[i] for i in indices) if v == v]
+        return sum(valores) / len(valores) if valores else None
+
+    def bytes(self):
+        """Memoria de los datos (sin el overhead fijo de los arrays)."""
+        columnas = [self.ids, self.predios, self.fechas, *self.columnas.values()]
+        return sum(c.itemsize * len(c) for c in columnas)
+
+
+def valores_float(queryset, *extra):
+    """values_list de (id, predio_id, fecha, ph, ..., potasio, *extra) con los NUMERIC convertidos en la base."""
+    return queryset.values_list('id', 'predio_id', 'fecha', *(Cast(campo, FloatField()) for campo in CAMPOS), *extra)
+
+
+def cargar_lecturas(queryset, chunk_size=TAMANO_CHUNK, excluir_anomalias=False):
+    """
+    Lote con las lecturas de `queryset`. Con `excluir_anomalias` los valores
+    marcados en la ingesta quedan como faltantes (el bit i de
+    Medicion.anomalias es CAMPOS[i], ver api/anomalias.py).
+    """
+    lote = LoteLecturas()
+    if not excluir_anomalias:
+        for fila in valores_float(queryset).iterator(chunk_size=chunk_size):
+            lote.agregar(*fila)
+        return lote
+    for *fila, anomalias in valores_float(queryset, 'anomalias').iterator(chunk_size=chunk_size):
+        if anomalias:
+            fila[3:] = [None if anomalias >> i & 1 else valor for i, valor in enumerate(fila[3:])]
+        lote.agregar(*fila)
+    return lote
@@ -0,0 +1,220 @@
+# backend/api/management/commands/bench_asgi.py
+"""
+Dashboard e ingesta en WSGI (vistas síncronas de views.py) contra ASGI
+(vistas de views_async.py, con las consultas del dashboard en paralelo).
+
+    python manage.py sembrar_datos --perfiles 5 --predios 10 --mediciones 5000
+    python manage.py bench_asgi --clientes 32 --hilos 8 --peticiones 1000
+
+Las peticiones pasan por el handler completo de Django (middleware y señales)
+sin el socket HTTP: WSGIHandler en --hilos hilos, como un worker de gunicorn
+con --threads, y ASGIHandler en un solo event loop, como un worker de uvicorn
+(sus consultas corren en ASYNC_HILOS_BD hilos). --clientes clientes envían
+una petición tras otra; la latencia incluye la espera por un hilo libre.
+
+'en curso' es el máximo de peticiones atendidas a la vez por el worker y
+'conexiones' las conexiones a la base que abrió. Sobre la red: levantar
+gunicorn (wsgi) y uvicorn (asgi) y usar `manage.py carga --async`.
+"""
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+from api.carga import perfiles_de_carga, percentiles, token_hs256
+from api.models import Dispositivo, Medicion, Predio
+
+DISPOSITIVO = 'bench-asgi'
+RUTAS = {
+    'dashboard': ('GET', '/api/dashboard/stats/', '/api/async/dashboard/stats/'),
+    'ingesta': ('POST', '/api/iot/ingest/', '/api/async/iot/ingest/'),
+}
+
+
+class _Concurrencia:
+    """Peticiones en curso según request_started / request_finished, y conexiones abiertas."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.en_curso = self.maximo = self.conexiones = 0
+
+    def empieza(self, **kwargs):
+        with self.lock:
+            self.en_curso += 1
+            self.maximo = max(self.maximo, self.en_curso)
+
+    def termina(self, **kwargs):
+        with self.lock:
+            self.en_curso -= 1
+
+    def conexion(self, **kwargs):
+        with self.lock:
+            self.conexiones += 1
+
+
+class Command(BaseCommand):
+    help = "Compara latencia y concurrencia del dashboard y la ingesta entre WSGI y ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', nargs='+', choices=tuple(RUTAS), default=list(RUTAS))
+        parser.add_argument('--clientes', type=int, default=16, help="Clientes concurrentes")
+        parser.add_argument('--hilos', type=int, default=4, help="Hilos del worker WSGI")
+        parser.add_argument('--peticiones', type=int, default=400, help="Peticiones por endpoint y modo")
+        parser.add_argument('--salida', help="Guarda el resultado en JSON")
+
+    def handle(self, *args, **opts):
+        if min(opts['clientes'], opts['hilos'], opts['peticiones']) < 1:
+            raise CommandError("--clientes, --hilos y --peticiones deben ser mayores que cero")
+        if not settings.SUPABASE_JWT_SECRET:
+            raise CommandError("SUPABASE_JWT_SECRET no está configurado: no se pueden firmar tokens")
+        profile = perfiles_de_carga().order_by('email').first()
+        predio = Predio.objects.filter(usuario=profile).order_by('id').first() if profile else None
+        if predio is None:
+            raise CommandError("No hay datos de carga: ejecutar `manage.py sembrar_datos`")
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+        self.host = host
+        self.cabeceras = {
+            'dashboard': {'Authorization': f'Bearer {token_hs256(profile.id, profile.email, settings.SUPABASE_JWT_SECRET)}'},
+            'ingesta': {'X-Api-Key': settings.WEMOS_API_KEY or '', 'Content-Type': 'application/json'},
+        }
+        self.cuerpo = json.dumps({'predio_id': predio.pk, 'dispositivo_id': DISPOSITIVO, 'humedad': 40.5,
+                                  'temperatura': 12.3, 'ph': 6.1}).encode()
+
+        ultima_previa = Medicion.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        concurrencia = _Concurrencia()
+        request_started.connect(concurrencia.empieza)
+        request_finished.connect(concurrencia.termina)
+        connection_created.connect(concurrencia.conexion)
+        resultado = {'configuracion': {'clientes': opts['clientes'], 'hilos_wsgi': opts['hilos'],
+                                       'hilos_bd_asgi': settings.ASYNC_HILOS_BD, 'peticiones': opts['peticiones']},
+                     'resultados': {}}
+        try:
+            self.stdout.write(f"{'endpoint':<10} {'modo':<5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                              f"{'errores':>8} {'en curso':>9} {'conexiones':>10}")
+            for endpoint in opts['endpoints']:
+                for modo in ('wsgi', 'asgi'):
+                    concurrencia.maximo = concurrencia.conexiones = 0
+                    if modo == 'wsgi':
+                        latencias, errores, total = self.wsgi(endpoint, opts['clientes'], opts['hilos'],
+                                                              opts['peticiones'])
+                    else:
+                        latencias, errores, total = asyncio.run(self.asgi(endpoint, opts['clientes'],
+                                                                          opts['peticiones']))
+                    fila = {'throughput_rps': round(len(latencias) / total, 2), **percentiles(latencias),
+                            'errores': errores, 'en_curso_max': concurrencia.maximo,
+                            'conexiones': concurrencia.conexiones}
+                    resultado['resultados'][f'{endpoint}_{modo}'] = fila
+                    self.stdout.write(f"{endpoint:<10} {modo:<5} {fila['throughput_rps']:>8} {fila['p50_ms']:>8} "
+                                      f"{fila['p95_ms']:>8} {fila['p99_ms']:>8} {errores:>8} "
+                                      f"{fila['en_curso_max']:>9} {fila['conexiones']:>10}")
+        finally:
+            request_started.disconnect(concurrencia.empieza)
+            request_finished.disconnect(concurrencia.termina)
+            connection_created.disconnect(concurrencia.conexion)
+            Dispositivo.objects.filter(identificador=DISPOSITIVO).delete()
+            Medicion.objects.filter(predio=predio, pk__gt=ultima_previa, origen='wemos').delete()
+
+        if opts['salida']:
+            with open(opts['salida'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultado guardado en {opts['salida']}"))
+
+    def _repartir(self, peticiones, clientes):
+        return [peticiones // clientes + (1 if i < peticiones % clientes else 0) for i in range(clientes)]
+
+    # ─── WSGI: un hilo por petición en curso ───
+
+    def wsgi(self, endpoint, clientes, hilos, peticiones):
+        metodo, ruta, _ = RUTAS[endpoint]
+        handler = WSGIHandler()
+        fabrica = RequestFactory(SERVER_NAME=self.host)
+        extra = {f"HTTP_{k.upper().replace('-', '_')}": v for k, v in self.cabeceras[endpoint].items()
+                 if k != 'Content-Type'}
+        latencias, errores, lock = [], [0], threading.Lock()
+
+        def atender(environ):
+            estado = []
+            respuesta = handler(environ, lambda status, headers: estado.append(status))
+            respuesta.close()  # request_finished, como el servidor WSGI
+            return int(estado[0].split()[0])
+
+        def cliente(cantidad, servidor):
+            for _ in range(cantidad):
+                if metodo == 'POST':
+                    environ = fabrica.post(ruta, data=self.cuerpo, content_type='application/json', **extra).environ
+                else:
+                    environ = fabrica.get(ruta, **extra).environ
+                inicio = time.perf_counter()
+                codigo = servidor.submit(atender, environ).result()
+                with lock:
+                    latencias.append(time.perf_counter() - inicio)
+                    errores[0] += codigo >= 400
+
+        comienzo = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as servidor:
+            clientes_hilos = [threading.Thread(target=cliente, args=(n, servidor))
+                              for n in self._repartir(peticiones, clientes)]
+            for hilo in clientes_hilos:
+                hilo.start()
+            for hilo in clientes_hilos:
+                hilo.join()
+        return latencias, errores[0], time.perf_counter() - comienzo
+
+    # ─── ASGI: un event loop ───
+
+    async def asgi(self, endpoint, clientes, peticiones):
+        metodo, _, ruta = RUTAS[endpoint]
+        handler = ASGIHandler()
+        partes = urlsplit(ruta)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': metodo,
+            'scheme': 'http', 'path': partes.path, 'raw_path': partes.path.encode(),
+            'query_string': partes.query.encode(), 'root_path': '', 'client': ('127.0.0.1', 0),
+            'server': (self.host, 80),
+            'headers': [(b'host', self.host.encode())] + [(k.lower().encode(), v.encode())
+                                                         for k, v in self.cabeceras[endpoint].items()],
+        }
+        cuerpo = self.cuerpo if metodo == 'POST' else b''
+        if cuerpo:  # DRF solo lee el cuerpo con Content-Length, que uvicorn pasa tal cual
+            scope['headers'].append((b'content-length', str(len(cuerpo)).encode()))
+        latencias, errores = [], 0
+
+        async def atender():
+            enviado, estado = False, []
+
+            async def receive():
+                nonlocal enviado
+                if not enviado:
+                    enviado = True
+                    return {'type': 'http.request', 'body': cuerpo, 'more_body': False}
+                await asyncio.Event().wait()  # El cliente no se desconecta: Django cancela la espera al responder
+
+            async def send(mensaje):
+                if mensaje['type'] == 'http.response.start':
+                    estado.append(mensaje['status'])
+
+            await handler(dict(scope), receive, send)
+            return estado[0]
+
+        async def cliente(cantidad):
+            nonlocal errores
+            for _ in range(cantidad):
+                inicio = time.perf_counter()
+                codigo = await atender()
+                latencias.append(time.perf_counter() - inicio)
+                errores += codigo >= 400
+
+        comienzo = time.perf_counter()
+        await asyncio.gather(*(cliente(n) for n in self._repartir(peticiones, clientes)))
+        return latencias, errores, time.perf_counter() - comienzo
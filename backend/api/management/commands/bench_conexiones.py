@@ -0,0 +1,104 @@
+# backend/api/management/commands/bench_conexiones.py
+"""
+Benchmark de la ingesta (POST /api/iot/ingest/) según el modo de conexión a la
+base de datos. Cada petición pasa por el WSGIHandler de Django completo
+(middleware y señales request_started/request_finished, que son las que cierran
+o reutilizan la conexión), sin el socket HTTP.
+
+    python manage.py sembrar_datos --perfiles 1 --predios 1 --mediciones 0
+    python manage.py bench_conexiones --peticiones 500
+    python manage.py bench_conexiones --modos ninguno persistente pool   # con psycopg[pool]
+
+Contra la base de Supabase la diferencia entre 'ninguno' y 'persistente' es
+el handshake TCP + TLS + auth de cada petición. Las lecturas creadas se borran
+al terminar. Para el mismo efecto con tráfico HTTP concurrente usar
+`manage.py carga` contra gunicorn con distintos DB_MODO_CONEXION.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+from api.carga import DOMINIO, percentiles
+from api.models import Dispositivo, Medicion, Predio
+
+DISPOSITIVO = 'bench-conexiones'
+MODOS = ('ninguno', 'persistente', 'pool')
+
+
+class Command(BaseCommand):
+    help = "Compara la latencia de la ingesta con y sin conexiones persistentes o pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modos', nargs='+', choices=MODOS, default=['ninguno', 'persistente'])
+        parser.add_argument('--peticiones', type=int, default=200, help="Peticiones por modo")
+        parser.add_argument('--predio', type=int, help="Predio destino (default: el primero sembrado)")
+
+    def handle(self, *args, **opts):
+        if opts['peticiones'] < 1:
+            raise CommandError("--peticiones debe ser mayor que cero")
+        predio = (Predio.objects.filter(pk=opts['predio']) if opts['predio']
+                  else Predio.objects.filter(usuario__email__endswith=f'@{DOMINIO}').order_by('id')).first()
+        if predio is None:
+            raise CommandError("No hay predio destino: usar --predio o ejecutar `manage.py sembrar_datos`")
+
+        conexion = connections['default']
+        original = (conexion.settings_dict['CONN_MAX_AGE'], conexion.settings_dict['OPTIONS'].get('pool'))
+        ultima_previa = Medicion.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        abiertas = []
+        receptor = lambda **kwargs: abiertas.append(1)  # noqa: E731
+        connection_created.connect(receptor)
+        try:
+            self.stdout.write(f"{'modo':<12} {'peticiones':>10} {'conexiones':>10} {'rps':>8} "
+                              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+            for modo in opts['modos']:
+                self.configurar(conexion, modo, original)
+                abiertas.clear()
+                latencias, total = self.medir(predio.pk, opts['peticiones'])
+                p = percentiles(latencias)
+                self.stdout.write(f"{modo:<12} {len(latencias):>10} {len(abiertas):>10} "
+                                  f"{len(latencias) / total:>8.1f} {p['p50_ms']:>8} {p['p95_ms']:>8} {p['p99_ms']:>8}")
+        finally:
+            connection_created.disconnect(receptor)
+            conexion.close()
+            conexion.settings_dict['CONN_MAX_AGE'] = original[0]
+            if original[1] is not None:
+                conexion.settings_dict['OPTIONS']['pool'] = original[1]
+            Dispositivo.objects.filter(identificador=DISPOSITIVO).delete()
+            Medicion.objects.filter(predio=predio, pk__gt=ultima_previa, origen='wemos').delete()
+
+    def configurar(self, conexion, modo, original):
+        conexion.close()
+        opciones = conexion.settings_dict['OPTIONS']
+        opciones.pop('pool', None)
+        if modo == 'pool':
+            if conexion.vendor != 'postgresql':
+                raise CommandError("El modo pool solo existe para PostgreSQL con psycopg3")
+            opciones['pool'] = original[1] or {'min_size': settings.DB_POOL_MIN, 'max_size': settings.DB_POOL_MAX,
+                                                'timeout': settings.DB_POOL_TIMEOUT}
+        conexion.settings_dict['CONN_MAX_AGE'] = settings.DB_CONN_MAX_AGE if modo == 'persistente' else 0
+
+    def medir(self, predio_id, cantidad):
+        handler = WSGIHandler()
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+        fabrica = RequestFactory(SERVER_NAME=host)
+        cuerpo = json.dumps({'predio_id': predio_id, 'dispositivo_id': DISPOSITIVO, 'humedad': 40.5,
+                             'temperatura': 12.3, 'ph': 6.1})
+        latencias = []
+        comienzo = time.perf_counter()
+        for _ in range(cantidad):
+            environ = fabrica.post('/api/iot/ingest/', data=cuerpo, content_type='application/json',
+                                   HTTP_X_API_KEY=settings.WEMOS_API_KEY or '').environ
+            estado = []
+            inicio = time.perf_counter()
+            respuesta = handler(environ, lambda status, headers: estado.append(status))
+            respuesta.close()  # Dispara request_finished, como el servidor WSGI
+            latencias.append(time.perf_counter() - inicio)
+            if not estado[0].startswith('201'):
+                raise CommandError(f"La ingesta respondió {estado[0]}: revisar WEMOS_API_KEY y el predio")
+        return latencias, time.perf_counter() - comienzo
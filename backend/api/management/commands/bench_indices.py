@@ -0,0 +1,136 @@
+# backend/api/management/commands/bench_indices.py
+"""
+Planes de ejecución y tiempos de las consultas de series de tiempo sobre
+`mediciones` (dashboard, listado filtrado por fechas, promedios semanales).
+
+    python manage.py sembrar_datos --perfiles 100 --predios 20 --mediciones 5000   # 10M filas
+    python manage.py migrate api 0008 && python manage.py bench_indices --salida antes.json
+    python manage.py migrate api 0009 && python manage.py bench_indices --salida despues.json --comparar antes.json
+
+En PostgreSQL cada plan es EXPLAIN (ANALYZE, BUFFERS): muestra si se usa el
+índice cubriente (Index Only Scan), el BRIN (Bitmap Heap Scan) o un Seq Scan.
+Las consultas se arman con el mismo ORM que las vistas, sobre el primer
+perfil sembrado. Los tiempos son la mediana de --repeticiones ejecuciones con
+la cache caliente (la primera no se cuenta).
+"""
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Avg, Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api.carga import perfiles_de_carga
+from api.exportacion import rango_fechas
+from api.models import Medicion, Predio, Profile
+from api.serializacion_rapida import CAMPOS_MEDICION, SerializadorFilas
+
+
+def consultas(profile):
+    predios = list(Predio.objects.filter(usuario=profile).order_by('id').values_list('id', flat=True))
+    if not predios:
+        raise CommandError("El perfil no tiene predios")
+    predio = predios[0]
+    hoy = timezone.localdate()
+    desde, hasta = hoy - timedelta(days=30), hoy
+    rango = rango_fechas(desde, hasta)
+    semana = timezone.now() - timedelta(days=7)
+    rapido = SerializadorFilas(Medicion, CAMPOS_MEDICION)
+    return {
+        # MedicionFilter antes y después: fecha__date contra rango sobre la columna
+        'listado_fecha_date': rapido.valores(Medicion.objects.filter(
+            predio_id=predio, fecha__date__gte=desde, fecha__date__lte=hasta).order_by('-fecha')[:100]),
+        'listado_rango': rapido.valores(Medicion.objects.filter(
+            predio_id=predio, fecha__gte=rango['gte'], fecha__lt=rango['lt']).order_by('-fecha')[:100]),
+        # dashboard_stats: conteo y tendencia de 30 días de todos los predios del usuario
+        'dashboard_conteo': Medicion.objects.filter(predio_id__in=predios).values('predio_id')
+                                            .annotate(total=Count('id')).order_by(),
+        'dashboard_tendencia': rapido.valores(Medicion.objects.filter(
+            predio_id__in=predios, fecha__gte=timezone.now() - timedelta(days=30)).order_by('fecha')),
+        'ultima_por_predio': Medicion.objects.filter(predio_id=predio).order_by('-fecha').values('pk')[:1],
+        # semanal.agregados_semanales: promedios diarios de todos los predios en una semana (BRIN)
+        'semanal_todos_los_predios': Medicion.objects.filter(fecha__gte=semana)
+                                                     .annotate(dia=TruncDate('fecha'))
+                                                     .values('predio_id', 'dia')
+                                                     .annotate(n=Avg('nitrogeno'), p=Avg('fosforo'),
+                                                               k=Avg('potasio'), cantidad=Count('id'))
+                                                     .order_by(),
+    }
+
+
+class Command(BaseCommand):
+    help = "Captura planes EXPLAIN y tiempos de las consultas de series de tiempo sobre mediciones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--email', help="Perfil a usar (default: el primero sembrado con sembrar_datos)")
+        parser.add_argument('--salida', help="Guarda planes y tiempos en JSON")
+        parser.add_argument('--comparar', help="JSON de una corrida anterior")
+        parser.add_argument('--planes', action='store_true', help="Imprime los planes completos")
+
+    def handle(self, *args, **opts):
+        perfiles = Profile.objects.filter(email=opts['email']) if opts['email'] else perfiles_de_carga()
+        profile = perfiles.order_by('email').first()
+        if profile is None:
+            raise CommandError("No hay perfil: ejecutar `manage.py sembrar_datos` o indicar --email")
+        if opts['repeticiones'] < 1:
+            raise CommandError("--repeticiones debe ser mayor que cero")
+
+        anterior = {}
+        if opts['comparar']:
+            with open(opts['comparar'], encoding='utf-8') as f:
+                anterior = json.load(f).get('consultas', {})
+
+        filas = Medicion.objects.count()
+        self.stdout.write(f"{connection.vendor}: {filas} mediciones, perfil {profile.email}")
+        self.stdout.write(f"{'consulta':<28} {'mediana ms':>11} {'mín ms':>9} {'nodos':<40}")
+        resultado = {'motor': connection.vendor, 'filas': filas, 'consultas': {}}
+        for nombre, consulta in consultas(profile).items():
+            plan = self.explicar(consulta)
+            tiempos = self.medir(consulta, opts['repeticiones'])
+            datos = {'mediana_ms': round(statistics.median(tiempos), 3), 'min_ms': round(min(tiempos), 3),
+                     'nodos': self.nodos(plan), 'plan': plan}
+            resultado['consultas'][nombre] = datos
+            linea = f"{nombre:<28} {datos['mediana_ms']:>11} {datos['min_ms']:>9} {', '.join(datos['nodos'])[:60]:<40}"
+            previo = anterior.get(nombre)
+            if previo and previo.get('mediana_ms'):
+                linea += f"  ({(datos['mediana_ms'] - previo['mediana_ms']) / previo['mediana_ms'] * 100:+.0f}%)"
+            self.stdout.write(linea)
+            if opts['planes']:
+                self.stdout.write(plan + '\n')
+
+        if opts['salida']:
+            with open(opts['salida'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultado guardado en {opts['salida']}"))
+
+    def explicar(self, queryset):
+        if connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True, buffers=True)
+        return queryset.explain()
+
+    def medir(self, queryset, repeticiones):
+        list(queryset.all())  # Calienta la cache
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            list(queryset.all())  # .all() evita reutilizar el resultado cacheado del queryset
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
+
+    def nodos(self, plan):
+        """Tipos de nodo del plan (Index Only Scan, Bitmap Heap Scan, Seq Scan...) en orden."""
+        claves = ('Index Only Scan', 'Index Scan', 'Bitmap Heap Scan', 'Bitmap Index Scan', 'Seq Scan',
+                  'SEARCH', 'SCAN')
+        encontrados = []
+        for linea in plan.splitlines():
+            for clave in claves:
+                if clave in linea:
+                    detalle = linea.split(clave, 1)[1].split('(')[0].strip()
+                    encontrados.append(f'{clave} {detalle}'.strip())
+                    break
+        return encontrados
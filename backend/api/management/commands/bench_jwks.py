@@ -0,0 +1,85 @@
+# backend/api/management/commands/bench_jwks.py
+"""
+Benchmark del costo de verificación de tokens RS256 por request.
+
+Compara el camino anterior (parsear el JWK con RSAAlgorithm.from_jwk en cada
+token) contra la JWKSCache (claves parseadas e indexadas por kid) y contra
+tokens repetidos servidos por la TokenCache, usando un servidor JWKS local.
+
+    python manage.py bench_jwks --tokens 2000
+"""
+import time
+
+import jwt
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from api.auth_utils import jwks_cache, token_cache
+from api.authentication import SupabaseAuthentication
+from api.stubs import ServidorJWKSStub, firmar, generar_clave
+
+
+class Command(BaseCommand):
+    help = "Mide el costo de verificación de tokens RS256 con y sin la cache de JWKS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        n = options['tokens']
+        privada, jwk = generar_clave('bench-1')
+        tokens = [firmar(privada, 'bench-1') for _ in range(n)]
+
+        with ServidorJWKSStub({'keys': [jwk]}) as stub, \
+                override_settings(SUPABASE_JWKS_URL=stub.jwks_url):
+            # 1. Camino anterior (get_signing_key): buscar el kid y parsear el JWK en cada request
+            jwks = {'keys': [jwk]}
+            inicio = time.perf_counter()
+            for token in tokens:
+                kid = jwt.get_unverified_header(token)['kid']
+                clave = next(jwt.algorithms.RSAAlgorithm.from_jwk(k) for k in jwks['keys'] if k['kid'] == kid)
+                jwt.decode(token, clave, algorithms=['RS256'], audience='authenticated')
+            legacy = time.perf_counter() - inicio
+
+            # Los cachés son globales del proceso: su configuración se restaura al terminar
+            maxsize, intervalo = token_cache.maxsize, jwks_cache.min_refetch_interval
+            try:
+                # 2. JWKSCache: claves parseadas una vez e indexadas por kid
+                jwks_cache.clear()
+                token_cache.clear()
+                token_cache.maxsize = 0
+                auth = SupabaseAuthentication()
+                inicio = time.perf_counter()
+                auth.decodificar_token(tokens[0])  # Primera descarga (en frío)
+                primera = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                for token in tokens:
+                    auth.decodificar_token(token)
+                cacheado = time.perf_counter() - inicio
+                descargas = stub.descargas
+
+                # 3. Mismo usuario repitiendo requests: el payload ya verificado se reutiliza
+                token_cache.maxsize = maxsize
+                inicio = time.perf_counter()
+                for _ in range(n):
+                    auth.decodificar_token(tokens[0])
+                repetido = time.perf_counter() - inicio
+
+                # 4. Rotación: un kid nuevo provoca exactamente un refetch
+                privada_2, jwk_2 = generar_clave('bench-2')
+                stub.jwks = {'keys': [jwk, jwk_2]}
+                jwks_cache.min_refetch_interval = 0
+                auth.decodificar_token(firmar(privada_2, 'bench-2'))
+                descargas_rotacion = stub.descargas - descargas
+            finally:
+                token_cache.maxsize, jwks_cache.min_refetch_interval = maxsize, intervalo
+                jwks_cache.clear()
+                token_cache.clear()
+
+        self.stdout.write(f"Tokens verificados: {n}")
+        self.stdout.write(f"  from_jwk por request: {legacy / n * 1e6:9.1f} µs/token")
+        self.stdout.write(f"  JWKSCache:            {cacheado / n * 1e6:9.1f} µs/token "
+                          f"({descargas} descarga(s) de JWKS, primera en {primera * 1e3:.1f} ms)")
+        self.stdout.write(f"  Token repetido:       {repetido / n * 1e6:9.1f} µs/token (TokenCache)")
+        self.stdout.write(f"  Speedup JWKSCache: {legacy / cacheado:.2f}x, token repetido: {legacy / repetido:.0f}x")
+        self.stdout.write(f"  Rotación de clave: {descargas_rotacion} refetch(es) por kid desconocido")
@@ -0,0 +1,73 @@
+# backend/api/management/commands/bench_lecturas.py
+"""
+Tiempo y memoria de cargar lecturas de sensores de tres formas:
+instancias de Medicion, tuplas con Decimal (values_list) y LoteLecturas.
+
+    python manage.py sembrar_datos --perfiles 10 --predios 10 --mediciones 10000   # 1M filas
+    python manage.py bench_lecturas --limite 1000000
+
+La memoria es el pico de tracemalloc durante la carga (lo que retiene el
+resultado más los temporales del ORM); tracemalloc vuelve la carga más lenta,
+así que el tiempo se mide en una corrida aparte.
+"""
+import gc
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.lecturas import CAMPOS, TAMANO_CHUNK, cargar_lecturas
+from api.models import Medicion
+
+
+def formas(queryset):
+    return {
+        'instancias': lambda: list(queryset.iterator(chunk_size=TAMANO_CHUNK)),
+        'decimal': lambda: list(queryset.values_list('id', 'predio_id', 'fecha', *CAMPOS)
+                                        .iterator(chunk_size=TAMANO_CHUNK)),
+        'compacto': lambda: cargar_lecturas(queryset),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compara tiempo y memoria de cargar mediciones como modelos, Decimal o columnas compactas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=1_000_000, help="Mediciones a cargar")
+
+    def handle(self, *args, **opts):
+        if opts['limite'] < 1:
+            raise CommandError("--limite debe ser mayor que cero")
+        ids = Medicion.objects.order_by('id').values_list('id', flat=True)[:opts['limite']]
+        ultimo = ids[len(ids) - 1] if ids else None
+        if ultimo is None:
+            raise CommandError("No hay mediciones: ejecutar `manage.py sembrar_datos`")
+        queryset = Medicion.objects.filter(id__lte=ultimo).order_by('id')
+
+        filas = queryset.count()
+        self.stdout.write(f"{connection.vendor}: {filas} mediciones")
+        self.stdout.write(f"{'forma':<12} {'segundos':>9} {'pico MB':>9} {'bytes/fila':>11}")
+        for nombre, cargar in formas(queryset).items():
+            segundos = self.medir_tiempo(cargar)
+            pico = self.medir_memoria(cargar)
+            self.stdout.write(f"{nombre:<12} {segundos:>9.2f} {pico / 2**20:>9.1f} {pico / filas:>11.0f}")
+
+    def medir_tiempo(self, cargar):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = cargar()
+        segundos = time.perf_counter() - inicio
+        del resultado
+        return segundos
+
+    def medir_memoria(self, cargar):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            resultado = cargar()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del resultado
+        return pico
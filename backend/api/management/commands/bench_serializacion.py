@@ -0,0 +1,82 @@
+# backend/api/management/commands/bench_serializacion.py
+"""
+Benchmark de serialización de mediciones: MedicionSerializer + JSONRenderer
+contra el camino rápido (values_list + SerializadorFilas + ORJSONRenderer).
+
+No usa la base de datos: arma instancias en memoria para el serializer y
+tuplas equivalentes a las de values_list() para el camino rápido.
+
+    python manage.py bench_serializacion --filas 1000 10000 100000
+"""
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Medicion, Predio
+from api.renderers import ORJSONRenderer, orjson
+from api.serializacion_rapida import CAMPOS_MEDICION, SerializadorFilas
+from api.serializers import MedicionSerializer
+
+
+def datos_sinteticos(cantidad, semilla=42):
+    rnd = random.Random(semilla)
+    predio = Predio(id=1, nombre='Predio Bench', zona='Osorno', tipo_suelo='Andisol', superficie=Decimal('10.00'))
+    inicio = timezone.now() - timedelta(minutes=cantidad)
+    instancias, tuplas = [], []
+    for i in range(cantidad):
+        valores = {
+            'ph': Decimal(f"{rnd.uniform(5, 7.5):.2f}"),
+            'temperatura': Decimal(f"{rnd.uniform(5, 30):.2f}"),
+            'humedad': Decimal(f"{rnd.uniform(20, 90):.2f}"),
+            'nitrogeno': Decimal(f"{rnd.uniform(5, 60):.2f}"),
+            'fosforo': Decimal(f"{rnd.uniform(5, 40):.2f}"),
+            'potasio': Decimal(f"{rnd.uniform(0.1, 1):.4f}"),
+        }
+        fecha = inicio + timedelta(minutes=i)
+        medicion = Medicion(id=i + 1, predio=predio, origen='wemos', **valores)
+        medicion.fecha = fecha
+        instancias.append(medicion)
+        tuplas.append((i + 1, 1, predio.nombre, predio.zona, fecha, valores['ph'], valores['temperatura'],
+                       valores['humedad'], valores['nitrogeno'], valores['fosforo'], valores['potasio'], 'wemos'))
+    return instancias, tuplas
+
+
+class Command(BaseCommand):
+    help = "Compara MedicionSerializer+JSONRenderer con el camino rápido values_list+orjson."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--repeticiones', type=int, default=3)
+
+    def medir(self, funcion, repeticiones):
+        mejor = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            duracion = time.perf_counter() - inicio
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        return mejor, resultado
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson no está instalado: el renderer rápido usa json estándar."))
+        rapido = SerializadorFilas(Medicion, CAMPOS_MEDICION)
+        estandar, veloz = JSONRenderer(), ORJSONRenderer()
+
+        self.stdout.write(f"{'filas':>8} {'serializer':>12} {'rápido':>10} {'speedup':>8} {'bytes':>12} {'iguales':>8}")
+        for cantidad in options['filas']:
+            instancias, tuplas = datos_sinteticos(cantidad)
+            t_serializer, json_serializer = self.medir(
+                lambda: estandar.render(MedicionSerializer(instancias, many=True, expand=[]).data),
+                options['repeticiones'])
+            t_rapido, json_rapido = self.medir(
+                lambda: veloz.render(rapido.filas(tuplas)), options['repeticiones'])
+            self.stdout.write(
+                f"{cantidad:>8} {t_serializer * 1e3:>10.1f}ms {t_rapido * 1e3:>8.1f}ms "
+                f"{t_serializer / t_rapido:>7.1f}x {len(json_rapido):>12} {str(json_serializer == json_rapido):>8}"
+            )
@@ -0,0 +1,97 @@
+# backend/api/management/commands/carga.py
+"""
+Prueba de carga contra un servidor corriendo (api/carga.py): N Wemos enviando
+lecturas y M usuarios consultando el dashboard, con p50/p95/p99 por endpoint.
+
+    python manage.py sembrar_datos --perfiles 50 --predios 20 --mediciones 2000
+    gunicorn nutrisoil_project.wsgi -w 4 &
+    python manage.py carga --dispositivos 50 --usuarios 20 --duracion 60 --salida base.json
+    # ... cambio ...
+    python manage.py carga --dispositivos 50 --usuarios 20 --duracion 60 --comparar base.json
+    # Vistas async (views_async.py) servidas por ASGI, con `pip install uvicorn`:
+    gunicorn nutrisoil_project.asgi -w 4 -k uvicorn.workers.UvicornWorker &
+    python manage.py carga --dispositivos 50 --usuarios 20 --duracion 60 --async --comparar base.json
+
+Usa la misma base de datos que el servidor (lee los perfiles sembrados) y el
+mismo SUPABASE_JWT_SECRET / WEMOS_API_KEY. Para cifras comparables: mismos
+datos sembrados, mismos parámetros y el cliente en otra máquina o en núcleos
+libres (los hilos de Python también consumen CPU).
+"""
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.carga import GeneradorCarga
+
+COMPARADAS = ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+class Command(BaseCommand):
+    help = "Genera carga de ingesta y lectura contra un servidor y reporta latencias por endpoint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--dispositivos', type=int, default=10, help="Wemos simulados (POST /api/iot/ingest/)")
+        parser.add_argument('--usuarios', type=int, default=5, help="Usuarios del dashboard simulados")
+        parser.add_argument('--duracion', type=float, default=30.0, help="Segundos de carga")
+        parser.add_argument('--peticiones', type=int, help="Peticiones por hilo (reemplaza --duracion)")
+        parser.add_argument('--pausa', type=float, default=0.0, help="Segundos entre peticiones de cada hilo")
+        parser.add_argument('--timeout', type=float, default=10.0)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--async', dest='rutas_async', action='store_true',
+                            help="Ingesta y dashboard en /api/async/ (servidor ASGI)")
+        parser.add_argument('--salida', help="Guarda el resultado en JSON")
+        parser.add_argument('--comparar', help="JSON de una corrida anterior para mostrar la diferencia")
+
+    def handle(self, *args, **opts):
+        if not settings.SUPABASE_JWT_SECRET:
+            raise CommandError("SUPABASE_JWT_SECRET no está configurado: no se pueden firmar tokens")
+        if opts['dispositivos'] < 0 or opts['usuarios'] < 0 or opts['dispositivos'] + opts['usuarios'] == 0:
+            raise CommandError("Se necesita al menos un dispositivo o un usuario")
+        anterior = None
+        if opts['comparar']:
+            with open(opts['comparar'], encoding='utf-8') as f:
+                anterior = json.load(f)
+
+        generador = GeneradorCarga(
+            opts['url'], settings.WEMOS_API_KEY or '', settings.SUPABASE_JWT_SECRET,
+            dispositivos=opts['dispositivos'], usuarios=opts['usuarios'], duracion=opts['duracion'],
+            peticiones=opts['peticiones'], pausa=opts['pausa'], semilla=opts['semilla'], timeout=opts['timeout'],
+            rutas_async=opts['rutas_async'],
+        )
+        try:
+            resultado = generador.ejecutar()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'endpoint':<12} {'peticiones':>10} {'errores':>8} {'rps':>9} "
+                          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for endpoint, r in resultado['resultados'].items():
+            self.stdout.write(
+                f"{endpoint:<12} {r['peticiones']:>10} {r['errores']:>8} {r['throughput_rps']:>9} "
+                f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['max_ms']:>9}"
+            )
+            if r['errores']:
+                self.stdout.write(self.style.WARNING(f"  códigos: {r['codigos']}"))
+
+        if anterior:
+            self.comparar(anterior, resultado)
+        if opts['salida']:
+            with open(opts['salida'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultado guardado en {opts['salida']}"))
+
+    def comparar(self, anterior, actual):
+        if anterior.get('configuracion', {}) | {'url': None} != actual['configuracion'] | {'url': None}:
+            self.stdout.write(self.style.WARNING("La corrida anterior usó otros parámetros: la comparación es orientativa"))
+        self.stdout.write("Diferencia contra la corrida anterior:")
+        for endpoint, r in actual['resultados'].items():
+            previo = anterior.get('resultados', {}).get(endpoint)
+            if not previo:
+                continue
+            cambios = []
+            for clave in COMPARADAS:
+                if previo.get(clave):
+                    cambios.append(f"{clave} {(r[clave] - previo[clave]) / previo[clave] * 100:+.1f}%")
+            self.stdout.write(f"  {endpoint:<12} " + ', '.join(cambios))
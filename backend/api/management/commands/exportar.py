@@ -0,0 +1,61 @@
+# backend/api/management/commands/exportar.py
+"""
+Exporta mediciones o recomendaciones de un usuario a un archivo (o stdout)
+usando el mismo generador en streaming que el endpoint /api/exportar/<tipo>/.
+
+    python manage.py exportar mediciones --email agricultor@nutrisoil.cl --formato parquet \
+        --desde 2025-01-01 --hasta 2025-03-31 --salida mediciones.parquet
+"""
+import sys
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exportacion import FORMATOS, TIPOS, Exportacion, ExportacionError
+from api.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Exporta en streaming las mediciones o recomendaciones de un usuario"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=list(TIPOS))
+        parser.add_argument('--email', required=True, help="Email del perfil dueño de los datos")
+        parser.add_argument('--formato', choices=list(FORMATOS), default='csv')
+        parser.add_argument('--desde', type=date.fromisoformat)
+        parser.add_argument('--hasta', type=date.fromisoformat)
+        parser.add_argument('--predio', type=int)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--salida', help="Archivo de destino (por defecto stdout)")
+
+    def handle(self, *args, **opts):
+        try:
+            profile = Profile.objects.get(email=opts['email'])
+        except Profile.DoesNotExist:
+            raise CommandError(f"No existe un perfil con email {opts['email']}")
+
+        try:
+            exportacion = Exportacion(
+                opts['tipo'], profile, formato=opts['formato'], desde=opts['desde'],
+                hasta=opts['hasta'], predio=opts['predio'], chunk_size=opts['chunk_size']
+            )
+        except ExportacionError as e:
+            raise CommandError(str(e))
+
+        destino = open(opts['salida'], 'wb') if opts['salida'] else sys.stdout.buffer
+        inicio = time.perf_counter()
+        total_bytes = 0
+        try:
+            for bloque in exportacion.bytes():
+                destino.write(bloque)
+                total_bytes += len(bloque)
+        finally:
+            if opts['salida']:
+                destino.close()
+        duracion = time.perf_counter() - inicio
+
+        self.stderr.write(
+            f"{exportacion.filas_exportadas} filas, {total_bytes / 1024:.1f} KiB en {duracion:.2f}s "
+            f"({exportacion.filas_exportadas / duracion if duracion else 0:.0f} filas/s)"
+        )
@@ -0,0 +1,52 @@
+# backend/api/management/commands/importar_mediciones.py
+"""
+Importa mediciones de laboratorio desde un CSV/XLSX para un usuario, con la
+misma validación y carga (COPY en PostgreSQL) que POST /api/mediciones/importar/.
+
+    python manage.py importar_mediciones resultados.csv --email agricultor@nutrisoil.cl
+    python manage.py importar_mediciones resultados.xlsx --email agricultor@nutrisoil.cl --solo-validar
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importacion import ImportacionError, importar_mediciones
+from api.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Importa mediciones de laboratorio desde un archivo CSV o XLSX"
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--email', required=True, help="Email del perfil dueño de los predios")
+        parser.add_argument('--solo-validar', action='store_true', help="Valida el archivo sin importar")
+
+    def handle(self, *args, **opts):
+        try:
+            profile = Profile.objects.get(email=opts['email'])
+        except Profile.DoesNotExist:
+            raise CommandError(f"No existe un perfil con email {opts['email']}")
+
+        try:
+            with open(opts['archivo'], 'rb') as archivo:
+                resultado = importar_mediciones(
+                    profile, archivo, os.path.basename(opts['archivo']), solo_validar=opts['solo_validar']
+                )
+        except (OSError, ImportacionError) as e:
+            raise CommandError(str(e))
+
+        for error in resultado['errores']:
+            detalle = '; '.join(f"{campo}: {mensaje}" for campo, mensaje in error['errores'].items())
+            self.stderr.write(f"Fila {error['fila']}: {detalle}")
+        if resultado['errores_truncados']:
+            self.stderr.write("... (más errores omitidos)")
+        for omitida in resultado['recomendaciones_omitidas']:
+            self.stderr.write(f"Medición {omitida['medicion']}: sin recomendación ({omitida['error']})")
+
+        segundos = resultado['duracion_ms'] / 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['filas_leidas']} filas leídas, {resultado['importadas']} importadas, "
+            f"{resultado['rechazadas']} rechazadas, {resultado['recomendaciones_creadas']} recomendaciones "
+            f"en {segundos:.2f}s ({resultado['filas_leidas'] / segundos if segundos else 0:.0f} filas/s)"
+        ))
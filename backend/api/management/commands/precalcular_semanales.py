@@ -0,0 +1,54 @@
+# backend/api/management/commands/precalcular_semanales.py
+"""
+Precalcula las recomendaciones semanales de todos los predios con mediciones
+nuevas (api/semanal.py). Pensado para correr al cierre de cada semana:
+
+    # crontab: domingo 00:15 UTC, semana recién terminada y la anterior (análisis tardíos)
+    15 0 * * 0  python manage.py precalcular_semanales --semanas 2
+
+    python manage.py precalcular_semanales --desde 2025-03-01 --hasta 2025-06-30  # temporada
+    python manage.py precalcular_semanales --forzar   # recalcula aunque estén al día
+
+Las semanas que ya están al día no se recalculan, así que repetirlo es barato.
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.semanal import TAMANO_BLOQUE, inicio_semana, precalcular
+
+
+class Command(BaseCommand):
+    help = "Precalcula las recomendaciones semanales de los predios con mediciones nuevas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semanas', type=int, default=1,
+                            help="Semanas cerradas hacia atrás a revisar (default 1: la recién terminada)")
+        parser.add_argument('--incluir-actual', action='store_true', help="Incluye también la semana en curso")
+        parser.add_argument('--desde', type=date.fromisoformat, help="Fecha inicial YYYY-MM-DD (reemplaza --semanas)")
+        parser.add_argument('--hasta', type=date.fromisoformat, help="Fecha final YYYY-MM-DD")
+        parser.add_argument('--forzar', action='store_true', help="Recalcula aunque la semana esté al día")
+        parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE, help="Predios por consulta agrupada")
+
+    def handle(self, *args, **opts):
+        actual = inicio_semana(timezone.now().date())  # Semanas en UTC, como get_semana_inicio
+        hasta = opts['hasta'] or (actual if opts['incluir_actual'] else actual - timedelta(days=7))
+        desde = opts['desde'] or hasta - timedelta(days=7 * (opts['semanas'] - 1))
+        if opts['semanas'] < 1 or opts['bloque'] < 1:
+            raise CommandError("--semanas y --bloque deben ser mayores que cero")
+        if desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta")
+
+        resumen = precalcular(desde, hasta, forzar=opts['forzar'], tamano_bloque=opts['bloque'])
+
+        for omitida in resumen['omitidas']:
+            self.stderr.write(
+                f"Predio {omitida['predio']}, semana {omitida['semana_inicio']}: {omitida['error']}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['semanas']} semanas, {resumen['predios']} predios con mediciones: "
+            f"{resumen['creadas']} creadas, {resumen['actualizadas']} actualizadas, "
+            f"{resumen['al_dia']} al día, {len(resumen['omitidas'])} omitidas "
+            f"({resumen['duracion_ms']} ms)"
+        ))
@@ -0,0 +1,75 @@
+# backend/api/management/commands/procesar_tareas.py
+"""
+Worker de la cola de tareas (api/tareas.py).
+
+    python manage.py procesar_tareas                 # corre hasta recibir SIGTERM/SIGINT
+    python manage.py procesar_tareas --una-vez       # procesa lo disponible y termina (cron)
+    python manage.py procesar_tareas --tipo reporte  # solo ciertos tipos
+
+Se pueden levantar varios workers en paralelo: cada lote se reserva con
+SELECT ... FOR UPDATE SKIP LOCKED.
+"""
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import tareas
+
+INTERVALO_MANTENCION = 60  # segundos entre recuperación de huérfanas y log de métricas
+
+
+class Command(BaseCommand):
+    help = "Procesa la cola de tareas en segundo plano (recomendaciones, reportes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help="Vacía la cola disponible y termina")
+        parser.add_argument('--lote', type=int, default=10, help="Tareas reservadas por vuelta")
+        parser.add_argument('--intervalo', type=float, default=1.0, help="Espera (s) cuando la cola está vacía")
+        parser.add_argument('--tipo', action='append', dest='tipos', help="Procesar solo este tipo (repetible)")
+
+    def handle(self, *args, **opts):
+        self.detener = False
+        if not opts['una_vez']:
+            signal.signal(signal.SIGTERM, self._detener)
+            signal.signal(signal.SIGINT, self._detener)
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        procesadas = fallidas = 0
+        ultima_mantencion = 0
+
+        while not self.detener:
+            close_old_connections()  # Reconecta si la BD cerró la conexión entre vueltas
+            if time.monotonic() - ultima_mantencion > INTERVALO_MANTENCION:
+                self._mantencion()
+                ultima_mantencion = time.monotonic()
+
+            lote = tareas.tomar(opts['lote'], worker=worker, tipos=opts['tipos'])
+            for tarea in lote:
+                if tareas.ejecutar(tarea):
+                    procesadas += 1
+                else:
+                    fallidas += 1
+            if not lote:
+                if opts['una_vez']:
+                    break
+                time.sleep(opts['intervalo'])
+
+        self.stdout.write(f"Worker {worker}: {procesadas} tareas completadas, {fallidas} con error")
+
+    def _detener(self, signum, frame):
+        self.stdout.write("Deteniendo worker al terminar el lote actual...")
+        self.detener = True
+
+    def _mantencion(self):
+        recuperadas = tareas.recuperar_huerfanas()
+        if recuperadas:
+            self.stderr.write(f"{recuperadas} tareas huérfanas devueltas a la cola")
+        tareas.purgar_completadas()
+        m = tareas.metricas()
+        self.stdout.write(
+            f"Cola: {m['profundidad']} pendientes (más antigua {m['antiguedad_max_s']:.0f}s), "
+            f"{m['por_estado']['fallida']} fallidas, latencia p95 {m['latencia_p95_s'] or 0:.2f}s"
+        )
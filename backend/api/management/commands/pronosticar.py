@@ -0,0 +1,32 @@
+# backend/api/management/commands/pronosticar.py
+"""
+Recalcula los pronósticos de humedad y NPK de todos los predios
+(api/pronosticos.py). Requiere numpy. Los resúmenes diarios cambian con cada
+lectura, así que conviene correrlo varias veces al día:
+
+    # crontab: cada 6 horas
+    0 */6 * * *  python manage.py pronosticar
+
+Los predios se ajustan de a --bloque a la vez, con una consulta por bloque.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.pronosticos import TAMANO_BLOQUE, PronosticoError, pronosticar
+
+
+class Command(BaseCommand):
+    help = "Recalcula los pronósticos de humedad y NPK de todos los predios"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bloque', type=int, default=TAMANO_BLOQUE, help="Predios por ajuste")
+
+    def handle(self, *args, **opts):
+        if opts['bloque'] < 1:
+            raise CommandError("--bloque debe ser mayor que cero")
+        try:
+            resumen = pronosticar(tamano_bloque=opts['bloque'])
+        except PronosticoError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['predios']} predios, {resumen['pronosticos']} pronósticos ({resumen['duracion_ms']} ms)"
+        ))
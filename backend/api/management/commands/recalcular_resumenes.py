@@ -0,0 +1,50 @@
+# backend/api/management/commands/recalcular_resumenes.py
+"""
+Rehace los resúmenes diarios por predio (api/resumenes.py) desde `mediciones`.
+La ingesta los mantiene al día; esto sirve para la carga inicial, después de
+`sembrar_datos` o de cambiar ANOMALIAS_EXCLUIR_PROMEDIOS:
+
+    python manage.py recalcular_resumenes --dias 60
+    python manage.py recalcular_resumenes --desde 2025-03-01 --hasta 2025-06-30
+
+Procesa de a --bloque predios, una consulta agrupada por bloque.
+"""
+from datetime import date, datetime, time as dtime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.models import Medicion, ResumenDiario
+from api.resumenes import dia_utc, recalcular
+
+
+class Command(BaseCommand):
+    help = "Rehace los resúmenes diarios de los predios con mediciones en un rango de días"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=31, help="Días hacia atrás, incluido hoy (default 31)")
+        parser.add_argument('--desde', type=date.fromisoformat, help="Fecha inicial YYYY-MM-DD (reemplaza --dias)")
+        parser.add_argument('--hasta', type=date.fromisoformat, help="Fecha final YYYY-MM-DD")
+        parser.add_argument('--bloque', type=int, default=500, help="Predios por consulta agrupada")
+
+    def handle(self, *args, **opts):
+        if opts['dias'] < 1 or opts['bloque'] < 1:
+            raise CommandError("--dias y --bloque deben ser mayores que cero")
+        hasta = opts['hasta'] or dia_utc(timezone.now())
+        desde = opts['desde'] or hasta - timedelta(days=opts['dias'] - 1)
+        if desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta")
+
+        inicio = datetime.combine(desde, dtime.min, tzinfo=dt_timezone.utc)
+        fin = datetime.combine(hasta + timedelta(days=1), dtime.min, tzinfo=dt_timezone.utc)
+        # Predios con mediciones en el rango o con resúmenes que ya no las tienen
+        predio_ids = sorted(
+            set(Medicion.objects.filter(fecha__gte=inicio, fecha__lt=fin).values_list('predio_id', flat=True).distinct())
+            | set(ResumenDiario.objects.filter(dia__gte=desde, dia__lte=hasta).values_list('predio_id', flat=True))
+        )
+        resumenes = 0
+        for i in range(0, len(predio_ids), opts['bloque']):
+            resumenes += recalcular(predio_ids[i:i + opts['bloque']], desde, hasta)
+        self.stdout.write(self.style.SUCCESS(
+            f"{desde}..{hasta}: {resumenes} resúmenes diarios de {len(predio_ids)} predios"
+        ))
@@ -0,0 +1,42 @@
+# backend/api/management/commands/refrescar_regional.py
+"""
+Rehace los indicadores mensuales por predio de las comparaciones regionales
+(api/regional.py) desde los resúmenes diarios:
+
+    # crontab: todos los días 01:30 UTC, mes en curso y el anterior (análisis tardíos)
+    30 1 * * *  python manage.py refrescar_regional --meses 2
+
+    python manage.py refrescar_regional --mes 2025-03
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.regional import inicio_mes, refrescar
+
+
+class Command(BaseCommand):
+    help = "Rehace los indicadores regionales por predio de los últimos meses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=1, help="Meses hacia atrás, incluido el actual (default 1)")
+        parser.add_argument('--mes', help="Un mes puntual AAAA-MM (reemplaza --meses)")
+
+    def handle(self, *args, **opts):
+        if opts['meses'] < 1:
+            raise CommandError("--meses debe ser mayor que cero")
+        if opts['mes']:
+            try:
+                meses = [date.fromisoformat(f"{opts['mes']}-01")]
+            except ValueError:
+                raise CommandError("--mes debe tener el formato AAAA-MM")
+        else:
+            mes, meses = inicio_mes(timezone.now().date()), []
+            for _ in range(opts['meses']):
+                meses.append(mes)
+                mes = inicio_mes(mes - timedelta(days=1))
+
+        for mes in meses:
+            cantidad = refrescar(mes)
+            self.stdout.write(self.style.SUCCESS(f"{mes:%Y-%m}: {cantidad} predios"))
@@ -0,0 +1,45 @@
+# backend/api/management/commands/sembrar_datos.py
+"""
+Datos sintéticos para pruebas de carga (api/carga.py). Reemplaza el conjunto
+anterior; con la misma semilla los datos son los mismos, así las corridas de
+`manage.py carga` se pueden comparar entre sí.
+
+    python manage.py sembrar_datos --perfiles 50 --predios 20 --mediciones 2000   # 2M lecturas
+    python manage.py sembrar_datos --solo-limpiar
+
+Solo toca perfiles con email @carga.nutrisoil.local. No usar en producción.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.carga import DOMINIO, limpiar, sembrar
+
+
+class Command(BaseCommand):
+    help = "Siembra perfiles, predios y mediciones sintéticas para pruebas de carga"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perfiles', type=int, default=10)
+        parser.add_argument('--predios', type=int, default=5, help="Predios por perfil")
+        parser.add_argument('--mediciones', type=int, default=1000, help="Mediciones por predio")
+        parser.add_argument('--dias', type=int, default=365, help="Días hacia atrás que cubren las mediciones")
+        parser.add_argument('--fraccion-npk', type=float, default=0.1, help="Fracción de mediciones con NPK")
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--solo-limpiar', action='store_true', help="Borra los datos sintéticos y termina")
+
+    def handle(self, *args, **opts):
+        if opts['solo_limpiar']:
+            borradas = limpiar()
+            self.stdout.write(self.style.SUCCESS(f"Datos @{DOMINIO} borrados ({borradas} mediciones)"))
+            return
+        if min(opts['perfiles'], opts['predios'], opts['dias']) < 1 or opts['mediciones'] < 0:
+            raise CommandError("--perfiles, --predios y --dias deben ser mayores que cero")
+
+        resumen = sembrar(
+            perfiles=opts['perfiles'], predios_por_perfil=opts['predios'],
+            mediciones_por_predio=opts['mediciones'], dias=opts['dias'],
+            semilla=opts['semilla'], fraccion_npk=opts['fraccion_npk'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen['perfiles']} perfiles, {resumen['predios']} predios, {resumen['mediciones']} mediciones "
+            f"en {resumen['duracion_s']}s ({resumen['filas_por_s']} filas/s)"
+        ))
@@ -0,0 +1,310 @@
+# backend/api/metricas.py
+"""
+Métricas por petición en formato de texto de Prometheus (GET /metrics).
+
+MetricasMiddleware mide, por vista y método:
+- latencia total (histograma) y peticiones por código de estado,
+- consultas SQL y su tiempo, con connection.execute_wrapper en todas las
+  conexiones (no depende de DEBUG),
+- tiempo de serialización: to_representation de los serializers con
+  CamposDinamicosMixin, SerializadorFilas.filas y el renderer JSON,
+- tamaño de la respuesta (las respuestas en streaming no se cuentan).
+
+Las peticiones sobre METRICAS_UMBRAL_LENTO_MS se registran en el log con su
+desglose. El registro vive en memoria del proceso: con varios workers de
+gunicorn cada uno expone sus propios contadores (Prometheus los suma por
+instancia).
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+RUTAS_EXCLUIDAS = ('/metrics',)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquetas(pares):
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, etiquetas
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *valores_etiquetas, cantidad=1):
+        with self._lock:
+            self._valores[valores_etiquetas] = self._valores.get(valores_etiquetas, 0) + cantidad
+
+    def lineas(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for clave, valor in valores:
+            yield f'{self.nombre}{_etiquetas(list(zip(self.etiquetas, clave)))} {_numero(valor)}'
+
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas, buckets):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, etiquetas
+        self.buckets = tuple(buckets)
+        self._series = {}  # etiquetas -> [conteos por bucket..., +Inf], suma
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores_etiquetas):
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_etiquetas)
+            if serie is None:
+                serie = self._series[valores_etiquetas] = [[0] * (len(self.buckets) + 1), 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def lineas(self):
+        with self._lock:
+            series = sorted((clave, list(conteos), suma) for clave, (conteos, suma) in self._series.items())
+        for clave, conteos, suma in series:
+            base = list(zip(self.etiquetas, clave))
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + ('+Inf',), conteos):
+                acumulado += conteo
+                le = limite if limite == '+Inf' else _numero(limite)
+                yield f'{self.nombre}_bucket{_etiquetas(base + [("le", le)])} {acumulado}'
+            yield f'{self.nombre}_sum{_etiquetas(base)} {_numero(suma)}'
+            yield f'{self.nombre}_count{_etiquetas(base)} {acumulado}'
+
+
+class Recolector:
+    """Valores que se leen al exponer (estado de un pool, etc.): `funcion` devuelve {etiquetas: valor}."""
+
+    def __init__(self, nombre, ayuda, etiquetas, funcion, tipo):
+        self.nombre, self.ayuda, self.etiquetas = nombre, ayuda, etiquetas
+        self.funcion, self.tipo = funcion, tipo
+
+    def lineas(self):
+        try:
+            valores = sorted(self.funcion().items())
+        except Exception:
+            logger.exception("No se pudo leer la métrica %s", self.nombre)
+            return
+        for clave, valor in valores:
+            yield f'{self.nombre}{_etiquetas(list(zip(self.etiquetas, clave)))} {_numero(valor)}'
+
+
+class Registro:
+    def __init__(self):
+        self.metricas = []
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        metrica = Contador(nombre, ayuda, etiquetas)
+        self.metricas.append(metrica)
+        return metrica
+
+    def histograma(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        metrica = Histograma(nombre, ayuda, etiquetas, buckets)
+        self.metricas.append(metrica)
+        return metrica
+
+    def recolector(self, nombre, ayuda, funcion, etiquetas=(), tipo='gauge'):
+        metrica = Recolector(nombre, ayuda, etiquetas, funcion, tipo)
+        self.metricas.append(metrica)
+        return metrica
+
+    def exponer(self):
+        lineas = []
+        for metrica in self.metricas:
+            lineas.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+            lineas.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+            lineas.extend(metrica.lineas())
+        return '\n'.join(lineas) + '\n'
+
+
+REGISTRO = Registro()
+ETIQUETAS = ('vista', 'metodo')
+
+PETICIONES = REGISTRO.contador(
+    'nutrisoil_http_requests_total', 'Peticiones atendidas por vista, método y código', ETIQUETAS + ('codigo',))
+LATENCIA = REGISTRO.histograma(
+    'nutrisoil_http_request_duration_seconds', 'Latencia total de la petición', ETIQUETAS)
+CONSULTAS = REGISTRO.histograma(
+    'nutrisoil_db_queries_per_request', 'Consultas SQL por petición', ETIQUETAS, BUCKETS_CONSULTAS)
+TIEMPO_SQL = REGISTRO.histograma(
+    'nutrisoil_db_duration_seconds_per_request', 'Tiempo en la base de datos por petición', ETIQUETAS)
+SERIALIZACION = REGISTRO.histograma(
+    'nutrisoil_serialization_duration_seconds', 'Tiempo en serializers y render JSON por petición', ETIQUETAS)
+TAMANO = REGISTRO.histograma(
+    'nutrisoil_http_response_size_bytes', 'Tamaño del cuerpo de la respuesta', ETIQUETAS, BUCKETS_BYTES)
+
+
+# ═══════════════════════════════════════════════════════
+# MEDICIÓN DE LA PETICIÓN EN CURSO
+# ═══════════════════════════════════════════════════════
+
+class PeticionMedida:
+    __slots__ = ('consultas', 'tiempo_sql', 'serializacion', 'profundidad')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.serializacion = 0.0
+        self.profundidad = 0
+
+
+_actual = ContextVar('metricas_peticion', default=None)
+
+
+@contextmanager
+def medir_serializacion():
+    """Suma el bloque al tiempo de serialización; los anidados no se cuentan dos veces."""
+    peticion = _actual.get()
+    if peticion is None or peticion.profundidad:
+        yield
+        return
+    peticion.profundidad += 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        peticion.serializacion += time.perf_counter() - inicio
+        peticion.profundidad -= 1
+
+
+class _ContadorSQL:
+    """execute_wrapper: cuenta consultas y acumula su duración en la petición."""
+
+    def __init__(self, peticion):
+        self.peticion = peticion
+        self.lock = threading.Lock()  # Las vistas async consultan desde varios hilos a la vez
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.peticion.consultas += 1
+                self.peticion.tiempo_sql += time.perf_counter() - inicio
+
+
+_envolturas = ContextVar('envolturas_sql', default=())
+
+
+@contextmanager
+def envolver_sql(envoltura):
+    """
+    execute_wrapper en las conexiones de este hilo, y registrado en el contexto
+    para que los hilos de asincronia.en_hilo lo apliquen a las suyas (las
+    conexiones de Django son por hilo).
+    """
+    token = _envolturas.set(_envolturas.get() + (envoltura,))
+    try:
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(envoltura))
+            yield
+    finally:
+        _envolturas.reset(token)
+
+
+@contextmanager
+def envolturas_heredadas():
+    """Aplica en este hilo los execute_wrapper registrados por envolver_sql en el contexto copiado."""
+    with ExitStack() as pila:
+        for envoltura in _envolturas.get():
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(envoltura))
+        yield
+
+
+def _nombre_vista(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'sin_ruta'
+    return match.view_name or match.route or 'sin_nombre'
+
+
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True  # Con un middleware solo síncrono ASGI atendería las peticiones de a una
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path in RUTAS_EXCLUIDAS:
+            return self.get_response(request)
+
+        peticion = PeticionMedida()
+        token = _actual.set(peticion)
+        inicio = time.perf_counter()
+        try:
+            with envolver_sql(_ContadorSQL(peticion)):
+                response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._registrar(request, response, peticion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        if request.path in RUTAS_EXCLUIDAS:
+            return await self.get_response(request)
+
+        peticion = PeticionMedida()
+        token = _actual.set(peticion)
+        inicio = time.perf_counter()
+        try:
+            with envolver_sql(_ContadorSQL(peticion)):
+                response = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._registrar(request, response, peticion, time.perf_counter() - inicio)
+
+    def _registrar(self, request, response, peticion, duracion):
+        etiquetas = (_nombre_vista(request), request.method)
+        PETICIONES.incrementar(*etiquetas, str(response.status_code))
+        LATENCIA.observar(duracion, *etiquetas)
+        CONSULTAS.observar(peticion.consultas, *etiquetas)
+        TIEMPO_SQL.observar(peticion.tiempo_sql, *etiquetas)
+        SERIALIZACION.observar(peticion.serializacion, *etiquetas)
+        tamano = None if response.streaming else len(response.content)
+        if tamano is not None:
+            TAMANO.observar(tamano, *etiquetas)
+
+        if duracion * 1000 >= settings.METRICAS_UMBRAL_LENTO_MS:
+            logger.warning(
+                "Petición lenta %s %s (%s): %.0fms, %d consultas SQL en %.0fms, serialización %.0fms, %s bytes",
+                request.method, request.get_full_path(), etiquetas[0], duracion * 1000, peticion.consultas,
+                peticion.tiempo_sql * 1000, peticion.serializacion * 1000,
+                'streaming' if tamano is None else tamano
+            )
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_medicion_humedad_alter_medicion_ph_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('resumen', 'Resumen por predio'), ('recomendacion', 'Detalle de recomendación')], max_length=20)),
+                ('formato', models.CharField(choices=[('pdf', 'PDF'), ('csv', 'CSV')], default='pdf', max_length=10)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('huella', models.CharField(db_index=True, max_length=64)),
+                ('marca_datos', models.CharField(max_length=200)),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('archivo', models.BinaryField(blank=True, null=True)),
+                ('tamano', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('duracion_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('descargas', models.PositiveIntegerField(default=0)),
+                ('fecha_solicitud', models.DateTimeField(auto_now_add=True)),
+                ('fecha_generado', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reportes', to='api.profile')),
+            ],
+            options={
+                'db_table': 'reportes',
+                'ordering': ['-fecha_solicitud'],
+                'indexes': [models.Index(fields=['usuario', '-fecha_solicitud'], name='reportes_usuario_5a5593_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_reporte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=50)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('clave', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('max_intentos', models.PositiveIntegerField(default=5)),
+                ('error', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('repetir', models.BooleanField(default=False)),
+                ('disponible_en', models.DateTimeField()),
+                ('fecha_encolado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'tareas',
+                'ordering': ['disponible_en', 'id'],
+                'indexes': [models.Index(fields=['estado', 'disponible_en'], name='tareas_estado_944307_idx')],
+            },
+        ),
+    ]
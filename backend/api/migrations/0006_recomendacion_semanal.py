@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_tarea'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recomendacion',
+            name='cantidad_mediciones',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recomendacion',
+            name='max_medicion_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='recomendacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('medicion__isnull', True)), fields=('predio', 'semana_inicio'), name='recomendacion_semanal_unica'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_recomendacion_semanal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Perfil',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metodo', models.CharField(max_length=10)),
+                ('ruta', models.CharField(max_length=500)),
+                ('vista', models.CharField(blank=True, default='', max_length=200)),
+                ('codigo', models.PositiveSmallIntegerField()),
+                ('duracion_ms', models.PositiveIntegerField()),
+                ('cantidad_consultas', models.PositiveIntegerField(default=0)),
+                ('tiempo_sql_ms', models.PositiveIntegerField(default=0)),
+                ('estadisticas', models.BinaryField()),
+                ('resumen', models.TextField(blank=True, default='')),
+                ('consultas', models.JSONField(blank=True, default=list)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='perfiles', to='api.profile')),
+            ],
+            options={
+                'db_table': 'perfiles',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
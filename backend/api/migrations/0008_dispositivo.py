@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_perfil'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Dispositivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identificador', models.CharField(max_length=64, unique=True)),
+                ('total_lecturas', models.PositiveBigIntegerField(default=0)),
+                ('primera_vez', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultima_vez', models.DateTimeField(db_index=True)),
+                ('predio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispositivos', to='api.predio')),
+                ('ultima_medicion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.medicion')),
+            ],
+            options={
+                'db_table': 'dispositivos',
+                'ordering': ['ultima_vez'],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Índices de series de tiempo para mediciones (ver bench_indices).
+#
+# En PostgreSQL los índices se crean con CONCURRENTLY para no bloquear la
+# ingesta mientras se construyen sobre una tabla grande; por eso la migración
+# no es atómica. El BRIN sobre fecha solo existe en PostgreSQL y no forma parte
+# del estado de los modelos.
+
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import migrations, models
+
+ANTERIOR = models.Index(fields=['predio', '-fecha'], name='mediciones_predio__fc1416_idx')
+CUBRE = models.Index(
+    fields=['predio', '-fecha'], name='mediciones_predio_fecha_cub',
+    include=['id', 'ph', 'temperatura', 'humedad', 'nitrogeno', 'fosforo', 'potasio', 'origen'],
+)
+# Las mediciones llegan en orden de fecha: cada rango de 32 páginas cubre un intervalo corto
+BRIN = BrinIndex(fields=['fecha'], name='mediciones_fecha_brin', pages_per_range=32)
+
+
+def crear_indices(apps, schema_editor):
+    Medicion = apps.get_model('api', 'Medicion')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.add_index(Medicion, CUBRE)
+        schema_editor.remove_index(Medicion, ANTERIOR)
+        return
+    schema_editor.add_index(Medicion, CUBRE, concurrently=True)
+    schema_editor.remove_index(Medicion, ANTERIOR, concurrently=True)
+    schema_editor.add_index(Medicion, BRIN, concurrently=True)
+    schema_editor.execute('ANALYZE mediciones')
+
+
+def quitar_indices(apps, schema_editor):
+    Medicion = apps.get_model('api', 'Medicion')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.add_index(Medicion, ANTERIOR)
+        schema_editor.remove_index(Medicion, CUBRE)
+        return
+    schema_editor.remove_index(Medicion, BRIN, concurrently=True)
+    schema_editor.add_index(Medicion, ANTERIOR, concurrently=True)
+    schema_editor.remove_index(Medicion, CUBRE, concurrently=True)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0008_dispositivo'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(model_name='medicion', name='mediciones_predio__fc1416_idx'),
+                migrations.AddIndex(model_name='medicion', index=CUBRE),
+            ],
+            database_operations=[
+                migrations.RunPython(crear_indices, quitar_indices),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_indices_mediciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicion',
+            name='anomalias',
+            field=models.SmallIntegerField(db_default=0, default=0),
+        ),
+        migrations.CreateModel(
+            name='EstadisticaSensor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parametro', models.CharField(max_length=20)),
+                ('n', models.PositiveIntegerField(default=0)),
+                ('media', models.FloatField(default=0)),
+                ('varianza', models.FloatField(default=0)),
+                ('consecutivas', models.PositiveSmallIntegerField(default=0)),
+                ('actualizada', models.DateTimeField(auto_now=True)),
+                ('predio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estadisticas_sensores', to='api.predio')),
+            ],
+            options={
+                'db_table': 'estadisticas_sensores',
+                'constraints': [models.UniqueConstraint(fields=('predio', 'parametro'), name='estadistica_sensor_unica')],
+            },
+        ),
+    ]
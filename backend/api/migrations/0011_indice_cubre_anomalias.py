@@ -0,0 +1,51 @@
+# El índice cubriente de mediciones incluye `anomalias`: los promedios que
+# excluyen valores marcados siguen resolviéndose con index-only scans.
+#
+# Como en 0009, en PostgreSQL el índice nuevo se construye CONCURRENTLY antes de
+# quitar el anterior; el anterior se renombra primero para que ambos convivan.
+
+from django.db import migrations, models
+
+COLUMNAS = ['id', 'ph', 'temperatura', 'humedad', 'nitrogeno', 'fosforo', 'potasio', 'origen']
+ANTERIOR = models.Index(fields=['predio', '-fecha'], name='mediciones_predio_fecha_cub', include=COLUMNAS)
+CUBRE = models.Index(fields=['predio', '-fecha'], name='mediciones_predio_fecha_cub',
+                     include=COLUMNAS + ['anomalias'])
+TEMPORAL = 'mediciones_predio_fecha_cub_old'
+
+
+def _reemplazar(schema_editor, Medicion, actual, nuevo):
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.remove_index(Medicion, actual)
+        schema_editor.add_index(Medicion, nuevo)
+        return
+    schema_editor.execute(f'ALTER INDEX {actual.name} RENAME TO {TEMPORAL}')
+    schema_editor.add_index(Medicion, nuevo, concurrently=True)
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {TEMPORAL}')
+
+
+def incluir_anomalias(apps, schema_editor):
+    _reemplazar(schema_editor, apps.get_model('api', 'Medicion'), ANTERIOR, CUBRE)
+
+
+def quitar_anomalias(apps, schema_editor):
+    _reemplazar(schema_editor, apps.get_model('api', 'Medicion'), CUBRE, ANTERIOR)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0010_anomalias'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(model_name='medicion', name='mediciones_predio_fecha_cub'),
+                migrations.AddIndex(model_name='medicion', index=CUBRE),
+            ],
+            database_operations=[
+                migrations.RunPython(incluir_anomalias, quitar_anomalias),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_indice_cubre_anomalias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('n_ph', models.PositiveIntegerField(default=0)),
+                ('suma_ph', models.FloatField(default=0)),
+                ('min_ph', models.FloatField(blank=True, null=True)),
+                ('max_ph', models.FloatField(blank=True, null=True)),
+                ('n_temperatura', models.PositiveIntegerField(default=0)),
+                ('suma_temperatura', models.FloatField(default=0)),
+                ('min_temperatura', models.FloatField(blank=True, null=True)),
+                ('max_temperatura', models.FloatField(blank=True, null=True)),
+                ('n_humedad', models.PositiveIntegerField(default=0)),
+                ('suma_humedad', models.FloatField(default=0)),
+                ('min_humedad', models.FloatField(blank=True, null=True)),
+                ('max_humedad', models.FloatField(blank=True, null=True)),
+                ('n_nitrogeno', models.PositiveIntegerField(default=0)),
+                ('suma_nitrogeno', models.FloatField(default=0)),
+                ('min_nitrogeno', models.FloatField(blank=True, null=True)),
+                ('max_nitrogeno', models.FloatField(blank=True, null=True)),
+                ('n_fosforo', models.PositiveIntegerField(default=0)),
+                ('suma_fosforo', models.FloatField(default=0)),
+                ('min_fosforo', models.FloatField(blank=True, null=True)),
+                ('max_fosforo', models.FloatField(blank=True, null=True)),
+                ('n_potasio', models.PositiveIntegerField(default=0)),
+                ('suma_potasio', models.FloatField(default=0)),
+                ('min_potasio', models.FloatField(blank=True, null=True)),
+                ('max_potasio', models.FloatField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('predio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='api.predio')),
+            ],
+            options={
+                'db_table': 'resumenes_diarios',
+                'constraints': [models.UniqueConstraint(fields=('predio', 'dia'), name='resumen_diario_unico')],
+            },
+        ),
+    ]
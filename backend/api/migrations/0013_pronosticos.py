@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_resumenes_diarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pronostico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parametro', models.CharField(max_length=20)),
+                ('desde', models.DateField()),
+                ('valores', models.JSONField()),
+                ('nivel', models.FloatField()),
+                ('tendencia', models.FloatField()),
+                ('dias_observados', models.PositiveSmallIntegerField()),
+                ('generado', models.DateTimeField()),
+                ('predio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pronosticos', to='api.predio')),
+            ],
+            options={
+                'db_table': 'pronosticos',
+                'constraints': [models.UniqueConstraint(fields=('predio', 'parametro'), name='pronostico_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_pronosticos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicadorPredio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('zona', models.CharField(max_length=50)),
+                ('tipo_suelo', models.CharField(max_length=50)),
+                ('cultivo', models.CharField(blank=True, max_length=100, null=True)),
+                ('mediciones', models.PositiveIntegerField()),
+                ('dias', models.PositiveSmallIntegerField()),
+                ('ph', models.FloatField(blank=True, null=True)),
+                ('temperatura', models.FloatField(blank=True, null=True)),
+                ('humedad', models.FloatField(blank=True, null=True)),
+                ('nitrogeno', models.FloatField(blank=True, null=True)),
+                ('fosforo', models.FloatField(blank=True, null=True)),
+                ('potasio', models.FloatField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField()),
+                ('predio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indicadores', to='api.predio')),
+            ],
+            options={
+                'db_table': 'indicadores_predios',
+                'indexes': [models.Index(fields=['mes', 'zona', 'tipo_suelo', 'cultivo'], name='indicadores_mes_grupo_idx')],
+                'constraints': [models.UniqueConstraint(fields=('mes', 'predio'), name='indicador_predio_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_indicadores_regionales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dispositivo',
+            name='duplicadas',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dispositivo',
+            name='faltantes',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='dispositivo',
+            name='secuencia_max',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dispositivo',
+            name='sesion',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_secuencias_dispositivos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporte',
+            name='obsoleto',
+            field=models.BooleanField(default=False),
+        ),
+    ]
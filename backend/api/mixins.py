@@ -0,0 +1,53 @@
+# backend/api/mixins.py
+
+
+class CamposDinamicosViewMixin:
+    """
+    Soporte de ?fields= y ?expand= para ViewSets cuyo serializer usa CamposDinamicosMixin.
+
+        /api/mediciones/?fields=fecha,nitrogeno,fosforo,potasio
+        /api/mediciones/?expand=recomendacion.predio_detalle
+
+    En los listados las relaciones anidadas son opt-in; en el detalle se incluyen
+    todas salvo que se envíe ?expand=. Los get_queryset usan `campo_solicitado` y
+    `relacion_expandida` para no hacer JOIN de lo que no se va a serializar.
+    """
+    acciones_lectura = ('list', 'retrieve')
+    # Relaciones expandidas cuando no se envía ?expand= (None = todas las declaradas)
+    expand_por_defecto = {'list': [], 'retrieve': None}
+
+    def _lista_param(self, nombre):
+        valor = self.request.query_params.get(nombre)
+        if valor is None:
+            return None
+        return [c.strip() for c in valor.split(',') if c.strip()]
+
+    def get_campos(self):
+        return self._lista_param('fields')
+
+    def get_expand(self):
+        expand = self._lista_param('expand')
+        if expand is None:
+            return self.expand_por_defecto.get(self.action)
+        return expand
+
+    def campo_solicitado(self, nombre):
+        campos = self.get_campos()
+        return campos is None or nombre in campos
+
+    def relacion_expandida(self, ruta):
+        expand = self.get_expand()
+        if expand is None:
+            return True
+        return any(e == ruta or e.startswith(ruta + '.') for e in expand)
+
+    def columnas_solicitadas(self, model, *extra):
+        """Columnas para .only(): pk + campos concretos pedidos en ?fields= + extra."""
+        concretos = {f.name for f in model._meta.concrete_fields}
+        return ['pk'] + [c for c in self.get_campos() if c in concretos] + list(extra)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.acciones_lectura:
+            kwargs.setdefault('fields', self.get_campos())
+            kwargs.setdefault('expand', self.get_expand())
+        return super().get_serializer(*args, **kwargs)
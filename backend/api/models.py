@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from datetime import timedelta
 
 class Profile(models.Model):
@@ -74,11 +75,22 @@ class Medicion(models.Model):
         ('manual', 'Ingreso Manual'),
     ], default='manual')
 
+    # Bit por parámetro marcado como anómalo en la ingesta (api/anomalias.py); 0 = normal.
+    # db_default: el COPY de la importación y de sembrar_datos no trae la columna
+    anomalias = models.SmallIntegerField(default=0, db_default=0)
+
     class Meta:
         db_table = 'mediciones'
         ordering = ['-fecha']
         indexes = [
-            models.Index(fields=['predio', '-fecha']),
+            # Cubre el dashboard, los listados y los promedios con index-only scans.
+            # En PostgreSQL además hay un BRIN sobre fecha (migración 0009) para los
+            # rangos de fecha de todos los predios; no va aquí porque otros motores no lo soportan.
+            models.Index(
+                fields=['predio', '-fecha'], name='mediciones_predio_fecha_cub',
+                include=['id', 'ph', 'temperatura', 'humedad', 'nitrogeno', 'fosforo', 'potasio', 'origen',
+                         'anomalias'],
+            ),
         ]
 
     def get_semana_inicio(self):
@@ -139,11 +151,309 @@ class Recomendacion(models.Model):
     factor_suelo = models.DecimalField(max_digits=4, decimal_places=2)
     factor_precipitacion = models.DecimalField(max_digits=4, decimal_places=2)
 
+    # Solo semanales: mediciones promediadas y la más reciente incluida.
+    # Si no cambian, la recomendación está al día (ver api/semanal.py)
+    cantidad_mediciones = models.PositiveIntegerField(null=True, blank=True)
+    max_medicion_id = models.BigIntegerField(null=True, blank=True)
+
     class Meta:
         db_table = 'recomendaciones'
         ordering = ['-fecha_calculo']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['predio', 'semana_inicio'], condition=models.Q(medicion__isnull=True),
+                name='recomendacion_semanal_unica'
+            ),
+        ]
 
     def __str__(self):
         if self.semana_inicio:
             return f"Recomendación semanal {self.predio.nombre} - Semana {self.semana_inicio}"
         return f"Recomendación {self.medicion.predio.nombre}"
+
+
+class Reporte(models.Model):
+    """
+    Artefacto de reporte (PDF/CSV) generado en segundo plano.
+    `clave` combina los parámetros con la marca de datos del usuario: si los
+    datos no cambiaron, volver a pedir el mismo reporte reutiliza el archivo.
+    """
+    usuario = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='reportes')
+    tipo = models.CharField(max_length=20, choices=[
+        ('resumen', 'Resumen por predio'),
+        ('recomendacion', 'Detalle de recomendación'),
+    ])
+    formato = models.CharField(max_length=10, choices=[
+        ('pdf', 'PDF'),
+        ('csv', 'CSV'),
+    ], default='pdf')
+    parametros = models.JSONField(default=dict, blank=True)
+
+    huella = models.CharField(max_length=64, db_index=True)  # usuario + tipo + formato + parámetros
+    marca_datos = models.CharField(max_length=200)
+    clave = models.CharField(max_length=64, unique=True)  # huella + marca_datos
+
+    estado = models.CharField(max_length=20, choices=[
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('listo', 'Listo'),
+        ('error', 'Error'),
+    ], default='pendiente')
+    archivo = models.BinaryField(null=True, blank=True, editable=False)
+    tamano = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    duracion_ms = models.PositiveIntegerField(null=True, blank=True)
+    descargas = models.PositiveIntegerField(default=0)
+    obsoleto = models.BooleanField(default=False)  # Editado mientras se generaba (invalidar_reportes)
+
+    fecha_solicitud = models.DateTimeField(auto_now_add=True)
+    fecha_generado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'reportes'
+        ordering = ['-fecha_solicitud']
+        indexes = [
+            models.Index(fields=['usuario', '-fecha_solicitud']),
+        ]
+
+    def __str__(self):
+        return f"Reporte {self.tipo}.{self.formato} de {self.usuario.email} ({self.estado})"
+
+
+class Tarea(models.Model):
+    """
+    Cola de trabajos en la base de datos (ver api/tareas.py y el comando
+    `procesar_tareas`). Se encola en la misma transacción que la escritura que
+    la origina, así que el worker nunca ve una tarea sin sus datos.
+    """
+    tipo = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    # Idempotencia: a lo más una tarea viva por clave (p. ej. "recomendacion:123")
+    clave = models.CharField(max_length=100, unique=True, null=True, blank=True)
+
+    estado = models.CharField(max_length=20, choices=[
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ], default='pendiente')
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=5)
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+
+    # Si se vuelve a encolar mientras se procesa, se repite al terminar
+    repetir = models.BooleanField(default=False)
+
+    disponible_en = models.DateTimeField()  # No se toma antes (reintentos con backoff)
+    fecha_encolado = models.DateTimeField(default=timezone.now)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'tareas'
+        ordering = ['disponible_en', 'id']
+        indexes = [
+            models.Index(fields=['estado', 'disponible_en']),
+        ]
+
+    def __str__(self):
+        return f"Tarea {self.tipo} #{self.id} ({self.estado})"
+
+
+class Perfil(models.Model):
+    """
+    Perfil de CPU de una petición, pedido por un administrador con el header
+    X-Perfilar o ?perfilar=1 (ver api/perfilado.py). Incluye el log de SQL.
+    """
+    usuario = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='perfiles')
+    metodo = models.CharField(max_length=10)
+    ruta = models.CharField(max_length=500)
+    vista = models.CharField(max_length=200, blank=True, default='')
+    codigo = models.PositiveSmallIntegerField()
+
+    duracion_ms = models.PositiveIntegerField()
+    cantidad_consultas = models.PositiveIntegerField(default=0)
+    tiempo_sql_ms = models.PositiveIntegerField(default=0)
+
+    estadisticas = models.BinaryField(editable=False)  # Formato pstats (.prof: snakeviz, pstats)
+    resumen = models.TextField(blank=True, default='')  # Top de funciones por tiempo acumulado
+    consultas = models.JSONField(default=list, blank=True)  # [{sql, params, ms, many}]
+
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'perfiles'
+        ordering = ['-fecha']
+
+    def __str__(self):
+        return f"Perfil {self.metodo} {self.ruta} ({self.duracion_ms} ms)"
+
+
+class Dispositivo(models.Model):
+    """
+    Índice de "última vez visto" de cada sensor IoT, actualizado en cada ingesta
+    (api/dispositivos.py). El estado de los dispositivos se consulta aquí, sin
+    recorrer `mediciones`.
+    """
+    # dispositivo_id enviado por el Wemos; firmware antiguo: 'predio-<id>'
+    identificador = models.CharField(max_length=64, unique=True)
+    predio = models.ForeignKey(Predio, on_delete=models.CASCADE, related_name='dispositivos')
+    ultima_medicion = models.ForeignKey(
+        Medicion, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    total_lecturas = models.PositiveBigIntegerField(default=0)
+    primera_vez = models.DateTimeField(default=timezone.now)
+    ultima_vez = models.DateTimeField(db_index=True)
+
+    # Protocolo con números de secuencia (api/dispositivos.py): secuencia más alta
+    # recibida y rangos [desde, hasta] aún no recibidos por debajo de ella
+    sesion = models.CharField(max_length=32, blank=True, default='')  # Cambia al reiniciar el equipo
+    secuencia_max = models.BigIntegerField(null=True, blank=True)
+    faltantes = models.JSONField(default=list, blank=True)
+    duplicadas = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'dispositivos'
+        ordering = ['ultima_vez']
+
+    def __str__(self):
+        return f"Dispositivo {self.identificador} ({self.predio.nombre})"
+
+
+class EstadisticaSensor(models.Model):
+    """
+    Media y varianza móviles de un parámetro en un predio, para marcar lecturas
+    anómalas en la ingesta sin recorrer el historial (api/anomalias.py).
+    """
+    predio = models.ForeignKey(Predio, on_delete=models.CASCADE, related_name='estadisticas_sensores')
+    parametro = models.CharField(max_length=20)
+    n = models.PositiveIntegerField(default=0)  # Lecturas aceptadas desde el último reinicio
+    media = models.FloatField(default=0)
+    varianza = models.FloatField(default=0)
+    consecutivas = models.PositiveSmallIntegerField(default=0)  # Anomalías seguidas (cambio de nivel)
+    actualizada = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'estadisticas_sensores'
+        constraints = [
+            models.UniqueConstraint(fields=['predio', 'parametro'], name='estadistica_sensor_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.parametro} en predio {self.predio_id}: {self.media:.2f} ± {self.varianza ** 0.5:.2f}"
+
+
+class ResumenDiario(models.Model):
+    """
+    Conteo, suma, mínimo y máximo por parámetro de las mediciones de un predio
+    en un día (UTC). Se actualiza en cada ingesta (api/resumenes.py): las
+    ventanas de 7 o 30 días y del mes se leen de a lo más 31 filas por predio.
+    Los valores marcados como anómalos no se acumulan.
+    """
+    predio = models.ForeignKey(Predio, on_delete=models.CASCADE, related_name='resumenes_diarios')
+    dia = models.DateField()
+    cantidad = models.PositiveIntegerField(default=0)  # Mediciones del día, con o sin valores
+
+    n_ph = models.PositiveIntegerField(default=0)
+    suma_ph = models.FloatField(default=0)
+    min_ph = models.FloatField(null=True, blank=True)
+    max_ph = models.FloatField(null=True, blank=True)
+
+    n_temperatura = models.PositiveIntegerField(default=0)
+    suma_temperatura = models.FloatField(default=0)
+    min_temperatura = models.FloatField(null=True, blank=True)
+    max_temperatura = models.FloatField(null=True, blank=True)
+
+    n_humedad = models.PositiveIntegerField(default=0)
+    suma_humedad = models.FloatField(default=0)
+    min_humedad = models.FloatField(null=True, blank=True)
+    max_humedad = models.FloatField(null=True, blank=True)
+
+    n_nitrogeno = models.PositiveIntegerField(default=0)
+    suma_nitrogeno = models.FloatField(default=0)
+    min_nitrogeno = models.FloatField(null=True, blank=True)
+    max_nitrogeno = models.FloatField(null=True, blank=True)
+
+    n_fosforo = models.PositiveIntegerField(default=0)
+    suma_fosforo = models.FloatField(default=0)
+    min_fosforo = models.FloatField(null=True, blank=True)
+    max_fosforo = models.FloatField(null=True, blank=True)
+
+    n_potasio = models.PositiveIntegerField(default=0)
+    suma_potasio = models.FloatField(default=0)
+    min_potasio = models.FloatField(null=True, blank=True)
+    max_potasio = models.FloatField(null=True, blank=True)
+
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'resumenes_diarios'
+        constraints = [
+            models.UniqueConstraint(fields=['predio', 'dia'], name='resumen_diario_unico'),
+        ]
+
+    def __str__(self):
+        return f"Resumen {self.dia} de predio {self.predio_id} ({self.cantidad} mediciones)"
+
+
+class Pronostico(models.Model):
+    """
+    Proyección diaria de un parámetro de un predio (api/pronosticos.py). La
+    calcula el comando `pronosticar` (cron) para todos los predios a la vez;
+    las vistas solo la leen.
+    """
+    predio = models.ForeignKey(Predio, on_delete=models.CASCADE, related_name='pronosticos')
+    parametro = models.CharField(max_length=20)
+    desde = models.DateField()  # Primer día proyectado
+    valores = models.JSONField()  # Un valor por día desde `desde`
+    nivel = models.FloatField()
+    tendencia = models.FloatField()  # Cambio diario estimado
+    dias_observados = models.PositiveSmallIntegerField()  # Días con datos en la historia usada
+    generado = models.DateTimeField()
+
+    class Meta:
+        db_table = 'pronosticos'
+        constraints = [
+            models.UniqueConstraint(fields=['predio', 'parametro'], name='pronostico_unico'),
+        ]
+
+    def __str__(self):
+        return f"Pronóstico de {self.parametro} en predio {self.predio_id} desde {self.desde}"
+
+
+class IndicadorPredio(models.Model):
+    """
+    Promedios mensuales de un predio con su zona, suelo y cultivo, para las
+    comparaciones regionales (api/regional.py). Se rehace desde los resúmenes
+    diarios con el comando `refrescar_regional`; las vistas leen solo esta tabla.
+    """
+    mes = models.DateField()  # Primer día del mes
+    predio = models.ForeignKey(Predio, on_delete=models.CASCADE, related_name='indicadores')
+    zona = models.CharField(max_length=50)
+    tipo_suelo = models.CharField(max_length=50)
+    cultivo = models.CharField(max_length=100, blank=True, null=True)
+    mediciones = models.PositiveIntegerField()
+    dias = models.PositiveSmallIntegerField()  # Días del mes con mediciones
+
+    ph = models.FloatField(null=True, blank=True)
+    temperatura = models.FloatField(null=True, blank=True)
+    humedad = models.FloatField(null=True, blank=True)
+    nitrogeno = models.FloatField(null=True, blank=True)
+    fosforo = models.FloatField(null=True, blank=True)
+    potasio = models.FloatField(null=True, blank=True)
+
+    actualizado = models.DateTimeField()
+
+    class Meta:
+        db_table = 'indicadores_predios'
+        constraints = [
+            models.UniqueConstraint(fields=['mes', 'predio'], name='indicador_predio_unico'),
+        ]
+        indexes = [
+            # Particiones de las funciones de ventana
+            models.Index(fields=['mes', 'zona', 'tipo_suelo', 'cultivo'], name='indicadores_mes_grupo_idx'),
+        ]
+
+    def __str__(self):
+        return f"Indicadores {self.mes:%Y-%m} de predio {self.predio_id}"
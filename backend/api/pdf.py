@@ -0,0 +1,141 @@
+# backend/api/pdf.py
+"""
+Escritor PDF mínimo (texto y tablas) sin dependencias externas.
+
+Usa la fuente Helvetica estándar con WinAnsiEncoding, suficiente para los
+reportes en español (tildes, ñ, °). Los caracteres fuera de cp1252 (emojis de
+las alertas, por ejemplo) se reemplazan por '?'.
+"""
+import zlib
+
+ANCHO_PAGINA, ALTO_PAGINA = 595, 842  # A4 en puntos
+MARGEN = 50
+
+# Ancho promedio de un carácter Helvetica (en em) para repartir columnas
+_ANCHO_PROMEDIO = 0.52
+
+
+def _escapar(texto):
+    datos = str(texto).encode('cp1252', errors='replace')
+    return datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def ancho_texto(texto, tamano):
+    return len(str(texto)) * tamano * _ANCHO_PROMEDIO
+
+
+class DocumentoPDF:
+    """
+    Documento de varias páginas que se arma línea a línea.
+
+        doc = DocumentoPDF("Reporte NutriSoil")
+        doc.titulo("Resumen por predio")
+        doc.tabla(["Predio", "pH"], [["Los Alerces", "6.10"]])
+        contenido = doc.bytes()
+    """
+
+    def __init__(self, titulo_documento=''):
+        self.titulo_documento = titulo_documento
+        self._paginas = []
+        self._comandos = None
+        self._y = 0
+        self._nueva_pagina()
+
+    def _nueva_pagina(self):
+        self._comandos = []
+        self._paginas.append(self._comandos)
+        self._y = ALTO_PAGINA - MARGEN
+
+    def _reservar(self, alto):
+        if self._y - alto < MARGEN:
+            self._nueva_pagina()
+        self._y -= alto
+
+    def _escribir(self, x, texto, tamano, negrita=False):
+        fuente = '/F2' if negrita else '/F1'
+        self._comandos.append(
+            b'BT %s %d Tf %.1f %.1f Td (%s) Tj ET' % (fuente.encode(), tamano, x, self._y, _escapar(texto))
+        )
+
+    def titulo(self, texto, tamano=16):
+        self._reservar(tamano + 8)
+        self._escribir(MARGEN, texto, tamano, negrita=True)
+
+    def texto(self, texto, tamano=10, negrita=False):
+        self._reservar(tamano + 4)
+        self._escribir(MARGEN, texto, tamano, negrita)
+
+    def espacio(self, alto=10):
+        self._reservar(alto)
+
+    def linea(self):
+        self._reservar(6)
+        self._comandos.append(b'%d %.1f m %d %.1f l S' % (MARGEN, self._y, ANCHO_PAGINA - MARGEN, self._y))
+
+    def tabla(self, encabezados, filas, tamano=8):
+        """Tabla simple; las columnas se reparten según el contenido más ancho."""
+        disponible = ANCHO_PAGINA - 2 * MARGEN
+        anchos = [
+            max([ancho_texto(e, tamano)] + [ancho_texto(f[i], tamano) for f in filas]) + 6
+            for i, e in enumerate(encabezados)
+        ]
+        escala = min(1.0, disponible / sum(anchos)) if anchos else 1.0
+        anchos = [a * escala for a in anchos]
+
+        def _fila(valores, negrita=False):
+            self._reservar(tamano + 5)
+            x = MARGEN
+            for valor, ancho in zip(valores, anchos):
+                self._escribir(x, valor, tamano, negrita)
+                x += ancho
+
+        _fila(encabezados, negrita=True)
+        for fila in filas:
+            if self._y - (tamano + 5) < MARGEN:
+                self._nueva_pagina()
+                _fila(encabezados, negrita=True)  # Repetir encabezado en la nueva página
+            _fila(['' if v is None else v for v in fila])
+
+    def bytes(self):
+        objetos = []  # Contenido de cada objeto, el número es la posición + 1
+
+        def agregar(contenido):
+            objetos.append(contenido)
+            return len(objetos)
+
+        catalogo = agregar(None)
+        paginas = agregar(None)
+        f1 = agregar(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        f2 = agregar(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+        total = len(self._paginas)
+        hijos = []
+        for numero, comandos in enumerate(self._paginas, start=1):
+            pie = b'BT /F1 8 Tf %d %d Td (%s) Tj ET' % (
+                MARGEN, MARGEN - 20, _escapar(f"{self.titulo_documento} - Página {numero} de {total}")
+            )
+            flujo = zlib.compress(b'\n'.join(comandos + [pie]))
+            contenido = agregar(b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(flujo), flujo))
+            hijos.append(agregar(
+                b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R '
+                b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> >>'
+                % (paginas, ANCHO_PAGINA, ALTO_PAGINA, contenido, f1, f2)
+            ))
+
+        objetos[catalogo - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % paginas
+        objetos[paginas - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+            b' '.join(b'%d 0 R' % h for h in hijos), total
+        )
+
+        salida = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        posiciones = []
+        for numero, contenido in enumerate(objetos, start=1):
+            posiciones.append(len(salida))
+            salida += b'%d 0 obj\n%s\nendobj\n' % (numero, contenido)
+        inicio_xref = len(salida)
+        salida += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+        salida += b''.join(b'%010d 00000 n \n' % p for p in posiciones)
+        salida += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            len(objetos) + 1, catalogo, inicio_xref
+        )
+        return bytes(salida)
@@ -0,0 +1,176 @@
+# backend/api/perfilado.py
+"""
+Perfilado opcional de una petición, solo para administradores.
+
+    curl -H "Authorization: Bearer $TOKEN" -H "X-Perfilar: 1" .../api/dashboard/stats/
+    curl -H "Authorization: Bearer $TOKEN" ".../api/dashboard/stats/?perfilar=1"
+
+La petición corre bajo cProfile (determinista) y registra cada consulta SQL
+con sus parámetros y duración. El resultado queda en la tabla `perfiles` y la
+respuesta trae los headers X-Perfil-Id y X-Perfil-Url para descargarlo
+(GET /api/perfiles/<id>/descargar/, un zip con el .prof, el resumen y el SQL).
+
+Sin el header ni el parámetro el middleware solo revisa esos dos valores y
+llama a la vista: no hay costo para las peticiones normales.
+"""
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import SupabaseAuthentication
+from .metricas import envolver_sql
+from .models import Perfil, Profile
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'X-Perfilar'
+PARAMETRO = 'perfilar'
+MAX_CONSULTAS = 2000  # Las siguientes solo se cuentan
+FUNCIONES_RESUMEN = 60
+
+
+def _administrador(request):
+    """Profile admin dueño del token de la petición, o None (sin token, inválido o no admin)."""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    try:
+        payload = SupabaseAuthentication().decodificar_token(auth_header.split(' ')[1])
+    except AuthenticationFailed:
+        return None
+    sub = payload.get('sub')
+    return Profile.objects.filter(pk=sub, role='admin').first() if sub else None
+
+
+class _RegistroSQL:
+    """execute_wrapper: guarda sql, parámetros y duración de cada consulta."""
+
+    def __init__(self):
+        self.consultas = []
+        self.total = 0
+        self.tiempo = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self.lock:  # Las vistas async consultan desde varios hilos a la vez
+                self.total += 1
+                self.tiempo += duracion
+                if len(self.consultas) < MAX_CONSULTAS:
+                    self.consultas.append({
+                        'sql': sql, 'params': None if many else _parametros(params),
+                        'ms': round(duracion * 1000, 3), 'many': many,
+                    })
+
+
+def _valor(valor):
+    return valor if isinstance(valor, (int, float, str, bool, type(None))) else repr(valor)
+
+
+def _parametros(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {str(k): _valor(v) for k, v in params.items()}
+    return [_valor(v) for v in params]
+
+
+class PerfiladoMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if HEADER not in request.headers and PARAMETRO not in request.GET:
+            return self.get_response(request)
+
+        admin = _administrador(request)
+        if admin is None:
+            return self.get_response(request)  # El flag se ignora para quien no es admin
+
+        perfilador = cProfile.Profile()
+        registro = _RegistroSQL()
+        inicio = time.perf_counter()
+        with envolver_sql(registro):
+            try:
+                perfilador.enable()
+            except ValueError:  # Otro perfilador activo en el proceso
+                logger.warning("No se pudo perfilar %s: hay otro perfilador activo", request.path)
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                perfilador.disable()
+        duracion = time.perf_counter() - inicio
+
+        perfil = self._guardar(request, response, admin, perfilador, registro, duracion)
+        return self._marcar(response, perfil)
+
+    async def __acall__(self, request):
+        """
+        Bajo ASGI cProfile mide el hilo del event loop (puede incluir otras
+        peticiones concurrentes); el SQL registrado sí es solo de esta petición.
+        """
+        if HEADER not in request.headers and PARAMETRO not in request.GET:
+            return await self.get_response(request)
+
+        admin = await sync_to_async(_administrador)(request)
+        if admin is None:
+            return await self.get_response(request)
+
+        perfilador = cProfile.Profile()
+        registro = _RegistroSQL()
+        inicio = time.perf_counter()
+        with envolver_sql(registro):
+            try:
+                perfilador.enable()
+            except ValueError:
+                logger.warning("No se pudo perfilar %s: hay otro perfilador activo", request.path)
+                return await self.get_response(request)
+            try:
+                response = await self.get_response(request)
+            finally:
+                perfilador.disable()
+        duracion = time.perf_counter() - inicio
+
+        perfil = await sync_to_async(self._guardar)(request, response, admin, perfilador, registro, duracion)
+        return self._marcar(response, perfil)
+
+    def _marcar(self, response, perfil):
+        response['X-Perfil-Id'] = str(perfil.pk)
+        response['X-Perfil-Url'] = f'/api/perfiles/{perfil.pk}/descargar/'
+        return response
+
+    def _guardar(self, request, response, admin, perfilador, registro, duracion):
+        perfilador.create_stats()
+        estadisticas = marshal.dumps(perfilador.stats)  # Antes de pstats.Stats, que vacía .stats
+        resumen = io.StringIO()
+        pstats.Stats(perfilador, stream=resumen).sort_stats('cumulative').print_stats(FUNCIONES_RESUMEN)
+        match = getattr(request, 'resolver_match', None)
+        perfil = Perfil.objects.create(
+            usuario=admin, metodo=request.method, ruta=request.get_full_path()[:500],
+            vista=(match.view_name or '') if match else '', codigo=response.status_code,
+            duracion_ms=round(duracion * 1000), cantidad_consultas=registro.total,
+            tiempo_sql_ms=round(registro.tiempo * 1000), estadisticas=estadisticas,
+            resumen=resumen.getvalue(), consultas=registro.consultas,
+        )
+        logger.info("Perfil %s: %s %s %dms, %d consultas SQL (%s)", perfil.pk, request.method,
+                    request.path, perfil.duracion_ms, registro.total, admin.email)
+        return perfil
@@ -0,0 +1,140 @@
+# backend/api/pronosticos.py
+"""
+Pronóstico a PRONOSTICO_HORIZONTE días de humedad y NPK por predio.
+
+Se ajusta sobre los promedios diarios de `resumenes_diarios` (api/resumenes.py)
+de los últimos PRONOSTICO_HISTORIA días con suavizado exponencial de Holt con
+tendencia amortiguada: nivel y tendencia se actualizan día a día, los días
+sin datos avanzan con la tendencia, y la proyección se aplana en vez de
+seguir subiendo o bajando indefinidamente.
+
+Todos los predios de un bloque se ajustan a la vez con NumPy: una matriz
+(predios × días) por parámetro, un paso vectorizado por día. El comando
+`pronosticar` (cron) guarda el resultado en `pronosticos`; las vistas solo lo
+leen, nunca ajustan dentro de la petición.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Pronostico, ResumenDiario
+from .resumenes import dia_utc
+
+try:
+    import numpy as np
+except ImportError:  # Solo lo necesita el comando `pronosticar`
+    np = None
+
+logger = logging.getLogger(__name__)
+
+PARAMETROS = ('humedad', 'nitrogeno', 'fosforo', 'potasio')
+LIMITES = {'humedad': (0, 100), 'nitrogeno': (0, None), 'fosforo': (0, None), 'potasio': (0, None)}
+TAMANO_BLOQUE = 2000  # Predios por ajuste
+
+
+class PronosticoError(Exception):
+    pass
+
+
+def series_diarias(predio_ids, desde, dias):
+    """{parametro: matriz (predios × días)} de promedios diarios, NaN en los días sin datos."""
+    fila = {predio_id: i for i, predio_id in enumerate(predio_ids)}
+    series = {parametro: np.full((len(predio_ids), dias), np.nan) for parametro in PARAMETROS}
+    columnas = [c for parametro in PARAMETROS for c in (f'n_{parametro}', f'suma_{parametro}')]
+    resumenes = ResumenDiario.objects.filter(
+        predio_id__in=predio_ids, dia__gte=desde, dia__lt=desde + timedelta(days=dias)
+    ).values_list('predio_id', 'dia', *columnas)
+    for predio_id, dia, *valores in resumenes.iterator(chunk_size=10000):
+        i, t = fila[predio_id], (dia - desde).days
+        for parametro, n, suma in zip(PARAMETROS, valores[::2], valores[1::2]):
+            if n:
+                series[parametro][i, t] = suma / n
+    return series
+
+
+def holt(serie, alfa, beta, amortiguar, horizonte):
+    """
+    Holt amortiguado por filas de `serie` (predios × días, NaN = sin dato).
+    Retorna (proyección predios × horizonte, nivel, tendencia, días observados).
+    """
+    observado = ~np.isnan(serie)
+    observados = observado.sum(axis=1)
+    primero = observado.argmax(axis=1)  # Primer día con dato (0 en las filas vacías)
+    filas = np.arange(serie.shape[0])
+    nivel = serie[filas, primero]
+    tendencia = np.zeros(serie.shape[0])
+
+    for t in range(serie.shape[1]):
+        activo = t > primero
+        previsto = nivel + amortiguar * tendencia
+        con_dato = activo & observado[:, t]
+        nuevo = np.where(con_dato, alfa * np.nan_to_num(serie[:, t]) + (1 - alfa) * previsto, previsto)
+        tendencia = np.where(con_dato, beta * (nuevo - nivel) + (1 - beta) * amortiguar * tendencia,
+                             np.where(activo, amortiguar * tendencia, tendencia))
+        nivel = np.where(activo, nuevo, nivel)
+
+    # nivel + (φ + φ² + ... + φʰ) · tendencia
+    pasos = np.cumsum(amortiguar ** np.arange(1, horizonte + 1))
+    return nivel[:, None] + pasos[None, :] * tendencia[:, None], nivel, tendencia, observados
+
+
+def pronosticar(hoy=None, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Recalcula los pronósticos de todos los predios con resúmenes en la ventana
+    de historia y reemplaza los guardados. Retorna un resumen para el log.
+    """
+    if np is None:
+        raise PronosticoError("Los pronósticos requieren numpy instalado (pip install numpy)")
+    inicio_proceso = time.perf_counter()
+    hoy = hoy or dia_utc(timezone.now())
+    dias, horizonte = settings.PRONOSTICO_HISTORIA, settings.PRONOSTICO_HORIZONTE
+    desde = hoy - timedelta(days=dias - 1)
+    predio_ids = list(
+        ResumenDiario.objects.filter(dia__gte=desde, dia__lte=hoy)
+        .values_list('predio_id', flat=True).distinct().order_by('predio_id')
+    )
+
+    generado, guardados = timezone.now(), 0
+    for i in range(0, len(predio_ids), tamano_bloque):
+        bloque = predio_ids[i:i + tamano_bloque]
+        pronosticos = []
+        for parametro, serie in series_diarias(bloque, desde, dias).items():
+            proyeccion, nivel, tendencia, observados = holt(
+                serie, settings.PRONOSTICO_ALFA, settings.PRONOSTICO_BETA, settings.PRONOSTICO_AMORTIGUAR, horizonte)
+            minimo, maximo = LIMITES[parametro]
+            proyeccion = np.clip(proyeccion, minimo, maximo)
+            for fila in np.flatnonzero(observados >= settings.PRONOSTICO_MINIMO_DIAS):
+                pronosticos.append(Pronostico(
+                    predio_id=bloque[fila], parametro=parametro, desde=hoy + timedelta(days=1),
+                    valores=[round(float(v), 4) for v in proyeccion[fila]], nivel=float(nivel[fila]),
+                    tendencia=float(tendencia[fila]), dias_observados=int(observados[fila]), generado=generado,
+                ))
+        with transaction.atomic():  # Los predios con pocos datos se quedan sin pronóstico
+            Pronostico.objects.filter(predio_id__in=bloque).delete()
+            Pronostico.objects.bulk_create(pronosticos, batch_size=1000)
+        guardados += len(pronosticos)
+
+    # Predios sin resúmenes recientes: un pronóstico viejo ya no sirve
+    Pronostico.objects.filter(generado__lt=generado).delete()
+    resumen = {'predios': len(predio_ids), 'pronosticos': guardados,
+               'duracion_ms': round((time.perf_counter() - inicio_proceso) * 1000)}
+    logger.info("Pronósticos al %s: %d predios, %d pronósticos en %dms",
+                hoy, resumen['predios'], resumen['pronosticos'], resumen['duracion_ms'])
+    return resumen
+
+
+def pronosticos_de(predios):
+    """{predio_id: {'generado', 'parametros': {parametro: {...}}}} de los pronósticos guardados."""
+    resultado = {}
+    for p in Pronostico.objects.filter(predio__in=predios).order_by('predio_id', 'parametro'):
+        entrada = resultado.setdefault(p.predio_id, {'generado': p.generado, 'parametros': {}})
+        entrada['parametros'][p.parametro] = {
+            'dias': [{'fecha': p.desde + timedelta(days=i), 'valor': valor} for i, valor in enumerate(p.valores)],
+            'tendencia_diaria': round(p.tendencia, 4),
+            'dias_observados': p.dias_observados,
+        }
+    return resultado
@@ -0,0 +1,58 @@
+# backend/api/recomendaciones.py
+"""
+Persistencia de las recomendaciones calculadas por MotorFertilizacion, tanto
+para una medición (vistas) como para lotes (importación masiva).
+"""
+from calculadora.motor_calculo import MotorFertilizacion
+
+from .models import Recomendacion
+
+TAMANO_LOTE = 1000
+
+
+def tiene_npk(medicion):
+    return all([medicion.nitrogeno, medicion.fosforo, medicion.potasio])
+
+
+def valores_recomendacion(medicion, calculos):
+    """Campos de la Recomendación para una medición y el resultado del motor."""
+    return {
+        'predio': medicion.predio,
+        'semana_inicio': medicion.get_semana_inicio(),
+        'ph_promedio': medicion.ph,
+        'temp_promedio': medicion.temperatura,
+        'humedad_promedio': medicion.humedad,
+        'n_promedio': medicion.nitrogeno,
+        'p_promedio': medicion.fosforo,
+        'k_promedio': medicion.potasio,
+        **calculos
+    }
+
+
+def calcular_y_guardar(medicion):
+    """Calcula y guarda (o actualiza) la recomendación de una medición."""
+    calculos = MotorFertilizacion.calcular_recomendacion_completa(medicion, medicion.predio)
+    recomendacion, _ = Recomendacion.objects.update_or_create(
+        medicion=medicion, defaults=valores_recomendacion(medicion, calculos)
+    )
+    return recomendacion
+
+
+def crear_recomendaciones_lote(mediciones):
+    """
+    Crea las recomendaciones de mediciones nuevas (sin recomendación previa)
+    con un bulk_create por lote. Retorna (cantidad creada, omitidas), donde
+    omitidas es una lista de {'medicion': id, 'error': mensaje}.
+    """
+    creadas, omitidas, pendientes = 0, [], []
+    for medicion, calculos, error in MotorFertilizacion.calcular_lote(m for m in mediciones if tiene_npk(m)):
+        if error:
+            omitidas.append({'medicion': medicion.id, 'error': error})
+            continue
+        pendientes.append(Recomendacion(medicion=medicion, **valores_recomendacion(medicion, calculos)))
+        if len(pendientes) >= TAMANO_LOTE:
+            creadas += len(Recomendacion.objects.bulk_create(pendientes))
+            pendientes = []
+    if pendientes:
+        creadas += len(Recomendacion.objects.bulk_create(pendientes))
+    return creadas, omitidas
@@ -0,0 +1,134 @@
+# backend/api/regional.py
+"""
+Comparaciones regionales por zona, tipo de suelo y cultivo (solo administradores).
+
+- refrescar(): rehace los indicadores mensuales de `indicadores_predios` (una
+  fila por predio y mes) desde `resumenes_diarios`, con una consulta agrupada;
+  lo corre el comando `refrescar_regional` (cron). Nunca lee `mediciones`.
+- resumen_grupos(): por grupo (zona, suelo, cultivo), cantidad de predios,
+  promedio, cuartiles y puesto entre grupos. Los cuartiles salen de CUME_DIST()
+  sobre la partición del grupo y el puesto de RANK() sobre los promedios.
+- ranking_predios(): cada predio con su puesto (RANK) y percentil
+  (PERCENT_RANK) dentro de su grupo; `limite` deja los primeros de cada grupo.
+
+Cada predio pesa lo mismo en su grupo, sin importar cuántas mediciones tenga.
+El cultivo es el del predio al momento de refrescar.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Min, Sum, Window
+from django.db.models.functions import CumeDist, PercentRank, Rank
+from django.utils import timezone
+
+from .lecturas import CAMPOS
+from .models import IndicadorPredio, ResumenDiario
+
+logger = logging.getLogger(__name__)
+
+GRUPO = ('zona', 'tipo_suelo', 'cultivo')
+CUARTILES = {'p25': 0.25, 'mediana': 0.5, 'p75': 0.75}
+
+
+def inicio_mes(dia):
+    return dia.replace(day=1)
+
+
+def mes_siguiente(mes):
+    return (mes + timedelta(days=32)).replace(day=1)
+
+
+# ═══════════════════════════════════════════════════════
+# REFRESCO
+# ═══════════════════════════════════════════════════════
+
+def refrescar(mes):
+    """Rehace los indicadores de `mes` (primer día) para todos los predios. Retorna cuántos quedaron."""
+    inicio = time.perf_counter()
+    filas = (
+        ResumenDiario.objects.filter(dia__gte=mes, dia__lt=mes_siguiente(mes))
+        .values('predio_id', zona=F('predio__zona'), tipo_suelo=F('predio__tipo_suelo'),
+                cultivo=F('predio__cultivo_actual'))
+        .annotate(
+            mediciones=Sum('cantidad'), dias=Count('id'),
+            **{f'n_{campo}': Sum(f'n_{campo}') for campo in CAMPOS},
+            **{f's_{campo}': Sum(f'suma_{campo}') for campo in CAMPOS},
+        )
+        .order_by()
+    )
+    ahora = timezone.now()
+    indicadores = [
+        IndicadorPredio(
+            mes=mes, predio_id=fila['predio_id'], zona=fila['zona'], tipo_suelo=fila['tipo_suelo'],
+            cultivo=fila['cultivo'], mediciones=fila['mediciones'], dias=fila['dias'], actualizado=ahora,
+            **{campo: fila[f's_{campo}'] / fila[f'n_{campo}'] if fila[f'n_{campo}'] else None for campo in CAMPOS},
+        )
+        for fila in filas
+    ]
+    with transaction.atomic():
+        IndicadorPredio.objects.filter(mes=mes).delete()
+        IndicadorPredio.objects.bulk_create(indicadores, batch_size=1000)
+    logger.info("Indicadores regionales de %s: %d predios en %dms",
+                mes.strftime('%Y-%m'), len(indicadores), (time.perf_counter() - inicio) * 1000)
+    return len(indicadores)
+
+
+# ═══════════════════════════════════════════════════════
+# CONSULTAS
+# ═══════════════════════════════════════════════════════
+
+def indicadores(mes, parametro, filtros):
+    """Indicadores del mes con valor para `parametro`, filtrados por zona / tipo_suelo / cultivo."""
+    return IndicadorPredio.objects.filter(mes=mes, **{f'{parametro}__isnull': False}, **filtros)
+
+
+def resumen_grupos(mes, parametro, filtros):
+    valor = F(parametro)
+    particion = [F(campo) for campo in GRUPO]
+    grupos = {
+        tuple(fila[campo] for campo in GRUPO): fila
+        for fila in indicadores(mes, parametro, filtros).values(*GRUPO).annotate(
+            predios=Count('id'), mediciones=Sum('mediciones'), promedio=Avg(valor),
+            minimo=Min(valor), maximo=Max(valor),
+            puesto=Window(Rank(), order_by=Avg(valor).desc()),
+        ).order_by()
+    }
+
+    # Cuartil q: el menor valor del grupo cuya distribución acumulada alcanza q
+    filas = indicadores(mes, parametro, filtros).annotate(
+        acumulado=Window(CumeDist(), partition_by=particion, order_by=valor.asc()),
+    ).values_list(*GRUPO, parametro, 'acumulado').order_by(*GRUPO, parametro)
+    for *clave, valor_predio, acumulado in filas:
+        grupo = grupos[tuple(clave)]
+        for nombre, q in CUARTILES.items():
+            if nombre not in grupo and acumulado >= q:
+                grupo[nombre] = valor_predio
+
+    resultado = sorted(grupos.values(), key=lambda g: (g['puesto'], g['zona'], g['tipo_suelo'], g['cultivo'] or ''))
+    for grupo in resultado:
+        for campo in ('promedio', 'minimo', 'maximo', *CUARTILES):
+            grupo[campo] = round(grupo[campo], 4)
+    return resultado
+
+
+def ranking_predios(mes, parametro, filtros, limite=None):
+    particion = [F(campo) for campo in GRUPO]
+    filas = indicadores(mes, parametro, filtros).annotate(
+        puesto=Window(Rank(), partition_by=particion, order_by=F(parametro).desc()),
+        percentil=Window(PercentRank(), partition_by=particion, order_by=F(parametro).asc()),
+    ).values('predio_id', 'mediciones', *GRUPO, 'puesto', 'percentil',
+             predio_nombre=F('predio__nombre'), valor=F(parametro))
+    # Sin cultivo primero en todos los motores, como en resumen_grupos
+    filas = filas.order_by('zona', 'tipo_suelo', F('cultivo').asc(nulls_first=True), 'puesto', 'predio_id')
+    if limite:  # Los `limite` primeros de cada grupo (un empate puede sumar alguno)
+        filas = filas.filter(puesto__lte=limite)
+    filas = list(filas)
+    for fila in filas:
+        fila['valor'], fila['percentil'] = round(fila['valor'], 4), round(fila['percentil'] * 100, 1)
+    return filas
+
+
+def ultimo_refresco(mes):
+    return IndicadorPredio.objects.filter(mes=mes).aggregate(ultimo=Max('actualizado'))['ultimo']
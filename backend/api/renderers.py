@@ -0,0 +1,31 @@
+# backend/api/renderers.py
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from .metricas import medir_serializacion
+
+try:
+    import orjson
+except ImportError:  # Sin orjson se usa el JSONRenderer estándar de DRF
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer sobre orjson: serializa dict/list/str/int/datetime en C.
+    Lo que orjson no conoce (Decimal, QuerySet, etc.) pasa por el encoder de DRF,
+    así la salida es la misma que con el renderer estándar.
+    """
+    _encoder = encoders.JSONEncoder()
+    _opciones = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with medir_serializacion():
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=self._encoder.default, option=self._opciones)
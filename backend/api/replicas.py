@@ -0,0 +1,213 @@
+# backend/api/replicas.py
+"""
+Lecturas en réplicas de PostgreSQL para los endpoints de solo lectura.
+
+Solo las vistas marcadas con @lectura_replica leen de una réplica; el resto
+(incluida la ingesta de los Wemos) sigue en la primaria. Dentro de una vista
+marcada se usa la primaria si:
+- el usuario escribió hace menos de DB_REPLICA_VENTANA_ESCRITURA segundos
+  (leer lo que uno mismo acaba de escribir), o
+- el retraso de la réplica supera DB_REPLICA_RETRASO_MAX segundos (se mide
+  cada DB_REPLICA_INTERVALO_RETRASO segundos por proceso), o
+- hay una transacción abierta en la primaria (ATOMIC_REQUESTS, TestCase).
+
+En las vistas async (views_async.py) la réplica elegida viaja en el contexto
+hasta los hilos de asincronia.en_hilo que ejecutan las consultas.
+
+Las escrituras recientes se guardan en la cache de Django: con varios workers
+de gunicorn hace falta una cache compartida o la ventana solo vale dentro de
+cada proceso.
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.http import HttpRequest
+from rest_framework.request import Request
+
+from .asincronia import en_hilo
+from .metricas import REGISTRO
+
+logger = logging.getLogger(__name__)
+
+LECTURAS = REGISTRO.contador(
+    'nutrisoil_db_read_routing_total', 'Vistas de solo lectura según la base que atendió la lectura',
+    ('destino', 'motivo'))
+
+PREFIJO_ESCRITURA = 'replicas:escritura:'
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_alias_lectura = ContextVar('alias_lectura', default=None)
+
+
+def replicas():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+# ═══════════════════════════════════════════════════════
+# RETRASO DE LAS RÉPLICAS
+# ═══════════════════════════════════════════════════════
+
+_retrasos = {}  # alias -> (momento de la medición, segundos)
+_lock = threading.Lock()
+
+SQL_RETRASO = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def medir_retraso(alias):
+    """Segundos de retraso de la réplica; al día si ya aplicó todo lo recibido."""
+    conexion = connections[alias]
+    if conexion.vendor != 'postgresql':
+        return 0.0
+    with conexion.cursor() as cursor:
+        cursor.execute(SQL_RETRASO)
+        return float(cursor.fetchone()[0])
+
+
+def retraso(alias):
+    ahora = time.monotonic()
+    with _lock:
+        medido = _retrasos.get(alias)
+    if medido and ahora - medido[0] < settings.DB_REPLICA_INTERVALO_RETRASO:
+        return medido[1]
+    try:
+        valor = medir_retraso(alias)
+    except DatabaseError:
+        logger.warning("No se pudo medir el retraso de %s; se lee de la primaria", alias, exc_info=True)
+        valor = float('inf')
+    with _lock:
+        _retrasos[alias] = (ahora, valor)
+    return valor
+
+
+# ═══════════════════════════════════════════════════════
+# ESCRITURAS RECIENTES (leer lo propio)
+# ═══════════════════════════════════════════════════════
+
+def registrar_escritura(usuario_id):
+    cache.set(f'{PREFIJO_ESCRITURA}{usuario_id}', True, timeout=settings.DB_REPLICA_VENTANA_ESCRITURA)
+
+
+def escribio_recientemente(usuario_id):
+    return usuario_id is not None and cache.get(f'{PREFIJO_ESCRITURA}{usuario_id}', False)
+
+
+class EscriturasRecientesMiddleware:
+    """Marca al usuario tras una petición de escritura exitosa para que sus lecturas vayan a la primaria."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        usuario_id = self._escritor(request, response)
+        if usuario_id is not None:
+            registrar_escritura(usuario_id)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        usuario_id = self._escritor(request, response)
+        if usuario_id is not None:
+            await sync_to_async(registrar_escritura)(usuario_id)
+        return response
+
+    def _escritor(self, request, response):
+        if request.method not in METODOS_SEGUROS and response.status_code < 400 and replicas():
+            usuario = getattr(request, 'user', None)  # DRF copia el usuario autenticado al HttpRequest
+            if usuario is not None and usuario.is_authenticated:
+                return usuario.pk
+        return None
+
+
+# ═══════════════════════════════════════════════════════
+# ELECCIÓN DE LA BASE
+# ═══════════════════════════════════════════════════════
+
+def elegir_alias(usuario_id):
+    """Réplica al día para la lectura, o None para usar la primaria. Devuelve (alias, motivo)."""
+    candidatas = replicas()
+    if not candidatas:
+        return None, 'sin_replicas'
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None, 'transaccion'  # La réplica no vería lo que la transacción aún no confirma
+    if escribio_recientemente(usuario_id):
+        return None, 'escritura_reciente'
+    al_dia = [alias for alias in candidatas if retraso(alias) <= settings.DB_REPLICA_RETRASO_MAX]
+    if not al_dia:
+        return None, 'retraso'
+    return random.choice(al_dia), 'replica'
+
+
+def _peticion(args):
+    return next((a for a in args if isinstance(a, (Request, HttpRequest))), None)
+
+
+def _usuario_id(args):
+    usuario = getattr(_peticion(args), 'user', None)
+    return usuario.pk if usuario is not None and usuario.is_authenticated else None
+
+
+def lectura_replica(vista):
+    """
+    Marca una vista (o acción de un viewset) de solo lectura. Va debajo de
+    @api_view / @action / @vista_async: corre después de la autenticación de DRF.
+    """
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(*args, **kwargs):
+            # El retraso se mide con una consulta: fuera del event loop
+            alias, motivo = await en_hilo(elegir_alias, _usuario_id(args))
+            LECTURAS.incrementar(alias or DEFAULT_DB_ALIAS, motivo)
+            if alias is None:
+                return await vista(*args, **kwargs)
+            token = _alias_lectura.set(alias)  # en_hilo copia el contexto: las consultas lo heredan
+            try:
+                return await vista(*args, **kwargs)
+            finally:
+                _alias_lectura.reset(token)
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        alias, motivo = elegir_alias(_usuario_id(args))
+        LECTURAS.incrementar(alias or DEFAULT_DB_ALIAS, motivo)
+        if alias is None:
+            return vista(*args, **kwargs)
+        token = _alias_lectura.set(alias)
+        try:
+            return vista(*args, **kwargs)
+        finally:
+            _alias_lectura.reset(token)
+    return envoltura
+
+
+class RouterReplicas:
+    """Fuera de @lectura_replica no opina: Django usa la primaria."""
+
+    def db_for_read(self, model, **hints):
+        return _alias_lectura.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Todas las bases tienen los mismos datos
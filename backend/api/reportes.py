@@ -0,0 +1,378 @@
+# backend/api/reportes.py
+"""
+Motor de reportes del lado del servidor.
+
+Las estadísticas por predio y el resumen de recomendaciones se calculan con
+consultas agregadas (GROUP BY en la base de datos), nunca trayendo las
+mediciones crudas. El artefacto (PDF o CSV) se genera en la cola de tareas
+(comando `procesar_tareas`) y se guarda en la tabla `reportes` con una clave que incluye la marca de
+datos del alcance pedido: si nada cambió, volver a pedir el reporte solo cuesta calcular la marca
+(ver marca_de_datos: con sensores activos, un reporte que llega hasta hoy cambia con cada lectura).
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.utils import timezone
+
+from .exportacion import rango_fechas
+from .models import Medicion, Predio, Recomendacion, Reporte
+from .pdf import DocumentoPDF
+from .tareas import encolar
+from .utils import generar_alertas
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+PARAMETROS_SUELO = ('ph', 'temperatura', 'humedad', 'nitrogeno', 'fosforo', 'potasio')
+TOTALES_FERTILIZANTES = ('urea_total', 'superfosfato_total', 'muriato_potasio_total', 'cal_total')
+
+
+class ReporteError(ValueError):
+    pass
+
+
+# ═══════════════════════════════════════════════════════
+# MARCA DE DATOS (clave de caché)
+# ═══════════════════════════════════════════════════════
+
+def marca_de_datos(profile, predios=None, desde=None, hasta=None):
+    """
+    Resume en un string corto el estado de los datos que entran en el reporte:
+    los predios y el rango de fechas pedidos (todo el usuario si no se acotan).
+    Cambia cuando se crean o eliminan predios, mediciones o recomendaciones de
+    ese alcance. Las ediciones invalidan los reportes explícitamente (ver
+    invalidar_reportes en signals.py).
+
+    Cuesta un COUNT/MAX sobre las mediciones del alcance en cada solicitud, y
+    cada lectura IoT nueva la cambia: un reporte que llega hasta hoy, de un
+    usuario con sensores activos, casi nunca se reutiliza. Un rango cerrado en
+    el pasado sí, aunque sigan llegando lecturas.
+    """
+    predios_usuario = Predio.objects.filter(usuario=profile)
+    mediciones = Medicion.objects.filter(predio__usuario=profile)
+    recomendaciones = Recomendacion.objects.filter(predio__usuario=profile)
+    if predios:
+        predios_usuario = predios_usuario.filter(id__in=predios)
+        mediciones = mediciones.filter(predio_id__in=predios)
+        recomendaciones = recomendaciones.filter(predio_id__in=predios)
+    for lookup, valor in rango_fechas(desde, hasta).items():
+        mediciones = mediciones.filter(**{f'fecha__{lookup}': valor})
+        recomendaciones = recomendaciones.filter(**{f'fecha_calculo__{lookup}': valor})
+
+    predios_usuario = predios_usuario.aggregate(n=Count('id'), max_id=Max('id'))
+    mediciones = mediciones.aggregate(n=Count('id'), max_id=Max('id'))
+    recomendaciones = recomendaciones.aggregate(n=Count('id'), max_id=Max('id'), ultima=Max('fecha_calculo'))
+    ultima = recomendaciones['ultima']
+    return (
+        f"p{predios_usuario['n']}.{predios_usuario['max_id'] or 0}"
+        f"-m{mediciones['n']}.{mediciones['max_id'] or 0}"
+        f"-r{recomendaciones['n']}.{recomendaciones['max_id'] or 0}"
+        f".{int(ultima.timestamp()) if ultima else 0}"
+    )
+
+
+def _sha256(*partes):
+    return hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def invalidar_reportes(usuario_id=None, predio_id=None):
+    """
+    Descarta los artefactos cacheados del usuario (ediciones que no cambian la
+    marca). Los que se están generando se marcan obsoletos: pueden haber leído
+    los datos antes de la edición, y generar_reporte los vuelve a generar.
+    """
+    reportes = Reporte.objects.all()
+    if predio_id is not None:
+        reportes = reportes.filter(usuario__predios=predio_id)
+    else:
+        reportes = reportes.filter(usuario_id=usuario_id)
+    reportes.filter(estado='procesando').update(obsoleto=True)
+    reportes.exclude(estado='procesando').delete()
+
+
+# ═══════════════════════════════════════════════════════
+# DATOS (consultas agregadas)
+# ═══════════════════════════════════════════════════════
+
+def datos_resumen(profile, predios=None, desde=None, hasta=None):
+    """Estadísticas por predio y totales de fertilizantes en tres consultas agregadas."""
+    mediciones = Medicion.objects.filter(predio__usuario=profile)
+    recomendaciones = Recomendacion.objects.filter(predio__usuario=profile)
+    if predios:
+        mediciones = mediciones.filter(predio_id__in=predios)
+        recomendaciones = recomendaciones.filter(predio_id__in=predios)
+    for lookup, valor in rango_fechas(desde, hasta).items():
+        mediciones = mediciones.filter(**{f'fecha__{lookup}': valor})
+        recomendaciones = recomendaciones.filter(**{f'fecha_calculo__{lookup}': valor})
+
+    promedios = {campo: Avg(campo) for campo in PARAMETROS_SUELO}
+    por_predio = list(
+        mediciones.values('predio_id', 'predio__nombre', 'predio__zona', 'predio__superficie')
+        .annotate(total=Count('id'), primera=Min('fecha'), ultima=Max('fecha'), **promedios)
+        .order_by('predio__zona', 'predio__nombre')
+    )
+    fertilizantes = {
+        fila.pop('predio_id'): fila
+        for fila in recomendaciones.values('predio_id').annotate(
+            recomendaciones=Count('id'), **{campo: Sum(campo) for campo in TOTALES_FERTILIZANTES}
+        ).order_by()
+    }
+    for fila in por_predio:
+        fila.update(fertilizantes.get(fila['predio_id'], {'recomendaciones': 0}))
+
+    return {
+        'generado': timezone.localtime(),
+        'periodo': (desde, hasta),
+        'general': mediciones.aggregate(total=Count('id'), predios=Count('predio', distinct=True), **promedios),
+        'predios': por_predio,
+    }
+
+
+def datos_recomendacion(profile, recomendacion_id):
+    try:
+        recomendacion = (
+            Recomendacion.objects.select_related('predio', 'medicion')
+            .get(pk=recomendacion_id, predio__usuario=profile)
+        )
+    except Recomendacion.DoesNotExist:
+        raise ReporteError('Recomendación no encontrada o no pertenece al usuario')
+    return {
+        'generado': timezone.localtime(),
+        'recomendacion': recomendacion,
+        'alertas': generar_alertas(recomendacion.medicion),
+    }
+
+
+# ═══════════════════════════════════════════════════════
+# RENDER (PDF / CSV)
+# ═══════════════════════════════════════════════════════
+
+def _num(valor, decimales=1):
+    return '--' if valor is None else f"{float(valor):.{decimales}f}"
+
+
+def _fecha(valor):
+    return timezone.localtime(valor).strftime('%d-%m-%Y') if valor else '--'
+
+
+COLUMNAS_RESUMEN = [
+    # (encabezado, clave, decimales)
+    ('Predio', 'predio__nombre', None),
+    ('Zona', 'predio__zona', None),
+    ('Análisis', 'total', None),
+    ('pH', 'ph', 2),
+    ('Temp °C', 'temperatura', 1),
+    ('Hum %', 'humedad', 1),
+    ('N ppm', 'nitrogeno', 1),
+    ('P ppm', 'fosforo', 1),
+    ('K cmol/kg', 'potasio', 2),
+    ('Urea kg', 'urea_total', 1),
+    ('SFT kg', 'superfosfato_total', 1),
+    ('KCl kg', 'muriato_potasio_total', 1),
+    ('Cal kg', 'cal_total', 1),
+]
+
+
+def _fila_resumen(fila):
+    return [
+        fila.get(clave, '') if decimales is None else _num(fila.get(clave), decimales)
+        for _, clave, decimales in COLUMNAS_RESUMEN
+    ]
+
+
+def _texto_periodo(periodo):
+    desde, hasta = periodo
+    return f"{desde or 'Inicio'} a {hasta or 'Hoy'}"
+
+
+def render_resumen_pdf(datos):
+    doc = DocumentoPDF('NutriSoil - Reporte de recomendaciones')
+    doc.titulo('Reporte de recomendaciones por predio')
+    doc.texto(f"Periodo: {_texto_periodo(datos['periodo'])}")
+    doc.texto(f"Generado: {datos['generado']:%d-%m-%Y %H:%M}")
+    doc.linea()
+
+    general = datos['general']
+    doc.titulo('Resumen general', tamano=12)
+    doc.texto(f"Análisis: {general['total']}   Predios: {general['predios']}")
+    doc.texto(
+        f"Promedios -> pH {_num(general['ph'], 2)} | Temp {_num(general['temperatura'])} °C | "
+        f"N {_num(general['nitrogeno'])} | P {_num(general['fosforo'])} | K {_num(general['potasio'], 2)}"
+    )
+    doc.espacio()
+
+    doc.titulo('Detalle por predio', tamano=12)
+    doc.tabla([c[0] for c in COLUMNAS_RESUMEN], [_fila_resumen(f) for f in datos['predios']])
+    return doc.bytes()
+
+
+def render_resumen_csv(datos):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([c[0] for c in COLUMNAS_RESUMEN] + ['Superficie ha', 'Primera', 'Última', 'Recomendaciones'])
+    for fila in datos['predios']:
+        writer.writerow(_fila_resumen(fila) + [
+            fila['predio__superficie'], _fecha(fila['primera']), _fecha(fila['ultima']), fila['recomendaciones']
+        ])
+    return buffer.getvalue().encode('utf-8')
+
+
+FILAS_RECOMENDACION = [
+    ('pH', 'ph_promedio', 2),
+    ('Temperatura (°C)', 'temp_promedio', 1),
+    ('Humedad (%)', 'humedad_promedio', 1),
+    ('Nitrógeno (ppm)', 'n_promedio', 2),
+    ('Fósforo (ppm)', 'p_promedio', 2),
+    ('Potasio (cmol/kg)', 'k_promedio', 4),
+]
+FILAS_FERTILIZANTES = [
+    ('Urea', 'urea_kg_ha', 'urea_total'),
+    ('Superfosfato triple', 'superfosfato_kg_ha', 'superfosfato_total'),
+    ('Muriato de potasio', 'muriato_potasio_kg_ha', 'muriato_potasio_total'),
+    ('Cal agrícola', 'cal_kg_ha', 'cal_total'),
+]
+
+
+def render_recomendacion_pdf(datos):
+    rec = datos['recomendacion']
+    doc = DocumentoPDF('NutriSoil - Recomendación de fertilización')
+    doc.titulo(f"Recomendación #{rec.id} - {rec.predio.nombre}")
+    doc.texto(f"Zona: {rec.predio.zona}   Suelo: {rec.predio.tipo_suelo}   Superficie: {rec.predio.superficie} ha")
+    doc.texto(f"Calculada: {_fecha(rec.fecha_calculo)}   Generado: {datos['generado']:%d-%m-%Y %H:%M}")
+    doc.linea()
+
+    doc.titulo('Análisis de suelo', tamano=12)
+    doc.tabla(['Parámetro', 'Valor'], [[nombre, _num(getattr(rec, campo), d)] for nombre, campo, d in FILAS_RECOMENDACION])
+    doc.espacio()
+
+    doc.titulo('Fertilizantes recomendados', tamano=12)
+    doc.tabla(['Producto', 'kg/ha', 'Total predio (kg)'], [
+        [nombre, _num(getattr(rec, por_ha)), _num(getattr(rec, total))]
+        for nombre, por_ha, total in FILAS_FERTILIZANTES
+    ])
+    doc.espacio()
+
+    if datos['alertas']:
+        doc.titulo('Alertas', tamano=12)
+        for alerta in datos['alertas']:
+            # Sin el emoji inicial, que Helvetica no puede dibujar
+            mensaje = alerta['mensaje'].encode('cp1252', errors='ignore').decode('cp1252').strip()
+            doc.texto(f"[{alerta['tipo']}] {mensaje}", tamano=9)
+    return doc.bytes()
+
+
+def render_recomendacion_csv(datos):
+    rec = datos['recomendacion']
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['Sección', 'Concepto', 'Valor'])
+    writer.writerow(['Predio', 'Nombre', rec.predio.nombre])
+    writer.writerow(['Predio', 'Zona', rec.predio.zona])
+    for nombre, campo, decimales in FILAS_RECOMENDACION:
+        writer.writerow(['Análisis', nombre, _num(getattr(rec, campo), decimales)])
+    for nombre, por_ha, total in FILAS_FERTILIZANTES:
+        writer.writerow(['Fertilizante kg/ha', nombre, _num(getattr(rec, por_ha))])
+        writer.writerow(['Fertilizante total kg', nombre, _num(getattr(rec, total))])
+    return buffer.getvalue().encode('utf-8')
+
+
+def _fecha_param(valor):
+    return date.fromisoformat(valor) if valor else None
+
+
+GENERADORES = {
+    # tipo -> (datos, {formato: render}); los parámetros vienen del JSON guardado
+    'resumen': (
+        lambda profile, p: datos_resumen(
+            profile, p.get('predios'), _fecha_param(p.get('desde')), _fecha_param(p.get('hasta'))
+        ),
+        {'pdf': render_resumen_pdf, 'csv': render_resumen_csv},
+    ),
+    'recomendacion': (
+        lambda profile, p: datos_recomendacion(profile, p['recomendacion']),
+        {'pdf': render_recomendacion_pdf, 'csv': render_recomendacion_csv},
+    ),
+}
+
+
+# ═══════════════════════════════════════════════════════
+# SOLICITUD Y GENERACIÓN
+# ═══════════════════════════════════════════════════════
+
+def solicitar_reporte(profile, tipo, formato, parametros):
+    """
+    Retorna (reporte, creado). Si ya existe un artefacto para los mismos
+    parámetros y la misma marca de datos, se reutiliza sin volver a generarlo.
+    """
+    huella = _sha256(str(profile.id), tipo, formato, parametros)
+    if tipo == 'resumen':
+        marca = marca_de_datos(profile, parametros.get('predios'), _fecha_param(parametros.get('desde')),
+                               _fecha_param(parametros.get('hasta')))
+    else:
+        marca = marca_de_datos(profile)
+    reporte, creado = Reporte.objects.defer('archivo').get_or_create(
+        clave=_sha256(huella, marca),
+        defaults={'usuario': profile, 'tipo': tipo, 'formato': formato, 'parametros': parametros,
+                  'huella': huella, 'marca_datos': marca},
+    )
+    if creado or reporte.estado == 'error':
+        if not creado:
+            Reporte.objects.filter(pk=reporte.pk).update(estado='pendiente', error='', obsoleto=False)
+            reporte.estado, reporte.error = 'pendiente', ''
+        encolar_reporte(reporte.pk)
+    return reporte, creado
+
+
+def generar_reporte(reporte_id):
+    """Calcula los datos y guarda el artefacto. Lo ejecuta el worker en segundo plano."""
+    actualizados = Reporte.objects.filter(pk=reporte_id, estado='pendiente').update(estado='procesando')
+    if not actualizados:
+        return  # Otro worker lo tomó o ya no existe
+    reporte = Reporte.objects.select_related('usuario').defer('archivo').get(pk=reporte_id)
+    inicio = time.perf_counter()
+    try:
+        obtener_datos, renders = GENERADORES[reporte.tipo]
+        with transaction.atomic():  # Un error de BD no arrastra el UPDATE de estado
+            contenido = renders[reporte.formato](obtener_datos(reporte.usuario, reporte.parametros))
+    except Exception as e:
+        logger.exception("Error generando reporte %s", reporte_id)
+        Reporte.objects.filter(pk=reporte_id).update(estado='error', error=str(e)[:1000])
+        return
+
+    duracion_ms = int((time.perf_counter() - inicio) * 1000)
+    with transaction.atomic():
+        listo = Reporte.objects.filter(pk=reporte_id, obsoleto=False).update(
+            estado='listo', archivo=contenido, tamano=len(contenido),
+            duracion_ms=duracion_ms, fecha_generado=timezone.now()
+        )
+        if listo:
+            # Las versiones anteriores del mismo reporte (otra marca de datos) ya no sirven
+            Reporte.objects.filter(huella=reporte.huella).exclude(pk=reporte_id).delete()
+    if not listo:
+        # Una edición lo invalidó mientras se generaba: el contenido puede ser anterior a ella
+        logger.info("Reporte %s invalidado durante la generación, se genera de nuevo", reporte_id)
+        if Reporte.objects.filter(pk=reporte_id).update(estado='pendiente', obsoleto=False):
+            encolar_reporte(reporte_id)
+        return
+    logger.info("Reporte %s (%s.%s) generado en %d ms, %d bytes",
+                reporte_id, reporte.tipo, reporte.formato, duracion_ms, len(contenido))
+
+
+def encolar_reporte(reporte_id):
+    """Genera el reporte fuera del ciclo de la petición, en la cola de tareas."""
+    if not settings.REPORTES_EN_SEGUNDO_PLANO:
+        generar_reporte(reporte_id)
+        return
+    encolar('reporte', {'reporte': reporte_id}, clave=f'reporte:{reporte_id}')
@@ -0,0 +1,144 @@
+# backend/api/resumenes.py
+"""
+Estadísticas por predio mantenidas de forma incremental (tabla
+`resumenes_diarios`): una fila por predio y día UTC con conteo, suma, mínimo y
+máximo de cada parámetro.
+
+- acumular(): en cada ingesta, un UPDATE de la fila del día (o su INSERT).
+- recalcular(): rehace los días de un rango desde `mediciones` con una
+  consulta agrupada; para la importación masiva, ediciones y borrados, y el
+  comando `recalcular_resumenes` (carga inicial).
+- estadisticas(): ventanas de los últimos 7 y 30 días y del mes en curso,
+  más la media exponencial de api/anomalias.py. Lee a lo más 31 filas por
+  predio, sin importar cuántas mediciones tenga.
+
+Con ANOMALIAS_EXCLUIR_PROMEDIOS los valores marcados en la ingesta no se
+acumulan, igual que en los promedios semanales.
+"""
+from datetime import datetime, time as dtime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Max, Min, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Greatest, Least, TruncDate
+from django.utils import timezone
+
+from .anomalias import BITS, sin_anomalia
+from .lecturas import CAMPOS
+from .models import EstadisticaSensor, Medicion, ResumenDiario
+
+VENTANAS = {'ultimos_7_dias': 7, 'ultimos_30_dias': 30}
+DECIMALES = {campo: Medicion._meta.get_field(campo).decimal_places for campo in CAMPOS}
+
+
+def dia_utc(fecha):
+    return fecha.astimezone(dt_timezone.utc).date()
+
+
+def _valores(medicion):
+    """{campo: float} de los valores que se acumulan."""
+    excluir = medicion.anomalias if settings.ANOMALIAS_EXCLUIR_PROMEDIOS else 0
+    return {campo: float(getattr(medicion, campo)) for campo in CAMPOS
+            if getattr(medicion, campo) is not None and not excluir & BITS[campo]}
+
+
+# ═══════════════════════════════════════════════════════
+# ESCRITURA
+# ═══════════════════════════════════════════════════════
+
+def acumular(medicion):
+    """Suma una medición nueva al resumen de su día (dentro de la transacción que la guarda)."""
+    dia, valores = dia_utc(medicion.fecha), _valores(medicion)
+    cambios = {'cantidad': F('cantidad') + 1, 'actualizado': timezone.now()}
+    for campo, valor in valores.items():
+        v = Value(valor, output_field=FloatField())
+        cambios[f'n_{campo}'] = F(f'n_{campo}') + 1
+        cambios[f'suma_{campo}'] = F(f'suma_{campo}') + v
+        cambios[f'min_{campo}'] = Least(Coalesce(f'min_{campo}', v), v)
+        cambios[f'max_{campo}'] = Greatest(Coalesce(f'max_{campo}', v), v)
+
+    filas = ResumenDiario.objects.filter(predio_id=medicion.predio_id, dia=dia)
+    if filas.update(**cambios):
+        return
+    nuevo = {'cantidad': 1}
+    for campo, valor in valores.items():
+        nuevo.update({f'n_{campo}': 1, f'suma_{campo}': valor, f'min_{campo}': valor, f'max_{campo}': valor})
+    try:
+        with transaction.atomic():
+            ResumenDiario.objects.create(predio_id=medicion.predio_id, dia=dia, **nuevo)
+    except IntegrityError:  # Otra lectura del mismo predio creó el día primero
+        filas.update(**cambios)
+
+
+def recalcular(predio_ids, desde, hasta):
+    """
+    Rehace los resúmenes de `predio_ids` entre los días `desde` y `hasta`
+    (inclusive) con una consulta agrupada por (predio, día). Retorna cuántos
+    días quedaron con mediciones.
+    """
+    inicio = datetime.combine(desde, dtime.min, tzinfo=dt_timezone.utc)
+    fin = datetime.combine(hasta + timedelta(days=1), dtime.min, tzinfo=dt_timezone.utc)
+    filtros = {campo: sin_anomalia(campo) if settings.ANOMALIAS_EXCLUIR_PROMEDIOS else None for campo in CAMPOS}
+    agregados = {}
+    for campo in CAMPOS:
+        valor = Cast(campo, FloatField())
+        agregados.update({
+            f'n_{campo}': Count(campo, filter=filtros[campo]),
+            f'suma_{campo}': Coalesce(Sum(valor, filter=filtros[campo]), 0.0),
+            f'min_{campo}': Min(valor, filter=filtros[campo]),
+            f'max_{campo}': Max(valor, filter=filtros[campo]),
+        })
+    filas = (
+        Medicion.objects.filter(predio_id__in=predio_ids, fecha__gte=inicio, fecha__lt=fin)
+        .values('predio_id', dia=TruncDate('fecha', tzinfo=dt_timezone.utc))
+        .annotate(cantidad=Count('id'), **agregados)
+        .order_by()
+    )
+    resumenes = [ResumenDiario(**fila) for fila in filas]
+    with transaction.atomic():
+        ResumenDiario.objects.filter(predio_id__in=predio_ids, dia__gte=desde, dia__lte=hasta).delete()
+        ResumenDiario.objects.bulk_create(resumenes, batch_size=1000)
+    return len(resumenes)
+
+
+# ═══════════════════════════════════════════════════════
+# LECTURA
+# ═══════════════════════════════════════════════════════
+
+def _ventana(resumenes):
+    resultado = {}
+    for campo in CAMPOS:
+        con_datos = [r for r in resumenes if getattr(r, f'n_{campo}')]
+        n = sum(getattr(r, f'n_{campo}') for r in con_datos)
+        if not n:
+            resultado[campo] = {'n': 0, 'promedio': None, 'minimo': None, 'maximo': None}
+            continue
+        resultado[campo] = {
+            'n': n,
+            'promedio': round(sum(getattr(r, f'suma_{campo}') for r in con_datos) / n, DECIMALES[campo]),
+            'minimo': min(getattr(r, f'min_{campo}') for r in con_datos),
+            'maximo': max(getattr(r, f'max_{campo}') for r in con_datos),
+        }
+    return resultado
+
+
+def estadisticas(predio, hoy=None):
+    """Ventanas por parámetro ({'n', 'promedio', 'minimo', 'maximo'}) y media exponencial del predio."""
+    hoy = hoy or dia_utc(timezone.now())
+    inicio_mes = hoy.replace(day=1)
+    desde = min(inicio_mes, hoy - timedelta(days=max(VENTANAS.values()) - 1))
+    resumenes = list(ResumenDiario.objects.filter(predio=predio, dia__gte=desde, dia__lte=hoy))
+
+    ventanas = {nombre: _ventana([r for r in resumenes if r.dia > hoy - timedelta(days=dias)])
+                for nombre, dias in VENTANAS.items()}
+    ventanas['mes_actual'] = _ventana([r for r in resumenes if r.dia >= inicio_mes])
+    ewma = {e.parametro: {'media': round(e.media, DECIMALES.get(e.parametro, 2)),
+                          'desvio': round(e.varianza ** 0.5, DECIMALES.get(e.parametro, 2)), 'n': e.n}
+            for e in EstadisticaSensor.objects.filter(predio=predio)}
+    return {
+        'predio_id': predio.id,
+        'dia': hoy,
+        'ventanas': ventanas,
+        'ewma': ewma,
+        'actualizado': max((r.actualizado for r in resumenes), default=None),
+    }
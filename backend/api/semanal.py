@@ -0,0 +1,228 @@
+# backend/api/semanal.py
+"""
+Recomendaciones semanales por predio (Recomendacion con `medicion` nula).
+
+La semana es la de Medicion.get_semana_inicio(): empieza el domingo y se cuenta
+sobre la fecha UTC. Los promedios de un bloque de predios salen de una sola
+consulta agrupada por (predio, día); los días se pliegan a semanas sumando
+sumas y conteos, así el promedio es exacto. Los valores marcados como
+anómalos en la ingesta (api/anomalias.py) no entran en los promedios. Cada
+recomendación guarda cuántas mediciones promedió y el id más alto: si ninguno
+cambió está al día y no se vuelve a calcular.
+
+- calcular_semanales(): núcleo compartido por la vista y el precálculo.
+- precalcular(): recorre todos los predios con mediciones en un rango de
+  semanas (comando `precalcular_semanales`, pensado para cron).
+"""
+import logging
+import time
+from datetime import datetime, time as dtime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from calculadora.motor_calculo import MotorFertilizacion
+
+from .anomalias import sin_anomalia
+from .models import Medicion, Predio, Recomendacion
+from .recomendaciones import TAMANO_LOTE, tiene_npk
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 500  # Predios por consulta agrupada
+
+# Campo de Medicion -> campo promedio de Recomendacion
+PROMEDIOS = {
+    'ph': 'ph_promedio',
+    'temperatura': 'temp_promedio',
+    'humedad': 'humedad_promedio',
+    'nitrogeno': 'n_promedio',
+    'fosforo': 'p_promedio',
+    'potasio': 'k_promedio',
+}
+
+
+def inicio_semana(dia):
+    """Domingo de la semana de `dia` (mismo criterio que Medicion.get_semana_inicio)."""
+    return dia - timedelta(days=(dia.weekday() + 1) % 7)
+
+
+def semanas_entre(desde, hasta):
+    semana, fin = inicio_semana(desde), inicio_semana(hasta)
+    semanas = []
+    while semana <= fin:
+        semanas.append(semana)
+        semana += timedelta(days=7)
+    return semanas
+
+
+def rango_semanas(semanas):
+    """Límites UTC [primer domingo, domingo siguiente al último) para filtrar por `fecha`."""
+    inicio = datetime.combine(min(semanas), dtime.min, tzinfo=dt_timezone.utc)
+    fin = datetime.combine(max(semanas) + timedelta(days=7), dtime.min, tzinfo=dt_timezone.utc)
+    return inicio, fin
+
+
+def _redondear(valor, campo):
+    decimales = Recomendacion._meta.get_field(campo).decimal_places
+    return valor.quantize(Decimal(1).scaleb(-decimales))
+
+
+def agregados_semanales(predio_ids, semanas):
+    """
+    {(predio_id, semana): {'cantidad', 'max_medicion_id', 'ph', 'temperatura', ...}}
+    para las semanas pedidas, con una sola consulta agrupada por (predio, día).
+    """
+    semanas = set(semanas)
+    inicio, fin = rango_semanas(semanas)
+    # Los valores marcados en la ingesta no entran al promedio; `cantidad` y el id
+    # más alto sí cuentan todas las mediciones (detectan semanas desactualizadas)
+    filtros = {campo: sin_anomalia(campo) if settings.ANOMALIAS_EXCLUIR_PROMEDIOS else None
+               for campo in PROMEDIOS}
+    filas = (
+        Medicion.objects.filter(predio_id__in=predio_ids, fecha__gte=inicio, fecha__lt=fin)
+        .values('predio_id', dia=TruncDate('fecha', tzinfo=dt_timezone.utc))
+        .annotate(
+            n=Count('id'), max_id=Max('id'),
+            **{f'n_{campo}': Count(campo, filter=filtros[campo]) for campo in PROMEDIOS},
+            **{f's_{campo}': Sum(campo, filter=filtros[campo]) for campo in PROMEDIOS},
+        )
+        .order_by()
+    )
+
+    acumulados = {}
+    for fila in filas:
+        semana = inicio_semana(fila['dia'])
+        if semana not in semanas:
+            continue  # Rango continuo entre semanas pedidas no consecutivas
+        acumulado = acumulados.setdefault((fila['predio_id'], semana), {
+            'cantidad': 0, 'max_medicion_id': 0,
+            **{f'n_{campo}': 0 for campo in PROMEDIOS}, **{f's_{campo}': Decimal(0) for campo in PROMEDIOS},
+        })
+        acumulado['cantidad'] += fila['n']
+        acumulado['max_medicion_id'] = max(acumulado['max_medicion_id'], fila['max_id'])
+        for campo in PROMEDIOS:
+            acumulado[f'n_{campo}'] += fila[f'n_{campo}']
+            acumulado[f's_{campo}'] += fila[f's_{campo}'] or 0
+
+    agregados = {}
+    for clave, acumulado in acumulados.items():
+        agregados[clave] = {'cantidad': acumulado['cantidad'], 'max_medicion_id': acumulado['max_medicion_id']}
+        for campo, destino in PROMEDIOS.items():
+            n = acumulado[f'n_{campo}']
+            agregados[clave][campo] = _redondear(Decimal(acumulado[f's_{campo}']) / n, destino) if n else None
+    return agregados
+
+
+def calcular_semanales(predios, semanas, forzar=False, promedios=None):
+    """
+    Calcula y guarda las recomendaciones semanales de `predios` ({id: Predio},
+    ya validados como del usuario) para `semanas` (domingos). Solo se recalculan
+    las semanas con mediciones nuevas, salvo `forzar`. `promedios` reemplaza
+    valores agregados ({'ph': ..., 'nitrogeno': ...}) y obliga a recalcular.
+
+    Retorna un dict con:
+    - recomendaciones: {(predio_id, semana): Recomendacion} de las semanas con datos
+    - creadas, actualizadas, al_dia: cantidades
+    - omitidas: [{'predio', 'semana_inicio', 'error'}] (sin NPK o error del motor)
+    """
+    promedios = {campo: valor for campo, valor in (promedios or {}).items() if valor is not None}
+    forzar = forzar or bool(promedios)
+    resultado = {'recomendaciones': {}, 'creadas': 0, 'actualizadas': 0, 'al_dia': 0, 'omitidas': []}
+    if not predios or not semanas:
+        return resultado
+
+    agregados = agregados_semanales(list(predios), semanas)
+    existentes = {
+        (r.predio_id, r.semana_inicio): r
+        for r in Recomendacion.objects.filter(
+            medicion__isnull=True, predio_id__in=list(predios), semana_inicio__in=list(semanas)
+        )
+    }
+
+    claves, por_calcular = [], []
+    for clave, agregado in sorted(agregados.items()):
+        existente = existentes.get(clave)
+        if (existente and not forzar and existente.cantidad_mediciones == agregado['cantidad']
+                and existente.max_medicion_id == agregado['max_medicion_id']):
+            resultado['recomendaciones'][clave] = existente
+            resultado['al_dia'] += 1
+            continue
+        # Medición "promedio" sin guardar: el motor solo lee atributos y el predio
+        promedio = Medicion(predio=predios[clave[0]], **{campo: agregado[campo] for campo in PROMEDIOS})
+        for campo, valor in promedios.items():
+            setattr(promedio, campo, valor)
+        if not tiene_npk(promedio):
+            resultado['omitidas'].append({'predio': clave[0], 'semana_inicio': clave[1],
+                                          'error': 'Faltan datos de NPK en las mediciones de esta semana'})
+            continue
+        claves.append(clave)
+        por_calcular.append(promedio)
+
+    ahora = timezone.now()
+    nuevas, modificadas = [], []
+    for clave, (promedio, calculos, error) in zip(claves, MotorFertilizacion.calcular_lote(por_calcular)):
+        if error:
+            resultado['omitidas'].append({'predio': clave[0], 'semana_inicio': clave[1], 'error': error})
+            continue
+        agregado = agregados[clave]
+        valores = {
+            **{destino: getattr(promedio, campo) for campo, destino in PROMEDIOS.items()},
+            **calculos,
+            'cantidad_mediciones': agregado['cantidad'],
+            'max_medicion_id': agregado['max_medicion_id'],
+            'fecha_calculo': ahora,
+        }
+        recomendacion = existentes.get(clave)
+        if recomendacion is None:
+            recomendacion = Recomendacion(predio=promedio.predio, semana_inicio=clave[1], medicion=None, **valores)
+            nuevas.append(recomendacion)
+        else:
+            for campo, valor in valores.items():
+                setattr(recomendacion, campo, valor)
+            modificadas.append(recomendacion)
+        resultado['recomendaciones'][clave] = recomendacion
+
+    if nuevas:
+        Recomendacion.objects.bulk_create(nuevas, batch_size=TAMANO_LOTE)
+    if modificadas:
+        Recomendacion.objects.bulk_update(modificadas, list(valores), batch_size=TAMANO_LOTE)
+    resultado['creadas'], resultado['actualizadas'] = len(nuevas), len(modificadas)
+    return resultado
+
+
+def precalcular(desde, hasta, forzar=False, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Recalcula las recomendaciones semanales de todos los predios con mediciones
+    entre las semanas de `desde` y `hasta`, de a `tamano_bloque` predios: por
+    bloque, una consulta agrupada, el motor en lote y escrituras en bulk.
+    """
+    inicio_proceso = time.perf_counter()
+    semanas = semanas_entre(desde, hasta)
+    inicio, fin = rango_semanas(semanas)
+    predio_ids = list(
+        Medicion.objects.filter(fecha__gte=inicio, fecha__lt=fin)
+        .values_list('predio_id', flat=True).distinct().order_by('predio_id')
+    )
+
+    resumen = {'semanas': len(semanas), 'predios': len(predio_ids), 'creadas': 0,
+               'actualizadas': 0, 'al_dia': 0, 'omitidas': []}
+    for i in range(0, len(predio_ids), tamano_bloque):
+        predios = Predio.objects.in_bulk(predio_ids[i:i + tamano_bloque])
+        with transaction.atomic():
+            resultado = calcular_semanales(predios, semanas, forzar=forzar)
+        for clave in ('creadas', 'actualizadas', 'al_dia'):
+            resumen[clave] += resultado[clave]
+        resumen['omitidas'] += resultado['omitidas']
+
+    resumen['duracion_ms'] = round((time.perf_counter() - inicio_proceso) * 1000)
+    logger.info(
+        "Precálculo semanal %s..%s: %d predios, %d creadas, %d actualizadas, %d al día, %d omitidas en %dms",
+        semanas[0], semanas[-1], resumen['predios'], resumen['creadas'], resumen['actualizadas'],
+        resumen['al_dia'], len(resumen['omitidas']), resumen['duracion_ms']
+    )
+    return resumen
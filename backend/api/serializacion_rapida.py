@@ -0,0 +1,122 @@
+# backend/api/serializacion_rapida.py
+"""
+Camino rápido de solo lectura para respuestas grandes (series de tiempo).
+
+En vez de instanciar modelos y pasar cada campo por un ModelSerializer, se piden
+tuplas con values_list() y se arma cada fila con conversores precalculados por
+columna. La salida es idéntica a la del serializer equivalente:
+  - DecimalField -> string con sus decimal_places ('6.10', '0.5000')
+  - DateTimeField -> datetime en la zona horaria actual (orjson lo escribe en ISO 8601;
+    sin orjson se entrega ya formateado, igual que serializers.DateTimeField)
+"""
+from django.db.models import DateTimeField, DecimalField
+from django.utils import timezone
+
+from .metricas import medir_serializacion
+from .renderers import orjson
+
+
+# Nombre en la API -> ruta ORM (mismos campos que MedicionSerializer sin relaciones)
+CAMPOS_MEDICION = {
+    'id': 'id',
+    'predio': 'predio_id',
+    'predio_nombre': 'predio__nombre',
+    'predio_zona': 'predio__zona',
+    'fecha': 'fecha',
+    'ph': 'ph',
+    'temperatura': 'temperatura',
+    'humedad': 'humedad',
+    'nitrogeno': 'nitrogeno',
+    'fosforo': 'fosforo',
+    'potasio': 'potasio',
+    'origen': 'origen',
+}
+
+
+# Mismos campos planos que RecomendacionSerializer (sin predio_detalle)
+CAMPOS_RECOMENDACION = {
+    'id': 'id',
+    'medicion': 'medicion_id',
+    'predio': 'predio_id',
+    'semana_inicio': 'semana_inicio',
+    'fecha_calculo': 'fecha_calculo',
+    **{nombre: nombre for nombre in (
+        'ph_promedio', 'temp_promedio', 'humedad_promedio', 'n_promedio', 'p_promedio', 'k_promedio',
+        'urea_kg_ha', 'superfosfato_kg_ha', 'muriato_potasio_kg_ha', 'cal_kg_ha',
+        'urea_total', 'superfosfato_total', 'muriato_potasio_total', 'cal_total',
+        'factor_zona', 'factor_suelo', 'factor_precipitacion',
+    )},
+}
+
+
+def resolver_campo(model, ruta):
+    *relaciones, nombre = ruta.split('__')
+    for relacion in relaciones:
+        model = model._meta.get_field(relacion).related_model
+    return model._meta.get_field(nombre)
+
+
+def _isoformat(valor):
+    valor = valor.isoformat()
+    if valor.endswith('+00:00'):
+        valor = valor[:-6] + 'Z'
+    return valor
+
+
+class SerializadorFilas:
+    """
+    Equivalente plano y de solo lectura a un ModelSerializer.
+
+        rapido = SerializadorFilas(Medicion, CAMPOS_MEDICION, nombres=['fecha', 'nitrogeno'])
+        filas = rapido.filas(rapido.valores(queryset))
+    """
+
+    def __init__(self, model, campos, nombres=None):
+        self.model = model
+        self.nombres = tuple(n for n in campos if nombres is None or n in nombres)
+        self.rutas = tuple(campos[n] for n in self.nombres)
+        self._tipos = [self._tipo(resolver_campo(model, ruta)) for ruta in self.rutas]
+
+    @staticmethod
+    def _tipo(field):
+        if isinstance(field, DecimalField):
+            return ('decimal', '{:.%df}' % field.decimal_places)
+        if isinstance(field, DateTimeField):
+            return ('datetime', None)
+        return None
+
+    def valores(self, queryset):
+        return queryset.values_list(*self.rutas)
+
+    def _conversores(self, fechas_como_texto=False):
+        zona = timezone.get_current_timezone()
+        conversores = []
+        for i, tipo in enumerate(self._tipos):
+            if tipo is None:
+                continue
+            clase, formato = tipo
+            if clase == 'decimal':
+                conversores.append((i, formato.format))
+            elif orjson is not None and not fechas_como_texto:
+                conversores.append((i, lambda v, zona=zona: v.astimezone(zona)))
+            else:
+                conversores.append((i, lambda v, zona=zona: _isoformat(v.astimezone(zona))))
+        return conversores
+
+    def filas(self, tuplas, fechas_como_texto=False):
+        with medir_serializacion():
+            return self._filas(tuplas, fechas_como_texto)
+
+    def _filas(self, tuplas, fechas_como_texto):
+        nombres = self.nombres
+        conversores = self._conversores(fechas_como_texto)
+        resultado = []
+        for tupla in tuplas:
+            if conversores:
+                tupla = list(tupla)
+                for i, convertir in conversores:
+                    valor = tupla[i]
+                    if valor is not None:
+                        tupla[i] = convertir(valor)
+            resultado.append(dict(zip(nombres, tupla)))
+        return resultado
@@ -1,11 +1,53 @@
 # backend/api/serializers.py
 
 from rest_framework import serializers
-from .models import Predio, Medicion, Recomendacion, Profile
+from .metricas import medir_serializacion
+from .models import Predio, Medicion, Recomendacion, Profile, Reporte, Perfil
 from django.contrib.auth.models import User
 from datetime import datetime, timedelta
 
 
+class CamposDinamicosMixin:
+    """
+    Permite elegir qué campos y qué relaciones anidadas se serializan.
+
+    - fields: iterable de nombres a incluir (None = todos).
+    - expand: lista de relaciones de `Meta.expandable_fields` a incluir, con
+      notación de punto para anidar (ej. 'recomendacion.predio_detalle').
+      None = comportamiento por defecto (todas las relaciones declaradas).
+
+    Los ViewSets los obtienen de ?fields= y ?expand= (ver api/mixins.py).
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandibles = getattr(self.Meta, 'expandable_fields', {})
+
+        directos = {}
+        if expand is not None:
+            for ruta in expand:
+                nombre, _, resto = ruta.partition('.')
+                if nombre in expandibles:
+                    directos.setdefault(nombre, [])
+                    if resto:
+                        directos[nombre].append(resto)
+            for nombre, (serializer_class, field_kwargs) in expandibles.items():
+                if nombre in directos:
+                    self.fields[nombre] = serializer_class(expand=directos[nombre], **field_kwargs)
+                else:
+                    self.fields.pop(nombre, None)
+
+        if fields is not None:
+            permitidos = set(fields) | set(directos)
+            for nombre in list(self.fields):
+                if nombre not in permitidos:
+                    self.fields.pop(nombre)
+
+    def to_representation(self, instance):
+        with medir_serializacion():
+            return super().to_representation(instance)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -21,7 +63,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 
 
 
-class PredioSerializer(serializers.ModelSerializer):
+class PredioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Predio
         fields = ['id', 'nombre', 'superficie', 'zona', 'tipo_suelo', 
@@ -29,11 +71,14 @@ class PredioSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'fecha_creacion']
 
 
-class RecomendacionSerializer(serializers.ModelSerializer):
+class RecomendacionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     predio_detalle = PredioSerializer(source='predio', read_only=True) # Nested serializer for predio details
 
     class Meta:
         model = Recomendacion
+        expandable_fields = {
+            'predio_detalle': (PredioSerializer, {'source': 'predio', 'read_only': True}),
+        }
         fields = [
             'id', 'medicion', 'predio', 'predio_detalle', 'semana_inicio', 'fecha_calculo',
             'ph_promedio', 'temp_promedio', 'humedad_promedio', 'n_promedio', 'p_promedio', 'k_promedio',
@@ -43,13 +88,16 @@ class RecomendacionSerializer(serializers.ModelSerializer):
         ]
 
 
-class MedicionSerializer(serializers.ModelSerializer):
+class MedicionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     predio_nombre = serializers.CharField(source='predio.nombre', read_only=True)
     predio_zona = serializers.CharField(source='predio.zona', read_only=True)
     recomendacion = RecomendacionSerializer(read_only=True)
     
     class Meta:
         model = Medicion
+        expandable_fields = {
+            'recomendacion': (RecomendacionSerializer, {'read_only': True}),
+        }
         fields = ['id', 'predio', 'predio_nombre', 'predio_zona', 'fecha', 'ph', 'temperatura', 
                   'humedad', 'nitrogeno', 'fosforo', 'potasio', 'origen', 'recomendacion']
         read_only_fields = ['id', 'fecha']
@@ -109,5 +157,81 @@ class GenerarRecomendacionSemanalSerializer(serializers.Serializer):
     potasio = serializers.DecimalField(max_digits=10, decimal_places=4, required=False)
 
 
+class GenerarRecomendacionesSemanalesLoteSerializer(serializers.Serializer):
+    """Input para generar en una petición las semanas de varios predios (p. ej. una temporada)"""
+    predio_ids = serializers.ListField(child=serializers.IntegerField(), min_length=1, max_length=100)
+    semanas = serializers.ListField(child=serializers.DateField(), min_length=1, max_length=104)
+    forzar = serializers.BooleanField(default=False)
+
+
 class GenerarRecomendacionIndividualSerializer(serializers.Serializer):
-    medicion_id = serializers.IntegerField()
\ No newline at end of file
+    medicion_id = serializers.IntegerField()
+
+
+# ═══════════════════════════════════════════════════════
+# Reportes generados en el servidor (PDF / CSV)
+# ═══════════════════════════════════════════════════════
+
+class SolicitudReporteSerializer(serializers.Serializer):
+    tipo = serializers.ChoiceField(choices=['resumen', 'recomendacion'])
+    formato = serializers.ChoiceField(choices=['pdf', 'csv'], default='pdf')
+    # Resumen por predio
+    predios = serializers.ListField(child=serializers.IntegerField(), required=False)
+    desde = serializers.DateField(required=False, allow_null=True)
+    hasta = serializers.DateField(required=False, allow_null=True)
+    # Detalle de una recomendación
+    recomendacion = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        if data['tipo'] == 'recomendacion' and not data.get('recomendacion'):
+            raise serializers.ValidationError({'recomendacion': 'Requerido para el reporte de una recomendación.'})
+        return data
+
+    def parametros(self):
+        """Parámetros normalizados (orden y formato estables para la clave de caché)."""
+        data = self.validated_data
+        if data['tipo'] == 'recomendacion':
+            return {'recomendacion': data['recomendacion']}
+        return {
+            'predios': sorted(set(data.get('predios') or [])),
+            'desde': data['desde'].isoformat() if data.get('desde') else None,
+            'hasta': data['hasta'].isoformat() if data.get('hasta') else None,
+        }
+
+
+class ReporteSerializer(serializers.ModelSerializer):
+    url_descarga = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Reporte
+        fields = ['id', 'tipo', 'formato', 'parametros', 'estado', 'tamano', 'error',
+                  'duracion_ms', 'fecha_solicitud', 'fecha_generado', 'url_descarga']
+        read_only_fields = fields
+
+    def get_url_descarga(self, obj):
+        if obj.estado != 'listo':
+            return None
+        url = f'/api/reportes/{obj.id}/descargar/'
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+class PerfilSerializer(serializers.ModelSerializer):
+    usuario_email = serializers.CharField(source='usuario.email', read_only=True)
+    url_descarga = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Perfil
+        fields = ['id', 'usuario_email', 'metodo', 'ruta', 'vista', 'codigo', 'duracion_ms',
+                  'cantidad_consultas', 'tiempo_sql_ms', 'fecha', 'url_descarga']
+        read_only_fields = fields
+
+    def get_url_descarga(self, obj):
+        url = f'/api/perfiles/{obj.id}/descargar/'
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class PerfilDetalleSerializer(PerfilSerializer):
+    class Meta(PerfilSerializer.Meta):
+        fields = PerfilSerializer.Meta.fields + ['resumen']
+        read_only_fields = fields
@@ -1,7 +1,8 @@
 from django.db.models.signals import post_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from .models import Medicion, Predio, Profile, Recomendacion
+from .reportes import invalidar_reportes
 
 # @receiver(post_save, sender=User)
 # def create_or_update_user_profile(sender, instance, created, **kwargs):
@@ -14,3 +15,19 @@ from .models import Profile
 #     pass
 
 
+
+
+# Los reportes cacheados se identifican por una marca de datos (conteos e IDs
+# máximos, ver api/reportes.py). Una edición no cambia esa marca, así que
+# descarta los artefactos del usuario explícitamente.
+@receiver(post_save, sender=Predio)
+def invalidar_reportes_predio(sender, instance, created, **kwargs):
+    if not created:
+        invalidar_reportes(usuario_id=instance.usuario_id)
+
+
+@receiver(post_save, sender=Medicion)
+@receiver(post_save, sender=Recomendacion)
+def invalidar_reportes_medicion(sender, instance, created, **kwargs):
+    if not created and instance.predio_id:
+        invalidar_reportes(predio_id=instance.predio_id)
@@ -0,0 +1,171 @@
+# backend/api/stubs.py
+"""
+Servidores HTTP locales que imitan servicios de Supabase.
+Se usan en los tests y en los comandos de benchmark para no depender de la red.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def generar_clave(kid):
+    """Par de claves RSA de prueba; retorna (clave_privada, jwk_publico)."""
+    privada = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = jwt.algorithms.RSAAlgorithm.to_jwk(privada.public_key(), as_dict=True)
+    jwk.update({'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+    return privada, jwk
+
+
+def firmar(privada, kid, sub=None):
+    """Token RS256 con los claims que emite Supabase Auth."""
+    ahora = int(time.time())
+    payload = {
+        'sub': sub or str(uuid.uuid4()), 'aud': 'authenticated',
+        'iat': ahora, 'exp': ahora + 3600, 'email': 'bench@nutrisoil.cl',
+    }
+    return jwt.encode(payload, privada, algorithm='RS256', headers={'kid': kid})
+
+
+class ServidorStub:
+    """
+    Servidor HTTP en 127.0.0.1 con puerto libre, ejecutado en un hilo.
+    Las subclases implementan `responder(metodo, ruta, cuerpo)` -> (status, dict).
+
+    Uso:
+        with ServidorJWKSStub(jwks) as stub:
+            requests.get(stub.url + '/auth/v1/.well-known/jwks.json')
+    """
+
+    def __init__(self):
+        self.peticiones = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _atender(self, metodo):
+                largo = int(self.headers.get('Content-Length') or 0)
+                cuerpo = json.loads(self.rfile.read(largo) or b'null') if largo else None
+                with stub._lock:
+                    stub.peticiones.append((metodo, self.path, cuerpo))
+                status, data = stub.responder(metodo, self.path, cuerpo, self.headers)
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._atender('GET')
+
+            def do_POST(self):
+                self._atender('POST')
+
+            def do_PUT(self):
+                self._atender('PUT')
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def responder(self, metodo, ruta, cuerpo, headers):
+        return 404, {'error': 'not found'}
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def detener(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+
+class ServidorJWKSStub(ServidorStub):
+    """Publica un JWKS en /auth/v1/.well-known/jwks.json; `jwks` se puede reemplazar en caliente."""
+
+    RUTA = '/auth/v1/.well-known/jwks.json'
+
+    def __init__(self, jwks=None):
+        super().__init__()
+        self.jwks = jwks or {'keys': []}
+
+    @property
+    def jwks_url(self):
+        return self.url + self.RUTA
+
+    def responder(self, metodo, ruta, cuerpo, headers):
+        if metodo == 'GET' and ruta == self.RUTA:
+            return 200, self.jwks
+        return 404, {'error': 'not found'}
+
+    @property
+    def descargas(self):
+        return sum(1 for metodo, ruta, _ in self.peticiones if ruta == self.RUTA)
+
+
+class ServidorGoTrueStub(ServidorStub):
+    """
+    Imita /auth/v1/admin/users de GoTrue.
+    - `latencia`: segundos de espera por petición (para medir concurrencia).
+    - `fallos_503`: cantidad de respuestas 503 iniciales (para probar reintentos).
+    """
+
+    def __init__(self, latencia=0, fallos_503=0):
+        super().__init__()
+        self.latencia = latencia
+        self.fallos_503 = fallos_503
+        self.usuarios = {}
+        self.baneados = set()
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+
+    def responder(self, metodo, ruta, cuerpo, headers):
+        with self._lock:
+            self.en_vuelo += 1
+            self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        try:
+            if self.latencia:
+                time.sleep(self.latencia)
+            with self._lock:
+                if self.fallos_503 > 0:
+                    self.fallos_503 -= 1
+                    return 503, {'msg': 'Service Unavailable'}
+                if not headers.get('Authorization', '').startswith('Bearer '):
+                    return 401, {'msg': 'No autorizado'}
+                if metodo == 'POST' and ruta == '/auth/v1/admin/users':
+                    email = (cuerpo or {}).get('email')
+                    if email in self.usuarios.values():
+                        return 422, {'msg': 'A user with this email address has already been registered'}
+                    user_id = str(uuid.uuid4())
+                    self.usuarios[user_id] = email
+                    return 200, {'id': user_id, 'email': email}
+                if metodo == 'PUT' and ruta.startswith('/auth/v1/admin/users/'):
+                    user_id = ruta.rsplit('/', 1)[-1]
+                    if user_id not in self.usuarios:
+                        return 404, {'msg': 'User not found'}
+                    self.baneados.add(user_id)
+                    return 200, {'id': user_id, 'email': self.usuarios[user_id]}
+            return 404, {'msg': 'not found'}
+        finally:
+            with self._lock:
+                self.en_vuelo -= 1
@@ -0,0 +1,133 @@
+# backend/api/supabase_admin.py
+"""
+Cliente HTTP compartido para la API de administración de Supabase Auth (GoTrue).
+
+Reutiliza conexiones (pool de requests.Session), aplica timeouts y reintentos
+acotados, y permite crear usuarios en paralelo con concurrencia limitada.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class SupabaseAdminError(Exception):
+    """Error devuelto por la API de administración de Supabase."""
+
+    def __init__(self, mensaje, status_code=None):
+        super().__init__(mensaje)
+        self.status_code = status_code
+
+
+class SupabaseAdminClient:
+    def __init__(self, base_url=None, service_key=None, timeout=None,
+                 max_retries=None, pool_size=None, max_workers=None):
+        self.base_url = (base_url or settings.SUPABASE_URL or '').rstrip('/')
+        self.service_key = service_key or os.environ.get("SUPABASE_SERVICE_KEY")
+        self.timeout = timeout or settings.SUPABASE_ADMIN_TIMEOUT
+        self.max_workers = max_workers or settings.SUPABASE_ADMIN_MAX_WORKERS
+        pool_size = pool_size or max(self.max_workers, 10)
+        max_retries = settings.SUPABASE_ADMIN_MAX_RETRIES if max_retries is None else max_retries
+
+        # Reintentos solo ante errores transitorios. POST no es idempotente:
+        # se reintenta si la conexión falla antes de enviar la petición o si
+        # GoTrue responde 429/503 (la petición no fue procesada).
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=0.3,
+            status_forcelist=[429, 503],
+            allowed_methods=frozenset(['GET', 'PUT', 'DELETE', 'POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _headers(self):
+        if not self.service_key:
+            raise SupabaseAdminError("SUPABASE_SERVICE_KEY no está configurada")
+        return {
+            "apikey": self.service_key,
+            "Authorization": f"Bearer {self.service_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _request(self, method, path, payload):
+        try:
+            response = self.session.request(
+                method, f"{self.base_url}/auth/v1{path}",
+                json=payload, headers=self._headers(), timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise SupabaseAdminError(f"Error de conexión con Supabase: {e}")
+        if response.status_code not in (200, 201):
+            raise SupabaseAdminError(
+                f"Error Supabase API ({response.status_code}): {response.text}",
+                status_code=response.status_code
+            )
+        try:
+            return response.json()
+        except ValueError:
+            raise SupabaseAdminError(
+                f"Respuesta no JSON de Supabase ({response.status_code}): {response.text[:200]}",
+                status_code=response.status_code
+            )
+
+    def create_user(self, email, password):
+        """Crea un usuario confirmado y retorna su ID de Supabase."""
+        user_data = self._request('POST', '/admin/users', {
+            "email": email,
+            "password": password,
+            "email_confirm": True
+        })
+        if not isinstance(user_data, dict):
+            raise SupabaseAdminError(f"Respuesta inesperada de Supabase: {str(user_data)[:200]}")
+        # GoTrue /admin/users devuelve el objeto usuario; por si acaso viene envuelto.
+        envuelto = user_data.get('user')
+        supabase_id = user_data.get('id') or (envuelto.get('id') if isinstance(envuelto, dict) else None)
+        if not supabase_id:
+            raise SupabaseAdminError(f"No se pudo obtener ID de usuario: {user_data}")
+        return supabase_id
+
+    def ban_user(self, user_id, duration="876000h"):
+        """Suspende al usuario en Supabase Auth (por defecto 100 años)."""
+        return self._request('PUT', f'/admin/users/{user_id}', {"ban_duration": duration})
+
+    def create_users(self, usuarios):
+        """
+        Crea varios usuarios en paralelo con a lo más `max_workers` peticiones en vuelo.
+        `usuarios` es una lista de (email, password). Retorna una lista en el mismo
+        orden con ('ok', supabase_id) o ('error', mensaje) para cada uno.
+        """
+        def _crear(usuario):
+            email, password = usuario
+            try:
+                return ('ok', self.create_user(email, password))
+            except SupabaseAdminError as e:
+                return ('error', str(e))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(_crear, usuarios))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_admin_client():
+    """Cliente compartido por el proceso (un solo pool de conexiones)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SupabaseAdminClient()
+    return _client
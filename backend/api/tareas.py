@@ -0,0 +1,213 @@
+# backend/api/tareas.py
+"""
+Cola de tareas local respaldada por la tabla `tareas`.
+
+- encolar(): se llama dentro de la transacción de la escritura que origina la
+  tarea; con `clave` hay a lo más una tarea viva por clave (idempotencia).
+- tomar(): reserva un lote con SELECT ... FOR UPDATE SKIP LOCKED, así varios
+  workers pueden correr en paralelo sin tomar la misma tarea.
+- ejecutar(): corre el handler; si falla se reintenta con backoff exponencial
+  hasta `max_intentos`, luego queda como fallida.
+
+El worker es el comando `python manage.py procesar_tareas`.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Medicion, Tarea
+from .recomendaciones import calcular_y_guardar, tiene_npk
+
+logger = logging.getLogger(__name__)
+
+TERMINADAS = ('completada', 'fallida')
+
+HANDLERS = {}
+
+
+def registrar(tipo):
+    """Decorador: registra el handler de un tipo de tarea. Recibe el payload como kwargs."""
+    def decorador(funcion):
+        HANDLERS[tipo] = funcion
+        return funcion
+    return decorador
+
+
+# ═══════════════════════════════════════════════════════
+# PRODUCTOR
+# ═══════════════════════════════════════════════════════
+
+def encolar(tipo, payload, clave=None, max_intentos=None):
+    ahora = timezone.now()
+    valores = {
+        'tipo': tipo, 'payload': payload, 'disponible_en': ahora, 'fecha_encolado': ahora,
+        'max_intentos': max_intentos or settings.TAREAS_MAX_INTENTOS,
+    }
+    if clave is None:
+        return Tarea.objects.create(**valores)
+
+    tarea, creada = Tarea.objects.get_or_create(clave=clave, defaults=valores)
+    if creada or tarea.estado == 'pendiente':
+        return tarea  # Ya está en cola: no se duplica
+    # Terminada: se reactiva. En proceso: se repite al terminar (los datos cambiaron)
+    reactivada = Tarea.objects.filter(pk=tarea.pk, estado__in=TERMINADAS).update(
+        estado='pendiente', payload=payload, intentos=0, error='', repetir=False,
+        disponible_en=ahora, fecha_encolado=ahora, fecha_inicio=None, fecha_fin=None,
+    )
+    if not reactivada:
+        Tarea.objects.filter(pk=tarea.pk, estado='procesando').update(repetir=True)
+    return tarea
+
+
+def encolar_recomendacion(medicion_id):
+    return encolar('recomendacion', {'medicion': medicion_id}, clave=f'recomendacion:{medicion_id}')
+
+
+# ═══════════════════════════════════════════════════════
+# WORKER
+# ═══════════════════════════════════════════════════════
+
+def tomar(limite, worker='', tipos=None):
+    """Reserva hasta `limite` tareas disponibles y las marca como en proceso."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        disponibles = Tarea.objects.select_for_update(skip_locked=True).filter(
+            estado='pendiente', disponible_en__lte=ahora
+        )
+        if tipos:
+            disponibles = disponibles.filter(tipo__in=tipos)
+        tareas = list(disponibles.order_by('disponible_en', 'id')[:limite])
+        if tareas:
+            Tarea.objects.filter(pk__in=[t.pk for t in tareas]).update(
+                estado='procesando', intentos=F('intentos') + 1, fecha_inicio=ahora, worker=worker
+            )
+    for tarea in tareas:
+        tarea.estado, tarea.intentos, tarea.fecha_inicio, tarea.worker = 'procesando', tarea.intentos + 1, ahora, worker
+    return tareas
+
+
+def _backoff(intentos):
+    espera = min(settings.TAREAS_BACKOFF_BASE * 2 ** (intentos - 1), settings.TAREAS_BACKOFF_MAX)
+    return timedelta(seconds=espera * random.uniform(0.9, 1.1))
+
+
+def ejecutar(tarea):
+    """Ejecuta una tarea ya tomada. Retorna True si terminó bien."""
+    handler = HANDLERS.get(tarea.tipo)
+    try:
+        if handler is None:
+            raise LookupError(f"Tipo de tarea sin handler: {tarea.tipo}")
+        with transaction.atomic():
+            handler(**tarea.payload)
+    except Exception as e:
+        ahora = timezone.now()
+        error = ''.join(traceback.format_exception_only(type(e), e)).strip()[:2000]
+        if tarea.intentos >= tarea.max_intentos:
+            logger.error("Tarea %s (%s) fallida tras %d intentos: %s", tarea.pk, tarea.tipo, tarea.intentos, error)
+            Tarea.objects.filter(pk=tarea.pk).update(estado='fallida', error=error, fecha_fin=ahora)
+        else:
+            logger.warning("Tarea %s (%s) intento %d falló, se reintenta: %s", tarea.pk, tarea.tipo, tarea.intentos, error)
+            Tarea.objects.filter(pk=tarea.pk).update(
+                estado='pendiente', error=error, disponible_en=ahora + _backoff(tarea.intentos)
+            )
+        return False
+
+    ahora = timezone.now()
+    completada = Tarea.objects.filter(pk=tarea.pk, repetir=False).update(
+        estado='completada', error='', fecha_fin=ahora
+    )
+    if not completada:  # Se volvió a encolar mientras corría
+        Tarea.objects.filter(pk=tarea.pk).update(
+            estado='pendiente', repetir=False, intentos=0, disponible_en=ahora, fecha_encolado=ahora, fecha_fin=ahora
+        )
+    return True
+
+
+def recuperar_huerfanas():
+    """Devuelve a la cola las tareas de workers que murieron a mitad de proceso."""
+    ahora = timezone.now()
+    limite = ahora - timedelta(seconds=settings.TAREAS_TIMEOUT_PROCESANDO)
+    return Tarea.objects.filter(estado='procesando', fecha_inicio__lt=limite).update(
+        estado='pendiente', disponible_en=ahora, error='Worker interrumpido (timeout)'
+    )
+
+
+def purgar_completadas(dias=None):
+    dias = settings.TAREAS_RETENCION_DIAS if dias is None else dias
+    borradas, _ = Tarea.objects.filter(
+        estado='completada', fecha_fin__lt=timezone.now() - timedelta(days=dias)
+    ).delete()
+    return borradas
+
+
+# ═══════════════════════════════════════════════════════
+# MÉTRICAS
+# ═══════════════════════════════════════════════════════
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return round(valores[indice], 3)
+
+
+def metricas(ventana_minutos=60, muestra=1000):
+    """
+    Profundidad de la cola y latencias recientes:
+    - espera: encolado -> inicio; ejecución: inicio -> fin; latencia: encolado -> fin.
+    """
+    ahora = timezone.now()
+    por_estado = dict(Tarea.objects.values_list('estado').annotate(n=Count('id')).order_by())
+    cola = {
+        fila['tipo']: {'pendientes': fila['n'], 'mas_antigua': fila['mas_antigua']}
+        for fila in Tarea.objects.filter(estado='pendiente', disponible_en__lte=ahora)
+        .values('tipo').annotate(n=Count('id'), mas_antigua=Min('fecha_encolado')).order_by()
+    }
+    mas_antigua = min((c['mas_antigua'] for c in cola.values()), default=None)
+
+    recientes = list(
+        Tarea.objects.filter(estado='completada', fecha_fin__gte=ahora - timedelta(minutes=ventana_minutos))
+        .order_by('-fecha_fin').values_list('fecha_encolado', 'fecha_inicio', 'fecha_fin')[:muestra]
+    )
+    espera = sorted((inicio - encolado).total_seconds() for encolado, inicio, _ in recientes)
+    ejecucion = sorted((fin - inicio).total_seconds() for _, inicio, fin in recientes)
+    latencia = sorted((fin - encolado).total_seconds() for encolado, _, fin in recientes)
+
+    return {
+        'por_estado': {estado: por_estado.get(estado, 0) for estado, _ in Tarea._meta.get_field('estado').choices},
+        'profundidad': sum(c['pendientes'] for c in cola.values()),
+        'profundidad_por_tipo': {tipo: c['pendientes'] for tipo, c in cola.items()},
+        'antiguedad_max_s': round((ahora - mas_antigua).total_seconds(), 3) if mas_antigua else 0,
+        'ventana_minutos': ventana_minutos,
+        'completadas_ventana': len(recientes),
+        'espera_p50_s': _percentil(espera, 50),
+        'espera_p95_s': _percentil(espera, 95),
+        'ejecucion_p50_s': _percentil(ejecucion, 50),
+        'ejecucion_p95_s': _percentil(ejecucion, 95),
+        'latencia_p95_s': _percentil(latencia, 95),
+    }
+
+
+# ═══════════════════════════════════════════════════════
+# HANDLERS
+# ═══════════════════════════════════════════════════════
+
+@registrar('recomendacion')
+def tarea_recomendacion(medicion):
+    """Calcula (o recalcula) la recomendación de una medición. Idempotente."""
+    medicion = Medicion.objects.select_related('predio').filter(pk=medicion).first()
+    if medicion is None or not tiene_npk(medicion):
+        return  # Eliminada o editada sin NPK: nada que hacer
+    calcular_y_guardar(medicion)
+
+
+@registrar('reporte')
+def tarea_reporte(reporte):
+    from .reportes import generar_reporte  # reportes encola en esta cola
+    generar_reporte(reporte)
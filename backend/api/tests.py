@@ -1,3 +1,1433 @@
-from django.test import TestCase
+import io
+import json
+import marshal
+import random
+import threading
+import time
+import zipfile
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import jwt
+import requests
+from asgiref.sync import async_to_sync
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpRequest
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .auth_utils import JWKSCache, jwks_cache, token_cache
+from .authentication import SupabaseAuthentication
+from .anomalias import BITS
+from .lecturas import cargar_lecturas
+from .carga import GeneradorCarga, limpiar, sembrar
+from .dispositivos import aplicar_secuencia, identificador
+from .exportacion import Exportacion
+from .metricas import REGISTRO
+from .models import (
+    Dispositivo, EstadisticaSensor, IndicadorPredio, Medicion, Perfil, Predio, Profile, Pronostico, Recomendacion,
+    Reporte, ResumenDiario, Tarea,
+)
+from . import asincronia, replicas, reportes, views_async
+from .renderers import ORJSONRenderer
+from .serializacion_rapida import CAMPOS_MEDICION, SerializadorFilas
+from .pronosticos import holt, np
+from .resumenes import recalcular
+from .semanal import calcular_semanales, precalcular
+from .serializers import MedicionSerializer, PromedioSemanalSerializer
+from .stubs import ServidorGoTrueStub, ServidorJWKSStub, firmar, generar_clave
+from .supabase_admin import SupabaseAdminClient, SupabaseAdminError
+from .tareas import ejecutar, encolar_recomendacion, tomar
+
+JWT_SECRET = 'secreto-de-pruebas-con-32-bytes-o-mas'
+
+
+def token_hs256(profile):
+    ahora = int(time.time())
+    payload = {'sub': str(profile.id), 'email': profile.email, 'aud': 'authenticated',
+               'iat': ahora, 'exp': ahora + 3600}
+    return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
+
+
+def crear_mediciones(predio, cantidad, con_recomendacion=True):
+    mediciones = Medicion.objects.bulk_create([
+        Medicion(predio=predio, ph=Decimal('6.10'), temperatura=Decimal('15.00'), humedad=Decimal('45.00'),
+                 nitrogeno=Decimal('20.00'), fosforo=Decimal('15.00'), potasio=Decimal('0.5000'))
+        for _ in range(cantidad)
+    ])
+    if con_recomendacion:
+        cero = Decimal('0')
+        Recomendacion.objects.bulk_create([
+            Recomendacion(
+                medicion=m, predio=predio, ph_promedio=m.ph, temp_promedio=m.temperatura,
+                humedad_promedio=m.humedad, n_promedio=m.nitrogeno, p_promedio=m.fosforo,
+                k_promedio=m.potasio, urea_kg_ha=cero, superfosfato_kg_ha=cero,
+                muriato_potasio_kg_ha=cero, cal_kg_ha=cero, urea_total=cero, superfosfato_total=cero,
+                muriato_potasio_total=cero, cal_total=cero, factor_zona=Decimal('1.1'),
+                factor_suelo=Decimal('2.5'), factor_precipitacion=Decimal('1.1'),
+            ) for m in mediciones
+        ])
+    return mediciones
+
+
+def cliente_autenticado(profile):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_hs256(profile)}')
+    return client
+
+
+class JWKSCacheTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.privada, cls.jwk = generar_clave('kid-1')
+        cls.privada_2, cls.jwk_2 = generar_clave('kid-2')
+
+    def setUp(self):
+        self.stub = ServidorJWKSStub({'keys': [self.jwk]}).iniciar()
+        self.addCleanup(self.stub.detener)
+        self.cache = JWKSCache(url=self.stub.jwks_url, ttl=600, min_refetch_interval=0)
+
+    def test_claves_parseadas_una_sola_vez(self):
+        for _ in range(5):
+            self.assertEqual(self.cache.get_key('kid-1').algorithm_name, 'RS256')
+        self.assertEqual(self.stub.descargas, 1)
+
+    def test_kid_desconocido_refetch_una_vez(self):
+        self.cache.get_key('kid-1')
+        self.stub.jwks = {'keys': [self.jwk, self.jwk_2]}
+        self.assertIsNotNone(self.cache.get_key('kid-2'))
+        self.assertEqual(self.stub.descargas, 2)
+        self.assertIsNone(self.cache.get_key('kid-inexistente'))
+        self.assertEqual(self.stub.descargas, 3)
+
+    def test_kid_desconocido_respeta_intervalo_minimo(self):
+        self.cache.min_refetch_interval = 60
+        self.cache.get_key('kid-1')
+        for _ in range(3):
+            self.assertIsNone(self.cache.get_key('kid-inexistente'))
+        self.assertEqual(self.stub.descargas, 1)
+
+    def test_fallo_inicial_no_se_cachea(self):
+        cache = JWKSCache(url=self.stub.url + '/no-existe', min_refetch_interval=0)
+        self.assertIsNone(cache.get_key('kid-1'))
+        cache._url = self.stub.jwks_url
+        self.assertIsNotNone(cache.get_key('kid-1'))
+
+    def test_fallo_conserva_claves_anteriores(self):
+        self.cache.get_key('kid-1')
+        self.cache._url = self.stub.url + '/no-existe'
+        self.assertFalse(self.cache.refresh(force=True))
+        self.assertIsNotNone(self.cache.get_key('kid-1'))
+
+    def test_refresh_en_segundo_plano_al_vencer_ttl(self):
+        self.cache.ttl = 0
+        self.cache.get_key('kid-1')
+        self.stub.jwks = {'keys': [self.jwk, self.jwk_2]}
+        self.assertIsNotNone(self.cache.get_key('kid-1'))  # Sirve la clave vieja sin esperar
+        for _ in range(100):
+            if 'kid-2' in self.cache._keys:
+                break
+            time.sleep(0.01)
+        self.assertIn('kid-2', self.cache._keys)
+
+    def test_autenticacion_rs256(self):
+        token = firmar(self.privada, 'kid-1', sub='abc')
+        token_cache.clear()
+        jwks_cache.clear()
+        self.addCleanup(jwks_cache.clear)
+        with override_settings(SUPABASE_JWKS_URL=self.stub.jwks_url):
+            payload = SupabaseAuthentication().decodificar_token(token)
+        self.assertEqual(payload['sub'], 'abc')
+
+
+class SupabaseAdminClientTests(SimpleTestCase):
+    def cliente(self, stub, **kwargs):
+        return SupabaseAdminClient(base_url=stub.url, service_key='service', **kwargs)
+
+    def test_altas_en_paralelo_con_concurrencia_acotada(self):
+        with ServidorGoTrueStub(latencia=0.05) as stub:
+            usuarios = [(f'u{i}@coop.cl', 'clave123') for i in range(20)]
+            inicio = time.perf_counter()
+            resultados = self.cliente(stub, max_workers=4).create_users(usuarios)
+            duracion = time.perf_counter() - inicio
+        self.assertTrue(all(estado == 'ok' for estado, _ in resultados))
+        self.assertLessEqual(stub.max_en_vuelo, 4)
+        self.assertLess(duracion, 20 * 0.05)
+
+    def test_reintenta_ante_503(self):
+        with ServidorGoTrueStub(fallos_503=2) as stub:
+            supabase_id = self.cliente(stub, max_retries=2).create_user('a@coop.cl', 'clave123')
+        self.assertIn(supabase_id, stub.usuarios)
+
+    def test_respuesta_invalida_es_error_por_usuario(self):
+        cuerpos = iter([b'<html>502 Bad Gateway</html>', b'["sin", "objeto"]', b'{"user": "x"}', b'{"id": "abc"}'])
+
+        def responder(metodo, url, **kwargs):
+            response = requests.Response()
+            response.status_code, response._content = 200, next(cuerpos)
+            return response
+
+        with ServidorGoTrueStub() as stub:
+            cliente = self.cliente(stub, max_workers=1)
+            with mock.patch.object(cliente.session, 'request', side_effect=responder):
+                resultados = cliente.create_users([(f'r{i}@coop.cl', 'clave123') for i in range(4)])
+        self.assertEqual([estado for estado, _ in resultados], ['error'] * 3 + ['ok'])
+        self.assertEqual(resultados[3], ('ok', 'abc'))
+
+    def test_error_por_usuario_duplicado(self):
+        with ServidorGoTrueStub() as stub:
+            cliente = self.cliente(stub)
+            cliente.create_user('a@coop.cl', 'clave123')
+            with self.assertRaises(SupabaseAdminError) as ctx:
+                cliente.create_user('a@coop.cl', 'clave123')
+        self.assertEqual(ctx.exception.status_code, 422)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class AdminBulkUsersTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.admin = Profile.objects.create(id=uuid.uuid4(), email='admin@nutrisoil.cl', role='admin')
+        self.stub = ServidorGoTrueStub().iniciar()
+        self.addCleanup(self.stub.detener)
+        cliente = SupabaseAdminClient(base_url=self.stub.url, service_key='service')
+        patcher = mock.patch('api.views_admin.get_admin_client', return_value=cliente)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_alta_masiva_reporta_resultado_por_usuario(self):
+        Profile.objects.create(id=uuid.uuid4(), email='existente@coop.cl')
+        self.stub.usuarios['x'] = 'existente@coop.cl'
+        usuarios = [{'new_email': f'socio{i}@coop.cl', 'password': 'clave123', 'nombre': f'Socio {i}'}
+                    for i in range(5)]
+        usuarios += [{'new_email': 'existente@coop.cl', 'password': 'clave123'},
+                     {'new_email': 'sin-clave@coop.cl'},
+                     {'new_email': 12345, 'password': 'clave123'},
+                     {'new_email': 'lista@coop.cl', 'password': ['clave123']}]
+        response = cliente_autenticado(self.admin).post(
+            '/api/admin/users/bulk/', {'usuarios': usuarios}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['creados'], 5)
+        self.assertEqual([r['status'] for r in response.data['resultados']], ['ok'] * 5 + ['error'] * 4)
+        self.assertEqual(Profile.objects.filter(email__startswith='socio').count(), 5)
+
+    def test_alta_masiva_solo_admin(self):
+        usuario = Profile.objects.create(id=uuid.uuid4(), email='u@coop.cl')
+        response = cliente_autenticado(usuario).post(
+            '/api/admin/users/bulk/', {'usuarios': [{'new_email': 'a@b.cl', 'password': 'x'}]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class ConsultasAcotadasTests(TestCase):
+    """El número de consultas no debe crecer con la cantidad de mediciones (N+1)."""
+
+    TAMANOS = (10, 100, 1000)
+
+    def contar_consultas(self, url, cantidad):
+        token_cache.clear()
+        profile = Profile.objects.create(id=uuid.uuid4(), email=f'p{cantidad}@nutrisoil.cl')
+        for i in range(3):
+            predio = Predio.objects.create(usuario=profile, nombre=f'Predio {i}', superficie=Decimal('10'),
+                                           zona='Osorno', tipo_suelo='Andisol', cultivo_actual='Papa temprana')
+            crear_mediciones(predio, cantidad // 3 + (cantidad % 3 if i == 0 else 0))
+        client = cliente_autenticado(profile)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConsultasConstantes(self, url):
+        consultas = {n: self.contar_consultas(url, n) for n in self.TAMANOS}
+        self.assertEqual(len(set(consultas.values())), 1, consultas)
+
+    def test_listado_mediciones(self):
+        self.assertConsultasConstantes('/api/mediciones/?page_size=100&expand=recomendacion.predio_detalle')
+
+    def test_dashboard_stats(self):
+        self.assertConsultasConstantes('/api/dashboard/stats/')
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class FiltroFechasTests(TestCase):
+    def test_rango_local_sobre_la_columna(self):
+        profile = Profile.objects.create(id=uuid.uuid4(), email='fechas@nutrisoil.cl')
+        predio = Predio.objects.create(usuario=profile, nombre='Fundo', superficie=Decimal('1'))
+        zona = timezone.get_current_timezone()
+        fechas = [datetime(2025, 3, 9, 23, 30), datetime(2025, 3, 10, 0, 0), datetime(2025, 3, 10, 23, 59)]
+        mediciones = crear_mediciones(predio, len(fechas), con_recomendacion=False)
+        for medicion, fecha in zip(mediciones, fechas):
+            medicion.fecha = timezone.make_aware(fecha, zona)
+        Medicion.objects.bulk_update(mediciones, ['fecha'])
+        client = cliente_autenticado(profile)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/mediciones/?fecha__gte=2025-03-10&fecha__lte=2025-03-10')
+        self.assertEqual(sorted(m['id'] for m in response.json()['results']), [m.id for m in mediciones[1:]])
+        sql = next(q['sql'] for q in ctx.captured_queries if 'FROM "mediciones"' in q['sql'] and 'LIMIT' in q['sql'])
+        self.assertNotIn('django_datetime_cast_date', sql)  # Sin cast sobre la columna
+
+        response = client.get('/api/mediciones/?fecha__lte=2025-03-09')
+        self.assertEqual([m['id'] for m in response.json()['results']], [mediciones[0].id])
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class LecturasCompactasTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='lecturas@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='Fundo', superficie=Decimal('2'))
+        rnd = random.Random(3)
+        inicio = datetime(2025, 4, 5, 22, 0, tzinfo=dt_timezone.utc)  # Sábado: dos semanas UTC en pocas horas
+        mediciones = []
+        for i in range(40):
+            m = Medicion(predio=self.predio, ph=Decimal(f'{rnd.uniform(4.5, 8):.2f}'),
+                         temperatura=Decimal(f'{rnd.uniform(2, 30):.2f}'), humedad=Decimal(f'{rnd.uniform(10, 95):.2f}'),
+                         nitrogeno=Decimal(f'{rnd.uniform(1, 60):.2f}') if i % 3 else None,
+                         fosforo=Decimal(f'{rnd.uniform(1, 40):.2f}') if i % 3 else None,
+                         potasio=Decimal(f'{rnd.uniform(0.05, 1.5):.4f}') if i % 3 else None)
+            mediciones.append(m)
+        Medicion.objects.bulk_create(mediciones)
+        for i, m in enumerate(mediciones):
+            m.fecha = inicio + timedelta(hours=i * 7, microseconds=i * 13)
+        Medicion.objects.bulk_update(mediciones, ['fecha'])
+
+    def esperado(self):
+        """Algoritmo anterior: instancias de Medicion y float(Decimal)."""
+        grupos = {}
+        for m in Medicion.objects.filter(predio=self.predio).order_by('fecha'):
+            grupos.setdefault(m.get_semana_inicio(), []).append(m)
+        resultado = []
+        for semana, grupo in sorted(grupos.items(), reverse=True):
+            fila = {'semana_inicio': semana, 'predio_id': self.predio.id, 'predio_nombre': self.predio.nombre,
+                    'cantidad_mediciones': len(grupo), 'fecha_primera': min(m.fecha for m in grupo),
+                    'fecha_ultima': max(m.fecha for m in grupo)}
+            for campo in ('ph', 'temperatura', 'humedad', 'nitrogeno', 'fosforo', 'potasio'):
+                valores = [getattr(m, campo) for m in grupo if getattr(m, campo) is not None]
+                fila[f'{campo}_promedio'] = round(sum(float(v) for v in valores) / len(valores), 2) if valores else None
+            resultado.append(fila)
+        return PromedioSemanalSerializer(resultado, many=True).data
+
+    def test_promedios_semanales_identicos(self):
+        response = cliente_autenticado(self.profile).get(f'/api/mediciones/promedios-semanales/?predio={self.predio.id}')
+        self.assertEqual(response.status_code, 200)
+        datos = response.json()
+        self.assertGreater(len(datos), 1)
+        self.assertEqual(datos, json.loads(ORJSONRenderer().render(self.esperado())))
+
+    def test_lote_compacto(self):
+        lote = cargar_lecturas(Medicion.objects.filter(predio=self.predio).order_by('fecha'), chunk_size=7)
+        mediciones = list(Medicion.objects.filter(predio=self.predio).order_by('fecha'))
+        self.assertEqual(len(lote), 40)
+        for lectura, medicion in zip(lote, mediciones):
+            self.assertEqual((lectura.id, lectura.predio_id, lectura.fecha), (medicion.id, self.predio.id, medicion.fecha))
+            self.assertEqual(lectura.ph, float(medicion.ph))
+            self.assertEqual(lectura.potasio, None if medicion.potasio is None else float(medicion.potasio))
+        self.assertEqual(lote.bytes(), 40 * (3 * 8 + 6 * 8))
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class CamposDinamicosTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='campos@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='Los Alerces', superficie=Decimal('5'),
+                                            zona='Osorno', tipo_suelo='Andisol', cultivo_actual='Papa temprana')
+        crear_mediciones(self.predio, 3)
+        self.client = cliente_autenticado(self.profile)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        return response.data, sql
+
+    def test_listado_sin_relaciones_por_defecto(self):
+        data, sql = self.get('/api/mediciones/')
+        self.assertNotIn('recomendacion', data['results'][0])
+        self.assertNotIn('"recomendaciones"', sql)
+
+    def test_fields_restringe_payload_y_columnas(self):
+        data, sql = self.get('/api/mediciones/?fields=fecha,nitrogeno')
+        self.assertEqual(set(data['results'][0]), {'fecha', 'nitrogeno'})
+        self.assertNotIn('"mediciones"."potasio"', sql)
+        self.assertNotIn('"predios"."nombre"', sql)
+
+    def test_expand_anidado(self):
+        data, _ = self.get('/api/mediciones/?expand=recomendacion')
+        recomendacion = data['results'][0]['recomendacion']
+        self.assertNotIn('predio_detalle', recomendacion)
+        data, _ = self.get('/api/mediciones/?expand=recomendacion.predio_detalle')
+        self.assertEqual(data['results'][0]['recomendacion']['predio_detalle']['nombre'], 'Los Alerces')
+
+    def test_detalle_conserva_relaciones(self):
+        medicion = Medicion.objects.filter(predio=self.predio).first()
+        data, _ = self.get(f'/api/mediciones/{medicion.id}/')
+        self.assertIn('predio_detalle', data['recomendacion'])
+
+    def test_recomendaciones_y_predios(self):
+        data, sql = self.get('/api/recomendaciones/')
+        self.assertNotIn('predio_detalle', data[0])
+        self.assertNotIn('"predios"."nombre"', sql)
+        data, _ = self.get('/api/recomendaciones/?expand=predio_detalle&fields=id,predio_detalle')
+        self.assertEqual(set(data[0]), {'id', 'predio_detalle'})
+        data, _ = self.get('/api/predios/?fields=id,nombre')
+        self.assertEqual(data, [{'id': self.predio.id, 'nombre': 'Los Alerces'}])
+
+
+class SerializacionRapidaTests(TestCase):
+    def test_salida_identica_al_serializer(self):
+        profile = Profile.objects.create(id=uuid.uuid4(), email='rapido@nutrisoil.cl')
+        predio = Predio.objects.create(usuario=profile, nombre='Ñuble Bajo', superficie=Decimal('5'),
+                                       zona='Río Bueno', tipo_suelo='Ultisol')
+        crear_mediciones(predio, 5, con_recomendacion=False)
+        Medicion.objects.create(predio=predio, humedad=Decimal('40.5'), origen='wemos')
+        queryset = Medicion.objects.select_related('predio').order_by('-fecha')
+
+        rapido = SerializadorFilas(Medicion, CAMPOS_MEDICION)
+        esperado = JSONRenderer().render(MedicionSerializer(queryset, many=True, expand=[]).data)
+        self.assertEqual(ORJSONRenderer().render(rapido.filas(rapido.valores(queryset))), esperado)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class ExportacionTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='export@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='El Roble', superficie=Decimal('8'),
+                                            zona='Osorno', tipo_suelo='Andisol')
+        crear_mediciones(self.predio, 25)
+        otro = Profile.objects.create(id=uuid.uuid4(), email='otro@nutrisoil.cl')
+        crear_mediciones(Predio.objects.create(usuario=otro, nombre='Ajeno', superficie=Decimal('1'),
+                                               zona='Osorno', tipo_suelo='Andisol'), 5)
+        self.client = cliente_autenticado(self.profile)
+
+    def descargar(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_en_bloques(self):
+        bloques = list(Exportacion('mediciones', self.profile, formato='csv', chunk_size=10).bytes())
+        self.assertEqual(len(bloques), 3)  # 10 + 10 + 5 filas, encabezado en el primero
+        lineas = b''.join(bloques).decode('utf-8').strip().splitlines()
+        self.assertEqual(lineas[0].split(','), list(CAMPOS_MEDICION))
+        self.assertEqual(len(lineas), 26)
+        self.assertEqual(self.descargar('/api/exportar/mediciones/?formato=csv'), b''.join(bloques))
+
+    def test_asgi_en_flujo_sin_juntar_la_respuesta(self):
+        esperado = self.descargar('/api/exportar/mediciones/?formato=csv')
+
+        async def descargar_async():
+            response = await self.async_client.get('/api/exportar/mediciones/?formato=csv',
+                                                   headers={'Authorization': f'Bearer {token_hs256(self.profile)}'})
+            self.assertTrue(response.is_async)
+            return b''.join([bloque async for bloque in response.streaming_content])
+
+        self.assertEqual(async_to_sync(descargar_async)(), esperado)
+
+    def test_ndjson_recomendaciones(self):
+        contenido = self.descargar('/api/exportar/recomendaciones/?formato=ndjson')
+        filas = [json.loads(linea) for linea in contenido.splitlines()]
+        self.assertEqual(len(filas), 25)
+        self.assertEqual({f['predio'] for f in filas}, {self.predio.id})
+
+    def test_rango_de_fechas_vacio_y_parametros_invalidos(self):
+        contenido = self.descargar('/api/exportar/mediciones/?formato=ndjson&hasta=2000-01-01')
+        self.assertEqual(contenido, b'')
+        self.assertEqual(self.client.get('/api/exportar/mediciones/?formato=xls').status_code, 400)
+        self.assertEqual(self.client.get('/api/exportar/predios/').status_code, 404)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, REPORTES_EN_SEGUNDO_PLANO=False)
+class ReportesTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='reportes@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='Las Quemas', superficie=Decimal('12'),
+                                            zona='Río Bueno', tipo_suelo='Ultisol')
+        self.mediciones = crear_mediciones(self.predio, 4)
+        self.client = cliente_autenticado(self.profile)
+
+    def solicitar(self, **datos):
+        return self.client.post('/api/reportes/', {'tipo': 'resumen', **datos}, format='json')
+
+    def test_resumen_pdf_y_cache_por_marca_de_datos(self):
+        response = self.solicitar(formato='pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['estado'], 'listo')
+
+        descarga = self.client.get(f"/api/reportes/{response.data['id']}/descargar/")
+        self.assertEqual(descarga['Content-Type'], 'application/pdf')
+        self.assertTrue(descarga.content.startswith(b'%PDF-1.4'))
+        self.assertEqual(self.client.get(f"/api/reportes/{response.data['id']}/descargar/",
+                                         HTTP_IF_NONE_MATCH=descarga['ETag']).status_code, 304)
+
+        # Mismos datos: se reutiliza el artefacto sin volver a generarlo
+        with mock.patch('api.reportes.render_resumen_pdf') as render:
+            repetido = self.solicitar(formato='pdf')
+        render.assert_not_called()
+        self.assertEqual(repetido.data['id'], response.data['id'])
+
+        # Datos nuevos: otra marca, se genera de nuevo y se descarta la versión anterior
+        crear_mediciones(self.predio, 1)
+        nuevo = self.solicitar(formato='pdf')
+        self.assertNotEqual(nuevo.data['id'], response.data['id'])
+        self.assertEqual(Reporte.objects.filter(usuario=self.profile).count(), 1)
+
+    def test_resumen_csv_agregado_por_predio(self):
+        response = self.solicitar(formato='csv', predios=[self.predio.id])
+        contenido = self.client.get(f"/api/reportes/{response.data['id']}/descargar/").content.decode('utf-8')
+        lineas = contenido.strip().splitlines()
+        self.assertEqual(len(lineas), 2)
+        self.assertIn('Las Quemas,Río Bueno,4,6.10', lineas[1])
+
+    def test_edicion_invalida_el_cache(self):
+        self.solicitar(formato='csv')
+        medicion = self.mediciones[0]
+        medicion.ph = Decimal('5.20')
+        medicion.save()
+        self.assertFalse(Reporte.objects.filter(usuario=self.profile).exists())
+
+    def test_edicion_durante_la_generacion_lo_regenera(self):
+        render_original, generados = reportes.render_resumen_csv, []
+
+        def render(datos):
+            if not generados:  # Edición concurrente: llega mientras el worker arma el archivo
+                medicion = self.mediciones[0]
+                medicion.ph = Decimal('5.30')
+                medicion.save()
+            generados.append(datos)
+            return render_original(datos)
+
+        with mock.patch.dict(reportes.GENERADORES['resumen'][1], {'csv': render}):
+            response = self.solicitar(formato='csv')
+        self.assertEqual(len(generados), 2)
+        reporte = Reporte.objects.get(pk=response.data['id'])
+        self.assertEqual((reporte.estado, reporte.obsoleto), ('listo', False))
+        self.assertIn('Las Quemas,Río Bueno,4,5.90', bytes(reporte.archivo).decode('utf-8'))
+
+    def test_rango_cerrado_no_cambia_con_lecturas_nuevas(self):
+        ayer = timezone.localdate() - timedelta(days=1)
+        Medicion.objects.filter(predio=self.predio).update(fecha=timezone.now() - timedelta(days=2))
+        primero = self.solicitar(formato='csv', hasta=ayer.isoformat())
+        crear_mediciones(self.predio, 1)  # Hoy: fuera del rango pedido
+        self.assertEqual(self.solicitar(formato='csv', hasta=ayer.isoformat()).data['id'], primero.data['id'])
+        self.assertNotEqual(self.solicitar(formato='csv').data['id'], primero.data['id'])
+
+    def test_recomendacion_propia_y_ajena(self):
+        propia = self.solicitar(tipo='recomendacion', recomendacion=self.mediciones[0].recomendacion.id)
+        self.assertEqual(propia.data['estado'], 'listo')
+        self.assertTrue(bytes(Reporte.objects.get(pk=propia.data['id']).archivo).startswith(b'%PDF'))
+
+        otro = Profile.objects.create(id=uuid.uuid4(), email='ajeno@nutrisoil.cl')
+        predio = Predio.objects.create(usuario=otro, nombre='Ajeno', superficie=Decimal('1'),
+                                       zona='Osorno', tipo_suelo='Andisol')
+        ajena = crear_mediciones(predio, 1)[0].recomendacion
+        response = self.solicitar(tipo='recomendacion', recomendacion=ajena.id)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class ImportacionMedicionesTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='lab@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='Santa Elena', superficie=Decimal('10'),
+                                            zona='Osorno', tipo_suelo='Andisol', cultivo_actual='Papa temprana')
+        otro = Profile.objects.create(id=uuid.uuid4(), email='vecino@nutrisoil.cl')
+        self.ajeno = Predio.objects.create(usuario=otro, nombre='Vecino', superficie=Decimal('3'),
+                                           zona='Osorno', tipo_suelo='Andisol')
+        self.client = cliente_autenticado(self.profile)
+
+    def subir(self, contenido, nombre='laboratorio.csv', url='/api/mediciones/importar/'):
+        archivo = SimpleUploadedFile(nombre, contenido.encode('utf-8'), content_type='text/csv')
+        return self.client.post(url, {'archivo': archivo}, format='multipart')
+
+    def test_importa_validas_y_reporta_errores_por_fila(self):
+        contenido = (
+            "Predio;Fecha;pH;Temperatura;Humedad;Nitrógeno (ppm);Fósforo (ppm);Potasio (cmol/kg)\n"
+            f"{self.predio.id};15-03-2025;6,1;14,5;45;20;15;0,5\n"
+            "santa elena;2025-03-16;5,8;;;18;12;0,4\n"
+            f"{self.ajeno.id};15-03-2025;6,1;14;45;20;15;0,5\n"
+            f"{self.predio.id};15-03-2025;15;14;45;abc;15;0,5\n"
+            f"{self.predio.id};;6,0;12;40;;;\n"
+        )
+        response = self.subir(contenido)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['importadas'], 3)
+        self.assertEqual(response.data['rechazadas'], 2)
+        self.assertEqual([e['fila'] for e in response.data['errores']], [4, 5])
+        self.assertEqual(set(response.data['errores'][1]['errores']), {'ph', 'nitrogeno'})
+        # Solo las filas con N, P y K completos generan recomendación
+        self.assertEqual(response.data['recomendaciones_creadas'], 2)
+
+        importadas = Medicion.objects.filter(predio=self.predio).order_by('id')
+        self.assertEqual(importadas[0].fecha.date().isoformat(), '2025-03-15')
+        self.assertEqual(importadas[1].ph, Decimal('5.80'))
+        self.assertTrue(all(m.origen == 'manual' for m in importadas))
+
+    def test_valor_enorme_es_error_de_fila(self):
+        response = self.subir(f"predio,ph,nitrogeno\n{self.predio.id},6.2,1e30\n{self.predio.id},6.2,20\n")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['importadas'], 1)
+        self.assertEqual(set(response.data['errores'][0]['errores']), {'nitrogeno'})
+
+    def test_solo_validar_no_escribe(self):
+        response = self.subir(f"predio,ph,n,p,k\n{self.predio.id},6.2,20,15,0.5\n",
+                              url='/api/mediciones/importar/?solo_validar=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rechazadas'], 0)
+        self.assertFalse(Medicion.objects.exists())
+
+    def test_consultas_no_crecen_con_las_filas(self):
+        def consultas(cantidad):
+            filas = ''.join(f"{self.predio.id},6.2,15,45,20,15,0.5\n" for _ in range(cantidad))
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.subir("predio,ph,temperatura,humedad,nitrogeno,fosforo,potasio\n" + filas)
+            self.assertEqual(response.status_code, 201)
+            return len(ctx.captured_queries)
+
+        # Sin consultas por fila: solo crecen los lotes de bulk_create (límite de parámetros de SQLite)
+        self.assertLess(consultas(500), 40)
+        self.assertEqual(Recomendacion.objects.filter(predio=self.predio).count(), 500)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class ColaTareasTests(TestCase):
+    def setUp(self):
+        # En PostgreSQL cerraría la conexión de la transacción de la prueba (autocommit apagado)
+        patcher = mock.patch('api.management.commands.procesar_tareas.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='cola@nutrisoil.cl', role='admin')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='El Maitén', superficie=Decimal('4'),
+                                            zona='Puerto Montt', tipo_suelo='Andisol')
+        self.client = cliente_autenticado(self.profile)
+
+    def crear_medicion(self, **extra):
+        datos = {'predio': self.predio.id, 'ph': '6.0', 'nitrogeno': '20', 'fosforo': '15', 'potasio': '0.5', **extra}
+        response = self.client.post('/api/mediciones/', datos, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_recomendacion_fuera_de_la_peticion(self):
+        medicion_id = self.crear_medicion()
+        self.crear_medicion(nitrogeno=None)  # Sin NPK completo no se encola
+        self.assertFalse(Recomendacion.objects.filter(medicion_id=medicion_id).exists())
+        self.assertEqual(Tarea.objects.get().clave, f'recomendacion:{medicion_id}')
+
+        call_command('procesar_tareas', una_vez=True, stdout=io.StringIO())
+        self.assertTrue(Recomendacion.objects.filter(medicion_id=medicion_id).exists())
+        self.assertEqual(Tarea.objects.get().estado, 'completada')
+
+    def test_idempotencia_por_medicion(self):
+        medicion_id = self.crear_medicion()
+        encolar_recomendacion(medicion_id)
+        self.assertEqual(Tarea.objects.filter(estado='pendiente').count(), 1)
+
+        tarea = tomar(10)[0]
+        encolar_recomendacion(medicion_id)  # Llega durante el proceso: se repite al terminar
+        self.assertTrue(ejecutar(tarea))
+        self.assertEqual(Tarea.objects.get().estado, 'pendiente')
+        self.assertTrue(ejecutar(tomar(10)[0]))
+        self.assertEqual(Tarea.objects.get().estado, 'completada')
+        self.assertEqual(Recomendacion.objects.filter(medicion_id=medicion_id).count(), 1)
+
+    @override_settings(TAREAS_MAX_INTENTOS=2, TAREAS_BACKOFF_BASE=0)
+    def test_reintentos_y_fallida(self):
+        medicion_id = self.crear_medicion()
+        with mock.patch.dict('api.tareas.HANDLERS', {'recomendacion': mock.Mock(side_effect=RuntimeError('caído'))}):
+            self.assertFalse(ejecutar(tomar(10)[0]))
+            tarea = Tarea.objects.get()
+            self.assertEqual((tarea.estado, tarea.intentos), ('pendiente', 1))
+            self.assertIn('caído', tarea.error)
+            self.assertFalse(ejecutar(tomar(10)[0]))
+        self.assertEqual(Tarea.objects.get().estado, 'fallida')
+
+        # Volver a encolar una fallida la reactiva
+        encolar_recomendacion(medicion_id)
+        self.assertEqual(Tarea.objects.get().estado, 'pendiente')
+
+    def test_metricas(self):
+        self.crear_medicion()
+        self.crear_medicion()
+        response = self.client.get('/api/tareas/metricas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['profundidad'], 2)
+        call_command('procesar_tareas', una_vez=True, stdout=io.StringIO())
+        metricas = self.client.get('/api/tareas/metricas/').data
+        self.assertEqual((metricas['profundidad'], metricas['completadas_ventana']), (0, 2))
+        self.assertIsNotNone(metricas['latencia_p95_s'])
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class RecomendacionSemanalTests(TestCase):
+    SEMANA = date(2025, 3, 2)  # Domingo
+
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='semanal@nutrisoil.cl')
+        self.predios = [
+            Predio.objects.create(usuario=self.profile, nombre=f'Potrero {i}', superficie=Decimal('2'),
+                                  zona='Osorno', tipo_suelo='Andisol')
+            for i in range(3)
+        ]
+        for predio in self.predios:
+            self.crear_en(predio, datetime(2025, 3, 3, 12, tzinfo=dt_timezone.utc), nitrogeno=Decimal('10.00'))
+            self.crear_en(predio, datetime(2025, 3, 8, 23, tzinfo=dt_timezone.utc), nitrogeno=Decimal('20.00'))
+        self.client = cliente_autenticado(self.profile)
+
+    def crear_en(self, predio, fecha, **valores):
+        medicion = crear_mediciones(predio, 1, con_recomendacion=False)[0]
+        Medicion.objects.filter(pk=medicion.pk).update(fecha=fecha, **valores)
+        return medicion
+
+    def test_precalculo_promedia_por_semana(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resumen = precalcular(self.SEMANA, self.SEMANA)
+        self.assertEqual((resumen['predios'], resumen['creadas']), (3, 3))
+        self.assertLessEqual(len(consultas), 8)  # No crece con la cantidad de predios
+
+        semanal = Recomendacion.objects.get(predio=self.predios[0], medicion__isnull=True)
+        self.assertEqual(semanal.semana_inicio, self.SEMANA)
+        self.assertEqual((semanal.n_promedio, semanal.cantidad_mediciones), (Decimal('15.00'), 2))
+
+        # Sin mediciones nuevas no se recalcula; con una nueva solo ese predio
+        self.assertEqual(precalcular(self.SEMANA, self.SEMANA)['al_dia'], 3)
+        self.crear_en(self.predios[1], datetime(2025, 3, 5, tzinfo=dt_timezone.utc), nitrogeno=Decimal('30.00'))
+        resumen = precalcular(self.SEMANA, self.SEMANA, tamano_bloque=2)
+        self.assertEqual((resumen['actualizadas'], resumen['al_dia']), (1, 2))
+        self.assertEqual(Recomendacion.objects.get(predio=self.predios[1]).n_promedio, Decimal('20.00'))
+
+    def test_comando(self):
+        salida = io.StringIO()
+        call_command('precalcular_semanales', desde=self.SEMANA, hasta=date(2025, 3, 20), stdout=salida)
+        self.assertIn('3 creadas', salida.getvalue())
+        self.assertEqual(Recomendacion.objects.filter(medicion__isnull=True).count(), 3)
+
+    def test_post_lee_la_precalculada(self):
+        precalcular(self.SEMANA, self.SEMANA)
+        datos = {'predio_id': self.predios[0].id, 'semana_inicio': '2025-03-05'}  # Miércoles: misma semana
+        response = self.client.post('/api/recomendaciones/generar-semanal/', datos, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['semana_inicio'], '2025-03-02')
+
+        self.crear_en(self.predios[0], datetime(2025, 3, 4, tzinfo=dt_timezone.utc))
+        response = self.client.post('/api/recomendaciones/generar-semanal/', datos, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Recomendacion.objects.filter(predio=self.predios[0], medicion__isnull=True).count(), 1)
+
+        datos['semana_inicio'] = '2025-04-06'
+        response = self.client.post('/api/recomendaciones/generar-semanal/', datos, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_predio_ajeno(self):
+        otro = Profile.objects.create(id=uuid.uuid4(), email='otro@nutrisoil.cl')
+        response = cliente_autenticado(otro).post(
+            '/api/recomendaciones/generar-semanal/',
+            {'predio_id': self.predios[0].id, 'semana_inicio': '2025-03-02'}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_lote_varios_predios_y_semanas(self):
+        url = '/api/recomendaciones/generar-semanal-lote/'
+        datos = {'predio_ids': [p.id for p in self.predios], 'semanas': ['2025-03-02', '2025-03-09']}
+        self.client.get('/api/predios/')  # El primer login crea el usuario de Django
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(url, datos, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['creadas'], len(response.data['recomendaciones'])), (3, 3))
+        self.assertEqual(len(response.data['sin_mediciones']), 3)  # Semana del 9 sin datos
+        self.assertLessEqual(len(consultas), 8)  # Independiente de predios x semanas
+
+        response = self.client.post(url, datos, format='json')
+        self.assertEqual((response.data['creadas'], response.data['al_dia']), (0, 3))
+
+        otro = Predio.objects.create(usuario=Profile.objects.create(id=uuid.uuid4(), email='v@nutrisoil.cl'),
+                                     nombre='Ajeno', superficie=Decimal('1'))
+        datos['predio_ids'].append(otro.id)
+        response = self.client.post(url, datos, format='json')
+        self.assertEqual((response.status_code, response.data['predio_ids']), (404, [otro.id]))
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, METRICAS_TOKEN='scrape', METRICAS_UMBRAL_LENTO_MS=0)
+class MetricasTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='metricas@nutrisoil.cl')
+        predio = Predio.objects.create(usuario=self.profile, nombre='La Vega', superficie=Decimal('3'))
+        crear_mediciones(predio, 3)
+        self.client = cliente_autenticado(self.profile)
+
+    def metricas(self, **headers):
+        return APIClient().get('/metrics', **headers)  # Sin el JWT del cliente autenticado
+
+    def serie(self, texto, prefijo):
+        return next(linea for linea in texto.splitlines() if linea.startswith(prefijo))
+
+    def test_registra_vista_sql_y_serializacion(self):
+        antes = self.metricas(HTTP_AUTHORIZATION='Bearer scrape').content.decode()
+        with self.assertLogs('api.metricas', 'WARNING') as logs:
+            self.assertEqual(self.client.get('/api/mediciones/').status_code, 200)
+        self.assertIn('Petición lenta GET /api/mediciones/ (medicion-list)', logs.output[0])
+
+        response = self.metricas(HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        texto = response.content.decode()
+        self.assertIn('# TYPE nutrisoil_http_request_duration_seconds histogram', texto)
+        etiquetas = '{vista="medicion-list",metodo="GET"'
+        conteo = f'nutrisoil_http_request_duration_seconds_count{etiquetas}}}'
+        previas = int(self.serie(antes, conteo).split()[-1]) if conteo in antes else 0
+        self.assertEqual(int(self.serie(texto, conteo).split()[-1]), previas + 1)
+        self.assertIn(f'nutrisoil_http_requests_total{etiquetas},codigo="200"}}', texto)
+        self.assertGreater(float(self.serie(texto, f'nutrisoil_db_queries_per_request_sum{etiquetas}').split()[-1]), 0)
+        self.assertGreater(float(self.serie(texto, f'nutrisoil_serialization_duration_seconds_sum{etiquetas}').split()[-1]), 0)
+        self.assertIn(f'nutrisoil_http_response_size_bytes_bucket{etiquetas},le="+Inf"}}', texto)
+
+    def test_estado_del_pool(self):
+        from .basedatos.base import DatabaseWrapper
+        pool = mock.Mock(get_stats=lambda: {'pool_min': 2, 'pool_max': 10, 'pool_size': 4, 'pool_available': 1,
+                                            'requests_waiting': 2, 'requests_wait_ms': 1500})
+        with mock.patch.dict(DatabaseWrapper._connection_pools, {'default': pool}):
+            texto = REGISTRO.exponer()
+        self.assertIn('nutrisoil_db_pool_in_use{alias="default"} 3', texto)
+        self.assertIn('nutrisoil_db_pool_utilization{alias="default"} 0.3', texto)
+        self.assertIn('nutrisoil_db_pool_waiting{alias="default"} 2', texto)
+        self.assertIn('# TYPE nutrisoil_db_pool_wait_seconds_total counter', texto)
+        self.assertIn('nutrisoil_db_pool_wait_seconds_total{alias="default"} 1.5', texto)
+        self.assertIn('nutrisoil_db_pool_timeouts_total{alias="default"} 0', texto)
+
+    def test_requiere_token(self):
+        self.assertEqual(self.metricas().status_code, 403)
+        self.assertEqual(self.metricas(HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class PerfiladoTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.admin = Profile.objects.create(id=uuid.uuid4(), email='perfil@nutrisoil.cl', role='admin')
+        predio = Predio.objects.create(usuario=self.admin, nombre='Las Quemas', superficie=Decimal('5'))
+        crear_mediciones(predio, 3)
+        self.client = cliente_autenticado(self.admin)
+
+    def test_sin_flag_no_perfila(self):
+        response = self.client.get('/api/dashboard/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Perfil-Id', response)
+        self.assertFalse(Perfil.objects.exists())
+
+    def test_admin_perfila_y_descarga(self):
+        response = self.client.get('/api/dashboard/stats/', HTTP_X_PERFILAR='1')
+        self.assertEqual(response.status_code, 200)
+        perfil = Perfil.objects.get(pk=response['X-Perfil-Id'])
+        self.assertEqual((perfil.vista, perfil.codigo), ('dashboard-stats', 200))
+        self.assertEqual(perfil.cantidad_consultas, len(perfil.consultas))
+        self.assertTrue(any('mediciones' in c['sql'] for c in perfil.consultas))
+
+        descarga = self.client.get(response['X-Perfil-Url'])
+        self.assertEqual(descarga['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(descarga.content)) as archivo:
+            self.assertEqual(sorted(archivo.namelist()), ['consultas.json', 'perfil.prof', 'resumen.txt'])
+            estadisticas = marshal.loads(archivo.read('perfil.prof'))
+        self.assertTrue(any(funcion == 'dashboard_stats' for _, _, funcion in estadisticas))
+
+        self.client.get('/api/predios/?perfilar=1')
+        self.assertEqual(len(self.client.get('/api/perfiles/').data), 2)
+
+    def test_no_admin_ignora_el_flag(self):
+        usuario = Profile.objects.create(id=uuid.uuid4(), email='agricultor@nutrisoil.cl')
+        cliente = cliente_autenticado(usuario)
+        response = cliente.get('/api/dashboard/stats/?perfilar=1', HTTP_X_PERFILAR='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Perfil-Id', response)
+        self.assertFalse(Perfil.objects.exists())
+        self.assertEqual(cliente.get('/api/perfiles/').status_code, 403)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, WEMOS_API_KEY='clave-wemos', IOT_DISPOSITIVO_INACTIVO_MIN=30)
+class DispositivosTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='iot@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='El Roble', superficie=Decimal('2'))
+        self.client = cliente_autenticado(self.profile)
+
+    def ingesta(self, **datos):
+        return APIClient().post('/api/iot/ingest/', {'predio_id': self.predio.id, 'humedad': 40, **datos},
+                                format='json', HTTP_X_API_KEY='clave-wemos')
+
+    def test_indice_de_ultima_vez_visto(self):
+        for _ in range(3):
+            self.assertEqual(self.ingesta(dispositivo_id='wemos-a1').status_code, 201)
+        ultima = self.ingesta().data['id']  # Firmware sin dispositivo_id
+
+        dispositivo = Dispositivo.objects.get(identificador='wemos-a1')
+        self.assertEqual(dispositivo.total_lecturas, 3)
+        self.assertEqual(Dispositivo.objects.get(identificador=f'predio-{self.predio.id}').ultima_medicion_id, ultima)
+
+        Dispositivo.objects.filter(pk=dispositivo.pk).update(ultima_vez=timezone.now() - timedelta(hours=2))
+        self.client.get('/api/iot/dispositivos/')  # El primer login crea el usuario de Django
+        with self.assertNumQueries(3):  # Perfil + usuario del token, dispositivos (sin leer mediciones)
+            datos = self.client.get('/api/iot/dispositivos/?inactivos=1').data
+        self.assertEqual((datos['total'], datos['inactivos'], datos['umbral_min']), (1, 1, 30))
+        self.assertEqual(datos['dispositivos'][0]['identificador'], 'wemos-a1')
+        self.assertEqual(self.client.get('/api/iot/dispositivos/').data['total'], 2)
+
+        otro = cliente_autenticado(Profile.objects.create(id=uuid.uuid4(), email='otro-iot@nutrisoil.cl'))
+        self.assertEqual(otro.get('/api/iot/dispositivos/').data['total'], 0)
+
+    def test_telemetria_por_dispositivo(self):
+        self.ingesta(dispositivo_id='wemos-b2')
+        APIClient().post('/api/iot/ingest/', {'predio_id': self.predio.id, 'humedad': 40}, format='json')
+        texto = REGISTRO.exponer()
+        self.assertIn(f'nutrisoil_ingest_readings_total{{dispositivo="wemos-b2",predio="{self.predio.id}",'
+                      f'resultado="201"}}', texto)
+        self.assertIn('nutrisoil_ingest_readings_total{dispositivo="desconocido",predio="",resultado="403"}', texto)
+        self.assertIn('nutrisoil_ingest_duration_seconds_count{dispositivo="wemos-b2"', texto)
+
+        self.ingesta(predio_id='x' * 500, dispositivo_id='wemos-b3')  # 404: el valor del cliente no es etiqueta
+        texto = REGISTRO.exponer()
+        self.assertIn('nutrisoil_ingest_readings_total{dispositivo="wemos-b3",predio="",resultado="404"}', texto)
+        self.assertNotIn('x' * 65, texto)
+        self.assertEqual(len(identificador({}, '9' * 500)), 64)
+
+    def test_secuencias_sin_duplicar(self):
+        def enviar(seq, sesion='s1'):
+            return self.ingesta(dispositivo_id='wemos-c3', seq=seq, sesion=sesion)
+
+        self.assertEqual([enviar(n).status_code for n in (1, 2)], [201, 201])
+        repetida = enviar(2)  # La respuesta anterior se perdió y el equipo reenvía
+        self.assertEqual((repetida.status_code, repetida.data['status']), (200, 'duplicado'))
+        self.assertEqual(Medicion.objects.filter(predio=self.predio).count(), 2)
+
+        self.assertEqual(enviar(6).data['faltantes'], [[3, 5]])
+        self.assertEqual(enviar(4).data['faltantes'], [[3, 3], [5, 5]])
+        self.assertEqual(enviar(9).data['faltantes'], [[3, 3], [5, 5], [7, 8]])
+        self.assertEqual(enviar(5).status_code, 201)
+        self.assertEqual(enviar(5).status_code, 200)
+        self.assertEqual(Medicion.objects.filter(predio=self.predio).count(), 6)
+
+        reinicio = enviar(1, sesion='s2')  # Equipo reiniciado: la numeración vuelve a empezar
+        self.assertEqual((reinicio.status_code, reinicio.data['secuencia_max'], reinicio.data['faltantes']),
+                         (201, 1, []))
+        dispositivo = self.client.get('/api/iot/dispositivos/').data['dispositivos'][0]
+        self.assertEqual((dispositivo['duplicadas'], dispositivo['total_lecturas']), (2, 7))
+        self.assertEqual(enviar('x').status_code, 400)
+        self.assertEqual(self.ingesta().status_code, 201)  # Firmware sin seq: sin cambios
+
+    @override_settings(IOT_VENTANA_SECUENCIA=100, IOT_MAX_RANGOS_FALTANTES=3)
+    def test_faltantes_acotados(self):
+        dispositivo = Dispositivo(secuencia_max=10, faltantes=[], sesion='')
+        for seq in (20, 30, 40, 50):
+            self.assertTrue(aplicar_secuencia(dispositivo, seq))
+        self.assertEqual(dispositivo.faltantes, [[11, 29], [31, 39], [41, 49]])  # Los más cercanos se unen
+        self.assertTrue(aplicar_secuencia(dispositivo, 15))  # Ninguna faltante se pierde
+        self.assertTrue(aplicar_secuencia(dispositivo, 10_000))  # Salto: se piden solo las que el equipo guarda
+        self.assertEqual(dispositivo.faltantes, [[9900, 9999]])
+        self.assertTrue(aplicar_secuencia(dispositivo, 9950))
+        self.assertFalse(aplicar_secuencia(dispositivo, 9950))
+        self.assertEqual(dispositivo.faltantes, [[9900, 9949], [9951, 9999]])
+        self.assertTrue(aplicar_secuencia(dispositivo, 9000))  # Muy por debajo de la ventana: reinicio sin sesión
+        self.assertEqual((dispositivo.secuencia_max, dispositivo.faltantes), (9000, []))
+
+    @override_settings(IOT_VENTANA_SECUENCIA=1000, IOT_MAX_RANGOS_FALTANTES=32)
+    def test_reintento_atrasado_misma_sesion(self):
+        dispositivo = Dispositivo(secuencia_max=5000, faltantes=[[4500, 4510]], sesion='s1')
+        self.assertFalse(aplicar_secuencia(dispositivo, 3, 's1'))  # Bajo la ventana: ya guardada, sin reinicio
+        self.assertEqual((dispositivo.secuencia_max, dispositivo.faltantes), (5000, [[4500, 4510]]))
+        self.assertTrue(aplicar_secuencia(dispositivo, 5001, 's1'))
+        self.assertEqual(dispositivo.faltantes, [[4500, 4510]])  # No pide reenviar lo ya guardado
+        self.assertTrue(aplicar_secuencia(dispositivo, 3, 's2'))  # Sesión nueva: reinicio
+        self.assertEqual((dispositivo.secuencia_max, dispositivo.faltantes, dispositivo.sesion), (3, [], 's2'))
+
+    @override_settings(IOT_VENTANA_SECUENCIA=1000, IOT_MAX_RANGOS_FALTANTES=32)
+    def test_perdidas_alternadas_no_se_olvidan(self):
+        dispositivo = Dispositivo(secuencia_max=0, faltantes=[], sesion='s1')
+        for seq in range(2, 200, 2):  # Se pierde una de cada dos
+            aplicar_secuencia(dispositivo, seq, 's1')
+        self.assertLessEqual(len(dispositivo.faltantes), 32)
+        for seq in range(1, 199, 2):
+            self.assertTrue(aplicar_secuencia(dispositivo, seq, 's1'), seq)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, WEMOS_API_KEY='clave-wemos', ANOMALIAS_MINIMO=20,
+                   ANOMALIAS_Z=4, ANOMALIAS_ALFA=0.05, ANOMALIAS_CONSECUTIVAS=6, ANOMALIAS_EXCLUIR_PROMEDIOS=True)
+class AnomaliasTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='anomalias@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='Las Vertientes', superficie=Decimal('2'))
+        self.rnd = random.Random(5)
+
+    def ingesta(self, **datos):
+        response = APIClient().post('/api/iot/ingest/', {'predio_id': self.predio.id, **datos},
+                                    format='json', HTTP_X_API_KEY='clave-wemos')
+        self.assertEqual(response.status_code, 201)
+        return Medicion.objects.get(pk=response.data['id'])
+
+    def normales(self, cantidad, humedad=40):
+        for _ in range(cantidad):
+            medicion = self.ingesta(humedad=round(self.rnd.gauss(humedad, 1.5), 2),
+                                    ph=round(self.rnd.gauss(6.2, 0.1), 2))
+            self.assertEqual(medicion.anomalias, 0)
+
+    def test_marca_picos_y_limites(self):
+        self.assertEqual(self.ingesta(humedad=100).anomalias, BITS['humedad'])  # Sonda saturada, aún sin historia
+        self.normales(25)
+        self.assertEqual(self.ingesta(humedad=41, ph=9.5).anomalias, BITS['ph'])
+        self.assertEqual(self.ingesta(humedad=0, ph=6.2).anomalias, BITS['humedad'])
+        self.assertEqual(self.ingesta(humedad=41, ph=6.2, temperatura=12).anomalias, 0)
+
+        estado = EstadisticaSensor.objects.get(predio=self.predio, parametro='ph')
+        self.assertEqual(estado.n, 27)  # 25 + 2: el pico de pH no entra en la estadística
+        self.assertAlmostEqual(estado.media, 6.2, delta=0.1)
+        self.assertIn('nutrisoil_ingest_anomalies_total{parametro="humedad",motivo="limite"}', REGISTRO.exponer())
+
+    def test_cambio_de_nivel_reinicia(self):
+        self.normales(25)
+        marcas = [self.ingesta(humedad=70 + i % 2).anomalias for i in range(6)]
+        self.assertEqual(marcas, [BITS['humedad']] * 6)
+        estado = EstadisticaSensor.objects.get(predio=self.predio, parametro='humedad')
+        self.assertEqual((estado.n, estado.media, estado.consecutivas), (1, 71.0, 0))
+        self.normales(20, humedad=70)  # El nuevo nivel es el normal
+
+    def test_promedios_excluyen_marcadas(self):
+        mediciones = crear_mediciones(self.predio, 3, con_recomendacion=False)  # humedad 45
+        for medicion, nitrogeno in zip(mediciones, ('10.00', '20.00', '90.00')):
+            Medicion.objects.filter(pk=medicion.pk).update(nitrogeno=Decimal(nitrogeno))
+        Medicion.objects.filter(pk=mediciones[2].pk).update(humedad=Decimal('100.00'), anomalias=BITS['humedad'])
+        semana = Medicion.objects.get(pk=mediciones[0].pk).get_semana_inicio()
+
+        semanal = calcular_semanales({self.predio.id: self.predio}, [semana])['recomendaciones'][(self.predio.id, semana)]
+        # Solo se excluye el parámetro marcado; la medición cuenta para detectar cambios
+        self.assertEqual((semanal.humedad_promedio, semanal.n_promedio), (Decimal('45.00'), Decimal('40.00')))
+        self.assertEqual(semanal.cantidad_mediciones, 3)
+
+        url = f'/api/mediciones/promedios-semanales/?predio={self.predio.id}'
+        datos = cliente_autenticado(self.profile).get(url).json()[0]
+        self.assertEqual((datos['humedad_promedio'], datos['cantidad_mediciones']), ('45.00', 3))
+        with override_settings(ANOMALIAS_EXCLUIR_PROMEDIOS=False):
+            self.assertEqual(cliente_autenticado(self.profile).get(url).json()[0]['humedad_promedio'], '63.33')
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, WEMOS_API_KEY='clave-wemos', ANOMALIAS_EXCLUIR_PROMEDIOS=True)
+class ResumenesDiariosTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='resumenes@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='Los Aromos', superficie=Decimal('2'))
+        self.client = cliente_autenticado(self.profile)
+        self.url = f'/api/predios/{self.predio.id}/estadisticas/'
+
+    def ingesta(self, **datos):
+        response = APIClient().post('/api/iot/ingest/', {'predio_id': self.predio.id, **datos},
+                                    format='json', HTTP_X_API_KEY='clave-wemos')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def columnas(self):
+        return list(ResumenDiario.objects.filter(predio=self.predio).order_by('dia').values(
+            'dia', 'cantidad', *(f'{p}_{c}' for c in ('ph', 'humedad', 'nitrogeno') for p in ('n', 'suma', 'min', 'max'))))
+
+    def test_ventanas_incrementales(self):
+        self.ingesta(humedad=40, temperatura=10)
+        self.ingesta(humedad=50, temperatura=20, ph=6.5)
+        self.ingesta(humedad=100)  # Sonda saturada: marcada, no entra en los resúmenes
+        antigua = crear_mediciones(self.predio, 1, con_recomendacion=False)[0]  # humedad 45
+        hace_20 = timezone.now() - timedelta(days=20)
+        Medicion.objects.filter(pk=antigua.pk).update(fecha=hace_20, humedad=Decimal('10.00'))
+        call_command('recalcular_resumenes', dias=31, stdout=io.StringIO())
+
+        self.client.get(self.url)  # El primer login crea el usuario de Django
+        with self.assertNumQueries(5):  # Perfil + usuario, predio, resúmenes, media exponencial
+            datos = self.client.get(self.url).json()
+        semana, mes = datos['ventanas']['ultimos_7_dias'], datos['ventanas']['ultimos_30_dias']
+        self.assertEqual(semana['humedad'], {'n': 2, 'promedio': 45.0, 'minimo': 40.0, 'maximo': 50.0})
+        self.assertEqual((semana['temperatura']['minimo'], semana['temperatura']['maximo']), (10.0, 20.0))
+        self.assertEqual(semana['nitrogeno'], {'n': 0, 'promedio': None, 'minimo': None, 'maximo': None})
+        self.assertEqual((mes['humedad']['n'], mes['humedad']['minimo'], mes['nitrogeno']['n']), (3, 10.0, 1))
+        self.assertEqual(datos['ventanas']['mes_actual']['humedad']['n'],
+                         3 if hace_20.date().month == timezone.now().date().month else 2)
+        self.assertEqual(datos['ewma']['humedad']['n'], 2)
+
+        otro = cliente_autenticado(Profile.objects.create(id=uuid.uuid4(), email='otro-res@nutrisoil.cl'))
+        self.assertEqual(otro.get(self.url).status_code, 404)
+
+    def test_recalcular_coincide_y_ediciones(self):
+        ids = [self.ingesta(humedad=h, ph=6 + h / 100) for h in (30, 35, 60)]
+        self.client.post('/api/mediciones/', {'predio': self.predio.id, 'nitrogeno': 25, 'humedad': 33}, format='json')
+        incremental = self.columnas()
+        hoy = timezone.now().date()
+        recalcular([self.predio.id], hoy, hoy)
+        self.assertEqual(self.columnas(), incremental)
+
+        self.assertEqual(self.client.delete(f'/api/mediciones/{ids[2]}/').status_code, 204)
+        self.client.patch(f'/api/mediciones/{ids[0]}/', {'humedad': 31}, format='json')
+        humedad = self.client.get(self.url).data['ventanas']['ultimos_7_dias']['humedad']
+        self.assertEqual((humedad['n'], humedad['minimo'], humedad['maximo']), (3, 31.0, 35.0))
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, PRONOSTICO_HORIZONTE=7, PRONOSTICO_HISTORIA=28,
+                   PRONOSTICO_MINIMO_DIAS=5, PRONOSTICO_ALFA=0.5, PRONOSTICO_BETA=0.2, PRONOSTICO_AMORTIGUAR=1.0)
+class PronosticosTests(TestCase):
+    HOY = date(2025, 5, 28)
+
+    def setUp(self):
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='pronosticos@nutrisoil.cl')
+        self.predios = [Predio.objects.create(usuario=self.profile, nombre=f'Lote {i}', superficie=Decimal('2'))
+                        for i in range(3)]
+        self.client = cliente_autenticado(self.profile)
+
+    def resumenes(self, predio, dias, humedad, nitrogeno=None):
+        ResumenDiario.objects.bulk_create([
+            ResumenDiario(predio=predio, dia=self.HOY - timedelta(days=d), cantidad=2,
+                          n_humedad=2, suma_humedad=2 * humedad(d),
+                          **({'n_nitrogeno': 1, 'suma_nitrogeno': nitrogeno} if nitrogeno else {}))
+            for d in dias
+        ])
+
+    @skipUnless(np, "Requiere numpy")
+    def test_holt_vectorizado(self):
+        serie = np.array([[10 + 2 * t for t in range(28)], [np.nan] * 28,
+                          [50 if t % 3 == 0 else np.nan for t in range(28)]], dtype=float)
+        proyeccion, nivel, tendencia, observados = holt(serie, 0.5, 0.2, 1.0, 7)
+        np.testing.assert_allclose(proyeccion[0], [66, 68, 70, 72, 74, 76, 78], atol=0.01)
+        np.testing.assert_allclose(proyeccion[2], [50] * 7)  # Los días sin dato no mueven el nivel
+        self.assertEqual(observados.tolist(), [28, 0, 10])
+        amortiguada = holt(serie, 0.5, 0.2, 0.8, 7)[0][0]
+        self.assertLess(amortiguada[-1] - amortiguada[-2], amortiguada[1] - amortiguada[0])
+
+    @skipUnless(np, "Requiere numpy")
+    def test_comando_y_lectura(self):
+        self.resumenes(self.predios[0], range(20), lambda d: 60 + 2 * (20 - d), nitrogeno=30)  # Sube 2% por día
+        self.resumenes(self.predios[1], range(3), lambda d: 40)  # Muy pocos días
+        with mock.patch('api.pronosticos.timezone.now',
+                        return_value=datetime(2025, 5, 28, 12, tzinfo=dt_timezone.utc)):
+            call_command('pronosticar', bloque=1, stdout=io.StringIO())
+        self.assertEqual(Pronostico.objects.count(), 2)
+
+        self.client.get('/api/dashboard/pronosticos/')  # El primer login crea el usuario de Django
+        with self.assertNumQueries(3):  # Perfil + usuario, pronósticos (sin ajustar nada)
+            datos = self.client.get('/api/dashboard/pronosticos/').json()['pronosticos']
+        self.assertEqual([d['predio_id'] for d in datos], [self.predios[0].id])
+        humedad = datos[0]['parametros']['humedad']
+        self.assertEqual(humedad['dias'][0]['fecha'], '2025-05-29')
+        self.assertEqual([d['valor'] for d in humedad['dias']][-2:], [100, 100])  # Acotada al rango del sensor
+        self.assertAlmostEqual(datos[0]['parametros']['nitrogeno']['dias'][6]['valor'], 30)
+
+        otro = cliente_autenticado(Profile.objects.create(id=uuid.uuid4(), email='otro-pro@nutrisoil.cl'))
+        self.assertEqual(otro.get('/api/dashboard/pronosticos/').json()['pronosticos'], [])
+        self.assertEqual(self.client.get('/api/dashboard/pronosticos/?predio=x').status_code, 400)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET)
+class RegionalTests(TestCase):
+    MES = date(2025, 5, 1)
+
+    def setUp(self):
+        token_cache.clear()
+        self.admin = Profile.objects.create(id=uuid.uuid4(), email='agronomo@nutrisoil.cl', role='admin')
+        productor = Profile.objects.create(id=uuid.uuid4(), email='productor@nutrisoil.cl')
+        grupos = [('Osorno', 'Andisol', 'Ballica perenne', [10, 20, 30, 40]),
+                  ('Osorno', 'Andisol', None, [50]),
+                  ('Río Bueno', 'Ultisol', 'Papa temprana', [5, 15])]
+        self.predios = {}
+        for zona, suelo, cultivo, valores in grupos:
+            for i, fosforo in enumerate(valores):
+                predio = Predio.objects.create(usuario=productor, nombre=f'{zona} {fosforo}', superficie=Decimal('1'),
+                                               zona=zona, tipo_suelo=suelo, cultivo_actual=cultivo)
+                self.predios[fosforo] = predio
+                # Dos días: el promedio mensual pondera por cantidad de valores
+                ResumenDiario.objects.create(predio=predio, dia=self.MES + timedelta(days=i), cantidad=3,
+                                             n_fosforo=1, suma_fosforo=fosforo - 3)
+                ResumenDiario.objects.create(predio=predio, dia=self.MES + timedelta(days=20), cantidad=1,
+                                             n_fosforo=3, suma_fosforo=3 * (fosforo + 1))
+        ResumenDiario.objects.create(predio=self.predios[10], dia=date(2025, 6, 1), cantidad=1,
+                                     n_fosforo=1, suma_fosforo=999)  # Otro mes
+        call_command('refrescar_regional', mes='2025-05', stdout=io.StringIO())
+        self.client = cliente_autenticado(self.admin)
+        self.client.get('/api/regional/resumen/')  # El primer login crea el usuario de Django
+
+    def test_resumen_por_grupo(self):
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.client.get('/api/regional/resumen/?mes=2025-05&parametro=fosforo').json()
+        self.assertFalse(any('FROM "mediciones"' in q['sql'] for q in consultas.captured_queries))
+        self.assertEqual(IndicadorPredio.objects.get(predio=self.predios[10]).fosforo, 10)
+        grupos = {(g['zona'], g['cultivo']): g for g in datos['grupos']}
+        ballica = grupos[('Osorno', 'Ballica perenne')]
+        self.assertEqual((ballica['predios'], ballica['mediciones'], ballica['promedio']), (4, 16, 25))
+        self.assertEqual((ballica['minimo'], ballica['p25'], ballica['mediana'], ballica['p75'], ballica['maximo']),
+                         (10, 10, 20, 30, 40))
+        self.assertEqual([g['puesto'] for g in datos['grupos']], [1, 2, 3])
+        self.assertEqual(datos['grupos'][0]['cultivo'], None)  # Osorno sin cultivo: promedio 50
+
+        datos = self.client.get('/api/regional/resumen/?mes=2025-05&zona=Río Bueno&parametro=fosforo').json()
+        self.assertEqual([(g['tipo_suelo'], g['promedio'], g['mediana']) for g in datos['grupos']],
+                         [('Ultisol', 10, 5)])
+
+    def test_ranking_dentro_del_grupo(self):
+        url = '/api/regional/ranking/?mes=2025-05&parametro=fosforo&zona=Osorno&tipo_suelo=Andisol'
+        filas = self.client.get(url + '&cultivo=Ballica perenne').json()['predios']
+        self.assertEqual([(f['valor'], f['puesto'], f['percentil']) for f in filas],
+                         [(40, 1, 100), (30, 2, 66.7), (20, 3, 33.3), (10, 4, 0)])
+        self.assertEqual(filas[0]['predio_id'], self.predios[40].id)
+        # Los primeros de cada grupo, no las primeras filas: Ballica perenne y Osorno sin cultivo
+        filas = self.client.get(url + '&limite=2').json()['predios']
+        self.assertEqual([(f['cultivo'], f['valor'], f['puesto']) for f in filas],
+                         [(None, 50, 1), ('Ballica perenne', 40, 1), ('Ballica perenne', 30, 2)])
+
+    def test_solo_administradores(self):
+        productor = cliente_autenticado(Profile.objects.get(email='productor@nutrisoil.cl'))
+        self.assertEqual(productor.get('/api/regional/resumen/').status_code, 403)
+        self.assertEqual(productor.get('/api/regional/ranking/').status_code, 403)
+        self.assertEqual(self.client.get('/api/regional/resumen/?parametro=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/regional/resumen/?mes=mayo').status_code, 400)
+
+
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, WEMOS_API_KEY='clave-wemos', DATABASE_ROUTERS=[])
+class VistasAsyncTests(TransactionTestCase):
+    """Las consultas corren en otros hilos (otras conexiones): los datos deben estar confirmados."""
+
+    def setUp(self):
+        self.addCleanup(asincronia.cerrar_conexiones)  # Sus hilos no pasan por request_finished
+        token_cache.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='async@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='Los Alerces', superficie=Decimal('6'),
+                                            zona='Osorno', tipo_suelo='Andisol', cultivo_actual='Papa temprana')
+        crear_mediciones(self.predio, 4)
+        Predio.objects.create(usuario=self.profile, nombre='Sin datos', superficie=Decimal('1.5'))
+        self.client = cliente_autenticado(self.profile)
+        self.client.get('/api/predios/')  # Crea el User del perfil
+
+    def get_async(self, url, **headers):
+        return async_to_sync(self.async_client.get)(url, headers=headers)
+
+    def test_dashboard_igual_al_sincrono_con_consultas_en_paralelo(self):
+        # Si predios y tendencia corrieran una tras otra la barrera se rompería por timeout
+        barrera = threading.Barrier(2, timeout=5)
+
+        def en_barrera(funcion):
+            def envoltura(*args):
+                barrera.wait()
+                return funcion(*args)
+            return envoltura
+
+        esperado = self.client.get('/api/dashboard/stats/').json()
+        with mock.patch('api.views_async.predios_dashboard', en_barrera(views_async.predios_dashboard)), \
+                mock.patch('api.views_async.tendencia_npk', en_barrera(views_async.tendencia_npk)):
+            response = self.get_async('/api/async/dashboard/stats/', Authorization=f'Bearer {token_hs256(self.profile)}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), esperado)
+        self.assertEqual(response.json()['total_mediciones'], 4)
+
+        # Las consultas de los hilos se cuentan en la petición
+        serie = 'nutrisoil_db_queries_per_request_sum{vista="dashboard-stats-async",metodo="GET"}'
+        linea = next(linea for linea in REGISTRO.exponer().splitlines() if linea.startswith(serie))
+        self.assertGreaterEqual(float(linea.split()[-1]), 4)
+
+    def test_dashboard_exige_autenticacion(self):
+        self.assertEqual(self.get_async('/api/async/dashboard/stats/').status_code, 403)
+        self.assertEqual(self.get_async('/api/async/dashboard/stats/', Authorization='Bearer malo').status_code, 403)
+        # Mismo orden que DRF: autenticación y permisos antes que el método
+        response = async_to_sync(self.async_client.post)('/api/async/dashboard/stats/')
+        self.assertEqual(response.status_code, APIClient().post('/api/dashboard/stats/').status_code)
+        response = async_to_sync(self.async_client.post)(
+            '/api/async/dashboard/stats/', headers={'Authorization': f'Bearer {token_hs256(self.profile)}'})
+        self.assertEqual(response.status_code, 405)
+        # Negociación de contenido y throttling de DRF, como en las vistas síncronas
+        self.assertEqual(self.get_async('/api/async/dashboard/stats/', Accept='application/xml').status_code, 406)
+        with mock.patch('rest_framework.views.APIView.get_throttles', return_value=[mock.Mock(**{
+                'allow_request.return_value': False, 'wait.return_value': 30})]):
+            response = self.get_async('/api/async/dashboard/stats/', Authorization=f'Bearer {token_hs256(self.profile)}')
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '30'))
+
+    def test_ingesta(self):
+        def ingesta(datos, clave='clave-wemos'):
+            return async_to_sync(self.async_client.post)(
+                '/api/async/iot/ingest/', datos, content_type='application/json', headers={'X-Api-Key': clave})
+
+        response = ingesta({'predio_id': self.predio.id, 'humedad': 40.5, 'dispositivo_id': 'wemos-async'})
+        self.assertEqual(response.status_code, 201)
+        medicion = Medicion.objects.get(pk=response.json()['id'])
+        self.assertEqual((medicion.origen, medicion.humedad), ('wemos', Decimal('40.50')))
+        self.assertEqual(Dispositivo.objects.get(identificador='wemos-async').ultima_medicion_id, medicion.pk)
+        self.assertEqual(ingesta({'predio_id': self.predio.id, 'humedad': 40}, clave='otra').status_code, 403)
+        self.assertEqual(ingesta({'predio_id': self.predio.id}).status_code, 400)
+        self.assertEqual(ingesta({'predio_id': 999999, 'humedad': 40}).status_code, 404)
+
+
+# Sin router: con DB_REPLICA_HOSTS la réplica de pruebas es un espejo en sqlite y las lecturas
+# concurrentes con la ingesta chocan con "table is locked"
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, WEMOS_API_KEY='clave-wemos', DATABASE_ROUTERS=[])
+class CargaTests(LiveServerTestCase):
+    def setUp(self):
+        self.addCleanup(asincronia.cerrar_conexiones)  # Las rutas async usan el pool de hilos
+
+    def test_siembra_determinista_y_limpieza(self):
+        ajeno = Profile.objects.create(email='real@example.com')
+        predio_ajeno = Predio.objects.create(usuario=ajeno, nombre='Real', superficie=1, zona='Osorno', tipo_suelo='Andisol')
+        crear_mediciones(predio_ajeno, 2, con_recomendacion=False)
+
+        resumen = sembrar(perfiles=2, predios_por_perfil=2, mediciones_por_predio=30, dias=60, semilla=7)
+        self.assertEqual((resumen['predios'], resumen['mediciones']), (4, 120))
+        primera = list(Medicion.objects.exclude(predio=predio_ajeno).order_by('predio__nombre', 'fecha')
+                       .values_list('ph', 'humedad', 'origen'))
+        fechas = Medicion.objects.exclude(predio=predio_ajeno).values_list('fecha', flat=True)
+        self.assertGreater(min(fechas), timezone.now() - timedelta(days=61))
+
+        sembrar(perfiles=2, predios_por_perfil=2, mediciones_por_predio=30, dias=60, semilla=7)
+        segunda = list(Medicion.objects.exclude(predio=predio_ajeno).order_by('predio__nombre', 'fecha')
+                       .values_list('ph', 'humedad', 'origen'))
+        self.assertEqual(primera, segunda)
+        self.assertEqual(Profile.objects.count(), 3)
+
+        self.assertEqual(limpiar(), 120)
+        self.assertEqual(list(Profile.objects.values_list('email', flat=True)), ['real@example.com'])
+        self.assertEqual(Medicion.objects.count(), 2)
+
+    def test_carga_contra_servidor(self):
+        sembrar(perfiles=1, predios_por_perfil=2, mediciones_por_predio=10, semilla=7)
+        generador = GeneradorCarga(self.live_server_url, 'clave-wemos', JWT_SECRET,
+                                   dispositivos=2, usuarios=1, peticiones=4)
+        resultado = generador.ejecutar()
+
+        ingesta, dashboard = resultado['resultados']['ingesta'], resultado['resultados']['dashboard']
+        self.assertEqual((ingesta['peticiones'], ingesta['errores']), (8, 0))
+        self.assertEqual(ingesta['codigos'], {'201': 8})
+        self.assertEqual((dashboard['peticiones'], dashboard['errores']), (2, 0))
+        self.assertEqual(resultado['resultados']['mediciones']['errores'], 0)
+        self.assertLessEqual(ingesta['p50_ms'], ingesta['p95_ms'])
+        self.assertEqual(Dispositivo.objects.filter(identificador__startswith='carga-').count(), 2)
+
+        # Vistas async: un cliente por corrida (sqlite en memoria no admite escrituras concurrentes)
+        for dispositivos, usuarios in ((1, 0), (0, 1)):
+            asincrono = GeneradorCarga(self.live_server_url, 'clave-wemos', JWT_SECRET, dispositivos=dispositivos,
+                                       usuarios=usuarios, peticiones=2, rutas_async=True).ejecutar()
+            self.assertTrue(asincrono['configuracion']['rutas_async'])
+            self.assertEqual(sum(r['errores'] for r in asincrono['resultados'].values()), 0, asincrono)
+        self.assertEqual(Dispositivo.objects.get(identificador='carga-0000').total_lecturas, 6)
+
+
+@override_settings(DB_REPLICA_RETRASO_MAX=5, DB_REPLICA_VENTANA_ESCRITURA=10, DB_REPLICA_INTERVALO_RETRASO=60)
+class EleccionReplicaTests(SimpleTestCase):
+    """Lógica del router sin réplicas reales: alias y retrasos simulados."""
+
+    def setUp(self):
+        cache.clear()
+        replicas._retrasos.clear()
+        self.addCleanup(replicas._retrasos.clear)
+        patcher = mock.patch.object(replicas, 'replicas', return_value=['replica_1', 'replica_2'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def elegir(self, retrasos, usuario_id=1):
+        with mock.patch.object(replicas, 'retraso', side_effect=retrasos.get):
+            return replicas.elegir_alias(usuario_id)
+
+    def test_elige_una_replica_al_dia(self):
+        self.assertEqual(self.elegir({'replica_1': 30.0, 'replica_2': 1.0}), ('replica_2', 'replica'))
+        self.assertEqual(self.elegir({'replica_1': 30.0, 'replica_2': 6.0}), (None, 'retraso'))
+        with mock.patch.object(replicas, 'replicas', return_value=[]):
+            self.assertEqual(self.elegir({}), (None, 'sin_replicas'))
+
+    def test_tras_escribir_lee_de_la_primaria(self):
+        replicas.registrar_escritura(1)
+        self.assertEqual(self.elegir({'replica_1': 0.0, 'replica_2': 0.0}), (None, 'escritura_reciente'))
+        self.assertEqual(self.elegir({'replica_1': 0.0, 'replica_2': 9.0}, usuario_id=2)[0], 'replica_1')
+
+    def test_retraso_se_mide_una_vez_por_intervalo(self):
+        with mock.patch.object(replicas, 'medir_retraso', return_value=3.0) as medir:
+            self.assertEqual([replicas.retraso('replica_1') for _ in range(3)], [3.0] * 3)
+        self.assertEqual(medir.call_count, 1)
+        with mock.patch.object(replicas, 'medir_retraso', side_effect=DatabaseError):
+            self.assertEqual(replicas.retraso('replica_2'), float('inf'))  # Sin medición: a la primaria
+
+    def test_vista_marcada_enruta_sus_lecturas(self):
+        router = replicas.RouterReplicas()
+
+        @replicas.lectura_replica
+        def vista(request):
+            return router.db_for_read(Medicion)
+
+        with mock.patch.object(replicas, 'retraso', return_value=0.0), \
+                mock.patch.object(replicas.random, 'choice', side_effect=lambda al_dia: al_dia[-1]):
+            self.assertEqual(vista(HttpRequest()), 'replica_2')
+        with mock.patch.object(replicas, 'retraso', return_value=60.0):
+            self.assertIsNone(vista(HttpRequest()))
+        self.assertIsNone(router.db_for_read(Medicion))  # Fuera de la vista: la primaria
+        self.assertEqual(router.db_for_write(Medicion), 'default')
+
+
+@skipUnless('replica_1' in settings.DATABASES, "Requiere DB_REPLICA_HOSTS (la réplica es un espejo en las pruebas)")
+@override_settings(SUPABASE_JWT_SECRET=JWT_SECRET, DB_REPLICA_RETRASO_MAX=5, DB_REPLICA_VENTANA_ESCRITURA=10)
+class ReplicasTests(TransactionTestCase):
+    # Sin la transacción de TestCase: con una abierta las lecturas se quedan en la primaria.
+    # Django reúne `databases` también de las clases omitidas: solo alias que existen
+    databases = {'default', *replicas.replicas()}
+
+    def setUp(self):
+        self.addCleanup(asincronia.cerrar_conexiones)
+        token_cache.clear()
+        cache.clear()
+        replicas._retrasos.clear()
+        self.profile = Profile.objects.create(id=uuid.uuid4(), email='replicas@nutrisoil.cl')
+        self.predio = Predio.objects.create(usuario=self.profile, nombre='Fundo', superficie=Decimal('4'),
+                                            zona='Osorno', tipo_suelo='Andisol')
+        crear_mediciones(self.predio, 2)
+        self.client = cliente_autenticado(self.profile)
+        self.client.get('/api/predios/')  # Crea el User del perfil
+
+    def lecturas(self, url):
+        """Réplicas elegidas por el router durante la petición (vacío = todo en la primaria)."""
+        elegidas = []
+        original = replicas.RouterReplicas.db_for_read
+
+        def espiar(router, model, **hints):
+            elegidas.append(original(router, model, **hints))
+            return elegidas[-1]
+
+        with mock.patch.object(replicas.RouterReplicas, 'db_for_read', espiar):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return {alias for alias in elegidas if alias}
+
+    def test_vistas_de_lectura_usan_la_replica(self):
+        for url in ('/api/mediciones/', '/api/dashboard/stats/', '/api/async/dashboard/stats/', '/api/recomendaciones/',
+                    f'/api/mediciones/promedios-semanales/?predio={self.predio.id}'):
+            self.assertEqual(self.lecturas(url), {'replica_1'}, url)
+        self.assertEqual(self.lecturas('/api/predios/'), set())  # No marcada
+
+    def test_tras_escribir_lee_de_la_primaria(self):
+        response = self.client.post('/api/predios/', {'nombre': 'Nuevo', 'superficie': '2', 'zona': 'Osorno',
+                                                      'tipo_suelo': 'Andisol'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.lecturas('/api/mediciones/'), set())
+
+        cache.clear()  # Venció la ventana
+        self.assertEqual(self.lecturas('/api/mediciones/'), {'replica_1'})
+
+    def test_replica_atrasada_usa_la_primaria(self):
+        with mock.patch.object(replicas, 'medir_retraso', return_value=30.0) as medir:
+            self.assertEqual(self.lecturas('/api/mediciones/'), set())
+            self.assertEqual(self.lecturas('/api/dashboard/stats/'), set())
+        self.assertEqual(medir.call_count, 1)  # El retraso se mide una vez por intervalo
+
+        replicas._retrasos.clear()
+        self.assertIn('nutrisoil_db_read_routing_total{destino="default",motivo="retraso"}', REGISTRO.exponer())
+        self.assertEqual(self.lecturas('/api/mediciones/'), {'replica_1'})
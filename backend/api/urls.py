@@ -4,6 +4,14 @@ from rest_framework.routers import DefaultRouter
 from . import views
 from . import views_admin
 from . import views_recomendacion
+from . import views_exportacion
+from . import views_reportes
+from . import views_tareas
+from . import views_perfiles
+from . import views_dispositivos
+from . import views_async
+from . import views_pronosticos
+from . import views_regional
 from .views_profile import ProfileViewSet
 
 # El router de DRF se encarga de generar las URLs para los ViewSets
@@ -13,6 +21,8 @@ router.register(r'mediciones', views.MedicionViewSet, basename='medicion')
 router.register(r'admin/users', views_admin.AdminUserViewSet, basename='admin-users')
 router.register(r'profiles', ProfileViewSet, basename='profile')
 router.register(r'recomendaciones', views_recomendacion.RecomendacionViewSet, basename='recomendacion')
+router.register(r'reportes', views_reportes.ReporteViewSet, basename='reporte')
+router.register(r'perfiles', views_perfiles.PerfilViewSet, basename='perfil')
 
 # Aquí definimos las URLs para nuestras vistas basadas en funciones
 urlpatterns = [
@@ -29,7 +39,25 @@ urlpatterns = [
     
     # URL para las estadísticas del Dashboard
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    # Versión async (ASGI): las consultas independientes en paralelo
+    path('async/dashboard/stats/', views_async.dashboard_stats, name='dashboard-stats-async'),
+    # Proyección de humedad y NPK (la calcula `manage.py pronosticar`)
+    path('dashboard/pronosticos/', views_pronosticos.pronosticos_dashboard, name='dashboard-pronosticos'),
+
+    # Exportación masiva en streaming (CSV / NDJSON / Parquet / Arrow)
+    path('exportar/<str:tipo>/', views_exportacion.exportar, name='exportar'),
+
+    # Comparaciones por zona, suelo y cultivo (solo admin; `manage.py refrescar_regional`)
+    path('regional/resumen/', views_regional.resumen_regional, name='regional-resumen'),
+    path('regional/ranking/', views_regional.ranking_regional, name='regional-ranking'),
+
+    # Métricas de la cola de tareas (solo admin)
+    path('tareas/metricas/', views_tareas.metricas_tareas, name='tareas-metricas'),
 
     # URL para ingesta de datos IoT (Wemos)
     re_path(r'^iot/ingest/?$', views.recibir_datos_wemos, name='iot-ingest'),
+    re_path(r'^async/iot/ingest/?$', views_async.recibir_datos_wemos, name='iot-ingest-async'),
+
+    # Estado de los dispositivos IoT (última vez visto, inactivos)
+    path('iot/dispositivos/', views_dispositivos.salud_dispositivos, name='iot-dispositivos'),
 ]
\ No newline at end of file
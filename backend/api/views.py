@@ -4,17 +4,26 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
 from django.contrib.auth.models import User
-from django.db.models import Avg
-from datetime import timedelta, datetime
-from collections import defaultdict
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+import time
+from datetime import timedelta
+from django.utils import timezone
 from django.conf import settings
-from .models import Predio, Medicion, Recomendacion
+from .models import Predio, Medicion
+from .anomalias import evaluar_lectura
+from .dispositivos import DESCONOCIDO, identificador, observar_ingesta, registrar_lectura, reservar_secuencia
+from .lecturas import CAMPOS as CAMPOS_LECTURA, cargar_lecturas
+from .mixins import CamposDinamicosViewMixin
+from .recomendaciones import calcular_y_guardar, tiene_npk
+from .replicas import lectura_replica
+from .resumenes import acumular, dia_utc, estadisticas, recalcular
+from .tareas import encolar_recomendacion
+from .serializacion_rapida import CAMPOS_MEDICION, SerializadorFilas
 from .serializers import (
     PredioSerializer, MedicionSerializer, MedicionCreateSerializer,
-    RecomendacionSerializer, PromedioSemanalSerializer,
-    GenerarRecomendacionSemanalSerializer
+    RecomendacionSerializer, PromedioSemanalSerializer
 )
-from calculadora.motor_calculo import MotorFertilizacion
 
 # Ya no se importan las utilidades de autenticación manual,
 # DRF lo gestiona a través de la clase en 'api/authentication.py'
@@ -24,7 +33,7 @@ from calculadora.motor_calculo import MotorFertilizacion
 # PREDIOS (Refactorizado para usar la autenticación de DRF)
 # ═══════════════════════════════════════════════════════
 
-class PredioViewSet(viewsets.ModelViewSet):
+class PredioViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     serializer_class = PredioSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -33,7 +42,10 @@ class PredioViewSet(viewsets.ModelViewSet):
         profile = getattr(self.request, 'profile', None)
         if profile:
             # ¡SOLUCIÓN! Filtramos por el objeto Profile, no por el User.
-            return Predio.objects.filter(usuario=profile)
+            queryset = Predio.objects.filter(usuario=profile)
+            if self.action in self.acciones_lectura and self.get_campos() is not None:
+                queryset = queryset.only(*self.columnas_solicitadas(Predio))
+            return queryset
         return Predio.objects.none()
 
     def perform_create(self, serializer):
@@ -42,16 +54,29 @@ class PredioViewSet(viewsets.ModelViewSet):
             # ¡SOLUCIÓN! Guardamos usando el objeto Profile.
             serializer.save(usuario=profile)
 
+    @action(detail=True, methods=['get'], url_path='estadisticas')
+    @lectura_replica
+    def estadisticas(self, request, pk=None):
+        """
+        Promedio, mínimo y máximo por parámetro de los últimos 7 y 30 días y del
+        mes en curso, y la media exponencial de los sensores. Sale de los
+        resúmenes diarios (api/resumenes.py): no recorre las mediciones.
+        """
+        return Response(estadisticas(self.get_object()))
+
 
 # ═══════════════════════════════════════════════════════
 # MEDICIONES (Refactorizado para usar la autenticación de DRF)
 # ═══════════════════════════════════════════════════════
 
+from rest_framework.parsers import MultiPartParser
+
 from .filters import MedicionFilter
+from .importacion import ImportacionError, importar_mediciones
 from .pagination import StandardResultsSetPagination
 
 
-class MedicionViewSet(viewsets.ModelViewSet):
+class MedicionViewSet(CamposDinamicosViewMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
     filterset_class = MedicionFilter
@@ -71,7 +96,26 @@ class MedicionViewSet(viewsets.ModelViewSet):
         if not profile:
             return Medicion.objects.none()
         
-        return Medicion.objects.filter(predio__usuario=profile).select_related('predio').order_by('-fecha')
+        queryset = Medicion.objects.filter(predio__usuario=profile).order_by('-fecha')
+        if self.action not in self.acciones_lectura:
+            return queryset.select_related('predio')
+
+        # Solo se hace JOIN de lo que se va a serializar (?fields= / ?expand=).
+        # La recomendación (one-to-one inverso) y su predio van en el mismo JOIN.
+        relaciones = []
+        if self.campo_solicitado('predio_nombre') or self.campo_solicitado('predio_zona'):
+            relaciones.append('predio')
+        if self.relacion_expandida('recomendacion'):
+            relaciones.append('recomendacion')
+            if self.relacion_expandida('recomendacion.predio_detalle'):
+                relaciones.append('recomendacion__predio')
+        if relaciones:  # select_related() sin argumentos seguiría todas las FK
+            queryset = queryset.select_related(*relaciones)
+
+        if self.get_campos() is not None and 'recomendacion' not in relaciones:
+            extra = ('predio', 'predio__nombre', 'predio__zona') if 'predio' in relaciones else ()
+            queryset = queryset.only(*self.columnas_solicitadas(Medicion, *extra))
+        return queryset
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -87,18 +131,46 @@ class MedicionViewSet(viewsets.ModelViewSet):
              # Dado el error anterior "Predio.usuario must be a Profile instance", sabemos que apunta a Profile.
             return Response({'error': 'Predio no válido o no pertenece al usuario'}, status=status.HTTP_403_FORBIDDEN)
         
-        medicion = serializer.save()
-        
-        if all([medicion.nitrogeno, medicion.fosforo, medicion.potasio]):
-            try:
-                self._calcular_y_guardar_recomendacion(medicion)
-            except Exception as e:
-                print(f"Error al calcular recomendación: {e}")
-        
+        # La recomendación se calcula en la cola de tareas (manage.py procesar_tareas);
+        # la tarea se confirma junto con la medición
+        with transaction.atomic():
+            medicion = serializer.save()
+            acumular(medicion)
+            if tiene_npk(medicion):
+                encolar_recomendacion(medicion.id)
+
         output_serializer = MedicionSerializer(medicion)
         return Response(output_serializer.data, status=status.HTTP_201_CREATED)
 
+    # Editar o borrar cambia sumas, mínimos y máximos ya acumulados: se rehacen los días afectados
+    def perform_update(self, serializer):
+        anterior = (serializer.instance.predio_id, dia_utc(serializer.instance.fecha))
+        with transaction.atomic():
+            medicion = serializer.save()
+            for predio_id, dia in {anterior, (medicion.predio_id, dia_utc(medicion.fecha))}:
+                recalcular([predio_id], dia, dia)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            dia = dia_utc(instance.fecha)
+            recalcular([instance.predio_id], dia, dia)
+
+    @lectura_replica
+    def list(self, request, *args, **kwargs):
+        # Sin relaciones anidadas cada fila se arma desde values_list (camino rápido)
+        if self.relacion_expandida('recomendacion'):
+            return super().list(request, *args, **kwargs)
+
+        rapido = SerializadorFilas(Medicion, CAMPOS_MEDICION, nombres=self.get_campos())
+        queryset = rapido.valores(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rapido.filas(page))
+        return Response(rapido.filas(queryset))
+
     @action(detail=False, methods=['get'], url_path='promedios-semanales')
+    @lectura_replica
     def promedios_semanales(self, request):
         predio_id = request.query_params.get('predio')
         if not predio_id:
@@ -115,33 +187,62 @@ class MedicionViewSet(viewsets.ModelViewSet):
         except Predio.DoesNotExist:
             return Response({'error': 'Predio no encontrado o no tiene permiso'}, status=status.HTTP_404_NOT_FOUND)
 
-        mediciones = Medicion.objects.filter(predio=predio).order_by('fecha')
-        if not mediciones.exists():
+        # Floats desde la base y memoria por columnas: sin un Medicion ni un Decimal por valor.
+        # Los valores marcados como anómalos en la ingesta no entran en los promedios.
+        lote = cargar_lecturas(Medicion.objects.filter(predio=predio).order_by('fecha'),
+                               excluir_anomalias=settings.ANOMALIAS_EXCLUIR_PROMEDIOS)
+        if not len(lote):
             return Response([])
 
-        grupos_semanales = defaultdict(list)
-        for medicion in mediciones:
-            semana_inicio = medicion.get_semana_inicio()
-            grupos_semanales[semana_inicio].append(medicion)
-
         resultados = []
-        for semana_inicio, mediciones_semana in sorted(grupos_semanales.items(), reverse=True):
+        for semana_inicio, indices in sorted(lote.agrupar_por_semana().items(), reverse=True):
             promedios = {
                 'semana_inicio': semana_inicio,
                 'predio_id': predio.id,
                 'predio_nombre': predio.nombre,
-                'cantidad_mediciones': len(mediciones_semana),
-                'fecha_primera': min(m.fecha for m in mediciones_semana),
-                'fecha_ultima': max(m.fecha for m in mediciones_semana),
+                'cantidad_mediciones': len(indices),
+                'fecha_primera': lote.fecha(indices[0]),  # Ordenadas por fecha
+                'fecha_ultima': lote.fecha(indices[-1]),
             }
-            for campo in ['ph', 'temperatura', 'humedad', 'nitrogeno', 'fosforo', 'potasio']:
-                valores = [getattr(m, campo) for m in mediciones_semana if getattr(m, campo) is not None]
-                promedios[f'{campo}_promedio'] = round(sum(float(v) for v in valores) / len(valores), 2) if valores else None
+            for campo in CAMPOS_LECTURA:
+                promedio = lote.promedio(campo, indices)
+                promedios[f'{campo}_promedio'] = round(promedio, 2) if promedio is not None else None
             resultados.append(promedios)
             
         serializer = PromedioSemanalSerializer(resultados, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='importar', parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """
+        Importación masiva de resultados de laboratorio (multipart, campo `archivo`).
+        Columnas: predio (id o nombre), fecha (opcional), ph, temperatura, humedad,
+        nitrogeno, fosforo, potasio. ?solo_validar=true revisa el archivo sin importar.
+        Responde 201 si todo se importó, 207 si hubo filas rechazadas.
+        """
+        profile = getattr(request, 'profile', None)
+        if not profile:
+            return Response({'error': 'Usuario sin perfil'}, status=status.HTTP_403_FORBIDDEN)
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({'error': 'Debe adjuntar el archivo en el campo "archivo"'}, status=status.HTTP_400_BAD_REQUEST)
+
+        solo_validar = request.query_params.get('solo_validar', '').lower() in ('1', 'true')
+        try:
+            resultado = importar_mediciones(profile, archivo, archivo.name, solo_validar=solo_validar)
+        except ImportacionError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if solo_validar:
+            codigo = status.HTTP_200_OK
+        elif not resultado['importadas']:
+            codigo = status.HTTP_400_BAD_REQUEST
+        elif resultado['rechazadas']:
+            codigo = status.HTTP_207_MULTI_STATUS
+        else:
+            codigo = status.HTTP_201_CREATED
+        return Response(resultado, status=codigo)
+
     @action(detail=True, methods=['post'], url_path='generar-recomendacion')
     def generar_recomendacion(self, request, pk=None):
         """
@@ -166,108 +267,61 @@ class MedicionViewSet(viewsets.ModelViewSet):
             return Response({'error': f'Error al generar recomendación: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def _calcular_y_guardar_recomendacion(self, medicion):
-        predio = medicion.predio
-        calculos = MotorFertilizacion.calcular_recomendacion_completa(medicion, predio)
-        
-        recomendacion, created = Recomendacion.objects.update_or_create(
-            medicion=medicion,
-            defaults={
-                'predio': predio,
-                'semana_inicio': medicion.get_semana_inicio(),
-                'ph_promedio': medicion.ph,
-                'temp_promedio': medicion.temperatura,
-                'humedad_promedio': medicion.humedad,
-                'n_promedio': medicion.nitrogeno,
-                'p_promedio': medicion.fosforo,
-                'k_promedio': medicion.potasio,
-                **calculos
-            }
-        )
-        return recomendacion
+        return calcular_y_guardar(medicion)
 
 
 # ═══════════════════════════════════════════════════════
 # VISTAS BASADAS EN FUNCIONES (Refactorizadas)
 # ═══════════════════════════════════════════════════════
 
-@api_view(['POST'])
-def generar_recomendacion_semanal(request):
-    serializer = GenerarRecomendacionSemanalSerializer(data=request.data)
-    serializer.is_valid(raise_exception=True)
-    
-    predio_id = serializer.validated_data['predio_id']
-    semana_inicio = serializer.validated_data['semana_inicio']
+from .utils import generar_alertas
 
-    try:
-        profile = getattr(request, 'profile', None)
-        if not profile:
-             return Response({'error': 'Usuario sin perfil'}, status=status.HTTP_403_FORBIDDEN)
-        predio = Predio.objects.get(id=predio_id, usuario=profile)
-    except Predio.DoesNotExist:
-        return Response({'error': 'Predio no encontrado o no tiene permiso'}, status=status.HTTP_404_NOT_FOUND)
-
-    semana_fin = semana_inicio + timedelta(days=6)
-    mediciones_semana = Medicion.objects.filter(
-        predio=predio, fecha__date__gte=semana_inicio, fecha__date__lte=semana_fin
-    )
-    if not mediciones_semana.exists():
-        return Response({'error': 'No hay mediciones para esa semana'}, status=status.HTTP_404_NOT_FOUND)
 
-    promedios = mediciones_semana.aggregate(
-        ph=Avg('ph'), temperatura=Avg('temperatura'), humedad=Avg('humedad'),
-        nitrogeno=Avg('nitrogeno'), fosforo=Avg('fosforo'), potasio=Avg('potasio')
-    )
-    if not all([promedios['nitrogeno'], promedios['fosforo'], promedios['potasio']]):
-        return Response({'error': 'Faltan datos de NPK en las mediciones de esta semana'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Usamos un objeto simple (como un dict) para pasar al motor de cálculo
-    medicion_promedio_dict = {
-        'ph': promedios['ph'], 'temperatura': promedios['temperatura'], 'humedad': promedios['humedad'],
-        'nitrogeno': promedios['nitrogeno'], 'fosforo': promedios['fosforo'], 'potasio': promedios['potasio']
-    }
-    
-    resultado = MotorFertilizacion.calcular_recomendacion_completa(medicion_promedio_dict, predio)
-    
-    recomendacion, created = Recomendacion.objects.update_or_create(
-        predio=predio, semana_inicio=semana_inicio, defaults={**resultado, **promedios}
-    )
-    
-    serializer_response = RecomendacionSerializer(recomendacion)
-    return Response(serializer_response.data, status=status.HTTP_201_CREATED)
+DASHBOARD_VACIO = {
+    'total_predios': 0, 'total_superficie': 0, 'total_mediciones': 0,
+    'ultima_medicion': None, 'tendencia_npk': [],
+    'comparativa_predios': [], 'alertas': []
+}
 
 
-from .utils import generar_alertas
+def mediciones_del_usuario(profile, predio_ids=None):
+    # Con los ids ya conocidos el filtro va directo al índice (predio, fecha), sin JOIN a predios.
+    # Sin ellos (vista async, en paralelo con la consulta de predios) va por subconsulta
+    if predio_ids is None:
+        predio_ids = Predio.objects.filter(usuario=profile).values('pk')
+    return Medicion.objects.filter(predio_id__in=predio_ids)
 
 
-@api_view(['GET'])
-def dashboard_stats(request):
-    profile = getattr(request, 'profile', None)
-    if not profile:
-        return Response({
-            'total_predios': 0, 'total_superficie': 0, 'total_mediciones': 0,
-            'ultima_medicion': None, 'tendencia_npk': [],
-            'comparativa_predios': [], 'alertas': []
-        })
+def predios_dashboard(profile):
+    """Predios del usuario y {id: última medición} de cada uno, en dos consultas."""
+    # Cada predio trae el id de su última medición en la misma consulta (subquery)
+    ultima_por_predio = Medicion.objects.filter(predio=OuterRef('pk')).order_by('-fecha').values('pk')[:1]
+    predios = list(Predio.objects.filter(usuario=profile).annotate(ultima_medicion_id=Subquery(ultima_por_predio)))
+    # Una sola consulta para las últimas mediciones de todos los predios
+    ultimas_mediciones = Medicion.objects.select_related('predio').in_bulk(
+        [p.ultima_medicion_id for p in predios if p.ultima_medicion_id]
+    )
+    return predios, ultimas_mediciones
 
-    predios = Predio.objects.filter(usuario=profile)
-    mediciones_usuario = Medicion.objects.filter(predio__usuario=profile).order_by('-fecha')
 
+def tendencia_npk(mediciones):
+    """Filas de los últimos 30 días para el gráfico de tendencia."""
+    fecha_hace_30_dias = timezone.now() - timedelta(days=30)
+    rapido = SerializadorFilas(Medicion, CAMPOS_MEDICION)
+    return rapido.filas(rapido.valores(mediciones.filter(fecha__gte=fecha_hace_30_dias).order_by('fecha')))
+
+
+def armar_dashboard(predios, ultimas_mediciones, total_mediciones, tendencia):
     # --- KPIs Generales ---
-    total_predios = predios.count()
     total_superficie = sum(p.superficie for p in predios if p.superficie is not None)
-    total_mediciones = mediciones_usuario.count()
-    ultima_medicion = mediciones_usuario.first()
+    ultima_medicion = max(ultimas_mediciones.values(), key=lambda m: (m.fecha, m.pk), default=None)
 
-    # --- Datos para Gráfico de Tendencia (últimos 30 días) ---
-    fecha_hace_30_dias = datetime.now() - timedelta(days=30)
-    tendencia_npk = mediciones_usuario.filter(fecha__gte=fecha_hace_30_dias).order_by('fecha')
-    
     # --- Datos para Gráfico de Comparativa y Alertas ---
     comparativa_predios = []
     alertas = []
 
     for predio in predios:
-        ultima_medicion_predio = Medicion.objects.filter(predio=predio).order_by('-fecha').first()
+        ultima_medicion_predio = ultimas_mediciones.get(predio.ultima_medicion_id)
         if ultima_medicion_predio:
             # Para la comparativa, añadimos todos los nutrientes
             comparativa_predios.append({
@@ -283,15 +337,29 @@ def dashboard_stats(request):
                 alerta['mensaje'] = f"En {predio.nombre}: {alerta['mensaje']}"
             alertas.extend(alertas_predio)
 
-    return Response({
-        'total_predios': total_predios,
+    return {
+        'total_predios': len(predios),
         'total_superficie': float(total_superficie),
         'total_mediciones': total_mediciones,
-        'ultima_medicion_kpis': MedicionSerializer(ultima_medicion).data if ultima_medicion else None,
-        'tendencia_npk': MedicionSerializer(tendencia_npk, many=True).data,
+        # Los gráficos y KPIs solo usan campos planos: sin recomendación anidada
+        'ultima_medicion_kpis': MedicionSerializer(ultima_medicion, expand=[]).data if ultima_medicion else None,
+        'tendencia_npk': tendencia,
         'comparativa_predios': comparativa_predios,
         'alertas': alertas,
-    })
+    }
+
+
+@api_view(['GET'])
+@lectura_replica
+def dashboard_stats(request):
+    """Consultas una tras otra; views_async.dashboard_stats hace las independientes en paralelo."""
+    profile = getattr(request, 'profile', None)
+    if not profile:
+        return Response(DASHBOARD_VACIO)
+
+    predios, ultimas_mediciones = predios_dashboard(profile)
+    mediciones = mediciones_del_usuario(profile, [p.pk for p in predios])
+    return Response(armar_dashboard(predios, ultimas_mediciones, mediciones.count(), tendencia_npk(mediciones)))
 
 
 # NOTA SOBRE WEMOS: Esta vista ahora debería tener su propia autenticación,
@@ -305,19 +373,30 @@ def recibir_datos_wemos(request):
     """
     Endpoint para recibir datos desde el dispositivo Wemos/ESP32.
     Autenticación simple por token en el header o body.
+    Cada lectura actualiza la telemetría de ingesta y el índice de dispositivos.
     """
+    inicio = time.perf_counter()
+    telemetria = {'dispositivo': DESCONOCIDO, 'predio': None}
+    response = procesar_ingesta(request.META.get('HTTP_X_API_KEY'), request.data, telemetria)
+    observar_ingesta(telemetria['dispositivo'], telemetria['predio'], str(response.status_code),
+                     time.perf_counter() - inicio)
+    return response
+
+
+def procesar_ingesta(device_token, datos, telemetria):
+    """Valida y guarda una lectura; compartida con views_async.recibir_datos_wemos."""
     # 1. Validación de Seguridad Simple
-    device_token = request.META.get('HTTP_X_API_KEY') 
     if device_token != settings.WEMOS_API_KEY:
         return Response({'error': 'Token de dispositivo inválido'}, status=status.HTTP_403_FORBIDDEN)
 
     # 2. Extraer datos
-    predio_id = request.data.get('predio_id')
-    humedad = request.data.get('humedad')
+    predio_id = datos.get('predio_id')
+    humedad = datos.get('humedad')
+    telemetria['dispositivo'] = identificador(datos, predio_id)
     
     # Wemos podría enviar otros datos en el futuro
-    temperatura = request.data.get('temperatura') 
-    ph = request.data.get('ph')
+    temperatura = datos.get('temperatura') 
+    ph = datos.get('ph')
 
     if not predio_id:
         return Response({'error': 'Falta predio_id'}, status=status.HTTP_400_BAD_REQUEST)
@@ -325,21 +404,46 @@ def recibir_datos_wemos(request):
     if humedad is None:
         return Response({'error': 'Falta dato de humedad'}, status=status.HTTP_400_BAD_REQUEST)
 
+    # Firmware con números de secuencia: reenvíos sin duplicar (api/dispositivos.py)
+    secuencia = datos.get('seq')
+    if secuencia is not None:
+        try:
+            secuencia = int(secuencia)
+        except (TypeError, ValueError):
+            secuencia = -1
+        if secuencia < 0:
+            return Response({'error': 'seq debe ser un entero no negativo'}, status=status.HTTP_400_BAD_REQUEST)
+
     # 3. Validar Predio
     try:
         predio = Predio.objects.get(id=predio_id)
-    except Predio.DoesNotExist:
+    except (Predio.DoesNotExist, ValueError):  # ValueError: predio_id no numérico
         return Response({'error': 'Predio no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    telemetria['predio'] = predio.id  # Solo predios existentes como etiqueta de métricas
 
-    # 4. Crear Medición
+    # 4. Crear Medición y actualizar la última vez visto del dispositivo
     try:
-        medicion = Medicion.objects.create(
-            predio=predio,
-            humedad=humedad,
-            temperatura=temperatura, # Puede ser None
-            ph=ph, # Puede ser None
-            origen='wemos'
-        )
-        return Response({'status': 'success', 'id': medicion.id}, status=status.HTTP_201_CREATED)
+        protocolo = {}
+        with transaction.atomic():
+            if secuencia is not None:
+                nueva, dispositivo = reservar_secuencia(telemetria['dispositivo'], predio.id, secuencia,
+                                                        str(datos.get('sesion') or '')[:32])
+                protocolo = {'seq': secuencia, 'secuencia_max': dispositivo.secuencia_max,
+                             'faltantes': dispositivo.faltantes}
+                if not nueva:  # Ya guardada: el equipo no recibió la respuesta anterior
+                    return Response({'status': 'duplicado', **protocolo}, status=status.HTTP_200_OK)
+            # Marca los valores anómalos (picos, sonda en 0 o 100) contra la estadística del predio
+            anomalias = evaluar_lectura(predio.id, {'humedad': humedad, 'temperatura': temperatura, 'ph': ph})
+            medicion = Medicion.objects.create(
+                predio=predio,
+                humedad=humedad,
+                temperatura=temperatura, # Puede ser None
+                ph=ph, # Puede ser None
+                origen='wemos',
+                anomalias=anomalias
+            )
+            acumular(medicion)
+            registrar_lectura(telemetria['dispositivo'], medicion)
+        return Response({'status': 'success', 'id': medicion.id, **protocolo}, status=status.HTTP_201_CREATED)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,5 +1,3 @@
-import os
-import requests
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -8,6 +6,7 @@ from django.contrib.auth.models import User
 from django.conf import settings
 from .models import Profile
 from .serializers_admin import AdminUserSerializer
+from .supabase_admin import get_admin_client
 
 class AdminUserViewSet(viewsets.ModelViewSet):
     queryset = Profile.objects.all()
@@ -36,60 +35,11 @@ class AdminUserViewSet(viewsets.ModelViewSet):
             return Response({"error": "Email y contraseña son requeridos"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # 1. Crear usuario en Supabase Auth vía API REST (requests)
-            # Usamos requests directamente para evitar conflictos con la librería supabase-py
-            url = settings.SUPABASE_URL
-            key = os.environ.get("SUPABASE_SERVICE_KEY")
-            if not key:
-                raise Exception("SUPABASE_SERVICE_KEY no está configurada")
-
-            headers = {
-                "apikey": key,
-                "Authorization": f"Bearer {key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "email": email,
-                "password": password,
-                "email_confirm": True
-            }
-            
-            # Endpoint: /auth/v1/admin/users
-            api_url = f"{url}/auth/v1/admin/users"
-            response = requests.post(api_url, json=payload, headers=headers)
-            
-            if response.status_code not in [200, 201]:
-                raise Exception(f"Error Supabase API ({response.status_code}): {response.text}")
-                
-            user_data = response.json()
-            # La respuesta puede ser el usuario directo o envuelto. 
-            # GoTrue /admin/users devuelve el objeto usuario.
-            supabase_id = user_data.get('id')
-            if not supabase_id:
-                 # Fallback por si la estructura cambia
-                 supabase_id = user_data.get('user', {}).get('id')
-            
-            if not supabase_id:
-                raise Exception(f"No se pudo obtener ID de usuario: {user_data}")
+            # 1. Crear usuario en Supabase Auth vía API REST (cliente compartido con pool)
+            supabase_id = get_admin_client().create_user(email, password)
 
             # 2. Crear Profile y User en Django
-            django_user, _ = User.objects.get_or_create(username=supabase_id, defaults={'email': email})
-            django_user.set_unusable_password()
-            django_user.save()
-
-            profile, created = Profile.objects.get_or_create(id=supabase_id, defaults={'user': django_user})
-            if not created:
-                profile.user = django_user
-            
-            # Actualizar campos del perfil
-            profile.nombre = data.get('nombre', '')
-            profile.apellido = data.get('apellido', '')
-            profile.rut = data.get('rut', '')
-            profile.empresa = data.get('empresa', '')
-            profile.role = data.get('role', 'usuario')
-            profile.email = email
-            profile.save()
+            profile = self._guardar_perfil(supabase_id, email, data)
 
             serializer = self.get_serializer(profile)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -97,6 +47,86 @@ class AdminUserViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Alta masiva de usuarios (ej. una cooperativa completa).
+        Body: {"usuarios": [{"new_email", "password", "nombre", ...}, ...]}
+        Las altas en Supabase se hacen en paralelo con concurrencia acotada;
+        la respuesta informa el resultado de cada usuario en el mismo orden.
+        """
+        if not self.check_admin_permission(request):
+            return Response({"error": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
+
+        usuarios = request.data.get('usuarios')
+        if not isinstance(usuarios, list) or not usuarios:
+            return Response({"error": "Debe enviar una lista 'usuarios'"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(usuarios) > settings.SUPABASE_ADMIN_BULK_MAX:
+            return Response(
+                {"error": f"Máximo {settings.SUPABASE_ADMIN_BULK_MAX} usuarios por petición"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        resultados = [None] * len(usuarios)
+        pendientes = []
+        vistos = set()
+        for i, data in enumerate(usuarios):
+            email = data.get('new_email') if isinstance(data, dict) else None
+            password = data.get('password') if isinstance(data, dict) else None
+            if not email or not password:
+                resultados[i] = {"email": email, "status": "error", "error": "Email y contraseña son requeridos"}
+            elif not isinstance(email, str) or not isinstance(password, str):
+                resultados[i] = {"email": email, "status": "error", "error": "Email y contraseña deben ser texto"}
+            elif email.lower() in vistos:
+                resultados[i] = {"email": email, "status": "error", "error": "Email duplicado en la petición"}
+            else:
+                vistos.add(email.lower())
+                pendientes.append(i)
+
+        # 1. Altas en Supabase Auth en paralelo (solo HTTP, sin tocar la BD en los hilos)
+        respuestas = get_admin_client().create_users(
+            [(usuarios[i]['new_email'], usuarios[i]['password']) for i in pendientes]
+        )
+
+        # 2. Perfiles locales en el hilo de la request
+        for i, (estado, valor) in zip(pendientes, respuestas):
+            data = usuarios[i]
+            email = data['new_email']
+            if estado != 'ok':
+                resultados[i] = {"email": email, "status": "error", "error": valor}
+                continue
+            try:
+                profile = self._guardar_perfil(valor, email, data)
+                resultados[i] = {"email": email, "status": "ok", "id": str(profile.id)}
+            except Exception as e:
+                resultados[i] = {"email": email, "status": "error", "id": valor, "error": str(e)}
+
+        creados = sum(1 for r in resultados if r['status'] == 'ok')
+        return Response({
+            "creados": creados,
+            "fallidos": len(resultados) - creados,
+            "resultados": resultados,
+        }, status=status.HTTP_201_CREATED if creados == len(resultados) else status.HTTP_207_MULTI_STATUS)
+
+    def _guardar_perfil(self, supabase_id, email, data):
+        django_user, _ = User.objects.get_or_create(username=supabase_id, defaults={'email': email})
+        django_user.set_unusable_password()
+        django_user.save()
+
+        profile, created = Profile.objects.get_or_create(id=supabase_id, defaults={'user': django_user})
+        if not created:
+            profile.user = django_user
+        
+        # Actualizar campos del perfil
+        profile.nombre = data.get('nombre', '')
+        profile.apellido = data.get('apellido', '')
+        profile.rut = data.get('rut', '')
+        profile.empresa = data.get('empresa', '')
+        profile.role = data.get('role', 'usuario')
+        profile.email = email
+        profile.save()
+        return profile
+
     def update(self, request, *args, **kwargs):
         if not self.check_admin_permission(request):
             return Response({"error": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
@@ -122,29 +152,8 @@ class AdminUserViewSet(viewsets.ModelViewSet):
                 user.is_active = False
                 user.save()
 
-            # 2. Banear en Supabase vía API REST
-            url = settings.SUPABASE_URL
-            key = os.environ.get("SUPABASE_SERVICE_KEY")
-            if not key:
-                raise Exception("SUPABASE_SERVICE_KEY no está configurada")
-
-            headers = {
-                "apikey": key,
-                "Authorization": f"Bearer {key}",
-                "Content-Type": "application/json"
-            }
-            
-            # Banear por 100 años
-            payload = {"ban_duration": "876000h"}
-            
-            # Endpoint: /auth/v1/admin/users/{id}
-            api_url = f"{url}/auth/v1/admin/users/{instance.id}"
-            response = requests.put(api_url, json=payload, headers=headers)
-            
-            if response.status_code != 200:
-                 # Si falla, verificar si es porque el usuario no existe en Auth (desincronización)
-                 # pero por ahora lanzamos error
-                 raise Exception(f"Error Supabase API ({response.status_code}): {response.text}")
+            # 2. Banear en Supabase vía API REST (100 años)
+            get_admin_client().ban_user(instance.id)
 
             return Response({"message": "Usuario suspendido correctamente"}, status=status.HTTP_200_OK)
 
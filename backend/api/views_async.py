@@ -0,0 +1,49 @@
+# backend/api/views_async.py
+"""
+Versiones async del dashboard y la ingesta, para el despliegue ASGI
+(nutrisoil_project/asgi.py, p. ej. `gunicorn -k uvicorn.workers.UvicornWorker`).
+
+- dashboard: predios con sus últimas mediciones, el conteo y la tendencia de
+  30 días son independientes y corren en paralelo (asincronia.en_paralelo);
+  la latencia es la de la consulta más lenta en vez de la suma.
+- ingesta: la lectura se guarda en un hilo del pool y el event loop sigue
+  atendiendo otras peticiones mientras tanto.
+
+Responden lo mismo que views.dashboard_stats y views.recibir_datos_wemos.
+"""
+import time
+from functools import partial
+
+from rest_framework import permissions
+from rest_framework.response import Response
+
+from .asincronia import en_hilo, en_paralelo, vista_async
+from .dispositivos import DESCONOCIDO, observar_ingesta
+from .replicas import lectura_replica
+from .views import (
+    DASHBOARD_VACIO, armar_dashboard, mediciones_del_usuario, predios_dashboard, procesar_ingesta, tendencia_npk
+)
+
+
+@vista_async(['GET'])
+@lectura_replica
+async def dashboard_stats(request):
+    profile = getattr(request, 'profile', None)
+    if not profile:
+        return Response(DASHBOARD_VACIO)
+
+    mediciones = mediciones_del_usuario(profile)
+    (predios, ultimas_mediciones), total_mediciones, tendencia = await en_paralelo(
+        partial(predios_dashboard, profile), mediciones.count, partial(tendencia_npk, mediciones)
+    )
+    return Response(armar_dashboard(predios, ultimas_mediciones, total_mediciones, tendencia))
+
+
+@vista_async(['POST'], permisos=[permissions.AllowAny])
+async def recibir_datos_wemos(request):
+    inicio = time.perf_counter()
+    telemetria = {'dispositivo': DESCONOCIDO, 'predio': None}
+    response = await en_hilo(procesar_ingesta, request.META.get('HTTP_X_API_KEY'), request.data, telemetria)
+    observar_ingesta(telemetria['dispositivo'], telemetria['predio'], str(response.status_code),
+                     time.perf_counter() - inicio)
+    return response
@@ -0,0 +1,32 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .dispositivos import estado_dispositivos
+from .models import Dispositivo
+
+
+@api_view(['GET'])
+def salud_dispositivos(request):
+    """
+    Estado de los sensores IoT según el índice de última vez visto.
+    GET /api/iot/dispositivos/?inactivos=1&umbral_min=60&predio=3
+    Cada usuario ve los dispositivos de sus predios; un administrador, todos.
+    """
+    profile = getattr(request, 'profile', None)
+    if not profile:
+        return Response({'error': 'Usuario sin perfil'}, status=status.HTTP_403_FORBIDDEN)
+
+    dispositivos = Dispositivo.objects.all()
+    if profile.role != 'admin':
+        dispositivos = dispositivos.filter(predio__usuario=profile)
+    try:
+        if request.query_params.get('predio'):
+            dispositivos = dispositivos.filter(predio_id=int(request.query_params['predio']))
+        umbral = request.query_params.get('umbral_min')
+        umbral = max(1, int(umbral)) if umbral else None
+    except ValueError:
+        return Response({'error': 'predio y umbral_min deben ser números enteros'}, status=status.HTTP_400_BAD_REQUEST)
+
+    solo_inactivos = request.query_params.get('inactivos', '').lower() in ('1', 'true')
+    return Response(estado_dispositivos(dispositivos, umbral_min=umbral, solo_inactivos=solo_inactivos))
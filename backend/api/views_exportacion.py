@@ -0,0 +1,44 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .asincronia import en_flujo
+from .exportacion import FORMATOS, TIPOS, Exportacion, ExportacionError
+
+
+class ExportacionParamsSerializer(serializers.Serializer):
+    formato = serializers.ChoiceField(choices=list(FORMATOS), default='csv')
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+    predio = serializers.IntegerField(required=False)
+
+
+@api_view(['GET'])
+def exportar(request, tipo):
+    """
+    Descarga en streaming todas las filas del usuario, sin paginación.
+    GET /api/exportar/mediciones/?formato=csv|ndjson|parquet|arrow&desde=2025-01-01&hasta=2025-03-31&predio=3
+    """
+    if tipo not in TIPOS:
+        return Response({'error': f'Tipo no válido. Opciones: {", ".join(TIPOS)}'}, status=status.HTTP_404_NOT_FOUND)
+
+    profile = getattr(request, 'profile', None)
+    if not profile:
+        return Response({'error': 'Usuario sin perfil'}, status=status.HTTP_403_FORBIDDEN)
+
+    params = ExportacionParamsSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+
+    try:
+        exportacion = Exportacion(tipo, profile, **params.validated_data)
+    except ExportacionError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    contenido = exportacion.bytes()
+    if isinstance(request._request, ASGIRequest):
+        contenido = en_flujo(contenido)  # Un generador síncrono se enviaría entero al final
+    response = StreamingHttpResponse(contenido, content_type=exportacion.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{exportacion.nombre_archivo}"'
+    return response
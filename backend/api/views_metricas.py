@@ -0,0 +1,23 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from .metricas import REGISTRO
+
+
+@require_GET
+def metricas_prometheus(request):
+    """
+    Métricas por vista en formato de texto de Prometheus. GET /metrics
+    Fuera de DEBUG exige METRICAS_TOKEN en "Authorization: Bearer <token>".
+    """
+    if settings.METRICAS_TOKEN:
+        esperado = f'Bearer {settings.METRICAS_TOKEN}'.encode()
+        autorizado = hmac.compare_digest(request.headers.get('Authorization', '').encode(), esperado)
+    else:
+        autorizado = settings.DEBUG
+    if not autorizado:
+        return HttpResponseForbidden("No autorizado")
+    return HttpResponse(REGISTRO.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
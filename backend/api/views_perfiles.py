@@ -0,0 +1,59 @@
+import io
+import json
+import zipfile
+
+from django.http import HttpResponse
+from rest_framework import mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import BasePermission, IsAuthenticated
+
+from .models import Perfil
+from .serializers import PerfilDetalleSerializer, PerfilSerializer
+
+
+class EsAdministrador(BasePermission):
+    message = 'No autorizado'
+
+    def has_permission(self, request, view):
+        profile = getattr(request, 'profile', None)
+        return bool(profile and profile.role == 'admin')
+
+
+class PerfilViewSet(mixins.RetrieveModelMixin,
+                    mixins.ListModelMixin,
+                    mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    """
+    Perfiles de peticiones tomados con X-Perfilar / ?perfilar=1 (solo administradores).
+
+    GET    /api/perfiles/                 -> listado
+    GET    /api/perfiles/<id>/            -> detalle con el resumen de pstats
+    GET    /api/perfiles/<id>/descargar/  -> zip: perfil.prof, resumen.txt, consultas.json
+    DELETE /api/perfiles/<id>/
+    """
+    permission_classes = [IsAuthenticated, EsAdministrador]
+
+    def get_queryset(self):
+        queryset = Perfil.objects.select_related('usuario')
+        if self.action == 'descargar':
+            return queryset
+        if self.action == 'retrieve':
+            return queryset.defer('estadisticas', 'consultas')
+        return queryset.defer('estadisticas', 'consultas', 'resumen')
+
+    def get_serializer_class(self):
+        return PerfilDetalleSerializer if self.action == 'retrieve' else PerfilSerializer
+
+    @action(detail=True, methods=['get'])
+    def descargar(self, request, pk=None):
+        perfil = self.get_object()
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archivo:
+            archivo.writestr('perfil.prof', bytes(perfil.estadisticas))
+            archivo.writestr('resumen.txt', f"{perfil.metodo} {perfil.ruta} -> {perfil.codigo}\n"
+                                            f"{perfil.duracion_ms} ms, {perfil.cantidad_consultas} consultas SQL "
+                                            f"({perfil.tiempo_sql_ms} ms)\n\n{perfil.resumen}")
+            archivo.writestr('consultas.json', json.dumps(perfil.consultas, ensure_ascii=False, indent=2))
+        response = HttpResponse(buffer.getvalue(), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="perfil_{perfil.pk}_{perfil.fecha:%Y%m%d_%H%M%S}.zip"'
+        return response
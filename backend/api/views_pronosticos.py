@@ -0,0 +1,33 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .models import Predio
+from .pronosticos import pronosticos_de
+from .replicas import lectura_replica
+
+
+@api_view(['GET'])
+@lectura_replica
+def pronosticos_dashboard(request):
+    """
+    Proyección diaria de humedad y NPK de los predios del usuario.
+    GET /api/dashboard/pronosticos/?predio=3
+    Lee lo que guardó el último `manage.py pronosticar`; los predios con pocos
+    días de datos no aparecen.
+    """
+    profile = getattr(request, 'profile', None)
+    if not profile:
+        return Response({'error': 'Usuario sin perfil'}, status=status.HTTP_403_FORBIDDEN)
+
+    predios = Predio.objects.filter(usuario=profile)
+    if request.query_params.get('predio'):
+        try:
+            predios = predios.filter(id=int(request.query_params['predio']))
+        except ValueError:
+            return Response({'error': 'predio debe ser un número entero'}, status=status.HTTP_400_BAD_REQUEST)
+
+    pronosticos = pronosticos_de(predios)
+    return Response({
+        'pronosticos': [{'predio_id': predio_id, **datos} for predio_id, datos in pronosticos.items()],
+    })
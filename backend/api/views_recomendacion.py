@@ -9,12 +9,18 @@ from django.db import transaction # Para asegurar la consistencia
 from .models import Medicion, Recomendacion, Predio
 from .serializers import (
     MedicionSerializer, RecomendacionSerializer,
-    GenerarRecomendacionIndividualSerializer # Nuevo serializador para la entrada
+    GenerarRecomendacionIndividualSerializer, # Nuevo serializador para la entrada
+    GenerarRecomendacionSemanalSerializer, GenerarRecomendacionesSemanalesLoteSerializer
 )
 from calculadora.motor_calculo import MotorFertilizacion
+from .mixins import CamposDinamicosViewMixin
+from .recomendaciones import valores_recomendacion
+from .replicas import lectura_replica
+from .semanal import PROMEDIOS, calcular_semanales, inicio_semana
 from .utils import generar_alertas # Importar la función
 
-class RecomendacionViewSet(mixins.RetrieveModelMixin,
+class RecomendacionViewSet(CamposDinamicosViewMixin,
+                           mixins.RetrieveModelMixin,
                            mixins.ListModelMixin,
                            viewsets.GenericViewSet):
     serializer_class = RecomendacionSerializer
@@ -26,9 +32,19 @@ class RecomendacionViewSet(mixins.RetrieveModelMixin,
         Filtra las recomendaciones para que un usuario solo vea las suyas.
         """
         profile = getattr(self.request, 'profile', None)
-        if profile:
-            return Recomendacion.objects.filter(predio__usuario=profile).select_related('predio', 'medicion').order_by('-fecha_calculo')
-        return Recomendacion.objects.none()
+        if not profile:
+            return Recomendacion.objects.none()
+
+        queryset = Recomendacion.objects.filter(predio__usuario=profile).order_by('-fecha_calculo')
+        if self.action == 'list':
+            # En el listado el predio anidado es opt-in (?expand=predio_detalle)
+            if self.relacion_expandida('predio_detalle'):
+                queryset = queryset.select_related('predio')
+            if self.get_campos() is not None and not self.relacion_expandida('predio_detalle'):
+                queryset = queryset.only(*self.columnas_solicitadas(Recomendacion))
+            return queryset
+        # El detalle agrega alertas calculadas desde la medición
+        return queryset.select_related('predio', 'medicion')
 
     # Endpoint para generar una recomendación individual
     @action(detail=False, methods=['post'], url_path='generar-individual')
@@ -63,18 +79,7 @@ class RecomendacionViewSet(mixins.RetrieveModelMixin,
                 calculos = MotorFertilizacion.calcular_recomendacion_completa(medicion, predio)
 
                 recomendacion, created = Recomendacion.objects.update_or_create(
-                    medicion=medicion,
-                    defaults={
-                        'predio': predio,
-                        'semana_inicio': medicion.get_semana_inicio(),
-                        'ph_promedio': medicion.ph,
-                        'temp_promedio': medicion.temperatura,
-                        'humedad_promedio': medicion.humedad,
-                        'n_promedio': medicion.nitrogeno,
-                        'p_promedio': medicion.fosforo,
-                        'k_promedio': medicion.potasio,
-                        **calculos
-                    }
+                    medicion=medicion, defaults=valores_recomendacion(medicion, calculos)
                 )
             except Exception as e:
                 return Response({'error': f'Error en el motor de cálculo: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -82,6 +87,88 @@ class RecomendacionViewSet(mixins.RetrieveModelMixin,
         serializer = self.get_serializer(recomendacion)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    # Recomendación a partir del promedio de una semana de mediciones
+    @action(detail=False, methods=['post'], url_path='generar-semanal')
+    def generar_semanal(self, request):
+        """
+        La semana se normaliza a su domingo (como get_semana_inicio). Si el
+        precálculo semanal ya la dejó al día se devuelve tal cual (200); si hay
+        mediciones nuevas o se envían promedios manuales se recalcula (201).
+        """
+        serializer = GenerarRecomendacionSemanalSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        profile = getattr(request, 'profile', None)
+        if not profile:
+            return Response({'error': 'Usuario sin perfil'}, status=status.HTTP_403_FORBIDDEN)
+        predio = Predio.objects.filter(pk=datos['predio_id'], usuario=profile).first()
+        if predio is None:
+            return Response({'error': 'Predio no encontrado o no tiene permiso'}, status=status.HTTP_404_NOT_FOUND)
+
+        semana = inicio_semana(datos['semana_inicio'])
+        with transaction.atomic():
+            resultado = calcular_semanales(
+                {predio.id: predio}, [semana], promedios={campo: datos.get(campo) for campo in PROMEDIOS}
+            )
+
+        recomendacion = resultado['recomendaciones'].get((predio.id, semana))
+        if recomendacion is None:
+            if resultado['omitidas']:
+                return Response({'error': resultado['omitidas'][0]['error']}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'error': 'No hay mediciones para esa semana'}, status=status.HTTP_404_NOT_FOUND)
+
+        codigo = status.HTTP_200_OK if resultado['al_dia'] else status.HTTP_201_CREATED
+        return Response(self.get_serializer(recomendacion).data, status=codigo)
+
+    # Varias semanas de varios predios en una sola petición
+    @action(detail=False, methods=['post'], url_path='generar-semanal-lote')
+    def generar_semanal_lote(self, request):
+        """
+        Propiedad de los predios en una consulta, promedios de todas las semanas
+        en una consulta agrupada, motor en lote y escrituras en bulk. Las semanas
+        ya al día no se recalculan (salvo `forzar`).
+        """
+        serializer = GenerarRecomendacionesSemanalesLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        profile = getattr(request, 'profile', None)
+        if not profile:
+            return Response({'error': 'Usuario sin perfil'}, status=status.HTTP_403_FORBIDDEN)
+        predio_ids = set(datos['predio_ids'])
+        predios = Predio.objects.filter(usuario=profile).in_bulk(predio_ids)
+        if len(predios) != len(predio_ids):
+            return Response(
+                {'error': 'Predios no encontrados o sin permiso', 'predio_ids': sorted(predio_ids - set(predios))},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        semanas = sorted({inicio_semana(semana) for semana in datos['semanas']})
+        with transaction.atomic():
+            resultado = calcular_semanales(predios, semanas, forzar=datos['forzar'])
+
+        recomendaciones = resultado['recomendaciones']
+        omitidas = {(o['predio'], o['semana_inicio']) for o in resultado['omitidas']}
+        return Response({
+            'recomendaciones': self.get_serializer(
+                [recomendaciones[clave] for clave in sorted(recomendaciones)], many=True
+            ).data,
+            'creadas': resultado['creadas'],
+            'actualizadas': resultado['actualizadas'],
+            'al_dia': resultado['al_dia'],
+            'omitidas': resultado['omitidas'],
+            'sin_mediciones': [
+                {'predio': predio_id, 'semana_inicio': semana}
+                for predio_id in sorted(predios) for semana in semanas
+                if (predio_id, semana) not in recomendaciones and (predio_id, semana) not in omitidas
+            ],
+        })
+
+    @lectura_replica
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def retrieve(self, request, *args, **kwargs):
         """
         Obtiene el detalle de una recomendación específica.
@@ -0,0 +1,63 @@
+from datetime import date
+
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .lecturas import CAMPOS
+from .regional import GRUPO, inicio_mes, ranking_predios, resumen_grupos, ultimo_refresco
+from .replicas import lectura_replica
+
+
+def _parametros(request):
+    """(mes, parametro, filtros) de la query string, o un Response de error."""
+    profile = getattr(request, 'profile', None)
+    if not profile or profile.role != 'admin':
+        return Response({"error": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
+    parametro = request.query_params.get('parametro', 'fosforo')
+    if parametro not in CAMPOS:
+        return Response({'error': f"parametro debe ser uno de: {', '.join(CAMPOS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        mes = request.query_params.get('mes')
+        mes = date.fromisoformat(f'{mes}-01') if mes else inicio_mes(date.today())
+    except ValueError:
+        return Response({'error': 'mes debe tener el formato AAAA-MM'}, status=status.HTTP_400_BAD_REQUEST)
+    filtros = {campo: request.query_params[campo] for campo in GRUPO if request.query_params.get(campo)}
+    return mes, parametro, filtros
+
+
+@api_view(['GET'])
+@lectura_replica
+def resumen_regional(request):
+    """
+    Promedio, cuartiles y puesto de cada grupo zona / suelo / cultivo (solo administradores).
+    GET /api/regional/resumen/?mes=2025-05&parametro=fosforo&zona=Osorno&tipo_suelo=Andisol&cultivo=Ballica perenne
+    Lee los indicadores de `manage.py refrescar_regional`, no las mediciones.
+    """
+    parametros = _parametros(request)
+    if isinstance(parametros, Response):
+        return parametros
+    mes, parametro, filtros = parametros
+    return Response({'mes': mes, 'parametro': parametro, 'actualizado': ultimo_refresco(mes),
+                     'grupos': resumen_grupos(mes, parametro, filtros)})
+
+
+@api_view(['GET'])
+@lectura_replica
+def ranking_regional(request):
+    """
+    Predios con su puesto y percentil dentro de su grupo (solo administradores);
+    `limite` es la cantidad de predios por grupo.
+    GET /api/regional/ranking/?mes=2025-05&parametro=nitrogeno&zona=Osorno&limite=100
+    """
+    parametros = _parametros(request)
+    if isinstance(parametros, Response):
+        return parametros
+    mes, parametro, filtros = parametros
+    try:
+        limite = max(1, int(request.query_params.get('limite', 500)))
+    except ValueError:
+        return Response({'error': 'limite debe ser un número entero'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'mes': mes, 'parametro': parametro, 'actualizado': ultimo_refresco(mes),
+                     'predios': ranking_predios(mes, parametro, filtros, limite=limite)})
@@ -0,0 +1,67 @@
+from django.db.models import F
+from django.http import HttpResponse
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import Recomendacion, Reporte
+from .reportes import CONTENT_TYPES, solicitar_reporte
+from .serializers import ReporteSerializer, SolicitudReporteSerializer
+
+
+class ReporteViewSet(mixins.RetrieveModelMixin,
+                     mixins.ListModelMixin,
+                     viewsets.GenericViewSet):
+    """
+    POST /api/reportes/                  -> solicita un reporte (202 en cola, 200 si ya estaba generado)
+    GET  /api/reportes/<id>/             -> estado del reporte
+    GET  /api/reportes/<id>/descargar/   -> artefacto (PDF/CSV), con ETag
+    """
+    serializer_class = ReporteSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        profile = getattr(self.request, 'profile', None)
+        if not profile:
+            return Reporte.objects.none()
+        queryset = Reporte.objects.filter(usuario=profile)
+        # El archivo solo se lee al descargar
+        return queryset if self.action == 'descargar' else queryset.defer('archivo')
+
+    def create(self, request, *args, **kwargs):
+        profile = getattr(request, 'profile', None)
+        if not profile:
+            return Response({'error': 'Usuario sin perfil'}, status=status.HTTP_403_FORBIDDEN)
+
+        solicitud = SolicitudReporteSerializer(data=request.data)
+        solicitud.is_valid(raise_exception=True)
+        recomendacion_id = solicitud.validated_data.get('recomendacion')
+        if recomendacion_id and not Recomendacion.objects.filter(pk=recomendacion_id, predio__usuario=profile).exists():
+            return Response({'error': 'Recomendación no encontrada o no pertenece al usuario'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        reporte, _ = solicitar_reporte(
+            profile, solicitud.validated_data['tipo'], solicitud.validated_data['formato'], solicitud.parametros()
+        )
+        reporte.refresh_from_db(fields=['estado', 'tamano', 'error', 'duracion_ms', 'fecha_generado'])
+        codigo = status.HTTP_200_OK if reporte.estado == 'listo' else status.HTTP_202_ACCEPTED
+        return Response(self.get_serializer(reporte).data, status=codigo)
+
+    @action(detail=True, methods=['get'])
+    def descargar(self, request, pk=None):
+        reporte = self.get_object()
+        if reporte.estado != 'listo':
+            return Response(self.get_serializer(reporte).data, status=status.HTTP_409_CONFLICT)
+
+        etag = f'"{reporte.clave}"'
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+
+        Reporte.objects.filter(pk=reporte.pk).update(descargas=F('descargas') + 1)
+        fecha = (reporte.fecha_generado or reporte.fecha_solicitud).strftime('%Y%m%d')
+        response = HttpResponse(bytes(reporte.archivo), content_type=CONTENT_TYPES[reporte.formato])
+        response['Content-Disposition'] = f'attachment; filename="reporte_{reporte.tipo}_{fecha}.{reporte.formato}"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+        return response
@@ -0,0 +1,21 @@
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .tareas import metricas
+
+
+@api_view(['GET'])
+def metricas_tareas(request):
+    """
+    Profundidad de la cola y latencias de la última hora (solo administradores).
+    GET /api/tareas/metricas/?ventana=60
+    """
+    profile = getattr(request, 'profile', None)
+    if not profile or profile.role != 'admin':
+        return Response({"error": "No autorizado"}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        ventana = max(1, min(int(request.query_params.get('ventana', 60)), 24 * 60))
+    except ValueError:
+        return Response({'error': 'ventana debe ser un número de minutos'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(metricas(ventana_minutos=ventana))
@@ -208,4 +208,20 @@ class MotorFertilizacion:
             'factor_zona': factor_zona,
             'factor_suelo': factor_suelo,
             'factor_precipitacion': factor_precip,
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def calcular_lote(cls, mediciones):
+        """
+        Calcula la recomendación de muchas mediciones de una vez (importaciones
+        masivas). Cada medición debe traer su predio cargado (select_related).
+        Retorna una lista de (medicion, calculos, error): si el cálculo de una
+        fila falla, su error queda registrado y el resto del lote continúa.
+        """
+        resultados = []
+        for medicion in mediciones:
+            try:
+                resultados.append((medicion, cls.calcular_recomendacion_completa(medicion, medicion.predio), None))
+            except (TypeError, ValueError, ArithmeticError) as e:
+                resultados.append((medicion, None, str(e)))
+        return resultados
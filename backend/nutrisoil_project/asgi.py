@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nutrisoil_project.settings')
 
+# Con ASGI las vistas de api/views_async.py (/api/async/...) hacen sus consultas en paralelo:
+#   gunicorn nutrisoil_project.asgi -k uvicorn.workers.UvicornWorker
+# Las exportaciones (/api/exportar/...) siguen en streaming con api.asincronia.en_flujo.
 application = get_asgi_application()
@@ -49,9 +49,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: mide la petición completa (latencia, SQL, serialización, tamaño)
+    'api.metricas.MetricasMiddleware',
+    # Solo actúa con X-Perfilar / ?perfilar=1 de un admin (api/perfilado.py)
+    'api.perfilado.PerfiladoMiddleware',
+    # Tras una escritura el usuario lee de la primaria por unos segundos (api/replicas.py)
+    'api.replicas.EscriturasRecientesMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise con soporte async: un middleware solo síncrono serializa las peticiones bajo ASGI
+    'api.asincronia.WhiteNoiseAsyncMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -117,21 +124,123 @@ WEMOS_API_KEY = os.getenv('WEMOS_API_KEY')
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
 
+# JWKS para tokens firmados con claves asimétricas (RS256/ES256)
+# Por defecto: {SUPABASE_URL}/auth/v1/.well-known/jwks.json
+SUPABASE_JWKS_URL = os.getenv('SUPABASE_JWKS_URL')
+SUPABASE_JWKS_TTL = int(os.getenv('SUPABASE_JWKS_TTL', '600'))  # segundos
+SUPABASE_JWKS_MIN_REFETCH = int(os.getenv('SUPABASE_JWKS_MIN_REFETCH', '30'))  # segundos
+# Tokens ya verificados que se mantienen en memoria (0 = desactivado)
+SUPABASE_TOKEN_CACHE_SIZE = int(os.getenv('SUPABASE_TOKEN_CACHE_SIZE', '1024'))
+
+# Cliente de administración de Supabase Auth (api/supabase_admin.py)
+SUPABASE_ADMIN_TIMEOUT = float(os.getenv('SUPABASE_ADMIN_TIMEOUT', '10'))  # segundos
+SUPABASE_ADMIN_MAX_RETRIES = int(os.getenv('SUPABASE_ADMIN_MAX_RETRIES', '2'))
+SUPABASE_ADMIN_MAX_WORKERS = int(os.getenv('SUPABASE_ADMIN_MAX_WORKERS', '8'))  # Altas en paralelo
+SUPABASE_ADMIN_BULK_MAX = int(os.getenv('SUPABASE_ADMIN_BULK_MAX', '500'))  # Usuarios por petición
+
+# Cola de tareas en la base de datos (api/tareas.py, worker: manage.py procesar_tareas)
+TAREAS_MAX_INTENTOS = int(os.getenv('TAREAS_MAX_INTENTOS', '5'))
+TAREAS_BACKOFF_BASE = float(os.getenv('TAREAS_BACKOFF_BASE', '5'))  # segundos, se duplica por intento
+TAREAS_BACKOFF_MAX = float(os.getenv('TAREAS_BACKOFF_MAX', '600'))  # segundos
+TAREAS_TIMEOUT_PROCESANDO = int(os.getenv('TAREAS_TIMEOUT_PROCESANDO', '600'))  # segundos sin terminar = worker caído
+TAREAS_RETENCION_DIAS = int(os.getenv('TAREAS_RETENCION_DIAS', '7'))  # Completadas que se conservan
+
+# Reportes PDF/CSV (api/reportes.py). False = se generan dentro de la petición
+REPORTES_EN_SEGUNDO_PLANO = os.getenv('REPORTES_EN_SEGUNDO_PLANO', 'True') == 'True'
+
+# Importación masiva de mediciones (POST /api/mediciones/importar/)
+IMPORTACION_MAX_FILAS = int(os.getenv('IMPORTACION_MAX_FILAS', '100000'))
+IMPORTACION_MAX_ERRORES = int(os.getenv('IMPORTACION_MAX_ERRORES', '200'))  # Errores detallados en la respuesta
+
+# Dispositivos IoT: minutos sin reportar para considerarlos inactivos (GET /api/iot/dispositivos/)
+IOT_DISPOSITIVO_INACTIVO_MIN = int(os.getenv('IOT_DISPOSITIVO_INACTIVO_MIN', '60'))
+# Ingesta con números de secuencia: lecturas que el firmware guarda para reenviar (los huecos más
+# antiguos ya no se piden) y máximo de rangos faltantes por dispositivo (al pasarlo se unen los más cercanos)
+IOT_VENTANA_SECUENCIA = int(os.getenv('IOT_VENTANA_SECUENCIA', '1000'))
+IOT_MAX_RANGOS_FALTANTES = int(os.getenv('IOT_MAX_RANGOS_FALTANTES', '32'))
+
+# Anomalías en la ingesta (api/anomalias.py): media y varianza móviles por predio y parámetro
+ANOMALIAS_MINIMO = int(os.getenv('ANOMALIAS_MINIMO', '20'))  # Lecturas antes de marcar por desvío
+ANOMALIAS_Z = float(os.getenv('ANOMALIAS_Z', '4'))  # Desvíos estándar para marcar una lectura
+ANOMALIAS_ALFA = float(os.getenv('ANOMALIAS_ALFA', '0.05'))  # Peso de cada lectura en la media exponencial
+ANOMALIAS_CONSECUTIVAS = int(os.getenv('ANOMALIAS_CONSECUTIVAS', '6'))  # Seguidas: cambio de nivel, se reinicia
+# Los promedios semanales y las recomendaciones ignoran los valores marcados
+ANOMALIAS_EXCLUIR_PROMEDIOS = os.getenv('ANOMALIAS_EXCLUIR_PROMEDIOS', 'True') == 'True'
+
+# Pronósticos de humedad y NPK (api/pronosticos.py, comando `pronosticar`; requiere numpy)
+PRONOSTICO_HORIZONTE = int(os.getenv('PRONOSTICO_HORIZONTE', '7'))  # Días proyectados
+PRONOSTICO_HISTORIA = int(os.getenv('PRONOSTICO_HISTORIA', '28'))  # Días de resúmenes usados para ajustar
+PRONOSTICO_MINIMO_DIAS = int(os.getenv('PRONOSTICO_MINIMO_DIAS', '5'))  # Días con datos para pronosticar
+PRONOSTICO_ALFA = float(os.getenv('PRONOSTICO_ALFA', '0.5'))  # Suavizado del nivel (Holt)
+PRONOSTICO_BETA = float(os.getenv('PRONOSTICO_BETA', '0.2'))  # Suavizado de la tendencia (Holt)
+PRONOSTICO_AMORTIGUAR = float(os.getenv('PRONOSTICO_AMORTIGUAR', '0.9'))  # Tendencia amortiguada por día (1 = lineal)
+
+# Métricas Prometheus (GET /metrics, api/metricas.py)
+METRICAS_UMBRAL_LENTO_MS = float(os.getenv('METRICAS_UMBRAL_LENTO_MS', '1000'))  # Peticiones lentas al log
+# Sin token /metrics solo responde con DEBUG=True; con token exige "Authorization: Bearer <token>"
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+
+
+# Conexiones a PostgreSQL (api/basedatos: tiempo para obtener conexión y estado del pool en /metrics)
+# 'persistente': cada hilo de gunicorn reutiliza su conexión hasta DB_CONN_MAX_AGE segundos
+# 'pool': pool de psycopg3 con DB_POOL_MIN..DB_POOL_MAX conexiones (requiere psycopg[pool] en vez de psycopg2)
+# 'ninguno': una conexión nueva por petición
+DB_MODO_CONEXION = os.getenv('DB_MODO_CONEXION', 'persistente')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '600'))  # segundos
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '2'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # segundos esperando una conexión libre
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'api.basedatos',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        # Django no admite CONN_MAX_AGE junto con el pool
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE if DB_MODO_CONEXION == 'persistente' else 0,
+        # Ping antes de reutilizar una conexión persistente o de entregarla desde el pool
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+if DB_MODO_CONEXION == 'pool':
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {'min_size': DB_POOL_MIN, 'max_size': DB_POOL_MAX, 'timeout': DB_POOL_TIMEOUT},
+    }
+
+# Réplicas de lectura (api/replicas.py): "host" o "host:puerto" separados por coma, mismas credenciales.
+# Solo las vistas con @lectura_replica leen de ellas.
+DB_REPLICA_HOSTS = [h.strip() for h in os.getenv('DB_REPLICA_HOSTS', '').split(',') if h.strip()]
+DB_REPLICA_NAME = os.getenv('DB_REPLICA_NAME') or DATABASES['default']['NAME']
+DB_REPLICA_RETRASO_MAX = float(os.getenv('DB_REPLICA_RETRASO_MAX', '5'))  # segundos; con más se lee de la primaria
+DB_REPLICA_INTERVALO_RETRASO = float(os.getenv('DB_REPLICA_INTERVALO_RETRASO', '5'))  # segundos entre mediciones
+# Segundos que un usuario lee de la primaria después de escribir (guardado en la cache de Django)
+DB_REPLICA_VENTANA_ESCRITURA = int(os.getenv('DB_REPLICA_VENTANA_ESCRITURA', '10'))
+
+for numero, replica in enumerate(DB_REPLICA_HOSTS, start=1):
+    host, _, puerto = replica.partition(':')
+    DATABASES[f'replica_{numero}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': puerto or DATABASES['default']['PORT'],
+        'NAME': DB_REPLICA_NAME,
+        'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {})),
+        # En las pruebas la réplica apunta a la base de pruebas de la primaria
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.replicas.RouterReplicas']
+
+# Vistas async (api/views_async.py, servidas por nutrisoil_project/asgi.py): hilos por proceso que ejecutan
+# sus consultas en paralelo. Cada hilo mantiene su conexión: acota las conexiones de cada worker ASGI.
+ASYNC_HILOS_BD = int(os.getenv('ASYNC_HILOS_BD', '8'))
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # JSONRenderer sobre orjson (mismo formato, cae al estándar si no está instalado)
+        'api.renderers.ORJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -4,7 +4,10 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from api.views_metricas import metricas_prometheus
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),  # ← Agregar esta línea
+    path('metrics', metricas_prometheus, name='metrics'),  # Prometheus
 ]
\ No newline at end of file
@@ -34,6 +34,15 @@ const int predioId = 1;
 // Pin del sensor (ejemplo analógico)
 const int sensorPin = A0; 
 
+// Protocolo con números de secuencia: cada lectura lleva "seq" (creciente) y
+// "sesion" (cambia en cada arranque). El backend descarta los reenvíos ya
+// guardados y responde en "faltantes" los rangos [desde, hasta] que no recibió;
+// se reenvían solo esos, si todavía están en el buffer.
+const int BUFFER = 32;
+float buffer[BUFFER];
+unsigned long seq = 0;
+String sesion;
+
 void setup() {
   Serial.begin(115200);
   delay(1000);
@@ -46,6 +55,54 @@ void setup() {
     Serial.print(".");
   }
   Serial.println("\nConectado a WiFi!");
+
+  sesion = String(ESP.getCycleCount(), HEX) + String(micros(), HEX);  // Distinta en cada arranque
+}
+
+// Envía la lectura `numero` del buffer. Retorna la respuesta, o "" si falló.
+String enviar(unsigned long numero) {
+  WiFiClient client;
+  HTTPClient http;
+  http.begin(client, serverUrl);
+  http.addHeader("Content-Type", "application/json");
+  http.addHeader("X-Api-Key", deviceToken);
+
+  // Crear JSON manual
+  String jsonPayload = "{";
+  jsonPayload += "\"predio_id\": " + String(predioId) + ",";
+  jsonPayload += "\"dispositivo_id\": \"wemos-" + String(ESP.getChipId(), HEX) + "\",";  // Identifica el sensor en /api/iot/dispositivos/
+  jsonPayload += "\"sesion\": \"" + sesion + "\",";
+  jsonPayload += "\"seq\": " + String(numero) + ",";
+  jsonPayload += "\"humedad\": " + String(buffer[numero % BUFFER]);
+  // jsonPayload += ",\"temperatura\": 25.0"; // Opcional
+  // jsonPayload += ",\"ph\": 6.5"; // Opcional
+  jsonPayload += "}";
+
+  int httpResponseCode = http.POST(jsonPayload);
+  String response = (httpResponseCode == 200 || httpResponseCode == 201) ? http.getString() : "";
+  Serial.println("seq " + String(numero) + " -> HTTP " + String(httpResponseCode));
+  http.end();
+  return response;
+}
+
+// Reenvía los rangos de "faltantes": [[desde, hasta], ...] que sigan en el buffer
+void reenviarFaltantes(const String& response) {
+  int pos = response.indexOf("\"faltantes\"");
+  if (pos < 0) return;
+  int fin = response.indexOf("]]", pos);
+  while (true) {
+    int abre = response.indexOf('[', pos + 1);
+    if (abre < 0 || (fin >= 0 && abre > fin) || response.charAt(abre + 1) == ']') break;  // Fin o lista vacía
+    if (response.charAt(abre + 1) == '[') { pos = abre; continue; }
+    int coma = response.indexOf(',', abre);
+    int cierra = response.indexOf(']', abre);
+    unsigned long desde = response.substring(abre + 1, coma).toInt();
+    unsigned long hasta = response.substring(coma + 1, cierra).toInt();
+    for (unsigned long n = desde; n <= hasta; n++) {
+      if (n + BUFFER > seq) enviar(n);  // Las más antiguas ya se sobrescribieron
+    }
+    pos = cierra;
+  }
 }
 
 void loop() {
@@ -54,40 +111,17 @@ void loop() {
   // float humedad = map(rawValue, 1024, 0, 0, 100); // Ejemplo de mapeo
   float humedad = 45.5; // Valor simulado para prueba
 
-  // 2. Enviar datos
+  // 2. Guardar en el buffer y enviar; si falla, el backend la pedirá en "faltantes"
+  seq++;
+  buffer[seq % BUFFER] = humedad;
   if (WiFi.status() == WL_CONNECTED) {
-    WiFiClient client;
-    HTTPClient http;
-
     Serial.print("Enviando datos a: ");
     Serial.println(serverUrl);
-
-    http.begin(client, serverUrl);
-    http.addHeader("Content-Type", "application/json");
-    
-    // Crear JSON manual
-    String jsonPayload = "{";
-    jsonPayload += "\"token\": \"" + String(deviceToken) + "\",";
-    jsonPayload += "\"predio_id\": " + String(predioId) + ",";
-    jsonPayload += "\"humedad\": " + String(humedad);
-    // jsonPayload += ",\"temperatura\": 25.0"; // Opcional
-    // jsonPayload += ",\"ph\": 6.5"; // Opcional
-    jsonPayload += "}";
-
-    Serial.println("Payload: " + jsonPayload);
-
-    int httpResponseCode = http.POST(jsonPayload);
-
-    if (httpResponseCode > 0) {
-      String response = http.getString();
-      Serial.println("Código HTTP: " + String(httpResponseCode));
+    String response = enviar(seq);
+    if (response.length() > 0) {
       Serial.println("Respuesta: " + response);
-    } else {
-      Serial.print("Error enviando POST: ");
-      Serial.println(httpResponseCode);
+      reenviarFaltantes(response);
     }
-
-    http.end();
   } else {
     Serial.println("WiFi desconectado");
   }
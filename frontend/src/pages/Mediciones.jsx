@@ -47,6 +47,8 @@ function Mediciones() {
             const params = {
                 predio: predioId,
                 page: page,
+                // Solo las columnas de la tabla (sin recomendación ni predio anidados)
+                fields: 'id,fecha,origen,ph,temperatura,humedad,nitrogeno,fosforo,potasio',
                 ...appliedFilters,
             };
 
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams } from 'react-router-dom';
 import { Container, Row, Col, Card, Table, Spinner, Alert, Badge, Button } from 'react-bootstrap'; // Importar Button
-import { getRecomendacionDetail } from '../services/api';
+import { getRecomendacionDetail, generarReporte, descargarReporte } from '../services/api';
 import { showToast } from '../utils/toast'; // Importar showToast
 import { formatNumber } from '../utils/formatters';
 
@@ -31,6 +31,7 @@ const RecomendacionDetalle = () => {
     const [recomendacion, setRecomendacion] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [isExporting, setIsExporting] = useState(false);
 
     const fetchRecomendacion = useCallback(async () => {
         try {
@@ -55,8 +56,17 @@ const RecomendacionDetalle = () => {
         showToast("Funcionalidad 'Enviar por correo' en desarrollo.", 'info');
     };
 
-    const handleExportPdf = () => {
-        showToast("Funcionalidad 'Exportar PDF' en desarrollo.", 'info');
+    const handleExportPdf = async () => {
+        setIsExporting(true);
+        try {
+            const reporte = await generarReporte({ tipo: 'recomendacion', formato: 'pdf', recomendacion: Number(id) });
+            await descargarReporte(reporte);
+        } catch (err) {
+            console.error("Error exportando el PDF:", err);
+            showToast(err.message || "No se pudo exportar el PDF.", 'error');
+        } finally {
+            setIsExporting(false);
+        }
     };
 
     if (loading) {
@@ -132,8 +142,8 @@ const RecomendacionDetalle = () => {
                     <Button variant="outline-secondary" className="me-2" onClick={handleEmail}>
                         Enviar por correo
                     </Button>
-                    <Button variant="outline-primary" onClick={handleExportPdf}>
-                        Exportar PDF
+                    <Button variant="outline-primary" onClick={handleExportPdf} disabled={isExporting}>
+                        {isExporting ? 'Exportando...' : 'Exportar PDF'}
                     </Button>
                 </Col>
             </Row>
@@ -1,13 +1,14 @@
 import React, { useState, useEffect, useMemo } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Container, Card, Button, Row, Col, Form, Spinner, Table, Accordion } from 'react-bootstrap';
-import { getMediciones, getPredios, getRecomendaciones } from '../services/api';
+import { getMediciones, getPredios, getRecomendaciones, generarReporte, descargarReporte } from '../services/api';
 import { showToast } from '../utils/toast'; // Importar showToast
 
 function Reportes() {
     // --- ESTADOS ---
     const [loading, setLoading] = useState(true);
     const [isGenerating, setIsGenerating] = useState(false);
+    const [isExporting, setIsExporting] = useState(false);
     const [allPredios, setAllPredios] = useState([]);
     const [recomendaciones, setRecomendaciones] = useState([]);
     const [selectedZonas, setSelectedZonas] = useState([]);
@@ -91,7 +92,7 @@ function Reportes() {
         setIsGenerating(true);
         setReportData(null);
         try {
-            const allMediciones = await getMediciones();
+            const allMediciones = await getMediciones({ expand: 'recomendacion' });
             let filteredMediciones = allMediciones.filter(m => m.recomendacion);
 
             if (reportFilters.predioIds.length > 0) {
@@ -131,8 +132,23 @@ function Reportes() {
         }
     };
 
-    const handleExportPDF = () => {
-        showToast('Función de exportar PDF en desarrollo.\nEn la versión final se generará un PDF completo con los datos de este reporte.', 'info');
+    const handleExportPDF = async () => {
+        setIsExporting(true);
+        try {
+            const reporte = await generarReporte({
+                tipo: 'resumen',
+                formato: 'pdf',
+                predios: reportFilters.predioIds.map(Number),
+                desde: reportFilters.fechaInicio || null,
+                hasta: reportFilters.fechaFin || null,
+            });
+            await descargarReporte(reporte);
+        } catch (error) {
+            console.error("Error exportando el PDF:", error);
+            showToast(error.message || "No se pudo exportar el PDF.", 'error');
+        } finally {
+            setIsExporting(false);
+        }
     };
 
     // --- RENDERIZADO ---
@@ -175,6 +191,9 @@ function Reportes() {
                     <Button variant="success" onClick={handleGenerateReport} disabled={isGenerating}>
                         {isGenerating ? <><Spinner as="span" animation="border" size="sm" role="status" aria-hidden="true" /> Generando...</> : 'Generar Reporte'}
                     </Button>
+                    <Button variant="outline-primary" className="ms-2" onClick={handleExportPDF} disabled={isExporting}>
+                        {isExporting ? <><Spinner as="span" animation="border" size="sm" role="status" aria-hidden="true" /> Exportando...</> : 'Exportar PDF'}
+                    </Button>
                 </Card.Body>
             </Card>
 
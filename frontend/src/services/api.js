@@ -315,6 +315,15 @@ export const createRecomendacionIndividual = async (medicionId) => {
   }
 };
 
+// Recomendaciones semanales de varios predios y semanas en una sola petición
+export const generarRecomendacionesSemanales = async (predioIds, semanas, forzar = false) => {
+  const response = await axios.post(
+    `${BACKEND_URL}/api/recomendaciones/generar-semanal-lote/`,
+    { predio_ids: predioIds, semanas, forzar }
+  );
+  return response.data;
+};
+
 export const getRecomendacionDetail = async (id) => {
   if (USE_MOCK) {
     await mockDelay();
@@ -336,6 +345,47 @@ export const getRecomendaciones = async () => {
 };
 
 
+// ═══════════════════════════════════════════════════════
+// 📄 REPORTES (generados en el servidor)
+// ═══════════════════════════════════════════════════════
+
+// Solicita el reporte y espera a que el worker lo genere. Si los datos no
+// cambiaron desde la última vez, el backend responde de inmediato (200).
+export const generarReporte = async (data, { intervaloMs = 1000, maxIntentos = 60 } = {}) => {
+  if (USE_MOCK) {
+    await mockDelay(1000);
+    console.log('Reporte solicitado (mock):', data);
+    return null;
+  }
+  let { data: reporte } = await axios.post(`${BACKEND_URL}/api/reportes/`, data);
+  for (let intento = 0; reporte.estado !== 'listo' && intento < maxIntentos; intento++) {
+    if (reporte.estado === 'error') {
+      throw new Error(reporte.error || 'Error al generar el reporte');
+    }
+    await new Promise(resolve => setTimeout(resolve, intervaloMs));
+    ({ data: reporte } = await axios.get(`${BACKEND_URL}/api/reportes/${reporte.id}/`));
+  }
+  if (reporte.estado !== 'listo') {
+    throw new Error('El reporte está tardando demasiado, intenta nuevamente en unos minutos.');
+  }
+  return reporte;
+};
+
+export const descargarReporte = async (reporte) => {
+  if (USE_MOCK || !reporte) {
+    return;
+  }
+  const response = await axios.get(`${BACKEND_URL}/api/reportes/${reporte.id}/descargar/`, { responseType: 'blob' });
+  const url = window.URL.createObjectURL(response.data);
+  const link = document.createElement('a');
+  link.href = url;
+  link.download = `reporte_${reporte.tipo}_${reporte.id}.${reporte.formato}`;
+  document.body.appendChild(link);
+  link.click();
+  link.remove();
+  window.URL.revokeObjectURL(url);
+};
+
 // ═══════════════════════════════════════════════════════
 // 👥 GESTIÓN DE USUARIOS (ADMIN)
 // ═══════════════════════════════════════════════════════